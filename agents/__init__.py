@@ -0,0 +1,35 @@
+"""
+Agents
+------
+
+Agent factories and the agent registry. Names are imported on first access
+(see utils/lazy_imports.py), so `from agents import get_system_info_agent`
+only loads that agent's module, prompt and tools.
+"""
+from utils.lazy_imports import lazy_exports
+
+_EXPORTS = {
+    "AgentRegistry": "agents.agent_registry",
+    "FrozenAgentError": "agents.agent_registry",
+    "get_agent_registry": "agents.agent_registry",
+    "get_dag_agent": "agents.dag_agent.dag_agent",
+    "get_network_system_agent": "agents.network_system_agent.network_system_agent",
+    "get_plan_executor_agent": "agents.plan_executor_agent.plan_executor_agent",
+    "get_planned_team_manager": "agents.team_manager_agent.team_manager_agent",
+    "get_python_expert_agent": "agents.python_expert_agent.python_expert_agent",
+    "get_python_refiner_agent": "agents.python_refiner_agent.python_refiner_agent",
+    "get_python_reviewer_agent": "agents.python_reviewer_agent.python_reviewer_agent",
+    "get_query_generation_agent": "agents.query_generation_agent.query_generation_agent",
+    "get_reviewer_agent": "agents.reviewer_agent.reviewer_agent",
+    "get_search_reviewer_agent": "agents.reviewer_agent.reviewer_agent",
+    "get_summarize_agent": "agents.summarize_agent.summarize_agent",
+    "get_system_info_agent": "agents.system_info_agent.system_info_agent",
+    "get_task_planner_agent": "agents.task_planner_agent.task_planner_agent",
+    "get_team_manager": "agents.team_manager_agent.team_manager_agent",
+    "get_url_fanout_agent": "agents.url_fanout_agent.url_fanout_agent",
+    "get_web_scrape_single_page_agent": "agents.single_page_scraper_agent.single_page_scraper_agent",
+    "get_web_search_agent": "agents.web_search_agent.web_search_agent",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,296 @@
+"""
+Agent Registry
+--------------
+
+Builds each agent pipeline once per configuration and hands the same graph
+to every Runner that asks for it.
+
+The get_*_agent() factories build a new LlmAgent on every call. A server that
+creates a Runner per request would rebuild (and re-instrument) the whole tree
+each time, and ADK would re-derive every tool declaration on every model call.
+AgentRegistry.get() instead:
+
+    1. builds the pipeline once per (name, configuration),
+    2. swaps in shared tools with cached declarations
+       (utils/llm/tool_declarations.py),
+    3. compiles every string instruction once (utils/llm/prompt_compiler.py),
+       with the token budgets from the environment,
+    4. routes every LlmAgent's model calls through a ModelRouter
+       (utils/llm/model_router.py, policy from the environment),
+    5. attaches metrics and deadline callbacks (instrument_agent(),
+       apply_deadline_budgets()),
+    6. freezes the tree: assigning to any agent attribute raises
+       FrozenAgentError, and sub_agents/tools become tuples.
+
+ADK agents keep no per-run state (that lives in the InvocationContext and the
+session), so one frozen graph can serve any number of concurrent runners.
+Callers that need to customize a pipeline use build(), which returns a fresh,
+mutable graph.
+
+Usage:
+    from agents.agent_registry import get_agent_registry
+    root_agent = get_agent_registry().get("loop_pipeline", max_iterations=5)
+    runner = Runner(app_name=APP_NAME, agent=root_agent, session_service=session_service)
+"""
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+
+from utils.llm.deadline import apply_deadline_budgets
+from utils.llm.model_router import apply_model_routing
+from utils.llm.prompt_compiler import compile_instructions
+from utils.llm.tool_declarations import share_tool_declarations
+from utils.metrics.metrics_callbacks import instrument_agent
+
+# Builder signature: (**configuration) -> root agent of a new pipeline.
+PipelineBuilder = Callable[..., BaseAgent]
+
+
+class FrozenAgentError(AttributeError):
+    """Raised when an agent of a shared, frozen pipeline is modified."""
+
+
+_frozen_classes: Dict[type, type] = {}
+_frozen_classes_lock = threading.Lock()
+
+
+def _refuse_change(self, name: str, value: Any = None) -> None:
+    raise FrozenAgentError(
+        f"Agent '{self.name}' belongs to a shared pipeline from the AgentRegistry and cannot be changed"
+        f" (setting '{name}'). Use AgentRegistry.build() for a private copy."
+    )
+
+
+def _frozen_class(cls: type) -> type:
+    """A subclass of an agent class that refuses attribute changes; isinstance() checks still pass."""
+    with _frozen_classes_lock:
+        if cls not in _frozen_classes:
+            _frozen_classes[cls] = type(cls.__name__, (cls,), {
+                "__module__": cls.__module__,
+                "__qualname__": cls.__qualname__,
+                "__setattr__": _refuse_change,
+                "__delattr__": _refuse_change,
+            })
+        return _frozen_classes[cls]
+
+
+def freeze_agent_tree(agent: BaseAgent) -> BaseAgent:
+    """
+    Makes every agent in a tree refuse attribute changes.
+
+    Args:
+        agent (BaseAgent): The root of the agent tree.
+
+    Returns:
+        BaseAgent: The same agent, for chaining.
+    """
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if type(current).__setattr__ is _refuse_change:
+            continue
+        object.__setattr__(current, "sub_agents", tuple(current.sub_agents))
+        if isinstance(current, LlmAgent):
+            object.__setattr__(current, "tools", tuple(current.tools))
+        object.__setattr__(current, "__class__", _frozen_class(type(current)))
+    return agent
+
+
+def _config_key(value: Any) -> Hashable:
+    """A hashable form of a configuration value (lists and dicts included)."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _config_key(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_config_key(item) for item in value)
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else items
+    hash(value)  # raises TypeError for unhashable values
+    return value
+
+
+class AgentRegistry:
+    """
+    Named pipeline builders, and the shared frozen graphs built from them.
+
+    Thread-safe: concurrent get() calls for the same configuration build it once.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, PipelineBuilder] = {}
+        self._graphs: Dict[Tuple[str, Hashable], BaseAgent] = {}
+        self._build_locks: Dict[Tuple[str, Hashable], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def register(self, name: str, builder: PipelineBuilder) -> None:
+        """
+        Args:
+            name (str): Pipeline name.
+            builder (callable): (**configuration) -> root agent of a new pipeline.
+        """
+        with self._lock:
+            self._builders[name] = builder
+            # Graphs of a replaced builder are stale.
+            for key in [key for key in self._graphs if key[0] == name]:
+                del self._graphs[key]
+
+    def names(self) -> List[str]:
+        return sorted(self._builders)
+
+    def build(self, name: str, **config: Any) -> BaseAgent:
+        """
+        Builds a new, mutable, uninstrumented pipeline.
+
+        Raises:
+            KeyError: If no pipeline is registered under name.
+        """
+        if name not in self._builders:
+            raise KeyError(f"No agent pipeline named '{name}', expected one of {self.names()}.")
+        return self._builders[name](**config)
+
+    def get(self, name: str, **config: Any) -> BaseAgent:
+        """
+        Returns the shared, instrumented and frozen pipeline for a configuration,
+        building it on first use.
+
+        Args:
+            name (str): Pipeline name.
+            **config: Passed to the builder; part of the cache key, so values
+                must be hashable (lists and dicts are fine).
+
+        Returns:
+            BaseAgent: The root agent.
+
+        Raises:
+            KeyError: If no pipeline is registered under name.
+            TypeError: If a configuration value is not hashable.
+        """
+        key = (name, _config_key(config))
+        graph = self._graphs.get(key)
+        if graph is not None:
+            self.hits += 1
+            return graph
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            graph = self._graphs.get(key)
+            if graph is None:
+                graph = self.build(name, **config)
+                share_tool_declarations(graph)
+                compile_instructions(graph)
+                apply_model_routing(graph)
+                instrument_agent(graph)
+                apply_deadline_budgets(graph)
+                freeze_agent_tree(graph)
+                self._graphs[key] = graph
+                self.builds += 1
+            else:
+                self.hits += 1
+        return graph
+
+    def clear(self) -> None:
+        """Forgets all built graphs; the next get() builds again."""
+        with self._lock:
+            self._graphs.clear()
+            self._build_locks.clear()
+
+
+# ------------------------------------------------------------------ pipelines
+# Agent modules are imported by the builders, so a pipeline that is never
+# requested costs nothing (and a broken agent module only breaks its pipelines).
+
+
+def build_loop_pipeline(max_iterations: int = 5) -> BaseAgent:
+    """Python expert, then a reviewer/refiner loop (use_loop_agent.py)."""
+    from google.adk.agents import LoopAgent, SequentialAgent
+
+    from agents.python_expert_agent.python_expert_agent import get_python_expert_agent
+    from agents.python_refiner_agent.python_refiner_agent import get_python_refiner_agent
+    from agents.python_reviewer_agent.python_reviewer_agent import get_python_reviewer_agent
+    from utils.code.execution_feedback import get_execution_feedback_agent
+
+    loop_agent = LoopAgent(
+        name="loop_agent",
+        description="A loop agent that can loop through a list of items",
+        max_iterations=max_iterations,
+        sub_agents=[get_execution_feedback_agent(), get_python_reviewer_agent(), get_python_refiner_agent()],
+    )
+    return SequentialAgent(
+        name="sequential_agent",
+        description="A sequential agent that can execute a list of agents in order",
+        sub_agents=[get_python_expert_agent(), loop_agent],
+    )
+
+
+def build_planned_team_pipeline() -> BaseAgent:
+    """Task planner, plan executor and team manager over the system, network, summary and Python agents (use_team_manager_agent.py)."""
+    from agents.network_system_agent.network_system_agent import get_network_system_agent
+    from agents.python_expert_agent.python_expert_agent import get_python_expert_agent
+    from agents.summarize_agent.summarize_agent import get_summarize_agent
+    from agents.system_info_agent.system_info_agent import get_system_info_agent
+    from agents.team_manager_agent.team_manager_agent import get_planned_team_manager
+    from tools.date_time_tool import get_date_and_time
+
+    return get_planned_team_manager(
+        [get_system_info_agent(), get_network_system_agent(), get_summarize_agent(), get_python_expert_agent()],
+        tools=[get_date_and_time],
+    )
+
+
+def build_search_pipeline() -> BaseAgent:
+    """Query generation, web search, parallel per-URL scraping and review (use_sequential_agent.py)."""
+    from google.adk.agents import SequentialAgent
+
+    from agents.query_generation_agent.query_generation_agent import get_query_generation_agent
+    from agents.reviewer_agent.reviewer_agent import get_search_reviewer_agent
+    from agents.url_fanout_agent.url_fanout_agent import get_url_fanout_agent
+    from agents.web_search_agent.web_search_agent import get_web_search_agent
+
+    return SequentialAgent(
+        name="sequential_agent",
+        description="a sequential agent that is charge on execute other agents in a specific order",
+        sub_agents=[
+            get_query_generation_agent(),
+            get_web_search_agent(),
+            get_url_fanout_agent(),
+            get_search_reviewer_agent(),
+        ],
+    )
+
+
+def build_system_info_pipeline() -> BaseAgent:
+    """Tool prefetch, system and network info, then a review, as a DAG (use_parallel_agents.py)."""
+    from agents.dag_agent.dag_agent import get_dag_agent
+    from agents.network_system_agent.network_system_agent import get_network_system_agent
+    from agents.reviewer_agent.reviewer_agent import get_reviewer_agent
+    from agents.system_info_agent.system_info_agent import get_system_info_agent
+    from utils.llm.tool_prefetch import get_tool_prefetch_agent
+
+    prefetch_agent = get_tool_prefetch_agent()
+    return get_dag_agent(
+        name="system_report_dag",
+        description="System and network reports, then a combined review.",
+        sub_agents=[prefetch_agent, get_system_info_agent(), get_network_system_agent(), get_reviewer_agent()],
+        # The info agents read the prefetched tool results in a model callback, not a template.
+        dependencies={
+            "system_info_agent": [prefetch_agent.name],
+            "network_system_agent": [prefetch_agent.name],
+        },
+    )
+
+
+_registry = AgentRegistry()
+_registry.register("loop_pipeline", build_loop_pipeline)
+_registry.register("planned_team_pipeline", build_planned_team_pipeline)
+_registry.register("search_pipeline", build_search_pipeline)
+_registry.register("system_info_pipeline", build_system_info_pipeline)
+
+
+def get_agent_registry() -> AgentRegistry:
+    """
+    Returns:
+        AgentRegistry: The process-wide registry, with the pipelines of the use_*.py scripts registered.
+    """
+    return _registry
@@ -0,0 +1,335 @@
+"""
+DAG Agent
+---------
+
+Runs sub-agents as a dependency graph instead of hand-nested
+SequentialAgent/ParallelAgent trees: each sub-agent (node) starts as soon as
+the state keys it reads have been written, not when a whole stage is done.
+
+Dependencies are inferred from what the nodes already declare:
+
+    * reads:  the {key} templates in the instructions of the LlmAgents in the
+              node ({key?} is optional and does not wait),
+    * writes: the output_key of the LlmAgents in the node,
+
+plus any `dependencies` given explicitly ({node: [node or state key, ...]})
+for inputs that are not templates, e.g. a node reading state in a callback.
+A key no node writes is an input of the whole graph (initial session state).
+A node whose required inputs were not produced (an upstream agent was
+skipped by the turn deadline or wrote nothing) is skipped too.
+
+At most max_workers nodes run at once ($DAG_MAX_WORKERS, default 8); when
+more are ready, those with the longest chain of dependents start first.
+Like ParallelAgent, every node runs in its own branch, so concurrent nodes do
+not see each other's conversation; data flows through state.
+
+After the run, state["dag_report"] holds each node's start and end time
+(seconds from the DAG's start), its status ("done" or "skipped") and the
+critical path: the chain of nodes, each started by the end of the previous
+one, that set the DAG's total time.
+
+Usage:
+    dag = get_dag_agent("report_dag", [system_info_agent, network_agent, reviewer_agent])
+"""
+import asyncio
+import os
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from utils.llm.prompt_compiler import template_keys
+
+DAG_REPORT_KEY = "dag_report"
+
+# Nodes running at once.
+DEFAULT_MAX_WORKERS = int(os.environ.get("DAG_MAX_WORKERS", 8))
+
+
+def _llm_agents(agent: BaseAgent) -> List[LlmAgent]:
+    found, pending = [], [agent]
+    while pending:
+        current = pending.pop(0)
+        pending.extend(current.sub_agents)
+        if isinstance(current, LlmAgent):
+            found.append(current)
+    return found
+
+
+def node_writes(agent: BaseAgent) -> Set[str]:
+    """
+    Returns:
+        set: The output_keys of the LlmAgents in the agent's tree.
+    """
+    return {llm.output_key for llm in _llm_agents(agent) if llm.output_key}
+
+
+def node_reads(agent: BaseAgent) -> Dict[str, bool]:
+    """
+    The state keys an agent's tree reads through instruction templates, without
+    the keys it writes itself.
+
+    Compiled prompts (utils/llm/prompt_compiler.py) are read from their
+    template. Other instructions given as functions (InstructionProvider)
+    cannot be inspected; declare their inputs with the DAG's `dependencies`.
+
+    Args:
+        agent (BaseAgent): A node of the DAG.
+
+    Returns:
+        dict: key -> True if required ({key}), False if optional ({key?}).
+    """
+    reads: Dict[str, bool] = {}
+    for llm in _llm_agents(agent):
+        instruction = getattr(llm.instruction, "template", llm.instruction)
+        if not isinstance(instruction, str):
+            continue
+        for key, required in template_keys(instruction).items():
+            reads[key] = reads.get(key, False) or required
+    for key in node_writes(agent):
+        reads.pop(key, None)
+    return reads
+
+
+class DagPlan:
+    """
+    The dependency graph of a DagAgent's nodes.
+
+    Attributes:
+        order (list[str]): Node names in declaration order.
+        after (dict): node -> the nodes it waits for.
+        required (dict): node -> the state keys that must exist when it starts.
+        height (dict): node -> length of its longest chain of dependents
+            (itself included); scheduling priority.
+    """
+
+    def __init__(self, nodes: List[BaseAgent], dependencies: Optional[Dict[str, List[str]]] = None):
+        self.order = [node.name for node in nodes]
+        writers: Dict[str, str] = {}
+        for node in nodes:
+            for key in node_writes(node):
+                if key in writers:
+                    raise ValueError(f"State key '{key}' is written by both '{writers[key]}' and '{node.name}'.")
+                writers[key] = node.name
+
+        self.after: Dict[str, Set[str]] = {}
+        self.required: Dict[str, Set[str]] = {}
+        for node in nodes:
+            reads = node_reads(node)
+            explicit = list((dependencies or {}).get(node.name, ()))
+            for item in explicit:
+                if item not in self.order and item not in writers:
+                    raise ValueError(f"Dependency '{item}' of '{node.name}' is neither a node nor a key written by one.")
+            after = {writers[key] for key in reads if key in writers}
+            after.update(item if item in self.order else writers[item] for item in explicit)
+            after.discard(node.name)
+            self.after[node.name] = after
+            self.required[node.name] = {key for key, required in reads.items() if required and key in writers}
+        unknown = set(dependencies or {}) - set(self.order)
+        if unknown:
+            raise ValueError(f"Dependencies given for unknown nodes: {', '.join(sorted(unknown))}.")
+
+        self.dependents: Dict[str, Set[str]] = {name: set() for name in self.order}
+        for name, after in self.after.items():
+            for upstream in after:
+                self.dependents[upstream].add(name)
+        self.height: Dict[str, int] = {}
+        for name in reversed(self.topological_order()):
+            self.height[name] = 1 + max((self.height[child] for child in self.dependents[name]), default=0)
+
+    def topological_order(self) -> List[str]:
+        """
+        Returns:
+            list[str]: The nodes, each after all the nodes it waits for.
+
+        Raises:
+            ValueError: If the dependencies form a cycle.
+        """
+        waiting = {name: set(after) for name, after in self.after.items()}
+        ordered: List[str] = []
+        while waiting:
+            ready = [name for name in self.order if name in waiting and not waiting[name]]
+            if not ready:
+                raise ValueError(f"Dependency cycle between: {', '.join(sorted(waiting))}.")
+            for name in ready:
+                del waiting[name]
+                ordered.append(name)
+            for after in waiting.values():
+                after.difference_update(ready)
+        return ordered
+
+
+def critical_path(after: Dict[str, Set[str]], timings: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    The chain of nodes that set the total time: from the node that ended last,
+    back through the upstream node that ended last before each one started.
+
+    Args:
+        after (dict): node -> the nodes it waits for.
+        timings (dict): node -> {"start", "end", ...} of the nodes that ran.
+
+    Returns:
+        list[str]: Node names, first to last.
+    """
+    if not timings:
+        return []
+    path = [max(timings, key=lambda name: timings[name]["end"])]
+    while True:
+        upstream = [name for name in after.get(path[-1], ()) if name in timings]
+        if not upstream:
+            break
+        path.append(max(upstream, key=lambda name: timings[name]["end"]))
+    return path[::-1]
+
+
+def render_dag_report(report: Dict[str, Any]) -> str:
+    """
+    Formats state["dag_report"] as text: one line per node, then the critical path.
+
+    Args:
+        report (dict): A DagAgent report.
+
+    Returns:
+        str: The rendered report.
+    """
+    lines = [f"{report['agent']}: {report['seconds']:.2f} s"]
+    for name, node in report["nodes"].items():
+        if node["status"] == "skipped":
+            lines.append(f"  {name:<28} skipped ({node['reason']})")
+        else:
+            lines.append(f"  {name:<28} {node['start']:>6.2f} -> {node['end']:>6.2f} s")
+    lines.append("  critical path: " + " -> ".join(report["critical_path"]))
+    return "\n".join(lines)
+
+
+class DagAgent(BaseAgent):
+    """
+    Runs its sub-agents as a dependency graph inferred from instruction
+    templates and output_keys (see the module docstring).
+
+    Attributes:
+        dependencies: Extra inputs per node name: other node names, or state
+            keys written by other nodes.
+        max_workers: Nodes running at once.
+    """
+
+    dependencies: Dict[str, List[str]] = {}
+    max_workers: int = DEFAULT_MAX_WORKERS
+
+    def plan(self) -> DagPlan:
+        """
+        Returns:
+            DagPlan: The dependency graph of the sub-agents.
+
+        Raises:
+            ValueError: If the dependencies are ambiguous, unknown or cyclic.
+        """
+        return DagPlan(list(self.sub_agents), self.dependencies)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        plan = self.plan()
+        nodes = {node.name: node for node in self.sub_agents}
+        branch = f"{ctx.branch}.{self.name}" if ctx.branch else self.name
+        started = time.perf_counter()
+
+        waiting = {name: set(after) for name, after in plan.after.items()}
+        ready = [name for name in plan.order if not waiting[name]]
+        runs: Dict[str, AsyncGenerator[Event, None]] = {}
+        steps: Dict[asyncio.Task, str] = {}
+        timings: Dict[str, Dict[str, Any]] = {}
+
+        def finish(name: str, **timing: Any) -> None:
+            timings[name] = timing
+            for child in plan.dependents[name]:
+                waiting[child].discard(name)
+                if not waiting[child] and child not in timings and child not in runs:
+                    ready.append(child)
+
+        try:
+            while ready or steps:
+                ready.sort(key=lambda name: (-plan.height[name], plan.order.index(name)))
+                while ready and len(runs) < max(1, self.max_workers) and not ctx.end_invocation:
+                    name = ready.pop(0)
+                    missing = sorted(key for key in plan.required[name] if key not in ctx.session.state)
+                    if missing:
+                        now = time.perf_counter() - started
+                        finish(name, start=now, end=now, status="skipped", reason=f"missing {', '.join(missing)}")
+                        continue
+                    runs[name] = nodes[name].run_async(ctx.model_copy(update={"branch": branch}))
+                    steps[asyncio.ensure_future(runs[name].__anext__())] = name
+                    timings[name] = {"start": time.perf_counter() - started}
+                if not steps:
+                    break
+                done, _ = await asyncio.wait(steps, return_when=asyncio.FIRST_COMPLETED)
+                for step in done:
+                    name = steps.pop(step)
+                    try:
+                        event = step.result()
+                    except StopAsyncIteration:
+                        del runs[name]
+                        finish(name, start=timings[name]["start"], end=time.perf_counter() - started, status="done")
+                        continue
+                    yield event
+                    # As ParallelAgent does: a node moves on only after the runner has
+                    # processed its event, so its state_delta is visible downstream.
+                    steps[asyncio.ensure_future(runs[name].__anext__())] = name
+        finally:
+            for step in steps:
+                step.cancel()
+
+        for name in plan.order:
+            if name not in timings:
+                timings[name] = {"start": None, "end": None, "status": "skipped", "reason": "invocation ended"}
+        ran = {name: timing for name, timing in timings.items() if timing["status"] == "done"}
+        report = {
+            "agent": self.name,
+            "seconds": round(time.perf_counter() - started, 3),
+            "nodes": {
+                name: {key: round(value, 3) if isinstance(value, float) else value for key, value in timings[name].items()}
+                for name in plan.order
+            },
+            "critical_path": critical_path(plan.after, ran),
+        }
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={DAG_REPORT_KEY: report}),
+        )
+
+
+def get_dag_agent(
+    name: str,
+    sub_agents: List[BaseAgent],
+    dependencies: Optional[Dict[str, List[str]]] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    description: str = "",
+) -> DagAgent:
+    """
+    Factory function to create a DAG workflow agent.
+
+    Args:
+        name (str): Agent name.
+        sub_agents (list): The nodes; names must be unique.
+        dependencies (dict, optional): Extra inputs per node name (other node
+            names or state keys), for inputs that are not instruction templates.
+        max_workers (int): Nodes running at once ($DAG_MAX_WORKERS, default 8).
+        description (str): Agent description.
+
+    Returns:
+        DagAgent: The configured agent.
+
+    Raises:
+        ValueError: If the dependencies are ambiguous, unknown or cyclic.
+    """
+    agent = DagAgent(
+        name=name,
+        description=description or "Runs its sub-agents as soon as the state keys they read are written.",
+        sub_agents=sub_agents,
+        dependencies=dependencies or {},
+        max_workers=max_workers,
+    )
+    agent.plan()
+    return agent
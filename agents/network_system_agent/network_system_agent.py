@@ -8,6 +8,7 @@ It uses an LLM guided by a detailed prompt and a specialized network information
 from google.adk.agents import LlmAgent
 from prompts.network_system_agent_prompt import network_system_agent_prompt
 from tools.network_info_tool import get_network_info # Import the ADK tool object
+from utils.llm.tool_prefetch import prefetch_tools_callback
 
 def get_network_system_agent() -> LlmAgent:
     """
@@ -26,6 +27,8 @@ def get_network_system_agent() -> LlmAgent:
         instruction=network_system_agent_prompt,
         model="gemini-2.0-flash", # Or your preferred/default model for agents
         tools=[get_network_info],
-        output_key="network_analysis_report" # Defines the key in the output where the agent's structured response will be found.
+        output_key="network_analysis_report", # Defines the key in the output where the agent's structured response will be found.
+        # get_network_info is always needed: a ToolPrefetchAgent runs it ahead of the first model call.
+        before_model_callback=prefetch_tools_callback(get_network_info),
     )
     return agent 
\ No newline at end of file
@@ -0,0 +1,342 @@
+"""
+Plan Executor Agent
+-------------------
+
+Runs the task planner's plan (prompts/task_planner_prompt.py) instead of
+letting the team manager transfer to one agent after another.
+
+The planner writes a JSON array of sub-tasks to state["task_plan"]. Each
+sub-task is a string, or an object {"task", "after", "agent"}:
+
+    * after: the numbers (from 1) of earlier sub-tasks whose results it needs,
+    * agent: the agent or tool that should do it.
+
+The executor:
+
+    1. assigns every sub-task to one of its sub-agents or tools: the one the
+       planner named, else the one whose name is the sub-task, else the one
+       whose name and description share the most words with it. A sub-task
+       nothing matches is reported as "unassigned" and not run.
+    2. orders the sub-tasks: a sub-task waits for the ones in its "after",
+       and for the information steps before it (sub-tasks written as a name,
+       like "get_date_and_time"); all others are independent.
+    3. runs them as a DAG (agents/dag_agent/dag_agent.py): independent
+       sub-tasks run concurrently, each in its own branch. An agent gets its
+       sub-task, with the results it waits for, as a user message; a tool
+       (a function without arguments) is called directly, with no model call.
+    4. keeps state["plan_results"] up to date: the user's request and, per
+       sub-task, its assignee, status ("pending", "done", "failed",
+       "unassigned" or "skipped") and result.
+
+A single synthesis call then answers from state["plan_results"]
+(get_planned_team_manager() in agents/team_manager_agent), so a multi-step
+request takes about (depth of the plan) model round trips, not one or more
+per sub-task.
+
+Usage:
+    executor = get_plan_executor_agent([reminder_agent, email_agent], tools=[get_current_time])
+"""
+import asyncio
+import inspect
+import json
+import re
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from agents.dag_agent.dag_agent import DAG_REPORT_KEY, DEFAULT_MAX_WORKERS, get_dag_agent
+from utils.llm.tool_prefetch import required_arguments
+
+TASK_PLAN_KEY = "task_plan"
+PLAN_RESULTS_KEY = "plan_results"
+# custom_metadata key of the event that carries a step's outcome.
+PLAN_STEP_KEY = "plan_step"
+
+# Words that say nothing about which agent should do a sub-task.
+_STOP_WORDS = {
+    "a", "an", "the", "to", "and", "or", "of", "for", "with", "via", "on", "in", "at", "by", "from",
+    "my", "me", "her", "his", "their", "it", "is", "that", "this", "can", "agent", "tool", "get", "use",
+}
+
+
+class PlanStep(NamedTuple):
+    """A parsed sub-task: step id ("step_1", ...), task text, the step ids it waits for, and the agent or tool the planner named."""
+
+    id: str
+    task: str
+    after: List[str]
+    assignee: Optional[str]
+
+
+def _is_lookup(task: str) -> bool:
+    """Information steps are written as a name, e.g. "get_date_and_time"."""
+    return task.isidentifier()
+
+
+def parse_plan(text: Any) -> List[PlanStep]:
+    """
+    Parses the planner's output.
+
+    Args:
+        text: The JSON array (a ```json fence around it is fine), or the
+            already decoded list.
+
+    Returns:
+        list[PlanStep]: The sub-tasks in order, with their dependencies.
+
+    Raises:
+        ValueError: If the output holds no JSON array of sub-tasks.
+    """
+    items = text
+    if isinstance(text, str):
+        start, end = text.find("["), text.rfind("]")
+        if start < 0 or end < start:
+            raise ValueError("The plan is not a JSON array.")
+        try:
+            items = json.loads(text[start:end + 1])
+        except json.JSONDecodeError as error:
+            raise ValueError(f"The plan is not valid JSON: {error}") from error
+    if not isinstance(items, list):
+        raise ValueError("The plan is not a JSON array.")
+
+    steps: List[PlanStep] = []
+    for number, item in enumerate(items, start=1):
+        if isinstance(item, dict):
+            task, assignee, after = str(item.get("task", "")).strip(), item.get("agent"), item.get("after") or []
+        else:
+            task, assignee, after = str(item).strip(), None, []
+        if not task:
+            continue
+        waits = [f"step_{n}" for n in after if isinstance(n, int) and 1 <= n < number]
+        if not _is_lookup(task):
+            waits.extend(step.id for step in steps if _is_lookup(step.task))
+        steps.append(PlanStep(f"step_{number}", task, sorted(set(waits)), str(assignee) if assignee else None))
+    if not steps:
+        raise ValueError("The plan has no sub-tasks.")
+    return steps
+
+
+def _words(text: str) -> set:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    return {word.removesuffix("s") if len(word) > 3 else word for word in words} - _STOP_WORDS
+
+
+def _normalized(name: str) -> str:
+    return re.sub(r"[\s_-]+", "_", name.strip().lower())
+
+
+def assign(step: PlanStep, candidates: Dict[str, str]) -> Optional[str]:
+    """
+    Picks the agent or tool for a sub-task (see the module docstring).
+
+    Args:
+        step (PlanStep): The sub-task.
+        candidates (dict): name -> description of the agents and tools, in order.
+
+    Returns:
+        str or None: The chosen name, None if nothing matches.
+    """
+    for name in (step.assignee, step.task):
+        if name:
+            for candidate in candidates:
+                if _normalized(candidate) == _normalized(name):
+                    return candidate
+    task_words = _words(step.task)
+    scores = {name: len(task_words & _words(f"{name} {description}")) for name, description in candidates.items()}
+    best = max(scores, key=scores.get, default=None)
+    return best if best is not None and scores[best] > 0 else None
+
+
+def _tool_description(tool: Callable) -> str:
+    return (inspect.getdoc(tool) or "").split("\n\n", 1)[0].replace("\n", " ")
+
+
+def _step_results(state: Dict[str, Any], step_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    steps = (state.get(PLAN_RESULTS_KEY) or {}).get("steps") or []
+    return [step for step in steps if step["id"] in step_ids and step["status"] == "done"]
+
+
+class PlanStepAgent(BaseAgent):
+    """
+    Runs one sub-task of a plan: the worker agent with the sub-task as a user
+    message, or the tool. Its last event carries the outcome in
+    custom_metadata["plan_step"].
+
+    Attributes:
+        task: The sub-task.
+        after: The step ids whose results the sub-task gets.
+        worker: The agent that does it, or None for a tool.
+        tool: The tool that does it, or None for an agent.
+    """
+
+    task: str
+    after: List[str] = []
+    worker: Optional[BaseAgent] = None
+    tool: Optional[Callable] = None
+
+    def _message(self, ctx: InvocationContext) -> str:
+        lines = [f"Sub-task: {self.task}"]
+        earlier = _step_results(ctx.session.state, self.after)
+        if earlier:
+            lines.append("\nResults of the earlier sub-tasks:")
+            lines.extend(f"- {step['task']}: {step['result']}" for step in earlier)
+        return "\n".join(lines)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        outcome: Dict[str, Any] = {"status": "done", "result": ""}
+        try:
+            if self.tool is not None:
+                if inspect.iscoroutinefunction(self.tool):
+                    result = await self.tool()
+                else:
+                    result = await asyncio.to_thread(self.tool)
+                outcome["result"] = result if isinstance(result, (str, int, float, bool, dict, list)) else str(result)
+            else:
+                yield Event(
+                    invocation_id=ctx.invocation_id,
+                    author="user",
+                    branch=ctx.branch,
+                    content=types.Content(role="user", parts=[types.Part(text=self._message(ctx))]),
+                )
+                async for event in self.worker.run_async(ctx):
+                    yield event
+                    if event.is_final_response() and event.content and event.content.parts:
+                        text = "".join(part.text or "" for part in event.content.parts)
+                        outcome["result"] = text or outcome["result"]
+        except Exception as error:  # a failed sub-task is reported; the others go on
+            outcome = {"status": "failed", "result": f"{type(error).__name__}: {error}"}
+        yield Event(invocation_id=ctx.invocation_id, author=self.name, branch=ctx.branch, custom_metadata={PLAN_STEP_KEY: outcome})
+
+
+class PlanExecutorAgent(BaseAgent):
+    """
+    Runs the plan in state["task_plan"] with its sub-agents and tools, as
+    concurrently as the plan allows (see the module docstring).
+
+    Attributes:
+        tools: Functions without arguments that can do a sub-task directly.
+        plan_key: State key of the planner's output.
+        max_workers: Sub-tasks running at once.
+    """
+
+    tools: List[Callable] = []
+    plan_key: str = TASK_PLAN_KEY
+    max_workers: int = DEFAULT_MAX_WORKERS
+
+    def candidates(self) -> Dict[str, str]:
+        """
+        Returns:
+            dict: name -> description of the sub-agents, then the tools.
+        """
+        found = {agent.name: agent.description for agent in self.sub_agents}
+        found.update((tool.__name__, _tool_description(tool)) for tool in self.tools)
+        return found
+
+    def describe(self) -> str:
+        """
+        Returns:
+            str: One "name: description" line per sub-agent and tool, for the planner's instruction.
+        """
+        return "\n".join(f"- {name}: {description}" for name, description in self.candidates().items())
+
+    def _state_event(self, ctx: InvocationContext, results: Dict[str, Any]) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={PLAN_RESULTS_KEY: json.loads(json.dumps(results, default=str))}),
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        request = "".join(part.text or "" for part in (ctx.user_content.parts if ctx.user_content else None) or [])
+        results: Dict[str, Any] = {"request": request, "steps": []}
+        try:
+            steps = parse_plan(ctx.session.state.get(self.plan_key))
+        except ValueError as error:
+            results["error"] = str(error)
+            yield self._state_event(ctx, results)
+            return
+
+        candidates = self.candidates()
+        agents = {agent.name: agent for agent in self.sub_agents}
+        tools = {tool.__name__: tool for tool in self.tools}
+        nodes: List[BaseAgent] = []
+        for step in steps:
+            assignee = assign(step, candidates)
+            results["steps"].append({
+                "id": step.id, "task": step.task, "assignee": assignee, "after": step.after,
+                "status": "pending" if assignee else "unassigned", "result": "",
+            })
+            if assignee:
+                nodes.append(PlanStepAgent(
+                    name=step.id, description=step.task, task=step.task, after=step.after,
+                    worker=agents.get(assignee), tool=tools.get(assignee) if assignee not in agents else None,
+                ))
+        yield self._state_event(ctx, results)
+
+        by_id = {step["id"]: step for step in results["steps"]}
+        names = {node.name for node in nodes}
+        if nodes:
+            dag = get_dag_agent(
+                name=f"{self.name}_steps",
+                sub_agents=nodes,
+                # Steps waiting for an unassigned step run without its result.
+                dependencies={step.id: [after for after in step.after if after in names] for step in steps if step.id in names},
+                max_workers=self.max_workers,
+            )
+            async for event in dag.run_async(ctx):
+                if event.custom_metadata and PLAN_STEP_KEY in event.custom_metadata:
+                    by_id[event.author].update(event.custom_metadata[PLAN_STEP_KEY])
+                    # Written before the DAG moves on, so dependent steps see the result.
+                    yield self._state_event(ctx, results)
+                elif event.actions.state_delta and DAG_REPORT_KEY in event.actions.state_delta:
+                    report = event.actions.state_delta[DAG_REPORT_KEY]
+                    results["critical_path"] = report["critical_path"]
+                    for name, node in report["nodes"].items():
+                        if node["status"] == "skipped":
+                            by_id[name].update(status="skipped", result=node.get("reason", ""))
+                else:
+                    yield event
+        results["seconds"] = round(time.perf_counter() - started, 3)
+        yield self._state_event(ctx, results)
+
+
+def get_plan_executor_agent(
+    sub_agents: List[BaseAgent],
+    tools: Sequence[Callable] = (),
+    name: str = "plan_executor_agent",
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> PlanExecutorAgent:
+    """
+    Factory function to create the plan executor.
+
+    Args:
+        sub_agents (list): Agents that can do sub-tasks; their descriptions
+            are matched against the sub-tasks.
+        tools (list): Functions without arguments that can do a sub-task
+            directly; their docstrings are matched against the sub-tasks.
+        name (str): Agent name.
+        max_workers (int): Sub-tasks running at once ($DAG_MAX_WORKERS, default 8).
+
+    Returns:
+        PlanExecutorAgent: The configured agent.
+
+    Raises:
+        ValueError: If a tool needs arguments.
+    """
+    for tool in tools:
+        required = required_arguments(tool)
+        if required:
+            raise ValueError(f"Tool '{tool.__name__}' cannot run a sub-task, it needs arguments: {', '.join(required)}")
+    return PlanExecutorAgent(
+        name=name,
+        description="Runs the task planner's sub-tasks with its agents and tools, independent ones concurrently.",
+        sub_agents=sub_agents,
+        tools=list(tools),
+        max_workers=max_workers,
+    )
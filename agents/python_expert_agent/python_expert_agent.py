@@ -3,10 +3,11 @@ from typing import List
 
 # Import the prompt
 from prompts.python_expert_agent_prompt import python_expert_agent_prompt
+from tools.code_execution_tool import run_python_candidates
+from utils.callback_chain import chain_callbacks
+from utils.code.loop_convergence import start_convergence_tracking
+from utils.code.patch_protocol import start_review_callback
 
-# Import any tools your agent might need (optional)
-# For a Python expert agent, tools for code execution, linting, or file system access might be relevant in the future.
-# from tools.your_specific_tool import your_specific_tool
 
 def get_python_expert_agent(sub_agents: List[BaseAgent] = []) -> LlmAgent:
     """
@@ -15,6 +16,8 @@ def get_python_expert_agent(sub_agents: List[BaseAgent] = []) -> LlmAgent:
     This agent acts as a senior Python developer. It receives a user request
     for Python code (e.g., functions, classes, scripts, debugging help)
     and returns the generated code in a structured JSON format.
+    Before answering it can run candidate programs and their tests in a local
+    sandbox (run_python_candidates, see tools/code_execution_tool.py).
     """
 
     agent_instruction = python_expert_agent_prompt
@@ -30,10 +33,12 @@ def get_python_expert_agent(sub_agents: List[BaseAgent] = []) -> LlmAgent:
         instruction=agent_instruction,
         model="gemini-2.0-flash", # Using a more capable model for code generation
         tools=[
-            # Add any relevant tools here in the future, e.g., a code execution tool.
+            # Runs candidate programs and their tests in parallel, in a local sandbox.
+            run_python_candidates,
         ],
-        output_key="generated_code"
-      
+        output_key="generated_code",
+        # Starts a review cycle: the reviewer sees the full program once, then only diffs.
+        after_agent_callback=chain_callbacks(start_review_callback, start_convergence_tracking),
     )
     return python_expert_agent_instance
 
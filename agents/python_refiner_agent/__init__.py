@@ -1,8 +1,8 @@
 # This file makes the 'python_refiner_agent' directory a Python package.
-# It exposes the agent factory function for easy import.
+# It exposes the agent factory function, imported on first access.
+from utils.lazy_imports import lazy_exports
 
-from .python_refiner_agent import get_python_refiner_agent
+_EXPORTS = {"get_python_refiner_agent": "agents.python_refiner_agent.python_refiner_agent"}
 
-__all__ = [
-    "get_python_refiner_agent"
-] 
\ No newline at end of file
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
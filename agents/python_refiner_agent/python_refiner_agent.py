@@ -1,5 +1,8 @@
 from google.adk.agents import LlmAgent
 from prompts.python_refiner_agent_prompt import python_refiner_agent_prompt
+from utils.callback_chain import chain_callbacks
+from utils.code.loop_convergence import stop_on_unchanged_code
+from utils.code.patch_protocol import REFINEMENT_PATCH_KEY, apply_refinement_patch_callback
 
 def get_python_refiner_agent() -> LlmAgent:
     """
@@ -7,8 +10,11 @@ def get_python_refiner_agent() -> LlmAgent:
 
     This agent analyzes Python code to find bugs, errors, and improve quality.
     It uses an LLM guided by a specific prompt to perform its tasks.
-    The agent is expected to output a JSON structure indicating whether the code
-    is satisfactory or needs further improvement, along with the refined code.
+    The agent outputs a unified diff against the current code in state["generated_code"]
+    instead of the whole program; apply_refinement_patch_callback applies it and
+    hands only the changed regions to the reviewer (see utils/code/patch_protocol.py).
+    If the code is then unchanged up to whitespace, stop_on_unchanged_code ends the
+    review loop (see utils/code/loop_convergence.py).
     """
     return LlmAgent(
         name="python_refiner_agent",
@@ -17,6 +23,10 @@ def get_python_refiner_agent() -> LlmAgent:
         # Consider making the model configurable or choosing one appropriate for code tasks
         model="gemini-2.0-flash", # Example model, choose appropriately
         tools=[], # No specific ADK tools for now, LLM handles refinement directly
-        # The output_key helps in retrieving the raw JSON string output from the LLM
-        output_key="refinement_details_json", 
+        # The current code and the review comments come from state via the instruction,
+        # so the conversation history (with every earlier version) is not resent.
+        include_contents="none",
+        # The output_key holds the raw diff until the after_agent_callback applies it
+        output_key=REFINEMENT_PATCH_KEY,
+        after_agent_callback=chain_callbacks(apply_refinement_patch_callback, stop_on_unchanged_code),
     )
\ No newline at end of file
@@ -1,5 +1,8 @@
 from google.adk.agents import LlmAgent
 from prompts.python_reviewer_agent_prompt import python_reviewer_agent_prompt
+from utils.code.loop_convergence import stop_on_repeated_review
+from utils.code.patch_protocol import REVIEW_COMMENTS_KEY
+from utils.code.static_review import static_review_callback
 from utils.llm.exit_loop import exit_loop
 
 def get_python_reviewer_agent() -> LlmAgent:
@@ -7,7 +10,15 @@ def get_python_reviewer_agent() -> LlmAgent:
     Factory function to create and configure the Python Code Reviewer Agent.
 
     This agent reviews Python code, identifies bugs, and suggests improvements.
-    If satisfied with the code, it calls the 'exit_loop' tool.
+    If satisfied with the code, it calls the 'exit_loop' tool, which ends the
+    review loop. A review that repeats the previous one ends it as well
+    (stop_on_repeated_review, see utils/code/loop_convergence.py).
+    Local syntax, lint and complexity checks run first and are part of its
+    context; code that does not compile, or that is clean and was already
+    reviewed, skips the model call (see utils/code/static_review.py).
+    In the review loop, the code and its doctests run in a local sandbox just
+    before it, and the results are part of its context as well
+    (see utils/code/execution_feedback.py).
     """
     return LlmAgent(
         name="python_reviewer_agent",
@@ -17,7 +28,9 @@ def get_python_reviewer_agent() -> LlmAgent:
         tools=[exit_loop], # Pass the exit_loop_tool to the agent
         # output_key can be used to get the raw text output (review comments)
         # when the agent doesn't call a tool.
-        output_key="review_comments", 
+        output_key=REVIEW_COMMENTS_KEY,
+        before_agent_callback=static_review_callback,
+        after_agent_callback=stop_on_repeated_review,
     )
 
 # Conceptual example of how an orchestrator might use this agent:
@@ -4,9 +4,13 @@ Reviewer Agent
 This agent analyzes and synthesizes reports from other agents (system and network)
 to provide a comprehensive, high-level overview, analysis, and consolidated recommendations.
 It does not use any tools itself, relying on the input from preceding agents.
+
+get_search_reviewer_agent() is its counterpart for the search pipeline: it
+answers the user's question from the pages the URL fan-out stage scraped.
 """
 from google.adk.agents import LlmAgent
 from prompts.reviewer_agent_prompt import reviewer_agent_prompt
+from prompts.search_reviewer_agent_prompt import search_reviewer_agent_prompt
 
 def get_reviewer_agent() -> LlmAgent:
     """
@@ -26,4 +30,24 @@ def get_reviewer_agent() -> LlmAgent:
         tools=[],  # This agent does not use tools directly
         output_key="overall_review_report" # Defines the key for the agent's final output
     )
-    return agent 
\ No newline at end of file
+    return agent
+
+
+def get_search_reviewer_agent() -> LlmAgent:
+    """
+    Factory function to create the reviewer of the search pipeline.
+
+    This agent uses an LLM to answer the user's question from the
+    generated_query and the scraped_urls_results written by the URL fan-out stage.
+
+    Returns:
+        LlmAgent: An instance of the LlmAgent configured for reviewing scraped search results.
+    """
+    return LlmAgent(
+        name="search_reviewer_agent",
+        description="A reviewer agent that answers the user's question from the scraped search result pages, citing its sources.",
+        instruction=search_reviewer_agent_prompt,
+        model="gemini-2.0-flash",
+        tools=[],
+        output_key="search_review_report",
+    )
@@ -7,6 +7,7 @@ It uses an LLM to process a request and the system_info_tool to gather data.
 from google.adk.agents import LlmAgent
 from prompts.system_info_agent_prompt import system_info_agent_prompt
 from tools.system_info_tool import get_system_info # Assuming this tool is registered or made available
+from utils.llm.tool_prefetch import prefetch_tools_callback
 
 # TODO: Ensure 'get_system_info' is properly exposed as an ADK tool object.
 # For example, if tools.system_info_tool defines 'system_info_tool_object',
@@ -28,6 +29,8 @@ def get_system_info_agent() -> LlmAgent:
         instruction=system_info_agent_prompt,
         model="gemini-2.0-flash", # Or your preferred model
         tools=[get_system_info], # This assumes get_system_info is directly usable or wrapped as an ADK tool object
-        output_key="system_information" # Key for the structured output
+        output_key="system_information", # Key for the structured output
+        # get_system_info is always needed: a ToolPrefetchAgent runs it ahead of the first model call.
+        before_model_callback=prefetch_tools_callback(get_system_info),
     )
     return agent 
\ No newline at end of file
@@ -1,18 +1,30 @@
-from dataclasses import Field
 from google.adk.agents import  BaseAgent, LlmAgent
-from google.adk.tools import BaseTool
 from prompts.task_planner_prompt import task_planner_prompt
-from agents.task_planner_agent.task_planner_agent import task_planner_agent
-from typing import Dict, List # Added for older Python versions, though 3.9+ dict is fine.
+from typing import List, Optional # Added for older Python versions, though 3.9+ dict is fine.
 
 
-def get_task_planner_agent(sub_agents: List[BaseAgent]  = []) -> LlmAgent:
+def get_task_planner_agent(sub_agents: List[BaseAgent]  = [], output_key: Optional[str] = None, capabilities: str = "") -> LlmAgent:
+    """
+    Factory function to create the task planner agent.
+
+    Args:
+        sub_agents (list): Agents the planner can transfer to.
+        output_key (str, optional): State key for the plan (a JSON array).
+        capabilities (str): The agents and tools that can run the sub-tasks,
+            one "name: description" per line; listed in the instruction.
+
+    Returns:
+        LlmAgent: The configured agent.
+    """
+    instruction = task_planner_prompt["instruction"]
+    if capabilities:
+        instruction += "\nAvailable agents and tools:\n" + capabilities + "\n"
     task_planner_agent = LlmAgent(
         name=task_planner_prompt["name"],
         description=task_planner_prompt["description"],
-        instruction=task_planner_prompt["instruction"],
+        instruction=instruction,
         model="gemini-2.0-flash",
         sub_agents=sub_agents,
+        output_key=output_key,
         )
     return task_planner_agent
-
@@ -1,6 +1,6 @@
-from google.adk.agents import  BaseAgent, LlmAgent
-from prompts.team_manager_prompt import team_manager_prompt
-from typing import  List 
+from google.adk.agents import  BaseAgent, LlmAgent, SequentialAgent
+from prompts.team_manager_prompt import team_manager_prompt, team_manager_synthesis_instruction
+from typing import  Callable, List, Sequence
 
 
 def get_team_manager(sub_agents: List[BaseAgent]  = []) -> LlmAgent:
@@ -15,3 +15,42 @@ def get_team_manager(sub_agents: List[BaseAgent]  = []) -> LlmAgent:
         )
     return manager_agent
 
+
+def get_planned_team_manager(sub_agents: List[BaseAgent], tools: Sequence[Callable] = ()) -> SequentialAgent:
+    """
+    Factory function to create a team manager that plans instead of transferring:
+    the task planner splits the request into sub-tasks, the plan executor
+    runs them with the given agents and tools (independent ones concurrently,
+    see agents/plan_executor_agent), and the team manager answers once from
+    state["plan_results"].
+
+    The answer is written from the results alone (include_contents="none"),
+    not from the workers' conversations.
+
+    Args:
+        sub_agents (list): Agents that can do sub-tasks.
+        tools (list): Functions without arguments that can do a sub-task directly.
+
+    Returns:
+        SequentialAgent: The planner, the executor and the team manager.
+    """
+    from agents.plan_executor_agent.plan_executor_agent import TASK_PLAN_KEY, get_plan_executor_agent
+    from agents.task_planner_agent.task_planner_agent import get_task_planner_agent
+
+    executor = get_plan_executor_agent(sub_agents, tools=tools)
+    manager_agent = LlmAgent(
+        name=team_manager_prompt["name"],
+        description=team_manager_prompt["description"],
+        instruction=team_manager_synthesis_instruction,
+        model=team_manager_prompt["model"],
+        include_contents="none",
+    )
+    return SequentialAgent(
+        name="planned_team_manager",
+        description="Plans the request, runs the sub-tasks concurrently where possible, then answers once.",
+        sub_agents=[
+            get_task_planner_agent(output_key=TASK_PLAN_KEY, capabilities=executor.describe()),
+            executor,
+            manager_agent,
+        ],
+    )
@@ -0,0 +1,211 @@
+"""
+URL Fan-Out Agent
+-----------------
+
+Scrapes the web pipeline's search results (use_sequential_agent.py) with one
+branch per URL, run in parallel, instead of a single LLM turn that calls the
+scraper tool for one URL after another:
+
+    1. reads the URLs from state["urls"], or else from the web search agent's
+       state["web_results"] ("url" / "link" fields, or bare links in the text),
+    2. starts one branch per URL - scrape_page() in a worker thread, then
+       extract_page() - with at most max_concurrency branches at a time,
+    3. merges the branches' pages into state, in URL order whatever order
+       they finish in:
+           state["scraped_pages"]         [{url, title, content} or {url, error}, ...]
+           state["scraped_urls_results"]  {url: title and text}, as the scraper tool writes it
+
+The stage takes about as long as its slowest URL instead of the sum of all of
+them, and spends no model call: a branch only fetches a page and cleans up
+its text. When a turn deadline is set (utils/llm/deadline.py) the stage stops
+at its budget; URLs that did not finish are recorded with an error.
+"""
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from tools.serper_scrape_single_page_tool import scrape_page
+from utils.code.unified_diff import strip_code_fences
+from utils.llm.deadline import get_current_deadline, run_key
+
+URLS_KEY = "urls"
+WEB_RESULTS_KEY = "web_results"
+SCRAPED_PAGES_KEY = "scraped_pages"
+SCRAPED_URLS_RESULTS_KEY = "scraped_urls_results"
+
+# Branches running at once (scraper API requests in flight).
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", 8))
+DEFAULT_MAX_URLS = 8
+# Characters of page text kept per URL.
+DEFAULT_MAX_CHARS = 6000
+# Seconds of the agent's deadline budget kept for storing the pages; when the
+# stage is the last of the turn, its budget ends with the turn's own timeout.
+DEADLINE_RESERVE_S = 0.1
+
+_URL_FIELDS = {"url", "link", "href", "source"}
+_URL_PATTERN = re.compile(r"https?://[^\s\"'<>()\[\]{}]+")
+
+
+def urls_from_results(results: Any) -> List[str]:
+    """
+    Finds the result URLs in the web search agent's output.
+
+    Args:
+        results: JSON text (optionally in a markdown fence), or parsed JSON.
+            Values of "url" / "link" / "href" / "source" keys are taken at any
+            depth; text that is not JSON is searched for bare http(s) links.
+
+    Returns:
+        list[str]: The URLs in order of appearance (may contain duplicates).
+    """
+    if isinstance(results, str):
+        text = strip_code_fences(results.strip())
+        try:
+            results = json.loads(text)
+        except ValueError:
+            return [url.rstrip(".,;:!?") for url in _URL_PATTERN.findall(text)]
+    found = []
+    pending = [results]
+    while pending:
+        value = pending.pop(0)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key.lower() in _URL_FIELDS and isinstance(item, str) and item.startswith(("http://", "https://")):
+                    found.append(item)
+                elif isinstance(item, (dict, list)):
+                    pending.append(item)
+        elif isinstance(value, list):
+            pending.extend(value)
+    return found
+
+
+def urls_from_state(state, max_urls: int = DEFAULT_MAX_URLS) -> List[str]:
+    """The URLs to scrape: state["urls"] if set, else those in state["web_results"]; deduplicated."""
+    urls = state.get(URLS_KEY) or urls_from_results(state.get(WEB_RESULTS_KEY) or "")
+    unique = list(dict.fromkeys(url.strip() for url in urls if isinstance(url, str) and url.strip()))
+    return unique[:max_urls]
+
+
+def extract_page(url: str, raw: Any, max_chars: int = DEFAULT_MAX_CHARS) -> Dict[str, str]:
+    """
+    The title and readable text of a scraped page.
+
+    Args:
+        url (str): The page's URL.
+        raw: The scraper's response: a dict with "text" (or "markdown") and
+            "metadata" {"title", ...}, or plain text.
+        max_chars (int): Text longer than this is cut at a word boundary.
+
+    Returns:
+        dict: {"url", "title", "content"}.
+    """
+    if isinstance(raw, dict):
+        metadata = raw.get("metadata") if isinstance(raw.get("metadata"), dict) else {}
+        title = metadata.get("title") or metadata.get("og:title") or raw.get("title") or ""
+        text = raw.get("text") or raw.get("markdown") or raw.get("content") or ""
+    else:
+        title, text = "", raw
+    text = re.sub(r"[ \t]+", " ", str(text))
+    text = re.sub(r"\s*\n\s*\n\s*", "\n\n", text).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+    return {"url": url, "title": str(title).strip(), "content": text}
+
+
+def _page_text(page: Dict[str, str]) -> str:
+    if "error" in page:
+        return f"Not scraped: {page['error']}"
+    return f"{page['title']}\n\n{page['content']}" if page["title"] else page["content"]
+
+
+class UrlFanOutAgent(BaseAgent):
+    """
+    Scrapes every URL found in state in its own parallel branch and merges the
+    pages into state (see the module docstring).
+
+    Attributes:
+        fetch: Scrapes one URL and returns the raw response; called in a
+            worker thread. Exceptions become an {"url", "error"} page.
+        max_concurrency: Branches running at once.
+        max_urls: URLs taken from state; the rest are ignored.
+        max_chars: Page text kept per URL.
+    """
+
+    fetch: Callable[[str], Any]
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    max_urls: int = DEFAULT_MAX_URLS
+    max_chars: int = DEFAULT_MAX_CHARS
+
+    async def _scrape(self, url: str, slots: asyncio.Semaphore) -> Dict[str, str]:
+        async with slots:
+            try:
+                raw = await asyncio.to_thread(self.fetch, url)
+            except Exception as e:
+                return {"url": url, "error": f"{type(e).__name__}: {e}"}
+        return extract_page(url, raw, self.max_chars)
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        urls = urls_from_state(ctx.session.state, self.max_urls)
+        slots = asyncio.Semaphore(max(1, self.max_concurrency))
+        branches = [asyncio.ensure_future(self._scrape(url, slots)) for url in urls]
+
+        deadline = get_current_deadline()
+        timeout: Optional[float] = max(0.0, deadline.remaining(run_key(ctx)) - DEADLINE_RESERVE_S) if deadline else None
+        if branches:
+            _, unfinished = await asyncio.wait(branches, timeout=timeout)
+            for branch in unfinished:
+                # The worker thread finishes its request on its own; its result is dropped.
+                branch.cancel()
+        pages = [
+            branch.result() if branch.done() and not branch.cancelled()
+            else {"url": url, "error": "not scraped before the turn deadline"}
+            for url, branch in zip(urls, branches)
+        ]
+
+        scraped = sum("error" not in page for page in pages)
+        lines = [f"Scraped {scraped} of {len(urls)} pages in {time.perf_counter() - started:.1f} s."]
+        lines.extend(f"- {page['url']}: {page.get('title') or page.get('error') or 'untitled'}" for page in pages)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text="\n".join(lines))]),
+            actions=EventActions(state_delta={
+                SCRAPED_PAGES_KEY: pages,
+                SCRAPED_URLS_RESULTS_KEY: {page["url"]: _page_text(page) for page in pages},
+            }),
+        )
+
+
+def get_url_fanout_agent(
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    max_urls: int = DEFAULT_MAX_URLS,
+    fetch: Callable[[str], Any] = scrape_page,
+) -> UrlFanOutAgent:
+    """
+    Factory function to create the URL fan-out scraping stage of the web pipeline.
+
+    Args:
+        max_concurrency (int): Branches running at once ($SCRAPE_CONCURRENCY, default 8).
+        max_urls (int): URLs taken from state.
+        fetch (callable): Scrapes one URL; defaults to the scraper API's scrape_page().
+
+    Returns:
+        UrlFanOutAgent: The configured agent.
+    """
+    return UrlFanOutAgent(
+        name="url_fanout_agent",
+        description="Scrapes every search result URL in its own parallel branch and merges the pages into state.",
+        fetch=fetch,
+        max_concurrency=max_concurrency,
+        max_urls=max_urls,
+    )
@@ -0,0 +1,106 @@
+"""
+Agent Registry Benchmark
+------------------------
+
+Measures what agents/agent_registry.py saves:
+
+    * pipeline construction: what a use_*.py script did per Runner (call the
+      get_*_agent() factories, instrument_agent(), apply_deadline_budgets())
+      against AgentRegistry.get() after the first build.
+    * tool declarations: the per-model-call cost of turning an agent's tools
+      into function declarations (what LlmAgent.canonical_tools() and
+      FunctionTool._get_declaration() do before every request), with plain
+      FunctionTools against shared_tool()s.
+
+Pipelines whose agent modules fail to import are skipped with the reason.
+
+Usage (from the repository root):
+    python -m benchmarks.agent_registry_benchmark
+    python -m benchmarks.agent_registry_benchmark --repeat 500
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.tools import BaseTool, FunctionTool
+
+from agents.agent_registry import AgentRegistry, get_agent_registry
+from utils.llm.deadline import apply_deadline_budgets
+from utils.llm.tool_declarations import shared_tool
+from utils.metrics.metrics_callbacks import instrument_agent
+
+
+def _median_us(action: Callable[[], object], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6
+
+
+def _tool_functions(agent: BaseAgent) -> List[Callable]:
+    functions, pending = [], [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if isinstance(current, LlmAgent):
+            for tool in current.tools:
+                if not isinstance(tool, BaseTool):
+                    functions.append(tool)
+                elif type(tool) is FunctionTool:
+                    functions.append(tool.func)
+    return functions
+
+
+def _declare_plain(functions: List[Callable]) -> None:
+    for func in functions:
+        FunctionTool(func)._get_declaration()
+
+
+def _declare_shared(functions: List[Callable]) -> None:
+    for func in functions:
+        shared_tool(func)._get_declaration()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="timed calls per measurement")
+    args = parser.parse_args()
+
+    registry = get_agent_registry()
+    print(f"{'pipeline':<22} {'tools':>5} {'build us':>10} {'get us':>8} {'speedup':>9}"
+          f" {'decl plain us':>14} {'decl shared us':>15} {'speedup':>9}")
+    for name in registry.names():
+        try:
+            registry.build(name)
+        except Exception as e:  # a broken agent module only breaks its own pipelines
+            print(f"{name:<22} skipped: {type(e).__name__}: {e}")
+            continue
+
+        def build_per_runner() -> BaseAgent:
+            graph = registry.build(name)
+            instrument_agent(graph)
+            apply_deadline_budgets(graph)
+            return graph
+
+        fresh = AgentRegistry()
+        fresh.register(name, lambda: registry.build(name))
+        fresh.get(name)
+        build_us = _median_us(build_per_runner, args.repeat)
+        get_us = _median_us(lambda: fresh.get(name), args.repeat)
+
+        functions = _tool_functions(registry.build(name))
+        _declare_shared(functions)
+        plain_us = _median_us(lambda: _declare_plain(functions), args.repeat)
+        shared_us = _median_us(lambda: _declare_shared(functions), args.repeat)
+        print(
+            f"{name:<22} {len(functions):>5} {build_us:>10.0f} {get_us:>8.2f} {build_us / get_us:>8.0f}x"
+            f" {plain_us:>14.0f} {shared_us:>15.2f} {plain_us / max(shared_us, 1e-3):>8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
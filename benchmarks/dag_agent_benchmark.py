@@ -0,0 +1,129 @@
+"""
+DAG Agent Benchmark
+-------------------
+
+Measures a workflow run as hand-nested SequentialAgent/ParallelAgent stages
+and as a DagAgent (agents/dag_agent/dag_agent.py) scheduled from the same
+agents' instruction templates and output_keys:
+
+    outline (1.0 s) ---------> intro (0.3 s) ----+
+                                                  +--> report (0.3 s)
+    facts (0.4 s) ----> analysis (1.0 s) --------+
+
+    * stages:  Sequential[Parallel[outline, facts], Parallel[intro, analysis], report];
+               analysis waits for outline although it only reads facts.
+    * dag:     every agent starts when its inputs are written.
+    * dag, 1 worker: the same graph with max_workers=1 (one agent at a time).
+
+Each agent is an LlmAgent whose scripted model waits the latency above, so no
+API key or network is needed. The DAG's critical path report is printed last.
+
+Usage (from the repository root):
+    python -m benchmarks.dag_agent_benchmark
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import time
+from typing import AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent, LlmAgent, ParallelAgent, SequentialAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.dag_agent.dag_agent import DAG_REPORT_KEY, get_dag_agent, render_dag_report
+from utils.llm.call_agent_async import call_agent_async
+
+MODEL = "scripted-dag"
+# name -> (model latency in seconds, instruction)
+NODES = {
+    "outline": (1.0, "Write an outline for a report on the topic."),
+    "facts": (0.4, "Collect the key facts on the topic."),
+    "intro": (0.3, "Write an introduction following this outline:\n{outline}"),
+    "analysis": (1.0, "Analyse these facts:\n{facts}"),
+    "report": (0.3, "Combine the introduction and the analysis.\n{intro}\n\n{analysis}"),
+}
+
+
+class ScriptedLlm(BaseLlm):
+    """Waits the node's latency, then answers with a short text."""
+
+    model: str = MODEL
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [MODEL]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        instruction = str(llm_request.config.system_instruction or "")
+        name = instruction.split("]", 1)[0].removeprefix("[")
+        await asyncio.sleep(NODES[name][0])
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=f"The {name}.")]))
+
+
+def _agents() -> Dict[str, LlmAgent]:
+    return {
+        name: LlmAgent(name=name, model=MODEL, instruction=f"[{name}] {instruction}", output_key=name)
+        for name, (_, instruction) in NODES.items()
+    }
+
+
+def build_stages() -> BaseAgent:
+    agents = _agents()
+    return SequentialAgent(name="stages", sub_agents=[
+        ParallelAgent(name="first_stage", sub_agents=[agents["outline"], agents["facts"]]),
+        ParallelAgent(name="second_stage", sub_agents=[agents["intro"], agents["analysis"]]),
+        agents["report"],
+    ])
+
+
+def build_dag(max_workers: int) -> BaseAgent:
+    return get_dag_agent("report_dag", list(_agents().values()), max_workers=max_workers)
+
+
+async def run_turn(agent: BaseAgent) -> Dict[str, object]:
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="dag_agent_benchmark", user_id="benchmark_user")
+    runner = Runner(app_name="dag_agent_benchmark", agent=agent, session_service=session_service)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await call_agent_async(runner, "benchmark_user", session.id, "Topic: caching.")
+    elapsed = time.perf_counter() - started
+    state = session_service.get_session(
+        app_name="dag_agent_benchmark", user_id="benchmark_user", session_id=session.id
+    ).state
+    assert state.get("report"), "the report agent must run"
+    return {"seconds": elapsed, "report": state.get(DAG_REPORT_KEY)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    LLMRegistry.register(ScriptedLlm)
+    # ADK 0.4 runs ParallelAgent branches in their own contexts; OpenTelemetry
+    # logs a harmless "Failed to detach context" for each.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+
+    print(f"{'mode':<16} {'seconds':>7}")
+    report = None
+    for label, build in (
+        ("stages", build_stages),
+        ("dag", lambda: build_dag(max_workers=8)),
+        ("dag, 1 worker", lambda: build_dag(max_workers=1)),
+    ):
+        result = asyncio.run(run_turn(build()))
+        print(f"{label:<16} {result['seconds']:>7.2f}")
+        report = report or result["report"]
+    print()
+    print(render_dag_report(report))
+
+
+if __name__ == "__main__":
+    main()
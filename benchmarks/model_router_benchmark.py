@@ -0,0 +1,117 @@
+"""
+Model Router Benchmark
+----------------------
+
+Runs turns of the system report pipeline (use_parallel_agents.py) on the
+local fake backend (utils/llm/fake_llm.py) under two routing policies
+(utils/llm/model_router.py):
+
+    * pinned: every agent on the model its factory pins (gemini-2.0-flash),
+              no escalation.
+    * routed: the default policy; the system and network reports start on
+              gemini-2.0-flash-lite and escalate to gemini-2.0-flash when
+              the answer fails a check.
+
+The fake models take the latency and have the capability of
+fake_llm.DEFAULT_PROFILES. Each request's difficulty is set per agent: the
+reports are easy (0.3) except on every fourth turn, when the network report is
+harder (0.6) than the cheapest tier can handle, and the review is 0.7. Cost
+uses the real Gemini prices (utils/metrics/agent_metrics.py) on the fake
+backend's token counts.
+
+Usage (from the repository root):
+    python -m benchmarks.model_router_benchmark
+    python -m benchmarks.model_router_benchmark --turns 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import time
+from typing import Dict
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.agent_registry import get_agent_registry
+from utils.llm.call_agent_async import call_agent_async
+from utils.llm.fake_llm import FakeLlm
+from utils.llm.model_router import RoutingPolicy, apply_model_routing, format_routes, route_report, tune_routes
+from utils.metrics.agent_metrics import agent_metrics
+from utils.metrics.metrics_callbacks import instrument_agent
+
+_turn = 0
+
+
+def _difficulty(llm_request) -> float:
+    instruction = str(llm_request.config.system_instruction or "")
+    if "senior IT analyst" in instruction:
+        return 0.7
+    if "network analysis agent" in instruction and _turn % 4 == 3:
+        return 0.6
+    return 0.3
+
+
+def _total(name: str) -> float:
+    return sum(sample["value"] for sample in agent_metrics.snapshot()["counters"].get(name, []))
+
+
+async def run_turns(policy: RoutingPolicy, turns: int) -> Dict[str, float]:
+    global _turn
+    agent = get_agent_registry().build("system_info_pipeline")
+    apply_model_routing(agent, policy)
+    instrument_agent(agent)
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="model_router_benchmark", user_id="benchmark_user")
+    runner = Runner(app_name="model_router_benchmark", agent=agent, session_service=session_service)
+    agent_metrics.reset()
+    started = time.perf_counter()
+    for _turn in range(turns):
+        with contextlib.redirect_stdout(io.StringIO()):
+            await call_agent_async(runner, "benchmark_user", session.id, "Report on this machine.")
+    elapsed = time.perf_counter() - started
+    routes = route_report()
+    return {
+        "seconds_per_turn": elapsed / turns,
+        "cost_per_turn": _total("adk_model_cost_usd_total") / turns,
+        "calls_per_turn": _total("adk_model_calls_total") / turns,
+        "escalations": sum(route["calls"] - route["ok"] for route in routes),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=8, help="turns per policy")
+    args = parser.parse_args()
+    FakeLlm.difficulty_of = _difficulty
+    # ADK 0.4 runs parallel branches in their own contexts; OpenTelemetry
+    # logs a harmless "Failed to detach context" for each.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+
+    policies = {
+        "pinned": RoutingPolicy(routes={}, max_escalations=0, backend="fake"),
+        "routed": RoutingPolicy(backend="fake"),
+    }
+    print(f"{args.turns} turns of the system report pipeline on the fake backend")
+    print(f"{'policy':<8} {'s/turn':>7} {'USD/turn':>10} {'calls/turn':>10} {'escalations':>11}")
+    for label, policy in policies.items():
+        result = asyncio.run(run_turns(policy, args.turns))
+        print(
+            f"{label:<8} {result['seconds_per_turn']:>7.2f} {result['cost_per_turn']:>10.6f}"
+            f" {result['calls_per_turn']:>10.2f} {result['escalations']:>11}"
+        )
+
+    print("\nRoutes of the routed run:")
+    print(f"{'agent':<22} {'step':<11} {'model':<22} {'calls':>5} {'ok':>4} {'mean s':>7}")
+    for route in route_report():
+        print(
+            f"{route['agent']:<22} {route['step']:<11} {route['model']:<22}"
+            f" {route['calls']:>5} {route['ok']:>4} {route['mean_latency_s']:>7.2f}"
+        )
+    suggested = tune_routes(policies["routed"], min_success_rate=0.9, min_calls=args.turns // 2)
+    print(f"\ntune_routes(min_success_rate=0.9): MODEL_ROUTES={format_routes(suggested)}")
+
+
+if __name__ == "__main__":
+    main()
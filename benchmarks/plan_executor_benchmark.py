@@ -0,0 +1,196 @@
+"""
+Plan Executor Benchmark
+-----------------------
+
+Runs one multi-step request through two team managers
+(agents/team_manager_agent/team_manager_agent.py):
+
+    * transfers: get_team_manager() with the worker agents as sub-agents and
+                 the time tool; the manager calls the tool, then transfers to
+                 one worker at a time, each worker transfers back when done.
+    * plan:      get_planned_team_manager(): the task planner's plan is run by
+                 the plan executor (agents/plan_executor_agent), independent
+                 sub-tasks concurrently, then the manager answers once.
+    * plan, 1 worker: the same with the executor's max_workers=1.
+
+The request "Remind me to call Sarah, email her the project files, schedule a
+follow-up call after the reminder and look up news about her company" is
+planned as:
+
+    get_date_and_time (tool) -> reminder, email, news -> follow-up call (after the reminder)
+
+Every model call is answered by a scripted model after MODEL_LATENCY seconds,
+so no API key or network is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.plan_executor_benchmark
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import AsyncGenerator, ClassVar, Dict, List
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.plan_executor_agent.plan_executor_agent import PLAN_RESULTS_KEY, PlanExecutorAgent
+from agents.team_manager_agent.team_manager_agent import get_planned_team_manager, get_team_manager
+from utils.llm.call_agent_async import call_agent_async
+
+MODEL = "scripted-plan"
+MODEL_LATENCY = 0.3
+REQUEST = (
+    "Remind me to call Sarah, email her the project files, schedule a follow-up call"
+    " after the reminder and look up news about her company."
+)
+PLAN = [
+    "get_date_and_time",
+    "add reminder to call sarah",
+    "send project files to sarah via email",
+    {"task": "schedule follow-up call with sarah", "after": [2]},
+    "search the web for news about sarah's company",
+]
+# name -> description of the worker agents.
+WORKERS = {
+    "reminder_agent": "Adds reminders and alarms.",
+    "email_agent": "Sends emails and files to contacts.",
+    "calendar_agent": "Books appointments and schedules calls and meetings in the calendar.",
+    "search_agent": "Searches the web for news and information.",
+}
+
+
+def get_current_time() -> str:
+    """Get the current system time formatted as 'dd/MM/yyyy HH:mm:ss'."""
+    return datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+
+def _said(request: LlmRequest, name: str) -> bool:
+    return any(
+        f"[{name}] said" in (part.text or "") for content in request.contents for part in content.parts or ()
+    )
+
+
+class ScriptedLlm(BaseLlm):
+    """Answers as the agent named in the request's system instruction, after MODEL_LATENCY seconds."""
+
+    model: str = MODEL
+    calls: ClassVar[int] = 0
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [MODEL]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        type(self).calls += 1
+        await asyncio.sleep(MODEL_LATENCY)
+        instruction = str(llm_request.config.system_instruction or "")
+        agent = re.search(r'Your internal name is "([^"]+)"', instruction).group(1)
+        answered = {
+            part.function_response.name
+            for content in llm_request.contents for part in content.parts or () if part.function_response
+        }
+        parts: List[types.Part]
+        if agent == "task_planner":
+            parts = [types.Part(text=json.dumps(PLAN))]
+        elif agent == "team_manager" and "transfer_to_agent" in llm_request.tools_dict:
+            pending = [name for name in WORKERS if not _said(llm_request, name)]
+            if "get_current_time" not in answered:
+                parts = [types.Part(function_call=types.FunctionCall(name="get_current_time", args={}))]
+            elif pending:
+                parts = [types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": pending[0]}))]
+            else:
+                parts = [types.Part(text="All done.")]
+        elif agent == "team_manager":
+            parts = [types.Part(text="All done.")]
+        else:
+            parts = [types.Part(text=f"{agent} did its part.")]
+            if "transfer_to_agent" in llm_request.tools_dict:
+                parts.append(types.Part(function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "team_manager"})))
+        yield LlmResponse(content=types.Content(role="model", parts=parts))
+
+
+def _workers() -> List[LlmAgent]:
+    return [
+        LlmAgent(name=name, model=MODEL, description=description, instruction=f"You are the {name}. {description}")
+        for name, description in WORKERS.items()
+    ]
+
+
+def _use_scripted_model(agent: BaseAgent) -> BaseAgent:
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if isinstance(current, LlmAgent):
+            current.model = MODEL
+    return agent
+
+
+def build_transfers() -> BaseAgent:
+    manager = get_team_manager(_workers())
+    manager.tools = [get_current_time]
+    return _use_scripted_model(manager)
+
+
+def build_plan(max_workers: int) -> BaseAgent:
+    manager = get_planned_team_manager(_workers(), tools=[get_current_time])
+    for agent in manager.sub_agents:
+        if isinstance(agent, PlanExecutorAgent):
+            agent.max_workers = max_workers
+    return _use_scripted_model(manager)
+
+
+async def run_turn(agent: BaseAgent) -> Dict[str, object]:
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="plan_executor_benchmark", user_id="benchmark_user")
+    runner = Runner(app_name="plan_executor_benchmark", agent=agent, session_service=session_service)
+    ScriptedLlm.calls = 0
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await call_agent_async(runner, "benchmark_user", session.id, REQUEST)
+    elapsed = time.perf_counter() - started
+    state = session_service.get_session(
+        app_name="plan_executor_benchmark", user_id="benchmark_user", session_id=session.id
+    ).state
+    return {"seconds": elapsed, "calls": ScriptedLlm.calls, "results": state.get(PLAN_RESULTS_KEY)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    LLMRegistry.register(ScriptedLlm)
+    # ADK 0.4 runs parallel branches in their own contexts; OpenTelemetry
+    # logs a harmless "Failed to detach context" for each.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+
+    print(f"{'mode':<16} {'seconds':>7} {'model calls':>11}")
+    results = None
+    for label, build in (
+        ("transfers", build_transfers),
+        ("plan", lambda: build_plan(max_workers=8)),
+        ("plan, 1 worker", lambda: build_plan(max_workers=1)),
+    ):
+        result = asyncio.run(run_turn(build()))
+        print(f"{label:<16} {result['seconds']:>7.2f} {result['calls']:>11}")
+        results = results or result["results"]
+
+    print(f"\nstate['{PLAN_RESULTS_KEY}'] of the plan run (critical path: {' -> '.join(results['critical_path'])}):")
+    for step in results["steps"]:
+        after = f" after {', '.join(step['after'])}" if step["after"] else ""
+        print(f"  {step['id']:<7} {step['task']:<46} {step['assignee'] or '-':<17} {step['status']}{after}")
+
+
+if __name__ == "__main__":
+    main()
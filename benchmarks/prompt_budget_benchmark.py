@@ -0,0 +1,133 @@
+"""
+Prompt Budget Benchmark
+-----------------------
+
+Reports what the instruction templates in prompts/ cost, with
+utils/llm/prompt_compiler.py:
+
+    * per prompt: static tokens, the cacheable prefix (static text before the
+      first state slot) and the static tail after it, and the state keys;
+    * per render: the tokens each injected key adds, for a typical state
+      (reports of a few thousand characters) and a large one (long reports,
+      many scraped pages, a long {user_preferences} as in
+      documentations/examples/InMemorySession), with the renders flagged over
+      PROMPT_TOKEN_BUDGET / PROMPT_STATE_TOKEN_BUDGET;
+    * render time: ADK's template fill on the raw template, the compiled
+      render (with its token report), and the compiled render followed by
+      the scan ADK 0.4 still runs over an InstructionProvider's result. That
+      scan is over the injected values too, so on ADK 0.4 the compiled path
+      costs more CPU, microseconds per model call either way.
+
+Usage (from the repository root):
+    python -m benchmarks.prompt_budget_benchmark
+    PROMPT_TOKEN_BUDGET=4000 python -m benchmarks.prompt_budget_benchmark
+"""
+import argparse
+import importlib
+import pkgutil
+import time
+from typing import Dict
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.flows.llm_flows.instructions import _populate_values
+from google.adk.sessions import InMemorySessionService
+
+import prompts
+from utils.llm.prompt_compiler import CompiledPrompt, PromptBudget, compile_prompt
+
+# The instruction of the InMemorySession example, which injects the user's preferences.
+USER_PROFILE_PROMPT = """
+    You are a helpful assistant that answers questions about the user.
+    hhere is some information about our user:
+    user name: {user_name}
+    ----------------------------------
+    user preferences: {user_preferences}
+    """
+
+# Characters of each injected value: key -> (typical, large).
+STATE_SIZES: Dict[str, tuple] = {
+    "system_information": (3000, 24000),
+    "network_analysis_report": (3000, 24000),
+    "scraped_urls_results": (8000, 80000),
+    "web_results": (2000, 12000),
+    "generated_code": (2500, 16000),
+    "review_context": (2500, 16000),
+    "user_preferences": (600, 20000),
+}
+DEFAULT_SIZE = (400, 4000)
+
+
+def catalog() -> Dict[str, CompiledPrompt]:
+    """Every string constant of the prompts package, compiled, by name."""
+    compiled = {}
+    for module_info in pkgutil.iter_modules(prompts.__path__):
+        module = importlib.import_module(f"prompts.{module_info.name}")
+        for name, value in vars(module).items():
+            if name.endswith("_prompt") and isinstance(value, str):
+                compiled[name] = compile_prompt(value, name=name)
+    compiled["user_profile_prompt"] = compile_prompt(USER_PROFILE_PROMPT, name="user_profile_prompt")
+    return compiled
+
+
+def sample_state(prompt: CompiledPrompt, large: bool) -> Dict[str, str]:
+    return {key: "x" * STATE_SIZES.get(key, DEFAULT_SIZE)[large] for key in prompt.keys}
+
+
+def render_times(prompt: CompiledPrompt, state: Dict[str, str], renders: int) -> tuple:
+    """Microseconds per render: (ADK on the raw template, compiled, compiled + ADK's scan)."""
+    session = InMemorySessionService().create_session(app_name="prompt_budget_benchmark", user_id="benchmark_user", state=state)
+    ctx = InvocationContext(
+        session_service=InMemorySessionService(), invocation_id="benchmark",
+        agent=LlmAgent(name="benchmark_agent"), session=session,
+    )
+    readonly = ReadonlyContext(ctx)
+    started = time.perf_counter()
+    for _ in range(renders):
+        _populate_values(prompt.template, ctx)
+    raw = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(renders):
+        prompt(readonly)
+    compiled = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(renders):
+        _populate_values(prompt(readonly), ctx)
+    scanned = time.perf_counter() - started
+    return tuple(seconds / renders * 1e6 for seconds in (raw, compiled, scanned))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=2000, help="renders per prompt for the timing")
+    args = parser.parse_args()
+    budget = PromptBudget.from_env()
+    compiled = catalog()
+
+    print("Static cost per prompt (tokens)")
+    print(f"{'prompt':<34} {'static':>6} {'prefix':>6} {'tail':>5}  keys")
+    for name, prompt in compiled.items():
+        tail = prompt.static_tokens - prompt.prefix_tokens if prompt.keys else 0
+        keys = ", ".join(f"{key}{'' if required else '?'}" for key, required in prompt.keys.items())
+        print(f"{name:<34} {prompt.static_tokens:>6} {prompt.prefix_tokens:>6} {tail:>5}  {keys or '-'}")
+
+    print(f"\nRendered cost (budget {budget.max_tokens} tokens per instruction, {budget.max_state_tokens} per key)")
+    print(f"{'prompt':<34} {'state':<8} {'tokens':>6}  flagged")
+    for name, prompt in compiled.items():
+        if not prompt.keys:
+            continue
+        for label, large in (("typical", False), ("large", True)):
+            report = prompt.report(sample_state(prompt, large))
+            flagged = ", ".join(key or "(whole prompt)" for key in report.over_budget)
+            print(f"{name:<34} {label:<8} {report.tokens:>6}  {flagged or '-'}")
+
+    print(f"\nRender time, typical state ({args.renders} renders, microseconds per render)")
+    print(f"{'prompt':<34} {'ADK':>7} {'compiled':>8} {'+ADK scan':>9}")
+    for name, prompt in compiled.items():
+        raw, fast, scanned = render_times(prompt, sample_state(prompt, large=False), args.renders)
+        print(f"{name:<34} {raw:>7.1f} {fast:>8.1f} {scanned:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Review Loop Benchmark
+---------------------
+
+Counts the model calls of one use_loop_agent.py turn (python expert, then
+the reviewer/refiner LoopAgent with max_iterations=5) under scripted model
+behaviour, before and after loop convergence, static review and execution
+feedback:
+
+    * before: exit_loop has no effect, nothing detects convergence, the
+              reviewer model sees every version of the code and nothing runs
+              it, so the loop always runs all iterations (the old
+              exit_loop_tool was a bare declaration).
+    * after:  exit_loop escalates, utils/code/loop_convergence.py stops the
+              loop on unchanged code or a repeated review,
+              utils/code/static_review.py skips reviews of code that does not
+              compile or was already reviewed, and
+              utils/code/execution_feedback.py runs the code and its doctests
+              in the sandbox, in a loop step before the reviewer, and shows
+              the results to reviewer and refiner.
+
+Scenarios:
+    satisfied        the reviewer calls exit_loop on the first review.
+    no_changes       the refiner answers NO_CHANGES.
+    whitespace_only  the refiner's diffs only reformat lines.
+    repeated_review  the refiner changes code, the reviewer keeps saying the same.
+    syntax_error     the expert's code does not compile; the refiner fixes it.
+    rejected_patch   the refiner's first diff does not apply, its retry says NO_CHANGES.
+    failing_doctest  a doctest fails; reviewer and refiner act on it once they are
+                     shown the failure (without it, they polish other lines).
+    keeps_improving  every iteration changes code and review (no early exit).
+
+The agents come from the real factories; only the model is scripted, so no
+API key or network is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.review_loop_benchmark
+"""
+import argparse
+import asyncio
+import contextlib
+import difflib
+import io
+import logging
+from typing import AsyncGenerator, Callable, Dict, List
+
+from google.adk.agents import LoopAgent, SequentialAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from agents.python_expert_agent.python_expert_agent import get_python_expert_agent
+from agents.python_refiner_agent.python_refiner_agent import get_python_refiner_agent
+from agents.python_reviewer_agent.python_reviewer_agent import get_python_reviewer_agent
+from utils.code.execution_feedback import get_execution_feedback_agent
+from utils.code.loop_convergence import CONVERGED_KEY
+from utils.code.patch_protocol import apply_refinement_patch_callback, start_review_callback
+from utils.llm.call_agent_async import call_agent_async
+
+MAX_ITERATIONS = 5
+MODEL = "scripted-review-loop"
+# As in use_loop_agent.py; the agents' instructions read these keys.
+INITIAL_STATE = {"generated_code": "", "review_context": "", "review_comments": "", "refinement_patch": "", "patch_error": ""}
+PROGRAM = "".join(f"def step_{n}(value):\n    return value + {n}\n\n\n" for n in range(20))
+BUGGY_MEAN = '''def mean(values):
+    """
+    >>> mean([1, 2, 3])
+    2.0
+    """
+    return sum(values) / (len(values) + 1)
+'''
+
+# Scenario -> agent ("expert", "reviewer", "refiner") -> (request, call number) -> response.
+# The expert answers with PROGRAM unless the scenario scripts it.
+Script = Dict[str, Callable[[LlmRequest, int], LlmResponse]]
+
+
+def _text(text: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def _exit_loop_call() -> LlmResponse:
+    call = types.FunctionCall(name="exit_loop", args={})
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+
+
+def _current_code(request: LlmRequest) -> str:
+    instruction = request.config.system_instruction
+    return instruction.split("Current code:\n", 1)[1].split("\n\nReview comments to address:", 1)[0] + "\n"
+
+
+def _diff(request: LlmRequest, change: Callable[[str], str]) -> LlmResponse:
+    code = _current_code(request)
+    lines = difflib.unified_diff(code.splitlines(True), change(code).splitlines(True), "a/code.py", "b/code.py")
+    return _text("".join(lines))
+
+
+def _fix(n: int) -> Callable[[str], str]:
+    return lambda code: code.replace(f"return value + {n}\n", f"return value + {n}  # checked\n", 1)
+
+
+def _reformat(n: int) -> Callable[[str], str]:
+    return lambda code: code.replace(f"return value + {n}\n", f"return value+{n}\n", 1)
+
+
+def _break_syntax(code: str) -> str:
+    return code.replace("def step_2(value):", "def step_2(value)", 1)
+
+
+def _fix_syntax(code: str) -> str:
+    return code.replace("def step_2(value)\n", "def step_2(value):\n", 1)
+
+
+def _fix_mean(code: str) -> str:
+    return code.replace("(len(values) + 1)", "len(values)", 1)
+
+
+def _shown_results(request: LlmRequest) -> str:
+    return str(request.config.system_instruction).split("doctests and tests", 1)[-1]
+
+
+def _first_then(first: Callable[[LlmRequest, int], LlmResponse], then: Callable[[LlmRequest, int], LlmResponse]):
+    return lambda request, n: first(request, n) if n == 1 else then(request, n)
+
+
+def _after_tool(respond: Callable[[LlmRequest, int], LlmResponse]) -> Callable[[LlmRequest, int], LlmResponse]:
+    """Answers the follow-up call ADK makes after a tool response with a short text."""
+    def answer(request: LlmRequest, n: int) -> LlmResponse:
+        last = request.contents[-1] if request.contents else None
+        if last and last.parts and last.parts[0].function_response:
+            return _text("Done.")
+        return respond(request, n)
+    return answer
+
+
+SCENARIOS: Dict[str, Script] = {
+    "satisfied": {
+        "reviewer": _after_tool(lambda request, n: _exit_loop_call()),
+        "refiner": lambda request, n: _text("NO_CHANGES"),
+    },
+    "no_changes": {
+        "reviewer": lambda request, n: _text(f"- Review {n}: consider adding docstrings."),
+        "refiner": lambda request, n: _text("NO_CHANGES"),
+    },
+    "whitespace_only": {
+        "reviewer": lambda request, n: _text(f"- Review {n}: spacing around operators."),
+        "refiner": lambda request, n: _diff(request, _reformat(n)),
+    },
+    "repeated_review": {
+        "reviewer": lambda request, n: _text("- step_3: add input validation."),
+        "refiner": lambda request, n: _diff(request, _fix(n)),
+    },
+    "syntax_error": {
+        "expert": lambda request, n: _text(f"```python\n{_break_syntax(PROGRAM)}```"),
+        "reviewer": lambda request, n: _text(f"- Review {n}: consider adding docstrings."),
+        "refiner": _first_then(lambda request, n: _diff(request, _fix_syntax), lambda request, n: _text("NO_CHANGES")),
+    },
+    "rejected_patch": {
+        "reviewer": lambda request, n: _text(f"- Review {n}: check step_{n}."),
+        "refiner": _first_then(
+            lambda request, n: _text("--- a/code.py\n+++ b/code.py\n@@ -1,1 +1,1 @@\n-def missing():\n+def found():\n"),
+            lambda request, n: _text("NO_CHANGES"),
+        ),
+    },
+    "failing_doctest": {
+        "expert": lambda request, n: _text(f"```python\n{PROGRAM}{BUGGY_MEAN}```"),
+        "reviewer": _after_tool(lambda request, n: (
+            _exit_loop_call() if "Execution passed" in _shown_results(request)
+            else _text("- mean: the doctest fails, the divisor is wrong.") if "Execution failed" in _shown_results(request)
+            else _text(f"- Review {n}: check step_{n}.")
+        )),
+        "refiner": lambda request, n: _diff(
+            request, _fix_mean if "Execution failed" in _shown_results(request) else _fix(n)
+        ),
+    },
+    "keeps_improving": {
+        "reviewer": lambda request, n: _text(f"- Review {n}: check step_{n}."),
+        "refiner": lambda request, n: _diff(request, _fix(n)),
+    },
+}
+
+_ROLES = {"Python Expert Agent": "expert", "Code Reviewer": "reviewer", "Code Refiner": "refiner"}
+_active_script: Script = {}
+_calls: Dict[str, int] = {}
+
+
+class ScriptedLlm(BaseLlm):
+    """Answers with the active scenario's script, chosen by the agent's instruction."""
+
+    model: str = MODEL
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [MODEL]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        instruction = str(llm_request.config.system_instruction or "")
+        role = next(role for marker, role in _ROLES.items() if marker in instruction)
+        _calls[role] = _calls.get(role, 0) + 1
+        if role in _active_script:
+            yield _active_script[role](llm_request, _calls[role])
+        else:
+            yield _text(f"```python\n{PROGRAM}```")
+
+
+def exit_loop(tool_context: ToolContext) -> dict:
+    """The old exit_loop: declared to the model, but without any effect."""
+    return {}
+
+
+def build_pipeline(converging: bool) -> SequentialAgent:
+    expert, reviewer, refiner = get_python_expert_agent(), get_python_reviewer_agent(), get_python_refiner_agent()
+    for agent in (expert, reviewer, refiner):
+        agent.model = MODEL
+    if not converging:
+        expert.after_agent_callback = start_review_callback
+        reviewer.before_agent_callback = None
+        reviewer.after_agent_callback = None
+        reviewer.tools = [exit_loop]
+        refiner.after_agent_callback = apply_refinement_patch_callback
+    steps = [reviewer, refiner] if not converging else [get_execution_feedback_agent(), reviewer, refiner]
+    loop_agent = LoopAgent(name="loop_agent", max_iterations=MAX_ITERATIONS, sub_agents=steps)
+    return SequentialAgent(name="sequential_agent", sub_agents=[expert, loop_agent])
+
+
+async def run_turn(scenario: str, converging: bool) -> Dict[str, object]:
+    global _active_script
+    _active_script = SCENARIOS[scenario]
+    _calls.clear()
+    session_service = InMemorySessionService()
+    session = session_service.create_session(
+        app_name="review_loop_benchmark", user_id="benchmark_user", state=dict(INITIAL_STATE)
+    )
+    runner = Runner(app_name="review_loop_benchmark", agent=build_pipeline(converging), session_service=session_service)
+    with contextlib.redirect_stdout(io.StringIO()):
+        await call_agent_async(runner, "benchmark_user", session.id, "Write twenty small step functions.")
+    state = session_service.get_session(
+        app_name="review_loop_benchmark", user_id="benchmark_user", session_id=session.id
+    ).state
+    return {"calls": sum(_calls.values()), "reason": state.get(CONVERGED_KEY) or ""}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    LLMRegistry.register(ScriptedLlm)
+    # ADK 0.4 closes the agent generators of a loop that escalates from another
+    # context; OpenTelemetry logs a harmless "Failed to detach context" for each.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+
+    print(f"Model calls per turn, LoopAgent max_iterations={MAX_ITERATIONS}")
+    print(f"{'scenario':<17} {'before':>7} {'after':>6}  stopped by")
+    for scenario in SCENARIOS:
+        before = asyncio.run(run_turn(scenario, converging=False))
+        after = asyncio.run(run_turn(scenario, converging=True))
+        reason = after["reason"] or ("exit_loop" if after["calls"] < before["calls"] else "max_iterations")
+        print(f"{scenario:<17} {before['calls']:>7} {after['calls']:>6}  {reason}")
+
+
+if __name__ == "__main__":
+    main()
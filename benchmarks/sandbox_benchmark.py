@@ -0,0 +1,80 @@
+"""
+Sandbox Benchmark
+-----------------
+
+Checks the limits of utils/code/sandbox.py and measures what running
+candidates in parallel saves:
+
+    * limits:     programs that loop, sleep, allocate, connect, spawn a
+                  process or write outside their directory, and how each run ends.
+    * candidates: N candidate programs with doctests and tests, run one after
+                  another and with run_candidates() on a pool of workers.
+
+Usage (from the repository root):
+    python -m benchmarks.sandbox_benchmark
+    python -m benchmarks.sandbox_benchmark --candidates 16 --workers 8
+"""
+import argparse
+import os
+import time
+
+from utils.code.sandbox import SandboxLimits, run_candidates, run_sandboxed
+
+LIMITS = SandboxLimits(cpu_seconds=2, memory_mb=256, wall_seconds=3)
+
+MISBEHAVING = {
+    "cpu loop": "while True:\n    pass\n",
+    "sleep": "import time\ntime.sleep(60)\n",
+    "allocate 2 GB": "data = bytearray(2 << 30)\n",
+    "http request": "import urllib.request\nurllib.request.urlopen('http://example.com', timeout=2)\n",
+    "raw socket": "import socket\nsocket.socket().connect(('1.1.1.1', 53))\n",
+    "subprocess": "import subprocess\nsubprocess.run(['id'])\n",
+    "write /tmp": "open('/tmp/sandbox_benchmark.txt', 'w').write('x')\n",
+}
+
+# A candidate with a doctest and a test; the sleep stands in for real work
+# that waits (I/O, timers), which overlaps even on a single CPU.
+CANDIDATE = '''import time
+
+
+def slugify(text):
+    """
+    >>> slugify("Hello World")
+    'hello-world'
+    """
+    time.sleep(0.2)
+    return "-".join(text.lower().split())
+'''
+TESTS = "def test_slugify():\n    assert slugify('  A  b ') == 'a-b'\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=8, help="candidate programs to run")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent sandboxes")
+    args = parser.parse_args()
+
+    print(f"Limits: {LIMITS.cpu_seconds} s CPU, {LIMITS.memory_mb} MB, {LIMITS.wall_seconds:g} s wall")
+    print(f"{'program':<15} {'status':<8} {'seconds':>7}  reason")
+    for name, code in MISBEHAVING.items():
+        result = run_sandboxed(code, limits=LIMITS)
+        reason = (result.exception.strip().splitlines() or [""])[-1]
+        print(f"{name:<15} {result.status:<8} {result.duration_s:>7.2f}  {reason[:70]}")
+    if os.path.exists("/tmp/sandbox_benchmark.txt"):
+        print("WARNING: /tmp/sandbox_benchmark.txt was written")
+
+    candidates = [CANDIDATE] * args.candidates
+    started = time.perf_counter()
+    serial = [run_sandboxed(code, TESTS, LIMITS) for code in candidates]
+    serial_s = time.perf_counter() - started
+    started = time.perf_counter()
+    parallel = run_candidates(candidates, TESTS, LIMITS, workers=args.workers)
+    parallel_s = time.perf_counter() - started
+    assert all(result.ok for result in serial + parallel)
+    print(f"\n{args.candidates} candidates (doctest + test each), {os.cpu_count()} CPU(s)")
+    print(f"serial               {serial_s:>6.2f} s")
+    print(f"run_candidates({args.workers:>2})   {parallel_s:>6.2f} s  ({serial_s / parallel_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Session Cache Benchmark
+-----------------------
+
+Measures one turn's worth of session-service reads on a hot session - one
+get_session() and one list_sessions(), as load_user_session() and the
+Runner do - for a session that already holds --events events, with and
+without the read-through SessionCache.
+
+Usage (from the repository root):
+    python -m benchmarks.session_cache_benchmark
+    python -m benchmarks.session_cache_benchmark --events 50 500 --turns 200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from utils.sessions.session_cache import SessionCache
+from utils.sessions.session_service_provider import PooledDatabaseSessionService
+
+APP_NAME = "session_benchmark"
+USER_ID = "benchmark_user"
+
+
+def _fill_session(service, events: int) -> str:
+    session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"turn": 0})
+    for n in range(events):
+        service.append_event(session, Event(
+            author="benchmark_agent",
+            invocation_id=f"e-{uuid.uuid4()}",
+            content=types.Content(role="model", parts=[types.Part(text="lorem ipsum " * 80)]),
+            actions=EventActions(state_delta={"turn": n}),
+        ))
+    return session.id
+
+
+def time_turns(service, session_id: str, turns: int) -> float:
+    """
+    Returns:
+        float: Median milliseconds for one get_session() + list_sessions().
+    """
+    timings = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_id)
+        service.list_sessions(app_name=APP_NAME, user_id=USER_ID)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, nargs="+", default=[10, 100, 500], help="events in the hot session")
+    parser.add_argument("--turns", type=int, default=100, help="timed reads per configuration")
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="session_benchmark_")
+    print(f"{'events':>7} {'uncached ms':>12} {'cached ms':>10} {'speed-up':>9} {'hit rate':>9}")
+    for events in args.events:
+        db_url = f"sqlite:///{os.path.join(db_dir, f'cache_{events}.db')}"
+        uncached = PooledDatabaseSessionService(db_url, cache=SessionCache(max_bytes=0))
+        session_id = _fill_session(uncached, events)
+        uncached_ms = time_turns(uncached, session_id, args.turns)
+        uncached.close()
+
+        cached = PooledDatabaseSessionService(db_url)
+        cached_ms = time_turns(cached, session_id, args.turns)
+        hit_rate = cached.cache.stats()["hit_rate"]
+        cached.close()
+        print(f"{events:>7} {uncached_ms:>12.2f} {cached_ms:>10.3f} {uncached_ms / cached_ms:>8.0f}x {hit_rate:>9.0%}")
+    print(f"\nDatabases in {db_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Session Compression Benchmark
+-----------------------------
+
+Measures what size-threshold zstd compression (the "+zstd" session formats,
+utils/sessions/session_compression.py) does to a session store shaped like
+db_loop_agent.db: many sessions of one app whose events carry tool results
+- get_network_info() dumps and scraper JSON - plus a little chat.
+
+The same store is built three times:
+
+    * plain:       JSON text, as ADK stores it.
+    * zstd:        values of at least --min-bytes compressed, no dictionary.
+    * zstd + dict: a dictionary trained on the app's values, then every row
+                   recompressed with it (train-dictionaries + migrate-format).
+
+For each it reports the bytes stored in the event content and session state
+columns, the database size and page count (after VACUUM, including the
+dictionary), and the median time of an uncached get_session(). The file
+shrinks less than the values: event rows also hold ids, timestamps and
+pickled actions, and the indexes are not compressed.
+
+Usage (from the repository root):
+    python -m benchmarks.session_compression_benchmark
+    python -m benchmarks.session_compression_benchmark --sessions 40 --events 30 --min-bytes 256
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from utils.sessions.session_cache import SessionCache
+from utils.sessions.session_compression import train_dictionaries
+from utils.sessions.session_serializer import migrate_serialized_rows
+from utils.sessions.session_service_provider import PooledDatabaseSessionService
+
+APP_NAME = "loop_agent_app"
+USER_ID = "benchmark_user"
+WORDS = [
+    "network", "latency", "packet", "router", "gateway", "python", "agent", "session", "review", "loop",
+    "config", "interface", "address", "server", "client", "request", "response", "timeout", "retry", "cache",
+]
+
+
+def _network_info(rng: random.Random) -> Dict[str, Any]:
+    """
+    Shaped like tools/network_info_tool.get_network_info() on Linux. The
+    agent always runs on the same host, so only pids, ports and the like vary.
+    """
+    host = random.Random(1)
+    interfaces = {
+        name: {
+            "addresses": [
+                {"family": "AddressFamily.AF_INET", "address": f"10.0.{n}.{host.randint(2, 254)}",
+                 "netmask": "255.255.255.0", "broadcast": f"10.0.{n}.255"},
+                {"family": "AddressFamily.AF_INET6", "address": f"fe80::{host.getrandbits(32):x}%{name}",
+                 "netmask": "ffff:ffff:ffff:ffff::"},
+                {"family": "AddressFamily.AF_PACKET", "address": ":".join(f"{host.randint(0, 255):02x}" for _ in range(6))},
+            ],
+            "stats": {"is_up": True, "duplex": "NicDuplex.NIC_DUPLEX_FULL", "speed_mbps": 1000, "mtu": 1500},
+        }
+        for n, name in enumerate(["lo", "eth0", "eth1", "docker0", "wlan0"])
+    }
+    ports = [
+        f"tcp   LISTEN 0      4096   0.0.0.0:{port}   0.0.0.0:*   users:((\"python\",pid={rng.randint(100, 9999)},fd={n}))"
+        for n, port in enumerate([22, 53, 80, 443, 5432, 6379, 8000, 8080, 9090] + [rng.randint(30000, 60000)])
+    ]
+    return {
+        "hostname": "agent-host",
+        "interfaces": interfaces,
+        "dns_servers": ["10.0.0.2", "8.8.8.8"],
+        "advanced_info": {
+            "ip_route": {"output": [f"10.{n}.0.0/16 via 10.0.0.1 dev eth0 proto static metric {n}" for n in range(10)]},
+            "ss_listening_ports": {"output": ports},
+        },
+        "notes": ["DNS server retrieval is platform-dependent and this basic tool uses a simplified approach. Results may vary."],
+    }
+
+
+def _scraped_page(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "url": f"https://example.com/articles/{rng.randint(1, 10 ** 6)}",
+        "status": 200,
+        "title": " ".join(rng.choices(WORDS, k=6)).title(),
+        "links": [f"https://example.com/articles/{rng.randint(1, 10 ** 6)}" for _ in range(15)],
+        "text": " ".join(rng.choices(WORDS, k=400)),
+    }
+
+
+def _events(rng: random.Random, count: int) -> List[Event]:
+    events = []
+    for step in range(count):
+        if step % 3 == 0:
+            part = types.Part(function_response=types.FunctionResponse(name="get_network_info", response=_network_info(rng)))
+        elif step % 3 == 1:
+            part = types.Part(function_response=types.FunctionResponse(name="scrape_page", response=_scraped_page(rng)))
+        else:
+            part = types.Part(text=" ".join(rng.choices(WORDS, k=40)))
+        events.append(Event(
+            author="loop_agent",
+            invocation_id=f"e-{uuid.uuid4()}",
+            content=types.Content(role="model", parts=[part]),
+            actions=EventActions(state_delta={"step": step}),
+        ))
+    return events
+
+
+def _build_store(db_path: str, sessions: int, events: int) -> List[str]:
+    rng = random.Random(7)
+    service = PooledDatabaseSessionService(f"sqlite:///{db_path}")
+    session_ids = []
+    for _ in range(sessions):
+        session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state={"last_report": _network_info(rng)})
+        for event in _events(rng, events):
+            service.append_event(session, event)
+        session_ids.append(session.id)
+    service.close()
+    return session_ids
+
+
+def _measure(db_path: str) -> Dict[str, int]:
+    """File size and page count after VACUUM, and bytes stored in the JSON columns."""
+    connection = sqlite3.connect(db_path)
+    try:
+        connection.execute("VACUUM")
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        pages = connection.execute("PRAGMA page_count").fetchone()[0]
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        values = sum(
+            connection.execute(query).fetchone()[0] or 0
+            for query in ("SELECT SUM(LENGTH(content)) FROM events", "SELECT SUM(LENGTH(state)) FROM sessions")
+        )
+        return {"bytes": pages * page_size, "pages": pages, "values": values}
+    finally:
+        connection.close()
+
+
+def _load_ms(db_path: str, session_ids: List[str], repeat: int) -> float:
+    service = PooledDatabaseSessionService(f"sqlite:///{db_path}", cache=SessionCache(max_bytes=0))
+    timings = []
+    for n in range(repeat):
+        started = time.perf_counter()
+        service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session_ids[n % len(session_ids)])
+        timings.append(time.perf_counter() - started)
+    service.close()
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="sessions in the store")
+    parser.add_argument("--events", type=int, default=24, help="events per session")
+    parser.add_argument("--min-bytes", type=int, default=512, help="compression threshold")
+    parser.add_argument("--repeat", type=int, default=40, help="timed get_session() calls")
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="session_benchmark_")
+    os.environ.pop("SESSION_SERIALIZER", None)
+    print(f"{args.sessions} sessions x {args.events} events, threshold {args.min_bytes} B")
+    print(f"{'store':<12} {'values KiB':>11} {'db KiB':>8} {'pages':>7} {'vs plain':>9} {'load ms':>8}")
+    plain = None
+    for label in ("plain", "zstd", "zstd + dict"):
+        if label == "plain":
+            os.environ.pop("SESSION_COMPRESS_MIN_BYTES", None)
+        else:
+            os.environ["SESSION_COMPRESS_MIN_BYTES"] = str(args.min_bytes)
+        db_path = os.path.join(db_dir, f"compression_{label.replace(' + ', '_')}.db")
+        session_ids = _build_store(db_path, args.sessions, args.events)
+        if label == "zstd + dict":
+            service = PooledDatabaseSessionService(f"sqlite:///{db_path}")
+            train_dictionaries(service.db_engine)
+            migrate_serialized_rows(service.db_engine)
+            service.close()
+        size = _measure(db_path)
+        plain = plain or size["bytes"]
+        load_ms = _load_ms(db_path, session_ids, args.repeat)
+        print(
+            f"{label:<12} {size['values'] / 1024:>11.0f} {size['bytes'] / 1024:>8.0f} {size['pages']:>7}"
+            f" {plain / size['bytes']:>8.1f}x {load_ms:>8.2f}"
+        )
+    print(f"\nDatabases in {db_dir}")
+
+
+if __name__ == "__main__":
+    main()
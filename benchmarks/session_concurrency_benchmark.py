@@ -0,0 +1,138 @@
+"""
+Session Concurrency Benchmark
+-----------------------------
+
+Compares how much the session service blocks the agent event loop, and how
+many turns per second get through, at 1, 10 and 100 concurrent sessions.
+
+Each simulated turn makes the same session-service calls ADK 0.4's Runner
+makes: one get_session(), one append_event() for the user message, then one
+append_event() per agent event (with a state delta), each after an
+`await asyncio.sleep()` standing in for the model call. No LLM is needed.
+
+Event-loop stall is measured by a probe task that asks to wake up every
+millisecond; any extra delay is time the loop spent blocked.
+
+Usage (from the repository root):
+    python -m benchmarks.session_concurrency_benchmark
+    python -m benchmarks.session_concurrency_benchmark --concurrency 1 10 100 --turns 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from typing import Dict, List
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from utils.sessions.async_session_service import AsyncDatabaseSessionService
+from utils.sessions.session_service_provider import PooledDatabaseSessionService
+
+APP_NAME = "session_benchmark"
+PROBE_INTERVAL_S = 0.001
+
+
+async def _probe_event_loop(stalls: List[float], stop: asyncio.Event) -> None:
+    """Records how late every 1 ms wake-up is."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL_S)
+        stalls.append(max(0.0, time.perf_counter() - started - PROBE_INTERVAL_S))
+
+
+async def _run_session(service, session_id: str, user_id: str, turns: int, events_per_turn: int, model_latency_s: float) -> None:
+    for turn in range(turns):
+        session = service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        invocation_id = f"e-{uuid.uuid4()}"
+        service.append_event(session, Event(
+            author="user",
+            invocation_id=invocation_id,
+            content=types.Content(role="user", parts=[types.Part(text=f"request {turn}")]),
+        ))
+        for step in range(events_per_turn):
+            await asyncio.sleep(model_latency_s)
+            service.append_event(session, Event(
+                author="benchmark_agent",
+                invocation_id=invocation_id,
+                content=types.Content(role="model", parts=[types.Part(text="lorem ipsum " * 40)]),
+                actions=EventActions(state_delta={"turn": turn, f"step_{step}": "done"}),
+            ))
+        # Yield between turns like a caller awaiting the next user message.
+        await asyncio.sleep(0)
+
+
+async def run_level(service, concurrency: int, turns: int, events_per_turn: int, model_latency_s: float) -> Dict[str, float]:
+    """
+    Runs `concurrency` sessions side by side and measures the event loop.
+
+    Returns:
+        dict: turns_per_s, stall_total_ms, stall_max_ms and stall_p99_ms.
+    """
+    # Sessions are created before the measured turns, as load_user_session() does.
+    user_ids = [f"user_{concurrency}_{n}" for n in range(concurrency)]
+    session_ids = [
+        service.create_session(app_name=APP_NAME, user_id=user_id, state={"turn": 0}).id
+        for user_id in user_ids
+    ]
+    stalls: List[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_event_loop(stalls, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _run_session(service, session_id, user_id, turns, events_per_turn, model_latency_s)
+        for session_id, user_id in zip(session_ids, user_ids)
+    ))
+    if hasattr(service, "flush_async"):
+        await service.flush_async()  # count the write-behind work as part of the run
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    stalls.sort()
+    return {
+        "turns_per_s": concurrency * turns / elapsed,
+        "stall_total_ms": sum(stalls) * 1000,
+        "stall_max_ms": (stalls[-1] if stalls else 0.0) * 1000,
+        "stall_p99_ms": (stalls[int(len(stalls) * 0.99)] if stalls else 0.0) * 1000,
+        "stall_median_ms": (statistics.median(stalls) if stalls else 0.0) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--events-per-turn", type=int, default=4, help="agent events per turn")
+    parser.add_argument("--model-latency-ms", type=float, default=20.0, help="simulated model call time")
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="session_benchmark_")
+    backends = {
+        "DatabaseSessionService (pooled, sync I/O)": PooledDatabaseSessionService,
+        "AsyncDatabaseSessionService": AsyncDatabaseSessionService,
+    }
+    print(f"{'backend':<44} {'sessions':>8} {'turns/s':>9} {'stall total':>12} {'stall max':>10} {'stall p99':>10}")
+    for label, backend in backends.items():
+        for concurrency in args.concurrency:
+            db_path = os.path.join(db_dir, f"{backend.__name__}_{concurrency}.db")
+            service = backend(f"sqlite:///{db_path}")
+            try:
+                result = asyncio.run(run_level(
+                    service, concurrency, args.turns, args.events_per_turn, args.model_latency_ms / 1000
+                ))
+            finally:
+                service.close()
+            print(
+                f"{label:<44} {concurrency:>8} {result['turns_per_s']:>9.1f}"
+                f" {result['stall_total_ms']:>10.0f}ms {result['stall_max_ms']:>8.1f}ms {result['stall_p99_ms']:>8.1f}ms"
+            )
+    print(f"\nDatabases in {db_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Session Serializer Benchmark
+----------------------------
+
+Compares the session serializers of utils/sessions/session_serializer.py on
+a session shaped like the ones the scraper and code agents produce: state
+holding scraped pages and generated code, and events carrying large tool
+results.
+
+For each format it reports the time to encode and decode the state alone,
+one append_event() and one uncached get_session() on the pooled service, and
+the size of the database file.
+
+Usage (from the repository root):
+    python -m benchmarks.session_serializer_benchmark
+    python -m benchmarks.session_serializer_benchmark --formats json orjson --events 50
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+import uuid
+from typing import Any, Callable, Dict
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from utils.sessions.session_cache import SessionCache
+from utils.sessions.session_serializer import SERIALIZERS, get_serializer
+from utils.sessions.session_service_provider import PooledDatabaseSessionService
+
+APP_NAME = "session_benchmark"
+USER_ID = "benchmark_user"
+
+
+def _page(words: int) -> str:
+    vocabulary = ["".join(random.choices(string.ascii_lowercase, k=random.randint(2, 9))) for _ in range(400)]
+    return " ".join(random.choice(vocabulary) for _ in range(words))
+
+
+def _large_state() -> Dict[str, Any]:
+    return {
+        "scraped_urls_results": {f"https://example.com/page/{n}": _page(12000) for n in range(3)},
+        "generated_code": "\n".join(f"def step_{n}(x):\n    return x * {n}  # {_page(8)}" for n in range(400)),
+        "network_report": [{"interface": f"eth{n}", "bytes_sent": n * 1000, "bytes_recv": n * 2000} for n in range(200)],
+    }
+
+
+def _tool_result_event(step: int) -> Event:
+    return Event(
+        author="benchmark_agent",
+        invocation_id=f"e-{uuid.uuid4()}",
+        content=types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            name="scrape_page", response={"url": f"https://example.com/{step}", "text": _page(3000)},
+        ))]),
+        actions=EventActions(state_delta={"step": step}),
+    )
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", default=list(SERIALIZERS), choices=list(SERIALIZERS))
+    parser.add_argument("--events", type=int, default=30, help="tool-result events in the session")
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions")
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    args = parser.parse_args()
+
+    random.seed(7)
+    state = _large_state()
+    events = [_tool_result_event(step) for step in range(args.events)]
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="session_benchmark_")
+    print(f"state: {len(json.dumps(state)) / 1024:.0f} KiB as JSON, {args.events} tool-result events")
+    print(f"{'format':<14} {'encode ms':>10} {'decode ms':>10} {'append ms':>10} {'load ms':>9} {'db KiB':>8}")
+    for name in args.formats:
+        serializer = get_serializer(name)
+        stored = serializer.dumps(state)
+        encode_ms = _median_ms(lambda: serializer.dumps(state), args.repeat)
+        decode_ms = _median_ms(lambda: serializer.loads(stored), args.repeat)
+
+        os.environ["SESSION_SERIALIZER"] = name
+        db_path = os.path.join(db_dir, f"serializer_{name}.db")
+        service = PooledDatabaseSessionService(f"sqlite:///{db_path}", cache=SessionCache(max_bytes=0))
+        session = service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state)
+        timings = []
+        for event in events:
+            started = time.perf_counter()
+            service.append_event(session, event)
+            timings.append(time.perf_counter() - started)
+        append_ms = statistics.median(timings) * 1000
+        load_ms = _median_ms(
+            lambda: service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=session.id), args.repeat
+        )
+        service.close()
+        print(
+            f"{name:<14} {encode_ms:>10.2f} {decode_ms:>10.2f} {append_ms:>10.2f} {load_ms:>9.2f}"
+            f" {os.path.getsize(db_path) / 1024:>8.0f}"
+        )
+    print(f"\nDatabases in {db_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Session Shard Benchmark
+-----------------------
+
+Measures append_event() throughput of ShardedSessionService with 1, 2 and 4
+SQLite shards while several worker processes write at the same time, each
+for its own users, as several agent servers sharing one session store would.
+
+With one shard every commit waits for the single database write lock; with N
+shards up to N commits run side by side. The gain is bounded by the CPU
+cores available to the workers (printed in the header).
+
+Usage (from the repository root):
+    python -m benchmarks.session_shard_benchmark
+    python -m benchmarks.session_shard_benchmark --shards 1 2 4 8 --workers 8 --events 400
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from typing import List, Tuple
+
+APP_NAME = "session_benchmark"
+USERS_PER_WORKER = 8
+
+
+def _worker(shard_urls: List[str], worker: int, events: int, ready, results) -> None:
+    # Imported here so every process builds its own engines.
+    from google.adk.events import Event, EventActions
+    from google.genai import types
+
+    from utils.sessions.sharded_session_service import ShardedSessionService
+
+    service = ShardedSessionService(shard_urls)
+    sessions = [
+        service.get_session(app_name=APP_NAME, user_id=f"user_{worker}_{n}", session_id=f"session_{worker}_{n}")
+        for n in range(USERS_PER_WORKER)
+    ]
+    ready.wait()
+    started = time.time()
+    for step in range(events):
+        session = sessions[step % len(sessions)]
+        service.append_event(session, Event(
+            author="benchmark_agent",
+            invocation_id=f"e-{uuid.uuid4()}",
+            content=types.Content(role="model", parts=[types.Part(text="lorem ipsum " * 40)]),
+            actions=EventActions(state_delta={"step": step}),
+        ))
+    results.put((started, time.time()))
+
+
+def run_level(db_dir: str, shards: int, workers: int, events: int) -> float:
+    """
+    Runs the workers against a fresh set of shards.
+
+    Returns:
+        float: Events appended per second, all workers together.
+    """
+    from utils.sessions.sharded_session_service import ShardedSessionService, shard_db_urls
+
+    shard_urls = shard_db_urls(f"sqlite:///{os.path.join(db_dir, f'shards_{shards}.db')}", shards)
+    # Sessions are created up front: ADK inserts the app_states row on an app's
+    # first create_session(), and processes racing to do that would collide.
+    service = ShardedSessionService(shard_urls)
+    for worker in range(workers):
+        for n in range(USERS_PER_WORKER):
+            service.create_session(
+                app_name=APP_NAME, user_id=f"user_{worker}_{n}", session_id=f"session_{worker}_{n}", state={"step": 0}
+            )
+    context = multiprocessing.get_context("spawn")
+    ready = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(shard_urls, worker, events, ready, results))
+        for worker in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    spans: List[Tuple[float, float]] = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = max(end for _, end in spans) - min(start for start, _ in spans)
+    return workers * events / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--workers", type=int, default=4, help="writer processes")
+    parser.add_argument("--events", type=int, default=300, help="events appended per worker")
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="session_benchmark_")
+    print(f"{args.workers} writer processes, {os.cpu_count()} CPU cores")
+    print(f"{'shards':>6} {'events/s':>9} {'vs 1 shard':>11}")
+    baseline = None
+    for shards in args.shards:
+        rate = run_level(db_dir, shards, args.workers, args.events)
+        baseline = baseline or rate
+        print(f"{shards:>6} {rate:>9.0f} {rate / baseline:>10.2f}x")
+    print(f"\nDatabases in {db_dir}")
+
+
+if __name__ == "__main__":
+    main()
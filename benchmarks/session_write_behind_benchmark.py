@@ -0,0 +1,133 @@
+"""
+Session Write-Behind Benchmark
+------------------------------
+
+Counts database transactions (each one a WAL append, and an fsync at
+checkpoints) needed to persist the same workload with:
+
+    * the pooled DatabaseSessionService: one transaction per event,
+    * AsyncDatabaseSessionService: commits whatever is queued when the writer is free,
+    * AsyncDatabaseSessionService in write-behind mode: group commit every
+      --window-ms, with the crash-recovery journal enabled.
+
+Turns are simulated as in session_concurrency_benchmark.py, and every turn
+ends with the flush call_agent_async() does, so each turn is durable before
+the next one starts.
+
+Usage (from the repository root):
+    python -m benchmarks.session_write_behind_benchmark
+    python -m benchmarks.session_write_behind_benchmark --concurrency 1 10 100 --window-ms 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from typing import Dict
+
+from google.adk.events import Event, EventActions
+from google.genai import types
+from sqlalchemy import event as sqlalchemy_event
+
+from utils.sessions.async_session_service import AsyncDatabaseSessionService, default_journal_path
+from utils.sessions.session_service_provider import PooledDatabaseSessionService
+
+APP_NAME = "session_benchmark"
+
+
+async def _run_session(service, session_id: str, user_id: str, turns: int, events_per_turn: int, model_latency_s: float) -> None:
+    for turn in range(turns):
+        session = service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        invocation_id = f"e-{uuid.uuid4()}"
+        service.append_event(session, Event(
+            author="user",
+            invocation_id=invocation_id,
+            content=types.Content(role="user", parts=[types.Part(text=f"request {turn}")]),
+        ))
+        for step in range(events_per_turn):
+            await asyncio.sleep(model_latency_s)
+            service.append_event(session, Event(
+                author="benchmark_agent",
+                invocation_id=invocation_id,
+                content=types.Content(role="model", parts=[types.Part(text="lorem ipsum " * 40)]),
+                actions=EventActions(state_delta={"turn": turn, f"step_{step}": "done"}),
+            ))
+        if hasattr(service, "flush_async"):
+            await service.flush_async()  # end of turn, as in call_agent_async()
+
+
+async def run_level(service, concurrency: int, turns: int, events_per_turn: int, model_latency_s: float) -> Dict[str, float]:
+    """
+    Runs `concurrency` sessions side by side and counts commits.
+
+    Returns:
+        dict: events, commits and turns_per_s.
+    """
+    user_ids = [f"user_{concurrency}_{n}" for n in range(concurrency)]
+    session_ids = [
+        service.create_session(app_name=APP_NAME, user_id=user_id, state={"turn": 0}).id
+        for user_id in user_ids
+    ]
+    commits = 0
+
+    def count_commit(connection) -> None:
+        nonlocal commits
+        commits += 1
+
+    engine = getattr(service.db_engine, "sync_engine", service.db_engine)
+    sqlalchemy_event.listen(engine, "commit", count_commit)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            _run_session(service, session_id, user_id, turns, events_per_turn, model_latency_s)
+            for session_id, user_id in zip(session_ids, user_ids)
+        ))
+    finally:
+        sqlalchemy_event.remove(engine, "commit", count_commit)
+    elapsed = time.perf_counter() - started
+    return {
+        "events": concurrency * turns * (events_per_turn + 1),
+        "commits": commits,
+        "turns_per_s": concurrency * turns / elapsed,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--turns", type=int, default=3, help="turns per session")
+    parser.add_argument("--events-per-turn", type=int, default=8, help="agent events per turn")
+    parser.add_argument("--model-latency-ms", type=float, default=20.0, help="simulated model call time")
+    parser.add_argument("--window-ms", type=float, default=50.0, help="group-commit window of write-behind mode")
+    parser.add_argument("--db-dir", default=None, help="where to put the SQLite files (default: a temp dir)")
+    args = parser.parse_args()
+
+    db_dir = args.db_dir or tempfile.mkdtemp(prefix="session_benchmark_")
+    backends = {
+        "DatabaseSessionService (pooled)": lambda url: PooledDatabaseSessionService(url),
+        "AsyncDatabaseSessionService": lambda url: AsyncDatabaseSessionService(url),
+        f"AsyncDatabaseSessionService write-behind {args.window_ms:g}ms": lambda url: AsyncDatabaseSessionService(
+            url, commit_interval_s=args.window_ms / 1000, journal_path=default_journal_path(url)
+        ),
+    }
+    print(f"{'backend':<50} {'sessions':>8} {'events':>7} {'commits':>8} {'events/commit':>14} {'turns/s':>8}")
+    for index, (label, backend) in enumerate(backends.items()):
+        for concurrency in args.concurrency:
+            db_path = os.path.join(db_dir, f"backend{index}_{concurrency}.db")
+            service = backend(f"sqlite:///{db_path}")
+            try:
+                result = asyncio.run(run_level(
+                    service, concurrency, args.turns, args.events_per_turn, args.model_latency_ms / 1000
+                ))
+            finally:
+                service.close()
+            print(
+                f"{label:<50} {concurrency:>8} {result['events']:>7} {result['commits']:>8}"
+                f" {result['events'] / max(result['commits'], 1):>14.1f} {result['turns_per_s']:>8.1f}"
+            )
+    print(f"\nDatabases in {db_dir}")
+
+
+if __name__ == "__main__":
+    main()
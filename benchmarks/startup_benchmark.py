@@ -0,0 +1,181 @@
+"""
+Startup Benchmark
+-----------------
+
+Measures how long the entry scripts take to import, using `python -X
+importtime`, and fails when a script goes over its startup budget.
+
+Almost all of a cold start is google.adk itself (its tools package imports
+vertexai and google.cloud.aiplatform), which this repository cannot change.
+Each import is therefore split into:
+
+    * adk:   modules imported under google.adk / google.genai,
+    * deps:  the stdlib and third-party modules imported outside google.adk
+             (reported, not budgeted: their time varies a lot from run to
+             run and is not this repository's code),
+    * own:   the self time of this repository's modules (the entry script,
+             agents., tools., utils., prompts.).
+
+The budget applies to the own part, the minimum of --repeat runs (the least
+disturbed one; a regression raises the minimum too). A new eager dependency
+shows up in the second check instead: the script fails if a module that
+must stay lazy (LAZY_MODULES: agent, prompt and tool modules, psutil,
+colorama, the async session stack) is imported at startup, since that is how
+a startup regression usually starts.
+
+Usage (from the repository root):
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --repeat 9 --budget-ms 30
+    python -m benchmarks.startup_benchmark --show 15   # slowest own modules
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+ENTRY_SCRIPTS = ("use_loop_agent", "use_parallel_agents", "use_sequential_agent")
+
+# Self time of this repository's modules an entry script may take, in
+# milliseconds. About twice the measured minimum (16-24 ms), so an unchanged
+# tree passes. Raise it deliberately, in the commit that needs it, never to
+# make a run pass.
+STARTUP_BUDGET_MS = 45.0
+
+# Modules that must not be imported until they are used.
+LAZY_MODULES = (
+    r"agents\.\w+_agent(\.|$)",
+    r"prompts\.",
+    r"tools\.",
+    r"psutil(\.|$)",
+    r"colorama(\.|$)",
+    r"sqlalchemy\.ext\.asyncio(\.|$)",
+    r"utils\.sessions\.async_session_service$",
+)
+
+ADK_PREFIXES = ("google.adk", "google.genai")
+OWN_PACKAGES = ("agents", "tools", "utils", "prompts")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportProfile(NamedTuple):
+    entry: str
+    total_us: int
+    adk_us: int
+    modules: Dict[str, int]  # module -> self time (us), outside google.adk
+
+    def is_own(self, name: str) -> bool:
+        return name == self.entry or name.split(".", 1)[0] in OWN_PACKAGES
+
+    @property
+    def own_us(self) -> int:
+        return sum(self_us for name, self_us in self.modules.items() if self.is_own(name))
+
+    @property
+    def deps_us(self) -> int:
+        return self.total_us - self.adk_us - self.own_us
+
+
+def parse_importtime(stderr: str, entry: str) -> ImportProfile:
+    """
+    Splits the `-X importtime` report of `import entry` into ADK and repo time.
+
+    Returns:
+        ImportProfile: Cumulative time of the entry module, the part spent
+            under google.adk / google.genai, and the self time of every other
+            module it imported.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+
+    # The report lists children before their parent; walk it parent-first.
+    total_us = adk_us = 0
+    modules: Dict[str, int] = {}
+    ancestors: List[str] = []
+    for self_us, cumulative_us, depth, name in reversed(rows):
+        del ancestors[depth:]
+        ancestors.append(name)
+        if ancestors[0] != entry:
+            continue
+        if depth == 0:
+            total_us = cumulative_us
+            modules[name] = self_us
+        elif any(parent.startswith(ADK_PREFIXES) for parent in ancestors[1:-1]):
+            continue
+        elif name.startswith(ADK_PREFIXES):
+            adk_us += cumulative_us
+        else:
+            modules[name] = self_us
+    return ImportProfile(entry, total_us, adk_us, modules)
+
+
+def profile_import(entry: str) -> ImportProfile:
+    """Imports an entry script in a fresh interpreter under -X importtime."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, PYTHONDONTWRITEBYTECODE="1", PYTHONWARNINGS="ignore")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {entry} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr, entry)
+
+
+def wall_ms(entry: str) -> float:
+    """Wall time of `python -c "import entry"`, interpreter startup included."""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, PYTHONWARNINGS="ignore")
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {entry}"], cwd=REPO_ROOT, env=env, check=True, capture_output=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def eager_modules(modules: Dict[str, int]) -> List[str]:
+    """The LAZY_MODULES among the imported modules, without their submodules."""
+    eager = sorted(name for name in modules if any(re.match(pattern, name) for pattern in LAZY_MODULES))
+    return [name for name in eager if not any(name.startswith(parent + ".") for parent in eager)]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="profiled imports per script (the minimum counts)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="own import time budget")
+    parser.add_argument("--show", type=int, default=0, help="list the N slowest own modules per script")
+    parser.add_argument("scripts", nargs="*", default=list(ENTRY_SCRIPTS), help="entry modules to import")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'script':<22} {'wall ms':>8} {'adk ms':>8} {'deps ms':>8} {'own ms':>8} {'budget':>8}")
+    for entry in args.scripts:
+        profiles = [profile_import(entry) for _ in range(max(1, args.repeat))]
+        fastest = min(profiles, key=lambda profile: profile.own_us)
+        own_ms = fastest.own_us / 1000
+        adk_ms = min(profile.adk_us for profile in profiles) / 1000
+        deps_ms = min(profile.deps_us for profile in profiles) / 1000
+        wall = wall_ms(entry)
+        status = "ok" if own_ms <= args.budget_ms else "OVER"
+        print(f"{entry:<22} {wall:>8.0f} {adk_ms:>8.0f} {deps_ms:>8.1f} {own_ms:>8.1f} {args.budget_ms:>7.0f} {status}")
+        if own_ms > args.budget_ms:
+            failures.append(f"{entry}: {own_ms:.1f} ms in the repository's own modules, budget {args.budget_ms:.0f} ms")
+        eager = eager_modules(profiles[-1].modules)
+        if eager:
+            failures.append(f"{entry}: imports {', '.join(eager)} at startup")
+        own = {name: self_us for name, self_us in fastest.modules.items() if fastest.is_own(name)}
+        for name, self_us in sorted(own.items(), key=lambda item: -item[1])[:args.show]:
+            print(f"    {self_us / 1000:>7.2f} ms  {name}")
+
+    if failures:
+        print("\nStartup regression:\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Tool Prefetch Benchmark
+-----------------------
+
+Counts the model calls and measures one use_parallel_agents.py turn (system
+and network info in parallel, then the reviewer) with and without
+utils/llm/tool_prefetch.py:
+
+    * before: each info agent's first model call only asks for its tool,
+              the second one writes the analysis (2 calls per branch).
+    * after:  a ToolPrefetchAgent runs get_system_info and get_network_info
+              concurrently before the branches start; each agent gets the
+              result with its first request and answers at once.
+
+The agents and tools are the real ones; only the model is scripted. It waits
+a fixed latency per call, asks for a tool when one is declared and its
+result is not in the request yet, and answers with text otherwise. No API key
+or network is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.tool_prefetch_benchmark
+    python -m benchmarks.tool_prefetch_benchmark --latency 1.5
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import logging
+import time
+from typing import AsyncGenerator, Dict, List
+
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from agents.agent_registry import build_system_info_pipeline
+from utils.llm.call_agent_async import call_agent_async
+from utils.llm.tool_prefetch import PREFETCHED_TOOLS_KEY
+
+MODEL = "scripted-system-report"
+_latency = 0.8
+_ROLES = {"senior IT analyst": "reviewer", "system information agent": "system_info", "network analysis agent": "network"}
+_calls: Dict[str, int] = {}
+
+
+class ScriptedLlm(BaseLlm):
+    """Calls the first declared tool whose result is missing, else answers with text."""
+
+    model: str = MODEL
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [MODEL]
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await asyncio.sleep(_latency)
+        answered = {
+            part.function_response.name
+            for content in llm_request.contents for part in content.parts or () if part.function_response
+        }
+        missing = [name for name in llm_request.tools_dict if name not in answered]
+        instruction = str(llm_request.config.system_instruction or "")
+        agent = next(role for marker, role in _ROLES.items() if marker in instruction)
+        _calls[agent] = _calls.get(agent, 0) + 1
+        if missing:
+            part = types.Part(function_call=types.FunctionCall(name=missing[0], args={}))
+        else:
+            part = types.Part(text=f"Report based on: {', '.join(sorted(answered)) or 'the other reports'}.")
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+
+def build_pipeline(prefetch: bool):
+    root = build_system_info_pipeline()
+    pending = [root]
+    while pending:
+        agent = pending.pop()
+        pending.extend(agent.sub_agents)
+        if isinstance(agent, LlmAgent):
+            agent.model = MODEL
+            if not prefetch:
+                agent.before_model_callback = None
+    if not prefetch:
+        root.sub_agents = root.sub_agents[1:]
+        root.dependencies = {}
+    return root
+
+
+async def run_turn(prefetch: bool) -> Dict[str, object]:
+    _calls.clear()
+    session_service = InMemorySessionService()
+    session = session_service.create_session(app_name="tool_prefetch_benchmark", user_id="benchmark_user")
+    runner = Runner(app_name="tool_prefetch_benchmark", agent=build_pipeline(prefetch), session_service=session_service)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await call_agent_async(runner, "benchmark_user", session.id, "Report on this machine.")
+    elapsed = time.perf_counter() - started
+    state = session_service.get_session(
+        app_name="tool_prefetch_benchmark", user_id="benchmark_user", session_id=session.id
+    ).state
+    assert state.get("system_information") and state.get("network_analysis_report"), "both branches must report"
+    prefetched = state.get(PREFETCHED_TOOLS_KEY) or {}
+    return {"seconds": elapsed, "calls": dict(_calls), "prefetch_s": prefetched.get("seconds")}
+
+
+def main() -> None:
+    global _latency
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=_latency, help="seconds per model call")
+    args = parser.parse_args()
+    _latency = args.latency
+    LLMRegistry.register(ScriptedLlm)
+    # ADK 0.4 runs ParallelAgent branches in their own contexts; OpenTelemetry
+    # logs a harmless "Failed to detach context" for each.
+    logging.getLogger("opentelemetry.context").setLevel(logging.CRITICAL)
+
+    print(f"One turn of the system report pipeline, {_latency:g} s per model call")
+    print(f"{'mode':<8} {'calls':>5} {'seconds':>7}  calls per agent")
+    for label, prefetch in (("before", False), ("after", True)):
+        result = asyncio.run(run_turn(prefetch))
+        calls = result["calls"]
+        per_agent = ", ".join(f"{agent}: {count}" for agent, count in sorted(calls.items()))
+        print(f"{label:<8} {sum(calls.values()):>5} {result['seconds']:>7.2f}  {per_agent}")
+        if result["prefetch_s"] is not None:
+            print(f"{'':<8} {'':>5} {'':>7}  (tools prefetched in {result['prefetch_s']:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+URL Fan-Out Benchmark
+---------------------
+
+Measures the scrape stage of the web pipeline with
+agents/url_fanout_agent/url_fanout_agent.py: one branch per search result
+URL, up to max_concurrency at a time.
+
+The scraper API is replaced by a fetch function that sleeps for a fixed
+per-URL latency and returns a page, so no API key or network is needed.
+The stage runs through a real Runner, with state["web_results"] in the web
+search agent's output format:
+
+    * sequential:  max_concurrency=1, one URL after another (the old
+                   scraper agent's tool loop, without its model calls).
+    * fan-out:     the default concurrency cap.
+    * deadline:    fan-out under a turn timeout shorter than the slowest URL;
+                   the stage returns on time with the finished pages.
+
+Usage (from the repository root):
+    python -m benchmarks.url_fanout_benchmark
+    python -m benchmarks.url_fanout_benchmark --urls 16 --concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from typing import Dict, List, Optional
+
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from agents.url_fanout_agent.url_fanout_agent import (
+    DEFAULT_MAX_CONCURRENCY,
+    SCRAPED_PAGES_KEY,
+    WEB_RESULTS_KEY,
+    get_url_fanout_agent,
+)
+from utils.llm.call_agent_async import call_agent_async
+from utils.llm.deadline import apply_deadline_budgets
+
+# Seconds per URL, cycled: a typical spread of page load times.
+LATENCIES = (0.4, 0.9, 0.3, 1.2, 0.6, 0.5, 0.8, 0.7)
+
+
+def _latencies(urls: int) -> Dict[str, float]:
+    return {f"https://example.com/page/{n}": LATENCIES[n % len(LATENCIES)] for n in range(urls)}
+
+
+def _web_results(urls: List[str]) -> str:
+    results = [{"title": f"Result {n}", "snippet": "...", "url": url, "domain": "example.com"} for n, url in enumerate(urls)]
+    return "```json\n" + json.dumps({"results": results}, indent=2) + "\n```"
+
+
+async def run_stage(latency: Dict[str, float], concurrency: int, timeout: Optional[float] = None) -> Dict[str, object]:
+    def fetch(url: str) -> dict:
+        time.sleep(latency[url])
+        return {"text": f"Body of {url}. " * 50, "metadata": {"title": f"Title of {url}"}}
+
+    agent = apply_deadline_budgets(
+        get_url_fanout_agent(max_concurrency=concurrency, max_urls=len(latency), fetch=fetch)
+    )
+    session_service = InMemorySessionService()
+    session = session_service.create_session(
+        app_name="url_fanout_benchmark", user_id="benchmark_user", state={WEB_RESULTS_KEY: _web_results(list(latency))}
+    )
+    runner = Runner(app_name="url_fanout_benchmark", agent=agent, session_service=session_service)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await call_agent_async(runner, "benchmark_user", session.id, "Scrape the results.", timeout=timeout)
+    elapsed = time.perf_counter() - started
+    pages = session_service.get_session(
+        app_name="url_fanout_benchmark", user_id="benchmark_user", session_id=session.id
+    ).state[SCRAPED_PAGES_KEY]
+    assert [page["url"] for page in pages] == list(latency), "pages must stay in URL order"
+    return {"seconds": elapsed, "scraped": sum("error" not in page for page in pages), "urls": len(pages)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=8, help="search result URLs")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="fan-out concurrency cap")
+    args = parser.parse_args()
+
+    latency = _latencies(args.urls)
+    print(f"{args.urls} URLs, latency sum {sum(latency.values()):.1f} s, max {max(latency.values()):.1f} s")
+    print(f"{'mode':<28} {'seconds':>7} {'scraped':>8}")
+    runs = [
+        ("sequential (concurrency 1)", 1, None),
+        (f"fan-out (concurrency {args.concurrency})", args.concurrency, None),
+        ("fan-out, 1.0 s turn timeout", args.concurrency, 1.0),
+    ]
+    for label, concurrency, timeout in runs:
+        result = asyncio.run(run_stage(latency, concurrency, timeout))
+        print(f"{label:<28} {result['seconds']:>7.2f} {result['scraped']:>4}/{result['urls']}")
+
+
+if __name__ == "__main__":
+    main()
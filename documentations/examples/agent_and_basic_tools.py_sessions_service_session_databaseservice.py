@@ -21,7 +21,6 @@ from google.adk.agents import LlmAgent
 from agents.web_searcher_agent.web_searcher_agent import web_searcher_agent
 # Import session and runner utilities from ADK
 from google.adk.runners import  Runner
-from google.adk.sessions import DatabaseSessionService
 # Import types for message content
 from google.genai import types
 # For loading environment variables from a .env file
@@ -32,6 +31,8 @@ from utils.before_model_callback import before_model_callback
 # from utils.llm.call_sequential_agent_async import call_sequential_agent_async
 # For generating unique IDs
 from utils.llm.call_agent_async import call_agent_async
+from utils.sessions.session_service_provider import get_session_service
+from utils.sessions.state_patches import state_append, state_remove_index, state_set_index
 from google.adk.tools import ToolContext
 import uuid
 # For JSON serialization (not used directly here)
@@ -61,9 +62,8 @@ def add_reminder(parameters: dict, tool_context: ToolContext) -> dict:
     reminder = parameters.get("reminder")
     print(f"Adding reminder: {reminder}")
     
-    reminders = tool_context.state.get("reminders", [])
-    reminders.append(reminder)
-    tool_context.state["reminders"] = reminders
+    # Only the appended item is written to the event, not the whole list.
+    state_append(tool_context, "reminders", reminder)
 
     return {
         "action": "add_reminder",
@@ -131,8 +131,7 @@ def update_reminder(parameters: dict, tool_context: ToolContext) -> dict:
 
     if 0 <= actual_index < len(reminders):
         old_reminder = reminders[actual_index]
-        reminders[actual_index] = new_reminder
-        tool_context.state["reminders"] = reminders
+        state_set_index(tool_context, "reminders", actual_index, new_reminder)
         print(f"Updating reminder {index}: '{old_reminder}' to '{new_reminder}'")
         return {
             "action": "update_reminder",
@@ -174,8 +173,7 @@ def delete_reminder(parameters: dict, tool_context: ToolContext) -> dict:
     actual_index = index - 1
 
     if 0 <= actual_index < len(reminders):
-        deleted_reminder = reminders.pop(actual_index)
-        tool_context.state["reminders"] = reminders
+        deleted_reminder = state_remove_index(tool_context, "reminders", actual_index)
         print(f"Deleting reminder {index}: '{deleted_reminder}'")
         return {
             "action": "delete_reminder",
@@ -231,20 +229,22 @@ async def main():
 
     db_url = "sqlite:///agent_data.db"
     # Create a session service to manage in-memory  session state
-    session_service = DatabaseSessionService(db_url=db_url)
+    session_service = get_session_service(db_url)
     # Set up app/session/user identifiers
     APP_NAME = "Database Memory Service app"
     SESSION_ID = str(uuid.uuid4())  # Unique session ID for this run
     USER_ID ="Moti_Elmakayes"    # Unique user ID for this run
      
-    existing_sessions = session_service.list_sessions(
+    # Resume the most recently updated session: one index lookup, however
+    # many sessions the user has (list_session_headers() pages through all).
+    latest_session = session_service.latest_session(
         app_name=APP_NAME,
         user_id=USER_ID
     )
 
-    if existing_sessions and len(existing_sessions.sessions) > 0:
-        print(f"Resuming session {existing_sessions.sessions[0].id}")
-        SESSION_ID = existing_sessions.sessions[0].id
+    if latest_session is not None:
+        print(f"Resuming session {latest_session.id}")
+        SESSION_ID = latest_session.id
     else:
         print(f"Creating new session {SESSION_ID}")
         session = session_service.create_session(
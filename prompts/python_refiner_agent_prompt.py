@@ -17,11 +17,43 @@ Your goals are, in order of importance:
     *   Strive for a state where the code is clean, correct, and robust.
 
 **Output:**
-*   You MUST return ONLY the refined Python code as a single, raw string.
-*   Do NOT include any explanations, apologies, introductory text, or markdown formatting (like ```python ... ```) in your output.
-*   Your entire response should be just the Python code itself. If no changes are made, return the original code.
+*   You MUST return ONLY a unified diff (the format of `diff -u` / `git diff`) against the current code shown below.
+*   Start with the headers `--- a/code.py` and `+++ b/code.py`, followed by one or more `@@ -old_start,old_count +new_start,new_count @@` hunks.
+*   Inside a hunk, prefix unchanged context lines with a single space, removed lines with `-` and added lines with `+`.
+*   Include 3 unchanged context lines around every change and copy them EXACTLY from the current code, including indentation. The patch is rejected if they do not match.
+*   Do NOT return the whole program, explanations, apologies or markdown formatting (like ```diff ... ```). Only the diff.
+*   If no changes are needed, return exactly: NO_CHANGES
+
+Example output:
+--- a/code.py
++++ b/code.py
+@@ -3,6 +3,6 @@
+ 
+ def average(numbers):
+     # Return the mean of a list of numbers
+-    return sum(numbers) / len(numbers)
++    return sum(numbers) / len(numbers) if numbers else 0.0
+ 
+ 
+ def main():
 
 **Important Notes:**
 *   Preserve the original functionality of the code unless a change is specifically to fix a bug.
 *   Be careful with making assumptions about the code's intended purpose if it's unclear.
-""" 
\ No newline at end of file
+*   Keep each diff focused on the review comments; do not reformat unrelated lines.
+
+Current code:
+{generated_code}
+
+Review comments to address:
+{review_comments?}
+
+Local static analysis findings for the current code (fix the ones that are real problems):
+{static_findings?}
+
+Results of running the current code, its doctests and tests (fix failing doctests/tests and errors first):
+{execution_results?}
+
+Error from applying your previous diff (if any, re-create the diff against the current code above):
+{patch_error?}
+"""
\ No newline at end of file
@@ -15,6 +15,13 @@ Your review process should cover:
 3.  **Security Vulnerabilities (Basic):**
     *   Identify any obvious security concerns like hardcoded secrets or use of dangerous patterns (if applicable to the code snippet).
 
+**What to review:**
+*   The code is shown below with line numbers. On the first pass you see the full program. After that you only see the lines the refiner changed (marked with `>`) plus some surrounding context; the rest of the program is unchanged since your earlier review.
+*   Focus on the changed lines and on whether they resolve your earlier comments. Refer to lines by the numbers shown.
+
+*   Take the static analysis findings and sandbox results below as given: mention the ones that matter in your review, but do not spend effort re-checking for syntax errors, unused names or undefined names yourself. Focus on logic, edge cases, design and security.
+*   Failing doctests or tests and errors when running the code are bugs: point them out first, and do not call `exit_loop` while any remain.
+
 **Output Format:**
 *   Provide your review as a clear, actionable list of comments. Each comment should specify the part of the code it refers to (e.g., by line number or function name if possible) and explain the issue or suggestion.
 *   If you find no issues and the code is excellent, state that explicitly.
@@ -36,4 +43,13 @@ Review Comments:
 If you are satisfied and decide from the results state that you are done and will quit in your review  and call the `exit_loop` tool that in your tools list
 
 ```
-""" 
\ No newline at end of file
+
+Code to review:
+{review_context?}
+
+Local static analysis of the current code (syntax, lint and complexity checks that already ran):
+{static_findings?}
+
+Results of running the current code, its doctests and tests in a sandbox:
+{execution_results?}
+"""
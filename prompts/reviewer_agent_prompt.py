@@ -30,11 +30,11 @@ Your input will contain two main sections, typically under keys like 'system_inf
     *   Critical Issues & Risks
     *   Consolidated Recommendations
 
+Ensure your language is professional, clear, and actionable. Assume the reader has access to the original reports but is looking to you for a combined, expert overview.
+
     here is the system information report:
     {system_information}
 
     here is the network analysis report:
     {network_analysis_report}
-
-Ensure your language is professional, clear, and actionable. Assume the reader has access to the original reports but is looking to you for a combined, expert overview.
 """
@@ -7,6 +7,9 @@ task_planner_prompt ={
             Return the output as a JSON array of lowercase strings.
               Each sub-task should represent a minimal, actionable step. 
               Use consistent phrasing and always extract time/date info separately.
+              The sub-tasks are run in parallel where possible. Information steps (like "get_date_and_time") run first and every later sub-task gets their results.
+              If a sub-task needs the result of another earlier sub-task, write it as an object with the numbers of the sub-tasks it waits for (counting from 1), e.g. {"task": "add dentist appointment to calendar", "after": [2]}.
+              If the available agents and tools are listed below, you may name the one that should do a sub-task: {"task": "...", "agent": "<name>"}.
 
               Examples:
               Example 1:
@@ -27,7 +30,7 @@ task_planner_prompt ={
                 [
                 "get_date_and_time",
                 "book dentist appointment",
-                "add dentist appointment to calendar"
+                {"task": "add dentist appointment to calendar", "after": [2]}
                 ]
 
                 Example 3:
@@ -45,3 +45,13 @@ Decline gracefully when something can't be done.
     "model": "gemini-2.0-flash"
 }
 
+
+# Instruction of the team manager's single answer after the plan executor
+# (agents/plan_executor_agent) has run the task planner's sub-tasks.
+team_manager_synthesis_instruction = team_manager_prompt["instruction"] + """
+The work for the user's request has already been done. Below are the request and, for each sub-task, its status and result: "done" with the result, or why it could not be done ("unassigned": nobody can do it, "failed" or "skipped" with the reason).
+
+Answer the request in a single reply, using only these results. Gracefully decline the parts that could not be done.
+
+{plan_results}
+"""
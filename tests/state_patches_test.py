@@ -0,0 +1,152 @@
+"""
+Tests for utils/sessions/state_patches.py: applying recorded operations, and
+replaying them on top of a checkpoint as the session services do on load.
+
+    python -m pytest tests/state_patches_test.py
+"""
+import time
+
+from google.adk.events.event import Event
+from google.adk.events.event_actions import EventActions
+from google.adk.sessions.database_session_service import StorageSession
+
+from utils.sessions import async_session_service
+from utils.sessions.state_patches import (
+    CHECKPOINT_STATE_KEY,
+    PATCH_DELTA_PREFIX,
+    PatchedEventCounter,
+    apply_ops,
+    event_patches,
+    replay_patches,
+)
+
+
+def _patch(key, *ops):
+    return EventActions(state_delta={PATCH_DELTA_PREFIX + key: [list(op) for op in ops]})
+
+
+def test_apply_list_ops():
+    value = apply_ops(["a", "b"], [["append", "c"], ["extend", ["d", "e"]], ["set", 0, "A"], ["remove", 1]])
+    assert value == ["A", "c", "d", "e"]
+
+
+def test_apply_dict_ops():
+    value = apply_ops({"a": 1, "b": 2}, [["merge", {"b": 3, "c": 4}], ["delete", "a"], ["delete", "missing"]])
+    assert value == {"b": 3, "c": 4}
+
+
+def test_apply_ops_starts_from_an_empty_value():
+    assert apply_ops(None, [["append", 1]]) == [1]
+    assert apply_ops(None, [["merge", {"a": 1}]]) == {"a": 1}
+
+
+def test_out_of_range_index_is_ignored():
+    assert apply_ops(["a"], [["set", 5, "x"], ["remove", 5]]) == ["a"]
+
+
+def test_applied_values_are_copies():
+    item = {"text": "buy milk"}
+    ops = [["append", item]]
+    value = apply_ops([], ops)
+    value[0]["text"] = "changed"
+    assert ops[0][1] == {"text": "buy milk"}
+
+
+def test_event_patches():
+    actions = EventActions(state_delta={PATCH_DELTA_PREFIX + "reminders": [["append", "x"]], "plain": 1})
+    assert event_patches(actions) == {"reminders": [["append", "x"]]}
+    assert event_patches(None) == {}
+    assert event_patches(EventActions()) == {}
+
+
+def test_replay_applies_only_operations_after_the_checkpoint():
+    # Operations up to t=2 are already folded into the stored value.
+    state = {"reminders": ["a", "B"], "prefs": {"lang": "en"}}
+    checkpoints = {"reminders": 2.0, "prefs": 2.0}
+    events = [
+        (1.0, _patch("reminders", ("append", "a"), ("append", "b"))),
+        (2.0, _patch("reminders", ("set", 1, "B"))),
+        (3.0, _patch("reminders", ("append", "c"))),
+        (4.0, _patch("reminders", ("remove", 0))),
+        (5.0, _patch("prefs", ("merge", {"theme": "dark"}))),
+    ]
+    assert replay_patches(state, checkpoints, events)
+    assert state == {"reminders": ["B", "c"], "prefs": {"lang": "en", "theme": "dark"}}
+    assert checkpoints == {"reminders": 4.0, "prefs": 5.0}
+
+
+def test_replay_is_a_no_op_when_everything_is_folded_in():
+    state = {"reminders": ["a"]}
+    checkpoints = {"reminders": 1.0}
+    assert not replay_patches(state, checkpoints, [(1.0, _patch("reminders", ("append", "a")))])
+    assert state == {"reminders": ["a"]}
+
+
+def test_full_write_acts_as_a_checkpoint():
+    # The full value written at t=2 already contains the append of t=1.
+    state = {"reminders": ["a", "b"]}
+    events = [
+        (1.0, _patch("reminders", ("append", "a"))),
+        (2.0, EventActions(state_delta={"reminders": ["a", "b"]})),
+        (3.0, _patch("reminders", ("append", "c"))),
+    ]
+    checkpoints = {}
+    assert replay_patches(state, checkpoints, events)
+    assert state == {"reminders": ["a", "b", "c"]}
+
+
+def test_patched_event_counter_is_due_every_n_events():
+    counter = PatchedEventCounter()
+    assert [counter.count("session", every=3) for _ in range(7)] == [False, False, True, False, False, True, False]
+
+
+def test_patched_event_counter_is_bounded_and_forgets_deleted_sessions():
+    counter = PatchedEventCounter(max_sessions=2)
+    for key in ("a", "b", "c"):
+        counter.count(key, every=10)
+    assert len(counter) == 2
+    # "a" was the least recently patched: its count restarted.
+    assert [counter.count("a", every=2) for _ in range(2)] == [False, True]
+    counter.forget("c")
+    counter.forget("missing")
+    assert len(counter) == 1
+
+
+def test_session_reloads_the_same_state_across_a_checkpoint(tmp_path, monkeypatch):
+    # Fold the operations into the sessions table after the fourth patched event.
+    monkeypatch.setattr(async_session_service, "CHECKPOINT_EVERY_PATCHED_EVENTS", 4)
+    db_url = f"sqlite:///{tmp_path / 'sessions.db'}"
+    service = async_session_service.AsyncDatabaseSessionService(db_url)
+    session = service.create_session(app_name="app", user_id="user", state={"reminders": [], "prefs": {}})
+    patches = [
+        _patch("reminders", ("append", "a")),
+        _patch("reminders", ("extend", ["b", "c"])),
+        _patch("reminders", ("set", 0, "A")),
+        _patch("prefs", ("merge", {"lang": "en", "theme": "dark"})),  # checkpoint after this event
+        _patch("reminders", ("remove", 1)),
+        _patch("prefs", ("delete", "theme")),
+    ]
+    for actions in patches:
+        service.append_event(session, Event(author="tool", invocation_id="inv", actions=actions, timestamp=time.time()))
+        # One event per batch: a checkpoint folds in everything committed so far.
+        service.flush()
+    service.close()
+
+    reloaded_service = async_session_service.AsyncDatabaseSessionService(db_url)
+    try:
+        async def stored_state():
+            async with reloaded_service.DatabaseSessionFactory() as db:
+                return (await db.get(StorageSession, ("app", "user", session.id))).state
+
+        # The stored values are checkpoints; the last two operations are replayed on load.
+        stored = reloaded_service._run(stored_state())
+        assert stored["reminders"] == ["A", "b", "c"]
+        assert stored["prefs"] == {"lang": "en", "theme": "dark"}
+        assert CHECKPOINT_STATE_KEY in stored
+
+        reloaded = reloaded_service.get_session(app_name="app", user_id="user", session_id=session.id)
+        assert reloaded.state["reminders"] == ["A", "c"]
+        assert reloaded.state["prefs"] == {"lang": "en"}
+        assert CHECKPOINT_STATE_KEY not in reloaded.state
+    finally:
+        reloaded_service.close()
@@ -0,0 +1,227 @@
+"""
+Tests for utils/code/static_review.py: the unused import (F401), unused local
+(F841) and undefined name (F821) checks must not report valid code.
+
+    python -m pytest tests/static_review_test.py
+"""
+import textwrap
+
+import pytest
+
+from utils.code.static_review import analyze_code
+
+
+def _codes(code: str):
+    report = analyze_code(textwrap.dedent(code))
+    assert report.syntax_error is None
+    return [finding.code for finding in report.findings]
+
+
+@pytest.mark.parametrize("code", [
+    # Used through a dotted import.
+    """
+    import os.path
+    print(os.path.join("a", "b"))
+    """,
+    # Re-exported.
+    """
+    from json import dumps
+    __all__ = ["dumps"]
+    """,
+    # Fallback import of the same name.
+    """
+    try:
+        import ujson as json
+    except ImportError:
+        import json
+    print(json.dumps(1))
+    """,
+    """
+    from __future__ import annotations
+    """,
+    # Used only in quoted annotations.
+    """
+    from typing import TYPE_CHECKING, List
+    if TYPE_CHECKING:
+        from collections import OrderedDict
+    def f(x: "OrderedDict", y: List["OrderedDict"]) -> "OrderedDict":
+        return x or y
+    """,
+    """
+    import typing
+    def f(x: "typing.List[int]"):
+        return x
+    """,
+    # Used only as a decorator.
+    """
+    import functools
+    @functools.lru_cache
+    def f():
+        return 1
+    """,
+])
+def test_no_false_unused_import(code):
+    assert "F401" not in _codes(code)
+
+
+@pytest.mark.parametrize("code", [
+    # Read by a closure.
+    """
+    def f():
+        x = 1
+        def g():
+            return x
+        return g
+    """,
+    """
+    def f():
+        x = 1
+        def g():
+            nonlocal x
+            x = 2
+        g()
+        return x
+    """,
+    """
+    def f():
+        total = 0
+        for i in range(3):
+            total += i
+        return total
+    """,
+    # Unpacking may ignore parts; "_" is a deliberate throwaway.
+    """
+    def f():
+        a, b = 1, 2
+        _ = 3
+        return a
+    """,
+    """
+    def f():
+        x = 1
+        return f"{x}"
+    """,
+    # Deleted: the binding ends on purpose.
+    """
+    def f():
+        x = object()
+        del x
+    """,
+    """
+    def f():
+        x = 1
+        return locals()
+    """,
+    """
+    def f():
+        global G
+        G = 1
+    """,
+    # A bare annotation binds nothing.
+    """
+    def f():
+        x: int
+        return 1
+    """,
+])
+def test_no_false_unused_local(code):
+    assert "F841" not in _codes(code)
+
+
+@pytest.mark.parametrize("code", [
+    """
+    if (n := 3) > 2:
+        print(n)
+    """,
+    """
+    print([y for y in range(3)])
+    """,
+    """
+    try:
+        pass
+    except Exception as e:
+        print(e)
+    """,
+    """
+    match [1, 2]:
+        case [a, *rest]:
+            print(a, rest)
+        case {"k": v, **kw}:
+            print(v, kw)
+    """,
+    """
+    class A:
+        x = 1
+        y = x + 1
+    """,
+    # Set implicitly by Python.
+    """
+    class A:
+        module = __module__
+        qualname = __qualname__
+        def f(self):
+            return __class__, __name__, __debug__
+    """,
+    # Defined later in the module, used at call time.
+    """
+    def f():
+        return g()
+    def g():
+        return 1
+    """,
+    """
+    def f():
+        global G
+        G = 1
+    def g():
+        return G
+    """,
+    # A star import can define anything.
+    """
+    from os import *
+    print(path)
+    """,
+    """
+    f = lambda x, *args, **kwargs: (x, args, kwargs)
+    """,
+])
+def test_no_false_undefined_name(code):
+    assert "F821" not in _codes(code)
+
+
+def test_real_problems_are_still_reported():
+    codes = _codes("""
+    import os
+    import sys
+    def f():
+        unused = 1
+        return undefined_name + sys.maxsize
+    """)
+    assert codes == ["F401", "F841", "F821"]
+
+
+def test_valid_program_is_clean():
+    report = analyze_code(textwrap.dedent('''
+    """Reminders."""
+    from dataclasses import dataclass, field
+    from typing import List
+
+
+    @dataclass
+    class Reminders:
+        items: List[str] = field(default_factory=list)
+
+        def add(self, text: str) -> "Reminders":
+            self.items.append(text)
+            return self
+
+
+    def main() -> None:
+        reminders = Reminders().add("buy milk")
+        print(reminders.items)
+
+
+    if __name__ == "__main__":
+        main()
+    '''))
+    assert report.clean, report.render()
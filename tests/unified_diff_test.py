@@ -0,0 +1,165 @@
+"""
+Tests for utils/code/unified_diff.py: hunks at the edges of the file, line
+numbers that drift, and diffs that do not match the source.
+
+    python -m pytest tests/unified_diff_test.py
+"""
+import pytest
+
+from utils.code.unified_diff import PatchError, apply_unified_diff, parse_unified_diff
+
+SOURCE = "".join(f"line {n}\n" for n in range(1, 11))
+
+
+def test_hunk_at_start_of_file():
+    diff = """\
+--- a/solution.py
++++ b/solution.py
+@@ -1,2 +1,3 @@
++import os
+ line 1
+ line 2
+"""
+    patched = apply_unified_diff(SOURCE, diff)
+    assert patched.code == "import os\n" + SOURCE
+    assert patched.changed_ranges == [(1, 1)]
+
+
+def test_replacing_first_line():
+    diff = """\
+@@ -1,2 +1,2 @@
+-line 1
++first
+ line 2
+"""
+    patched = apply_unified_diff(SOURCE, diff)
+    assert patched.code.splitlines()[:2] == ["first", "line 2"]
+    assert patched.changed_ranges == [(1, 1)]
+
+
+def test_hunk_at_end_of_file():
+    diff = """\
+@@ -9,2 +9,3 @@
+ line 9
+ line 10
++line 11
+"""
+    patched = apply_unified_diff(SOURCE, diff)
+    assert patched.code == SOURCE + "line 11\n"
+    assert patched.changed_ranges == [(11, 11)]
+
+
+def test_deleting_last_line_points_at_the_new_last_line():
+    diff = """\
+@@ -9,2 +9,1 @@
+ line 9
+-line 10
+"""
+    patched = apply_unified_diff(SOURCE, diff)
+    assert patched.code.splitlines()[-1] == "line 9"
+    assert patched.changed_ranges == [(9, 9)]
+
+
+def test_end_of_file_without_trailing_newline():
+    diff = """\
+@@ -3 +3 @@
+-c
++C
+\\ No newline at end of file
+"""
+    assert apply_unified_diff("a\nb\nc", diff).code == "a\nb\nC"
+
+
+def test_drifted_line_numbers_are_tolerated():
+    # The header says line 2, the context is at line 6.
+    diff = """\
+@@ -2,3 +2,3 @@
+ line 6
+-line 7
++seven
+ line 8
+"""
+    patched = apply_unified_diff(SOURCE, diff)
+    assert patched.code.splitlines()[6] == "seven"
+    assert patched.changed_ranges == [(7, 7)]
+
+
+def test_drift_carries_over_to_later_hunks():
+    # Both headers are 3 lines too high.
+    diff = """\
+@@ -5,2 +5,2 @@
+ line 2
+-line 3
++three
+@@ -8,2 +8,2 @@
+ line 5
+-line 6
++six
+"""
+    lines = apply_unified_diff(SOURCE, diff).code.splitlines()
+    assert lines[2] == "three"
+    assert lines[5] == "six"
+
+
+def test_wrong_hunk_counts_are_ignored():
+    diff = """\
+@@ -4,99 +4,1 @@
+ line 4
+-line 5
++five
+"""
+    assert apply_unified_diff(SOURCE, diff).code.splitlines()[4] == "five"
+
+
+def test_code_fence_is_stripped():
+    diff = "```diff\n@@ -1 +1 @@\n-line 1\n+one\n```"
+    assert apply_unified_diff(SOURCE, diff).code.startswith("one\n")
+
+
+def test_mismatched_context_raises():
+    diff = """\
+@@ -4,3 +4,3 @@
+ line 4
+-line five
++five
+ line 6
+"""
+    with pytest.raises(PatchError, match="Hunk 1"):
+        apply_unified_diff(SOURCE, diff)
+
+
+def test_mismatch_in_a_later_hunk_rejects_the_whole_patch():
+    diff = """\
+@@ -1 +1 @@
+-line 1
++one
+@@ -5 +5 @@
+-not in the source
++five
+"""
+    with pytest.raises(PatchError, match="Hunk 2"):
+        apply_unified_diff(SOURCE, diff)
+
+
+def test_hunks_must_apply_in_order():
+    # The second hunk's lines come before the first hunk's.
+    diff = """\
+@@ -5 +5 @@
+-line 5
++five
+@@ -2 +2 @@
+-line 2
++two
+"""
+    with pytest.raises(PatchError):
+        apply_unified_diff(SOURCE, diff)
+
+
+def test_diff_without_hunks_raises():
+    with pytest.raises(PatchError, match="no hunks"):
+        apply_unified_diff(SOURCE, "--- a/solution.py\n+++ b/solution.py\n")
+
+
+def test_line_outside_a_hunk_raises():
+    with pytest.raises(PatchError, match="not part of a hunk"):
+        parse_unified_diff("@@ -1 +1 @@\n-line 1\n+one\n*bogus\n")
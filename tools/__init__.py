@@ -1,2 +1,22 @@
-import sys
-import os
+"""
+Tools
+-----
+
+Agent tool functions. Names are imported on first access (see
+utils/lazy_imports.py); heavy dependencies such as psutil and requests are
+imported by the tool functions themselves, on first call.
+"""
+from utils.lazy_imports import lazy_exports
+
+_EXPORTS = {
+    "exit_loop_tool": "tools.control_tools",
+    "get_date_and_time": "tools.date_time_tool",
+    "get_network_info": "tools.network_info_tool",
+    "get_system_info": "tools.system_info_tool",
+    "run_python_candidates": "tools.code_execution_tool",
+    "run_python_code": "tools.code_execution_tool",
+    "serper_scrape_single_page_tool": "tools.serper_scrape_single_page_tool",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,69 @@
+"""
+Code Execution Tool
+-------------------
+
+Lets an agent run Python code locally instead of judging it by reading it:
+each program runs with its doctests and optional tests in its own sandboxed
+interpreter, with CPU, memory and time limits and no network access (see
+utils/code/sandbox.py).
+
+run_python_code:       one program.
+run_python_candidates: several versions of a program against the same tests,
+                       in parallel; reports which ones pass.
+
+Both are coroutines: a run takes up to the sandbox's wall-time limit, so it
+is awaited in a worker thread and does not block the event loop (and every
+other session) meanwhile.
+
+`tests` has no default value: Gemini function declarations do not support
+defaults, and ADK logs a warning for every request that has one.
+"""
+import asyncio
+
+from google.adk.tools.tool_context import ToolContext  # For ADK compatibility
+
+from utils.code.sandbox import run_candidates, run_sandboxed
+
+# Candidates accepted per call; more are ignored.
+MAX_CANDIDATES = 8
+
+
+async def run_python_code(code: str, tests: str, tool_context: ToolContext = None) -> dict:
+    """
+    Runs a Python program, its doctests and optional tests in a sandbox.
+
+    Args:
+        code (str): The Python program. It runs as the module `solution`, so an
+            `if __name__ == "__main__":` block is not executed.
+        tests (str): Test code: `test_*` functions using assert, or
+            unittest.TestCase classes. The program's functions are in scope.
+            An empty string runs only the program and its doctests.
+        tool_context (ToolContext, optional): ADK tool context. Not used.
+
+    Returns:
+        dict: status ("passed", "failed", "error", "timeout" or "crashed"),
+            ok, stdout, stderr, exception, tests_run, failures and duration_s.
+    """
+    return (await asyncio.to_thread(run_sandboxed, code, tests or "")).to_dict()
+
+
+async def run_python_candidates(candidates: list[str], tests: str, tool_context: ToolContext = None) -> dict:
+    """
+    Runs several candidate versions of a Python program against the same tests,
+    in parallel, each in its own sandbox.
+
+    Args:
+        candidates (list[str]): The candidate programs (at most 8).
+        tests (str): Test code run against every candidate: `test_*` functions
+            using assert, or unittest.TestCase classes. Can be empty.
+        tool_context (ToolContext, optional): ADK tool context. Not used.
+
+    Returns:
+        dict: results (one run_python_code result per candidate, in order) and
+            passing (the indexes of the candidates whose run and tests passed).
+    """
+    results = await asyncio.to_thread(run_candidates, candidates[:MAX_CANDIDATES], tests or "")
+    return {
+        "results": [result.to_dict() for result in results],
+        "passing": [index for index, result in enumerate(results) if result.ok],
+    }
@@ -0,0 +1,23 @@
+"""
+Date and Time Tool
+------------------
+
+Provides the current local date and time, for plans whose sub-tasks depend
+on "now" (reminders, follow-ups, schedules).
+"""
+from datetime import datetime
+
+from google.adk.tools.tool_context import ToolContext
+
+
+def get_date_and_time(tool_context: ToolContext = None) -> str:
+    """
+    Get the current local date and time formatted as 'dd/MM/yyyy HH:mm:ss' with the weekday.
+
+    Args:
+        tool_context (ToolContext, optional): ADK tool context. Defaults to None.
+                                              Not used; included for ADK compatibility.
+    Returns:
+        str: e.g. 'Sunday 28/07/2024 15:42:10'.
+    """
+    return datetime.now().strftime("%A %d/%m/%Y %H:%M:%S")
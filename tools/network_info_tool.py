@@ -6,7 +6,6 @@ Provides functions to gather various network information details,
 including interface addresses, MACs, status, and DNS servers.
 """
 import socket
-import psutil
 import subprocess # Added import
 import platform # Added import for OS detection
 
@@ -105,6 +104,8 @@ def get_network_info(tool_context: ToolContext = None) -> dict:
     Returns:
         dict: Network information (hostname, interface details, DNS servers, advanced_info, etc.)
     """
+    import psutil  # imported on first call, not when the agent is built
+
     network_details = {
         'hostname': socket.gethostname(),
         'interfaces': {},
@@ -4,6 +4,8 @@ Minimal Scraper Tool (ADK-compatible)
 
 Scrapes a list of URLs by POSTing each to a configured scraper API root endpoint.
 Provides both a plain function and an ADK FunctionTool for use in agents.
+scrape_page() scrapes a single URL; the URL fan-out agent calls it once per
+branch (see agents/url_fanout_agent/url_fanout_agent.py).
 
 Requirements:
     - pip install requests
@@ -12,14 +14,40 @@ Requirements:
 """
 import os
 import json
-import requests
 from typing import List, Dict, Any
 from google.adk.tools.tool_context import ToolContext
 from google.adk.tools import FunctionTool
 
+from utils.sessions.state_patches import state_merge
+
 SCRAPER_API_URL = os.environ.get("SCRAPER_API_URL", "https://scrape.serper.dev")
 SCRAPER_API_KEY = os.environ.get("SCRAPER_API_KEY", "44742fb5f61a502c7c85b72e71fa4a83fda9a325")
 
+def _scraper_headers() -> Dict[str, str]:
+    return {
+        'X-API-KEY': SCRAPER_API_KEY,
+        'Content-Type': 'application/json'
+    }
+
+def scrape_page(url: str, timeout: float = 30) -> Dict[str, Any]:
+    """Scrape one URL with the configured scraper API.
+
+    Args:
+        url (str): The URL to scrape.
+        timeout (float, optional): Request timeout in seconds.
+
+    Returns:
+        dict: The scraper's JSON response (page text and metadata).
+
+    Raises:
+        requests.RequestException: If the request fails or returns an error status.
+    """
+    import requests  # imported on first call, not when the agent is built
+
+    response = requests.post(SCRAPER_API_URL, headers=_scraper_headers(), data=json.dumps({"url": url}), timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
 def serper_scrape_single_page_tool(urls: List[str], tool_context: ToolContext = None) -> str:
     """Scrape a list of URLs using the configured scraper API root endpoint.
 
@@ -30,17 +58,19 @@ def serper_scrape_single_page_tool(urls: List[str], tool_context: ToolContext =
     Returns:
         str: JSON string of results for each URL.
     """
+    import requests  # imported on first call, not when the agent is built
+
     results: Dict[str, Any] = {}
-    headers = {
-        'X-API-KEY': SCRAPER_API_KEY,
-        'Content-Type': 'application/json'
-    }
+    headers = _scraper_headers()
     for url in urls:
         payload = json.dumps({"url": url})
         try:
             response = requests.post(SCRAPER_API_URL, headers=headers, data=payload, timeout=30)
             print(f"response for {url}: {response.text}")
-            tool_context.state["scraped_urls_results"] = response.text
+            # Merge instead of overwrite so every scraped URL is kept, and only
+            # the new entry is written to the session event.
+            if tool_context is not None:
+                state_merge(tool_context, "scraped_urls_results", {url: response.text})
             response.raise_for_status()
             results[url] = response.json()
         except Exception as e:
@@ -14,8 +14,6 @@ import os
 import platform
 import socket
 
-import psutil
-
 from google.adk.tools.tool_context import ToolContext
 
 
@@ -40,7 +38,13 @@ def get_system_info(tool_context: ToolContext = None) -> dict:
         'processor': platform.processor(),
         'hostname': socket.gethostname(),
     }
-    # Try to use psutil for more detailed information if it's installed
+    # Try to use psutil for more detailed information if it's installed.
+    # Imported here rather than at module level so building an agent with this
+    # tool does not load psutil.
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
     try:
         # We check if psutil is available (imported successfully)
         # and then use it. If it wasn't imported, this block will be skipped.
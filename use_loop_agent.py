@@ -1,13 +1,13 @@
 import asyncio
 import uuid
 from dotenv import load_dotenv
-from google.adk.agents import SequentialAgent, LoopAgent
 from google.adk.runners import Runner
-from agents.python_expert_agent.python_expert_agent import get_python_expert_agent
-from agents.python_refiner_agent.python_refiner_agent import get_python_refiner_agent
+from agents.agent_registry import get_agent_registry
 from utils.llm.call_agent_async import call_agent_async
+from utils.llm.deadline import get_turn_timeout
 from utils.sessions.load_user_session import load_user_session
-from agents.python_reviewer_agent.python_reviewer_agent import get_python_reviewer_agent
+from utils.sessions.history_compaction import compact_session_if_needed
+from utils.metrics.prometheus_server import start_metrics_server
 
 load_dotenv()
 
@@ -19,28 +19,26 @@ async def main():
     SESSION_ID = str(uuid.uuid4())
     USER_ID = "user123"
     initial_state = {
-        "generated_code" : ""
+        "generated_code" : "",
+        # Diff-based review loop state (see utils/code/patch_protocol.py)
+        "review_context" : "",
+        "review_comments" : "",
+        "refinement_patch" : "",
+        "patch_error" : "",
+        # Sandboxed runs of the code and of tests seeded here (see utils/code/execution_feedback.py)
+        "generated_tests" : "",
+        "execution_results" : "",
+        # Why the review loop stopped early, if it did (see utils/code/loop_convergence.py)
+        "loop_converged" : ""
     }
     sessionDetails = load_user_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID, intial_state=initial_state)
     SESSION_ID = sessionDetails["session_id"]
     session_service = sessionDetails["session_service"]
 
 
-    # Create a loop agent
-    loop_agent = LoopAgent(
-        name="loop_agent",
-        description="A loop agent that can loop through a list of items",
-        max_iterations=5,
-        sub_agents=[get_python_reviewer_agent(), get_python_refiner_agent()]
-    )
-
-    python_expert_agent = get_python_expert_agent()
-    # Create a sequential agent
-    sequential_agent = SequentialAgent(
-        name="sequential_agent",
-        description="A sequential agent that can execute a list of agents in order",
-        sub_agents=[get_python_expert_agent(), loop_agent]
-    )
+    # Python expert, then a reviewer/refiner loop; built, instrumented and shared by the registry.
+    sequential_agent = get_agent_registry().get("loop_pipeline", max_iterations=5)
+    start_metrics_server()
     runner = Runner(app_name=APP_NAME, agent=sequential_agent, session_service=session_service)
     while True:
         user_input = input("Enter a message: ")
@@ -50,8 +48,14 @@ async def main():
             response = await call_agent_async(runner=runner,
                                  user_id=USER_ID, 
                                  session_id=SESSION_ID, 
-                                 message=user_input)
+                                 message=user_input,
+                                 timeout=get_turn_timeout())
             print(response)
+            compact_session_if_needed(session_service, APP_NAME, USER_ID, SESSION_ID)
+            # The loop exchanges diffs, so the last response is a patch (or a review);
+            # the full refined program lives in state.
+            session = session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+            print(session.state.get("generated_code", ""))
 
 
 
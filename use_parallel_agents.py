@@ -1,6 +1,5 @@
 import asyncio
 from dotenv import load_dotenv
-from google.adk.agents import ParallelAgent,SequentialAgent
 from google.adk.runners import Runner
 from google.adk.sessions import  InMemorySessionService, DatabaseSessionService
 import platform
@@ -8,16 +7,12 @@ import sys
 import socket
 
 
-from agents.network_system_agent.network_system_agent import get_network_system_agent
-from agents.reviewer_agent.reviewer_agent import get_reviewer_agent
-from agents.system_info_agent.system_info_agent import get_system_info_agent
+from agents.agent_registry import get_agent_registry
 from utils.llm.call_agent_async import call_agent_async
+from utils.llm.deadline import get_turn_timeout
 from utils.sessions.load_user_session import load_user_session
-
-try:
-    import psutil
-except ImportError:
-    psutil = None
+from utils.sessions.history_compaction import compact_session_if_needed
+from utils.metrics.prometheus_server import start_metrics_server
 
 
 load_dotenv()
@@ -39,20 +34,9 @@ async def main():
     session_details = load_user_session(APP_NAME,USER_ID,SESSION_ID,[])
     SESSION_ID = session_details["session_id"]
     session_service = session_details["session_service"]
-    parallel_agent = ParallelAgent(
-        name="parallel_agent",
-        
-        description="A parallel agent that can run multiple agents in parallel",
-        sub_agents=[get_system_info_agent(), get_network_system_agent()],
-    )
-
-    sequential_agent = SequentialAgent(
-        name="sequential_agent",
-        description="A sequential agent that can run multiple agents in sequential",
-        sub_agents=[parallel_agent, get_reviewer_agent()],
-    )
-
-
+    # System and network info in parallel, then a review; built, instrumented and shared by the registry.
+    sequential_agent = get_agent_registry().get("system_info_pipeline")
+    start_metrics_server()
     runner = Runner(app_name=APP_NAME, agent=sequential_agent, session_service=session_service)
     # ********** END OF APP SETUP **********
 
@@ -62,7 +46,8 @@ async def main():
         if query == "exit":
             break
         else:
-            response = await call_agent_async(runner=runner, message=query,user_id=USER_ID, session_id=SESSION_ID)
+            response = await call_agent_async(runner=runner, message=query,user_id=USER_ID, session_id=SESSION_ID, timeout=get_turn_timeout())
+            compact_session_if_needed(session_service, APP_NAME, USER_ID, SESSION_ID)
 
 
 
@@ -0,0 +1,48 @@
+import asyncio
+import uuid
+from dotenv import load_dotenv
+from google.adk.runners import Runner
+from agents.agent_registry import get_agent_registry
+from utils.llm.call_agent_async import call_agent_async
+from utils.llm.deadline import get_turn_timeout
+from utils.sessions.load_user_session import load_user_session
+from utils.sessions.history_compaction import compact_session_if_needed
+from utils.metrics.prometheus_server import start_metrics_server
+
+load_dotenv()
+
+
+async def main():
+
+    APP_NAME = "Team Manager - Planned Sub-Tasks"
+    SESSION_ID = str(uuid.uuid4())
+    USER_ID = "user123"
+    initial_state = {
+        # The task planner's JSON plan and the executor's per-step results
+        # (see agents/plan_executor_agent/plan_executor_agent.py)
+        "task_plan" : "",
+        "plan_results" : {},
+    }
+    session_details = load_user_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID, intial_state=initial_state)
+    SESSION_ID = session_details["session_id"]
+    session_service = session_details["session_service"]
+
+    # Planner, concurrent plan executor, then one team manager answer; built, instrumented and shared by the registry.
+    team_manager = get_agent_registry().get("planned_team_pipeline")
+    start_metrics_server()
+    runner = Runner(app_name=APP_NAME, agent=team_manager, session_service=session_service)
+    while True:
+        user_input = input("You: ")
+        if user_input.lower() == "exit":
+            break
+        response = await call_agent_async(runner=runner,
+                                 user_id=USER_ID,
+                                 session_id=SESSION_ID,
+                                 message=user_input,
+                                 timeout=get_turn_timeout())
+        print(response)
+        compact_session_if_needed(session_service, APP_NAME, USER_ID, SESSION_ID)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+"""
+Utils
+-----
+
+Runtime helpers for the entry scripts: running turns, deadlines, metrics and
+session services. Names are imported on first access (see lazy_imports.py),
+so importing one helper does not load the session stack or the metrics
+server.
+"""
+from utils.lazy_imports import lazy_exports
+
+_EXPORTS = {
+    "apply_deadline_budgets": "utils.llm.deadline",
+    "apply_model_routing": "utils.llm.model_router",
+    "call_agent_async": "utils.llm.call_agent_async",
+    "compact_session_if_needed": "utils.sessions.history_compaction",
+    "compile_instructions": "utils.llm.prompt_compiler",
+    "compile_prompt": "utils.llm.prompt_compiler",
+    "get_async_session_service": "utils.sessions.session_service_provider",
+    "get_session_service": "utils.sessions.session_service_provider",
+    "get_sharded_session_service": "utils.sessions.session_service_provider",
+    "get_turn_timeout": "utils.llm.deadline",
+    "instrument_agent": "utils.metrics.metrics_callbacks",
+    "load_user_session": "utils.sessions.load_user_session",
+    "share_tool_declarations": "utils.llm.tool_declarations",
+    "start_metrics_server": "utils.metrics.prometheus_server",
+}
+
+__all__ = sorted(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -0,0 +1,68 @@
+"""
+callback_chain.py
+
+Composes several ADK callbacks into the single callback slot an agent offers
+(before_agent_callback, before_model_callback, before_tool_callback, ...).
+"""
+import inspect
+from typing import Any, Callable, Optional
+
+
+def chain_callbacks(*callbacks: Optional[Callable]) -> Optional[Callable]:
+    """
+    Chains callbacks so they run in order until one returns a value.
+
+    This matches ADK callback semantics: a before-callback that returns a value
+    short-circuits the step, and an after-callback that returns a value replaces
+    the result. Later callbacks only run while earlier ones return None.
+    If any callback is async (tool callbacks may be), the chain is async too.
+
+    Args:
+        *callbacks: Callbacks to run, in order. None entries are ignored.
+
+    Returns:
+        The chained callback, the only callback if there is just one, or None.
+    """
+    flat = []
+    for callback in callbacks:
+        if callback is None:
+            continue
+        flat.extend(getattr(callback, "__chained_callbacks__", (callback,)))
+    if not flat:
+        return None
+    if len(flat) == 1:
+        return flat[0]
+
+    if any(inspect.iscoroutinefunction(callback) for callback in flat):
+        async def chained(*args: Any, **kwargs: Any):
+            for callback in flat:
+                result = callback(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                if result is not None:
+                    return result
+            return None
+    else:
+        def chained(*args: Any, **kwargs: Any):
+            for callback in flat:
+                result = callback(*args, **kwargs)
+                if result is not None:
+                    return result
+            return None
+
+    chained.__chained_callbacks__ = tuple(flat)
+    return chained
+
+
+def has_callback(slot: Optional[Callable], callback: Callable) -> bool:
+    """
+    Whether a callback slot already contains a callback, directly or chained.
+
+    Args:
+        slot: The current value of an agent callback attribute.
+        callback: The callback to look for.
+
+    Returns:
+        bool: True if the callback is already attached.
+    """
+    return slot is callback or callback in getattr(slot, "__chained_callbacks__", ())
@@ -0,0 +1,100 @@
+"""
+Execution Feedback
+------------------
+
+Runs the review loop's current program in the sandbox (utils/code/sandbox.py)
+so the reviewer and the refiner judge it by what it does, not only by how it
+reads: the program is executed and its doctests run. Tests a caller put in
+state["generated_tests"] run as well; no agent of the loop pipeline writes
+that key. The rendered result goes to state["execution_results"], which both
+prompts show; a failing doctest with its expected and actual output tells the
+refiner what to fix in one iteration.
+
+Each version of the code runs once: the result is kept until the code or the
+tests change (up to whitespace, see loop_convergence.code_fingerprint()).
+Code that does not compile is not run; static_review_callback() already
+sends it back to the refiner with the syntax error.
+
+The run is a step of the loop, ExecutionFeedbackAgent, placed before the
+reviewer. The sandbox runs in a worker thread, so other sessions on the event
+loop keep going, and the step waits at most the turn deadline's remaining
+time (utils/llm/deadline.py). A run that does not finish in time is reported
+as not run and tried again on the next iteration.
+
+Wiring (see build_loop_pipeline in agents/agent_registry.py):
+    loop_agent  sub_agents: execution_feedback_agent, python_reviewer_agent, python_refiner_agent
+"""
+import ast
+import asyncio
+from typing import AsyncGenerator, Dict, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+from utils.code.loop_convergence import code_fingerprint
+from utils.code.patch_protocol import GENERATED_CODE_KEY
+from utils.code.sandbox import run_sandboxed
+from utils.llm.deadline import get_current_deadline, run_key
+
+EXECUTION_RESULTS_KEY = "execution_results"
+GENERATED_TESTS_KEY = "generated_tests"
+# Fingerprint of the code and tests behind state["execution_results"].
+EXECUTED_FINGERPRINT_KEY = "executed_fingerprint"
+
+
+class ExecutionFeedbackAgent(BaseAgent):
+    """
+    Runs the current code and its tests in the sandbox, unless this version
+    already ran, and stores the result (see the module docstring). Spends no
+    model call.
+
+    Place it before the reviewer in the review LoopAgent.
+    """
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = ctx.session.state
+        code = state.get(GENERATED_CODE_KEY) or ""
+        tests = state.get(GENERATED_TESTS_KEY) or ""
+        fingerprint = f"{code_fingerprint(code)}:{code_fingerprint(tests)}"
+        if fingerprint == state.get(EXECUTED_FINGERPRINT_KEY):
+            return
+
+        delta: Dict[str, str] = {EXECUTED_FINGERPRINT_KEY: fingerprint}
+        if not code.strip():
+            delta[EXECUTION_RESULTS_KEY] = ""
+        else:
+            try:
+                ast.parse(code)
+            except (SyntaxError, ValueError):
+                delta[EXECUTION_RESULTS_KEY] = "Not run: the code does not compile."
+            else:
+                deadline = get_current_deadline()
+                timeout: Optional[float] = max(0.0, deadline.remaining(run_key(ctx))) if deadline else None
+                try:
+                    result = await asyncio.wait_for(asyncio.to_thread(run_sandboxed, code, tests), timeout=timeout)
+                    delta[EXECUTION_RESULTS_KEY] = result.render()
+                except asyncio.TimeoutError:
+                    # The worker thread finishes on its own (bounded by the sandbox's
+                    # wall-clock limit); without a fingerprint the next iteration retries.
+                    del delta[EXECUTED_FINGERPRINT_KEY]
+                    delta[EXECUTION_RESULTS_KEY] = "Not run: the turn deadline left no time to run the code."
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=delta),
+        )
+
+
+def get_execution_feedback_agent() -> ExecutionFeedbackAgent:
+    """
+    Factory function to create the execution feedback step of the review loop.
+
+    Returns:
+        ExecutionFeedbackAgent: The configured agent.
+    """
+    return ExecutionFeedbackAgent(
+        name="execution_feedback_agent",
+        description="Runs the current code and its doctests in a sandbox before the review.",
+    )
@@ -0,0 +1,140 @@
+"""
+Loop Convergence
+----------------
+
+Stops the reviewer/refiner LoopAgent of use_loop_agent.py once another
+iteration cannot change anything, instead of running all max_iterations:
+
+    * the refined code is unchanged, or only its whitespace changed
+      (the refiner answered NO_CHANGES, or its diff only reformatted lines),
+    * the reviewer repeats its previous review.
+
+The reviewer ending the loop itself, by calling exit_loop
+(utils/llm/exit_loop.py), stays the first way out; these checks catch the
+loops where it never does.
+
+Each iteration is compared with the previous one through short fingerprints
+kept in session state, so no extra copy of the program is stored. Stopping
+works like exit_loop: the callback escalates, which makes the LoopAgent
+return, and the reason is recorded in state["loop_converged"].
+
+Wiring (see the python_* agent factories):
+    python_expert_agent    after_agent_callback: start_convergence_tracking
+    python_reviewer_agent  after_agent_callback: stop_on_repeated_review
+    python_refiner_agent   after_agent_callback: apply_refinement_patch_callback, then stop_on_unchanged_code
+"""
+import hashlib
+import io
+import tokenize
+
+from utils.code.patch_protocol import GENERATED_CODE_KEY, PATCH_ERROR_KEY, REVIEW_COMMENTS_KEY
+
+CONVERGED_KEY = "loop_converged"
+CODE_FINGERPRINT_KEY = "code_fingerprint"
+REVIEW_FINGERPRINT_KEY = "review_fingerprint"
+
+# Tokens that carry no meaning beyond layout. INDENT/DEDENT are kept (without
+# the indent width), since moving a line in or out of a block changes the code.
+_LAYOUT_TOKENS = {tokenize.NL, tokenize.NEWLINE, tokenize.ENDMARKER}
+
+
+def code_fingerprint(code: str) -> str:
+    """
+    A fingerprint of Python code that ignores whitespace changes: blank lines,
+    trailing spaces, spacing between tokens (`a=b` vs `a = b`) and the width of
+    an indent. Code that does not tokenize is compared line by line with runs
+    of whitespace collapsed.
+
+    Args:
+        code (str): Python source.
+
+    Returns:
+        str: Hex digest; equal for code that only differs in whitespace.
+    """
+    try:
+        normalized = "\x00".join(
+            f"{token.type}:{'' if token.type == tokenize.INDENT else token.string}"
+            for token in tokenize.generate_tokens(io.StringIO(code).readline)
+            if token.type not in _LAYOUT_TOKENS
+        )
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        normalized = "\n".join(
+            f"{len(line) - len(line.lstrip())}:{' '.join(line.split())}"
+            for line in code.splitlines()
+            if line.strip()
+        )
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def review_fingerprint(review: str) -> str:
+    """A fingerprint of review text that ignores case and whitespace."""
+    return hashlib.sha1(" ".join(review.lower().split()).encode("utf-8")).hexdigest()
+
+
+def stop_loop(callback_context, reason: str) -> None:
+    """
+    Ends the enclosing LoopAgent after the current agent, the way exit_loop does.
+
+    Args:
+        callback_context: ADK CallbackContext of an after_agent_callback.
+        reason (str): Stored in state["loop_converged"].
+    """
+    callback_context.state[CONVERGED_KEY] = reason
+    callback_context._event_actions.escalate = True
+
+
+def start_convergence_tracking(callback_context) -> None:
+    """
+    after_agent_callback for the code generator, after start_review_callback():
+    fingerprints the new program and forgets the previous cycle's review.
+
+    Returns:
+        None
+    """
+    state = callback_context.state
+    state[CODE_FINGERPRINT_KEY] = code_fingerprint(state.get(GENERATED_CODE_KEY) or "")
+    state[REVIEW_FINGERPRINT_KEY] = ""
+    state[CONVERGED_KEY] = ""
+    return None
+
+
+def stop_on_unchanged_code(callback_context) -> None:
+    """
+    after_agent_callback for the refiner, after apply_refinement_patch_callback():
+    stops the loop when the code is the same as before this refinement, up to
+    whitespace. A rejected patch also leaves the code unchanged, but the
+    refiner gets another iteration to fix it.
+
+    Returns:
+        None
+    """
+    state = callback_context.state
+    if state.get(PATCH_ERROR_KEY):
+        return None
+    fingerprint = code_fingerprint(state.get(GENERATED_CODE_KEY) or "")
+    unchanged = fingerprint == state.get(CODE_FINGERPRINT_KEY)
+    state[CODE_FINGERPRINT_KEY] = fingerprint
+    if unchanged:
+        stop_loop(callback_context, "The refiner left the code unchanged (up to whitespace).")
+    return None
+
+
+def stop_on_repeated_review(callback_context) -> None:
+    """
+    after_agent_callback for the reviewer: stops the loop when the review is
+    the same as the previous one, up to case and whitespace. The refiner would
+    only get the comments it already acted on.
+
+    Returns:
+        None
+    """
+    state = callback_context.state
+    review = state.get(REVIEW_COMMENTS_KEY) or ""
+    if not isinstance(review, str) or not review.strip():
+        return None
+    fingerprint = review_fingerprint(review)
+    repeated = fingerprint == state.get(REVIEW_FINGERPRINT_KEY)
+    state[REVIEW_FINGERPRINT_KEY] = fingerprint
+    if repeated:
+        stop_loop(callback_context, "The reviewer repeated its previous review.")
+    return None
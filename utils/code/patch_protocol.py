@@ -0,0 +1,95 @@
+"""
+Patch Protocol
+--------------
+
+Session-state plumbing for the diff-based review loop in use_loop_agent.py:
+
+    python_expert_agent    writes the full program to state["generated_code"].
+                           start_review_callback() shows it to the reviewer once,
+                           in full and with line numbers.
+    python_reviewer_agent  reads state["review_context"], writes state["review_comments"].
+    python_refiner_agent   reads the current code and the comments and emits a
+                           unified diff into state["refinement_patch"].
+                           apply_refinement_patch_callback() applies it to
+                           state["generated_code"] and puts only the changed
+                           regions (plus context) into state["review_context"].
+
+Per-iteration output therefore grows with the size of the change, not with
+the size of the program. utils/code/loop_convergence.py stops the loop once
+an iteration changes nothing.
+"""
+from utils.code.unified_diff import PatchError, apply_unified_diff, number_lines, render_changed_regions, strip_code_fences
+
+GENERATED_CODE_KEY = "generated_code"
+REVIEW_CONTEXT_KEY = "review_context"
+REVIEW_COMMENTS_KEY = "review_comments"
+REFINEMENT_PATCH_KEY = "refinement_patch"
+PATCH_ERROR_KEY = "patch_error"
+
+# What the refiner answers instead of a diff when it has nothing to change.
+NO_CHANGES_MARKER = "NO_CHANGES"
+
+# Unchanged lines shown to the reviewer around every change.
+REVIEW_CONTEXT_LINES = 5
+
+
+def start_review_callback(callback_context):
+    """
+    after_agent_callback for the code generator: starts a new review cycle.
+
+    Strips markdown fences from the generated code (patches are applied to it
+    line by line) and gives the reviewer the whole program once.
+
+    Args:
+        callback_context: ADK CallbackContext.
+
+    Returns:
+        None
+    """
+    state = callback_context.state
+    code = strip_code_fences(state.get(GENERATED_CODE_KEY) or "")
+    state[GENERATED_CODE_KEY] = code
+    state[REVIEW_CONTEXT_KEY] = f"Full program ({len(code.splitlines())} lines):\n{number_lines(code)}"
+    state[REFINEMENT_PATCH_KEY] = ""
+    state[PATCH_ERROR_KEY] = ""
+    return None
+
+
+def apply_refinement_patch_callback(callback_context):
+    """
+    after_agent_callback for the refiner: applies its diff to the current code.
+
+    A patch that does not apply is rejected as a whole; the code stays as it
+    was and the error is stored in state["patch_error"] so the refiner can
+    retry on the next loop iteration.
+
+    Args:
+        callback_context: ADK CallbackContext.
+
+    Returns:
+        None
+    """
+    state = callback_context.state
+    patch = strip_code_fences((state.get(REFINEMENT_PATCH_KEY) or "").strip()).strip()
+    if not patch or patch == NO_CHANGES_MARKER:
+        state[REVIEW_CONTEXT_KEY] = "The refiner made no changes in the last iteration."
+        state[PATCH_ERROR_KEY] = ""
+        return None
+
+    try:
+        applied = apply_unified_diff(state.get(GENERATED_CODE_KEY) or "", patch)
+    except PatchError as e:
+        state[PATCH_ERROR_KEY] = str(e)
+        state[REVIEW_CONTEXT_KEY] = (
+            "The last refinement could not be applied, the code is unchanged. "
+            "Repeat the review comments that still apply."
+        )
+        return None
+
+    state[GENERATED_CODE_KEY] = applied.code
+    state[PATCH_ERROR_KEY] = ""
+    state[REVIEW_CONTEXT_KEY] = (
+        "Lines changed by the last refinement (changed lines are marked with '>'):\n"
+        + render_changed_regions(applied.code, applied.changed_ranges, context=REVIEW_CONTEXT_LINES)
+    )
+    return None
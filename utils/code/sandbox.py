@@ -0,0 +1,369 @@
+"""
+Sandbox
+-------
+
+Runs generated Python code, its doctests and optional generated tests in a
+fresh, restricted subprocess, and several candidates in parallel:
+
+    * time:    RLIMIT_CPU, plus a wall-clock timeout enforced by the parent,
+    * memory:  RLIMIT_AS (address space), RLIMIT_FSIZE, RLIMIT_NOFILE, no core files,
+    * network: a new network namespace when the process may create one
+               (root / CAP_SYS_ADMIN), and always an audit hook (PEP 578) that
+               refuses to create internet sockets or resolve host names,
+    * system:  the audit hook also refuses to start processes, load native
+               libraries through ctypes, or write files outside the job's
+               temporary working directory.
+
+Every run gets its own interpreter (`python -I`, a minimal environment, an
+empty temporary cwd), so nothing leaks from one candidate to the next; the
+"pool" is a thread pool that keeps up to `workers` such subprocesses busy.
+
+The harness reports stdout, stderr, the exception that ended the program (if
+any) and one entry per failing doctest or test. Tests are what a model would
+write without a test runner: `test_*` functions without arguments and
+unittest.TestCase classes, with the program importable as `solution`.
+
+The audit hook is a guard against generated code that misbehaves by accident,
+not a security boundary against hostile code; rlimits need a POSIX system
+(on Windows only the wall-clock timeout applies).
+"""
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+
+DEFAULT_CPU_SECONDS = 5
+DEFAULT_MEMORY_MB = 512
+DEFAULT_WALL_SECONDS = 10.0
+
+# stdout / stderr / failure text kept per run, in characters.
+OUTPUT_LIMIT = 4000
+
+SOLUTION_MODULE = "solution"
+
+# Runs inside the sandboxed interpreter; reads the job as JSON from stdin.
+_HARNESS = r'''
+import json, os, sys
+job = json.loads(sys.stdin.read())
+limits = job["limits"]
+
+network = "audit hook"
+if sys.platform.startswith("linux"):
+    try:
+        import ctypes
+        if ctypes.CDLL(None, use_errno=True).unshare(0x40000000) == 0:  # CLONE_NEWNET
+            network = "namespace"
+    except (OSError, AttributeError):
+        pass
+
+try:
+    import resource
+except ImportError:
+    resource = None
+if resource is not None:
+    for name, soft, hard in (
+        ("RLIMIT_CPU", limits["cpu_seconds"], limits["cpu_seconds"] + 1),
+        ("RLIMIT_AS", limits["memory_mb"] << 20, limits["memory_mb"] << 20),
+        ("RLIMIT_FSIZE", 16 << 20, 16 << 20),
+        ("RLIMIT_NOFILE", 64, 64),
+        ("RLIMIT_CORE", 0, 0),
+    ):
+        try:
+            resource.setrlimit(getattr(resource, name), (soft, hard))
+        except (AttributeError, ValueError, OSError):
+            pass
+
+import doctest, inspect, io, socket, traceback, types, unittest
+
+workdir = os.path.realpath(job["workdir"])
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+BLOCKED = ("subprocess.Popen", "os.system", "os.exec", "os.posix_spawn", "os.spawn", "os.fork", "os.forkpty",
+           "os.kill", "os.killpg", "pty.spawn", "ctypes.dlopen", "ctypes.dlsym", "ctypes.call_function",
+           "socket.getaddrinfo", "socket.gethostbyname", "socket.gethostbyaddr", "socket.getnameinfo", "webbrowser.open")
+PATH_EVENTS = {"os.remove", "os.rename", "os.rmdir", "os.mkdir", "os.chmod", "os.chown", "os.truncate",
+               "os.symlink", "os.link", "os.utime", "shutil.rmtree", "shutil.copyfile", "shutil.move"}
+
+def inside_workdir(path):
+    if isinstance(path, int):
+        return True
+    path = os.path.realpath(os.fsdecode(path))
+    return path == os.devnull or path == workdir or path.startswith(workdir + os.sep)
+
+def audit(event, args):
+    if event.startswith(BLOCKED):
+        raise PermissionError(f"sandbox: {event} is not allowed")
+    if event == "socket.__new__" and args[1] not in (getattr(socket, "AF_UNIX", None), -1):
+        raise PermissionError("sandbox: network access is not allowed")
+    if event == "open" and isinstance(args[2], int) and args[2] & WRITE_FLAGS and not inside_workdir(args[0]):
+        raise PermissionError(f"sandbox: writing {args[0]!r} is not allowed")
+    if event in PATH_EVENTS and not all(inside_workdir(arg) for arg in args[:2] if isinstance(arg, (str, bytes, os.PathLike))):
+        raise PermissionError(f"sandbox: {event} outside the working directory is not allowed")
+
+sys.addaudithook(audit)
+
+result = {"status": "passed", "exception": "", "tests_run": 0, "failures": [], "network": network}
+
+def describe(exc):
+    # The last frames of the traceback, without the harness's own (<string>) frames.
+    trace = traceback.TracebackException.from_exception(exc)
+    trace.stack = traceback.StackSummary.from_list([frame for frame in trace.stack if frame.filename != "<string>"][-4:])
+    return "".join(trace.format()).strip()
+
+module = types.ModuleType(job["module"])
+module.__file__ = job["solution_path"]
+sys.modules[job["module"]] = module
+try:
+    with open(job["solution_path"], encoding="utf-8") as f:
+        exec(compile(f.read(), job["solution_path"], "exec"), module.__dict__)
+except BaseException as e:
+    if not (isinstance(e, SystemExit) and e.code in (None, 0)):
+        result["status"] = "error"
+        result["exception"] = describe(e)
+if result["status"] == "passed":
+    runner = doctest.DocTestRunner(optionflags=doctest.ELLIPSIS | doctest.NORMALIZE_WHITESPACE)
+    for test in doctest.DocTestFinder().find(module, job["module"]):
+        if not test.examples:
+            continue
+        report = io.StringIO()
+        outcome = runner.run(test, out=report.write)
+        result["tests_run"] += 1
+        if outcome.failed:
+            result["failures"].append(f"doctest {test.name}:\n{report.getvalue().strip()}")
+
+    if job["tests_path"]:
+        namespace = {"__name__": "test_" + job["module"], "__file__": job["tests_path"]}
+        namespace.update({k: v for k, v in vars(module).items() if not k.startswith("__")})
+        try:
+            with open(job["tests_path"], encoding="utf-8") as f:
+                exec(compile(f.read(), job["tests_path"], "exec"), namespace)
+        except BaseException as e:
+            result["failures"].append(f"the tests could not be loaded:\n{describe(e)}")
+        for name, obj in list(namespace.items()):
+            if name.startswith("test") and inspect.isfunction(obj) and obj.__module__ == namespace["__name__"]:
+                if obj.__code__.co_argcount:
+                    continue  # pytest fixtures are not supported
+                result["tests_run"] += 1
+                try:
+                    obj()
+                except BaseException as e:
+                    result["failures"].append(f"{name}:\n{describe(e)}")
+            elif inspect.isclass(obj) and issubclass(obj, unittest.TestCase) and obj.__module__ == namespace["__name__"]:
+                outcome = unittest.TestResult()
+                unittest.defaultTestLoader.loadTestsFromTestCase(obj).run(outcome)
+                result["tests_run"] += outcome.testsRun
+                for case, text in outcome.failures + outcome.errors:
+                    result["failures"].append(f"{case.id()}:\n{text.strip()}")
+    if result["failures"]:
+        result["status"] = "failed"
+
+for stream in (sys.stdout, sys.stderr):
+    try:
+        stream.flush()
+    except Exception:
+        pass
+with open(1, "w", encoding="utf-8", closefd=False) as out:
+    out.write("\n" + job["marker"] + json.dumps(result))
+'''
+
+
+class SandboxLimits:
+    """
+    Resource limits of one sandboxed run.
+
+    Args:
+        cpu_seconds (int): CPU time before the process is killed (RLIMIT_CPU).
+        memory_mb (int): Address space limit (RLIMIT_AS); allocations beyond it
+            raise MemoryError.
+        wall_seconds (float): Wall-clock time before the parent kills the
+            process (covers sleeping and blocked programs).
+    """
+
+    def __init__(
+        self,
+        cpu_seconds: int = DEFAULT_CPU_SECONDS,
+        memory_mb: int = DEFAULT_MEMORY_MB,
+        wall_seconds: float = DEFAULT_WALL_SECONDS,
+    ):
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.wall_seconds = wall_seconds
+
+    @classmethod
+    def from_env(cls) -> "SandboxLimits":
+        """Limits from $SANDBOX_CPU_SECONDS, $SANDBOX_MEMORY_MB and $SANDBOX_WALL_SECONDS."""
+        return cls(
+            cpu_seconds=int(os.environ.get("SANDBOX_CPU_SECONDS", DEFAULT_CPU_SECONDS)),
+            memory_mb=int(os.environ.get("SANDBOX_MEMORY_MB", DEFAULT_MEMORY_MB)),
+            wall_seconds=float(os.environ.get("SANDBOX_WALL_SECONDS", DEFAULT_WALL_SECONDS)),
+        )
+
+
+class ExecutionResult(NamedTuple):
+    """
+    Outcome of one sandboxed run.
+
+    status is one of:
+        passed   the program ran and every doctest and test passed (or there were none),
+        failed   the program ran, some tests failed (see failures),
+        error    the program raised while being executed (see exception),
+        timeout  the CPU or wall-clock limit was hit,
+        crashed  the interpreter died without a report (e.g. killed for memory).
+    """
+
+    status: str
+    stdout: str
+    stderr: str
+    exception: str
+    tests_run: int
+    failures: List[str]
+    duration_s: float
+    network: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "passed"
+
+    def render(self) -> str:
+        """The result as text for a prompt (without timings, so equal runs render equally)."""
+        if self.status == "passed" and not self.tests_run:
+            lines = ["Execution passed: the program ran without errors; it has no doctests or tests."]
+        elif self.status in ("passed", "failed"):
+            passed = self.tests_run - len(self.failures)
+            lines = [f"Execution {self.status}: {passed} of {self.tests_run} doctests/tests passed."]
+        else:
+            lines = [f"Execution {self.status}."]
+        if self.exception:
+            lines.append(self.exception)
+        lines.extend(f"- {failure}" for failure in self.failures)
+        for name, text in (("stdout", self.stdout), ("stderr", self.stderr)):
+            if text.strip():
+                lines.append(f"{name}:\n{text.rstrip()}")
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        """A JSON-serializable copy, as returned by the code execution tools."""
+        return dict(self._asdict(), ok=self.ok)
+
+
+def _tidy(text, workdir: str, limit: int = OUTPUT_LIMIT) -> str:
+    """Decodes and truncates captured output, with paths relative to the job's working directory."""
+    # TimeoutExpired carries bytes even when the process was started with text=True.
+    if isinstance(text, bytes):
+        text = text.decode("utf-8", errors="replace")
+    # The temporary directory's name changes on every run; keep prompts comparable.
+    text = (text or "").replace(workdir + os.sep, "")
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}\n... ({len(text) - limit} more characters)"
+
+
+def _sandbox_env(workdir: str) -> dict:
+    env = {"PATH": os.defpath, "HOME": workdir, "TMPDIR": workdir, "LANG": "C.UTF-8"}
+    if "SYSTEMROOT" in os.environ:  # Windows cannot start Python without it
+        env["SYSTEMROOT"] = os.environ["SYSTEMROOT"]
+    return env
+
+
+def _execute(code: str, tests: str, limits: SandboxLimits, workdir: str) -> ExecutionResult:
+    solution_path = os.path.join(workdir, f"{SOLUTION_MODULE}.py")
+    tests_path = os.path.join(workdir, f"test_{SOLUTION_MODULE}.py") if tests.strip() else ""
+    with open(solution_path, "w", encoding="utf-8") as f:
+        f.write(code)
+    if tests_path:
+        with open(tests_path, "w", encoding="utf-8") as f:
+            f.write(tests)
+    marker = f"@@sandbox-result-{uuid.uuid4().hex}@@"
+    job = {
+        "workdir": workdir,
+        "module": SOLUTION_MODULE,
+        "solution_path": solution_path,
+        "tests_path": tests_path,
+        "marker": marker,
+        "limits": {"cpu_seconds": limits.cpu_seconds, "memory_mb": limits.memory_mb},
+    }
+    started = time.perf_counter()
+    try:
+        process = subprocess.run(
+            [sys.executable, "-I", "-B", "-X", "utf8", "-c", _HARNESS],
+            input=json.dumps(job), capture_output=True, text=True, encoding="utf-8", errors="replace",
+            cwd=workdir, env=_sandbox_env(workdir), timeout=limits.wall_seconds,
+        )
+    except subprocess.TimeoutExpired as e:
+        return ExecutionResult(
+            "timeout", _tidy(e.stdout, workdir), _tidy(e.stderr, workdir),
+            f"Killed after {limits.wall_seconds:g} s of wall-clock time.", 0, [], time.perf_counter() - started,
+        )
+    duration = time.perf_counter() - started
+
+    stdout, found, report = process.stdout.rpartition(marker)
+    if not found:
+        if process.returncode == -getattr(signal, "SIGXCPU", 0):
+            status, exception = "timeout", f"Killed after {limits.cpu_seconds} s of CPU time."
+        else:
+            status, exception = "crashed", f"The interpreter exited with code {process.returncode} without a report."
+        return ExecutionResult(
+            status, _tidy(process.stdout, workdir), _tidy(process.stderr, workdir), exception, 0, [], duration,
+        )
+    result = json.loads(report)
+    return ExecutionResult(
+        result["status"],
+        _tidy(stdout[:-1] if stdout.endswith("\n") else stdout, workdir),
+        _tidy(process.stderr, workdir),
+        _tidy(result["exception"], workdir),
+        result["tests_run"],
+        [_tidy(failure, workdir) for failure in result["failures"]],
+        duration,
+        result["network"],
+    )
+
+
+def run_sandboxed(code: str, tests: str = "", limits: Optional[SandboxLimits] = None) -> ExecutionResult:
+    """
+    Runs a program, its doctests and optional tests in a new sandboxed interpreter.
+
+    Args:
+        code (str): The program. It is executed as the module `solution`, so an
+            `if __name__ == "__main__":` block does not run.
+        tests (str, optional): Test code: `test_*` functions and/or
+            unittest.TestCase classes. The program's names are in scope, and
+            `from solution import ...` works too.
+        limits (SandboxLimits, optional): Defaults to SandboxLimits.from_env().
+
+    Returns:
+        ExecutionResult: The outcome; never raises for problems of the program itself.
+    """
+    with tempfile.TemporaryDirectory(prefix="sandbox-") as workdir:
+        return _execute(code, tests, limits or SandboxLimits.from_env(), workdir)
+
+
+def run_candidates(
+    candidates: Sequence[str],
+    tests: str = "",
+    limits: Optional[SandboxLimits] = None,
+    workers: Optional[int] = None,
+) -> List[ExecutionResult]:
+    """
+    Runs several versions of a program against the same tests, in parallel.
+
+    Args:
+        candidates (list[str]): Programs, each run in its own sandbox.
+        tests (str, optional): Tests run against every candidate.
+        limits (SandboxLimits, optional): Limits of each run.
+        workers (int, optional): Concurrent sandboxes; defaults to
+            $SANDBOX_WORKERS, else the number of CPUs.
+
+    Returns:
+        list[ExecutionResult]: One result per candidate, in order.
+    """
+    if not candidates:
+        return []
+    limits = limits or SandboxLimits.from_env()
+    workers = workers or int(os.environ.get("SANDBOX_WORKERS", 0)) or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(workers, len(candidates))) as pool:
+        return list(pool.map(lambda code: run_sandboxed(code, tests, limits), candidates))
@@ -0,0 +1,404 @@
+"""
+Static Review
+-------------
+
+Local checks on state["generated_code"] that run before python_reviewer_agent
+spends a model call on it:
+
+    * syntax:     ast.parse() and compile() (no code is executed), plus the
+                  SyntaxWarnings compile() raises (`x is 1`, bad escapes).
+    * lint:       pyflakes-style checks on the syntax tree - unused imports and
+                  locals, undefined names, redefinitions, f-strings without
+                  placeholders, `== None`, bare except, mutable defaults.
+    * complexity: McCabe cyclomatic complexity per function, reported above
+                  COMPLEXITY_LIMIT.
+
+static_review_callback() (the reviewer's before_agent_callback) puts the
+findings into state["static_findings"], which both the reviewer and refiner
+prompts show, and skips the reviewer's model call when it cannot add anything:
+
+    * code that does not compile goes straight to the refiner, with the
+      diagnostics as its review comments,
+    * code that is clean and unchanged since the last model review (a rejected
+      patch leaves it unchanged) is not reviewed again; the refiner retries
+      with the review it already has.
+
+The checks are written against the ast module rather than an external linter
+so the loop has no extra dependency; they favour missing a problem over
+reporting one that is not there.
+"""
+import ast
+import builtins
+import warnings
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from google.genai import types
+
+from utils.code.loop_convergence import code_fingerprint
+from utils.code.patch_protocol import GENERATED_CODE_KEY, REVIEW_COMMENTS_KEY
+
+STATIC_FINDINGS_KEY = "static_findings"
+# Fingerprint of the code the reviewer model last saw.
+REVIEWED_FINGERPRINT_KEY = "reviewed_fingerprint"
+
+# Functions more complex than this are reported (mccabe's usual threshold).
+COMPLEXITY_LIMIT = 10
+
+# Findings listed in the reviewer's context; the rest are counted.
+MAX_FINDINGS = 30
+
+_MODULE_NAMES = {"__name__", "__file__", "__doc__", "__spec__", "__loader__", "__package__", "__builtins__", "__path__"}
+# Set implicitly in class bodies (__module__, __qualname__) and methods (__class__).
+_CLASS_NAMES = {"__module__", "__qualname__", "__class__"}
+_KNOWN_NAMES = set(dir(builtins)) | _MODULE_NAMES | _CLASS_NAMES
+
+_FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda]
+
+
+class Finding(NamedTuple):
+    """One problem found in the code, with a pyflakes/mccabe-style code."""
+
+    line: int
+    code: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.message} [{self.code}]"
+
+
+class StaticReport(NamedTuple):
+    """Result of analyze_code()."""
+
+    syntax_error: Optional[Finding]
+    findings: List[Finding]
+
+    @property
+    def clean(self) -> bool:
+        return self.syntax_error is None and not self.findings
+
+    def render(self) -> str:
+        """The report as text for a prompt."""
+        if self.syntax_error:
+            return f"The code does not compile:\n- {self.syntax_error}"
+        if not self.findings:
+            return "No problems found (syntax, lint and complexity checks)."
+        lines = [f"- {finding}" for finding in self.findings[:MAX_FINDINGS]]
+        if len(self.findings) > MAX_FINDINGS:
+            lines.append(f"- ... and {len(self.findings) - MAX_FINDINGS} more")
+        return "\n".join(lines)
+
+
+# ------------------------------------------------------------------ syntax
+
+
+def _warning_code(message: str) -> str:
+    if "with a literal" in message:
+        return "F632"
+    if "escape sequence" in message:
+        return "W605"
+    return "W0"
+
+
+def check_syntax(code: str) -> Tuple[Optional[ast.Module], Optional[Finding], List[Finding]]:
+    """
+    Parses and compiles the code without running it.
+
+    Returns:
+        tuple: (syntax tree or None, syntax error Finding or None, compiler warning Findings).
+    """
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        try:
+            tree = ast.parse(code)
+            compile(tree, "<generated_code>", "exec", dont_inherit=True)
+        except (SyntaxError, ValueError) as e:
+            line = getattr(e, "lineno", None) or 0
+            message = getattr(e, "msg", None) or str(e)
+            return None, Finding(line, "E999", f"{type(e).__name__}: {message}"), []
+    # Python 3.11 reports invalid escape sequences as DeprecationWarning, 3.12 as SyntaxWarning.
+    found = [
+        Finding(warning.lineno or 0, _warning_code(str(warning.message)), str(warning.message))
+        for warning in caught
+        if issubclass(warning.category, (SyntaxWarning, DeprecationWarning))
+    ]
+    return tree, None, found
+
+
+# ------------------------------------------------------------------ lint
+
+
+def _all_bound_names(tree: ast.AST) -> Set[str]:
+    """Every name bound anywhere in the module, in any scope."""
+    bound: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.alias):
+            bound.add((node.asname or node.name).split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            bound.add(node.rest)
+    return bound
+
+
+def _annotations(tree: ast.AST) -> Iterator[ast.expr]:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.arg) and node.annotation is not None:
+            yield node.annotation
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.returns is not None:
+            yield node.returns
+        elif isinstance(node, ast.AnnAssign):
+            yield node.annotation
+
+
+def _string_annotation_names(tree: ast.AST) -> Set[str]:
+    """Names used in quoted annotations ("OrderedDict", List["Node"])."""
+    names: Set[str] = set()
+    for annotation in _annotations(tree):
+        for node in ast.walk(annotation):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                try:
+                    names |= _loaded_names(ast.parse(node.value, mode="eval"))
+                except SyntaxError:
+                    continue  # a Literal["..."] value, not a type
+    return names
+
+
+def _loaded_names(tree: ast.AST) -> Set[str]:
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)}
+
+
+def _dunder_all(tree: ast.Module) -> Set[str]:
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            if isinstance(node.value, (ast.List, ast.Tuple)):
+                return {elt.value for elt in node.value.elts if isinstance(elt, ast.Constant) and isinstance(elt.value, str)}
+    return set()
+
+
+def _unused_imports(tree: ast.Module, loaded: Set[str]) -> List[Finding]:
+    exported = _dunder_all(tree)
+    found = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            continue
+        for alias in node.names:
+            if alias.name == "*":
+                continue
+            name = (alias.asname or alias.name).split(".")[0]
+            if name not in loaded and name not in exported:
+                imported = f"{alias.name} as {alias.asname}" if alias.asname else alias.name
+                found.append(Finding(node.lineno, "F401", f"'{imported}' imported but unused"))
+    return found
+
+
+def _undefined_names(tree: ast.Module) -> List[Finding]:
+    if any(isinstance(node, ast.ImportFrom) and any(a.name == "*" for a in node.names) for node in ast.walk(tree)):
+        return []  # a star import can define anything
+    defined = _all_bound_names(tree) | _KNOWN_NAMES
+    found, reported = [], set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in defined and node.id not in reported:
+            reported.add(node.id)
+            found.append(Finding(node.lineno, "F821", f"undefined name '{node.id}'"))
+    return found
+
+
+def _function_body_nodes(function: _FunctionNode) -> Iterator[ast.AST]:
+    """Nodes of a function's own scope (nested functions and classes excluded)."""
+    pending = list(function.body) if isinstance(function.body, list) else [function.body]
+    while pending:
+        node = pending.pop()
+        yield node
+        for child in ast.iter_child_nodes(node):
+            if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                pending.append(child)
+
+
+def _unused_locals(tree: ast.Module) -> List[Finding]:
+    found = []
+    for function in ast.walk(tree):
+        if not isinstance(function, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        own = list(_function_body_nodes(function))
+        if any(isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in ("locals", "vars") for node in own):
+            continue
+        declared = {name for node in own if isinstance(node, (ast.Global, ast.Nonlocal)) for name in node.names}
+        # Loads in nested functions count: closures use the variable. So does
+        # `del name`, which ends the binding.
+        loaded = _loaded_names(function) | _string_annotation_names(function) | {
+            node.id for node in ast.walk(function) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Del)
+        }
+        assigned: Dict[str, int] = {}
+        for node in own:
+            # Only plain `name = value` / `name: T = value`; unpacking is allowed to ignore parts.
+            if isinstance(node, ast.Assign):
+                targets = [t for t in node.targets if isinstance(t, ast.Name)]
+            elif isinstance(node, ast.AnnAssign) and node.value is not None and isinstance(node.target, ast.Name):
+                targets = [node.target]
+            else:
+                continue
+            for target in targets:
+                assigned.setdefault(target.id, target.lineno)
+        for name, line in assigned.items():
+            if name not in loaded and name not in declared and not name.startswith("_"):
+                found.append(Finding(line, "F841", f"local variable '{name}' is assigned to but never used"))
+    return found
+
+
+def _redefinitions(tree: ast.Module) -> List[Finding]:
+    found = []
+    for scope in ast.walk(tree):
+        body = getattr(scope, "body", None)
+        if not isinstance(body, list):
+            continue
+        seen: Dict[str, ast.AST] = {}
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                previous = seen.get(node.name)
+                # Decorated redefinitions (@x.setter, @overload, ...) are intentional.
+                if previous is not None and not previous.decorator_list and not node.decorator_list:
+                    found.append(Finding(node.lineno, "F811", f"redefinition of '{node.name}' from line {previous.lineno}"))
+                seen[node.name] = node
+    return found
+
+
+def _comparison_findings(node: ast.Compare) -> List[Finding]:
+    found = []
+    for op, right in zip(node.ops, node.comparators):
+        if not isinstance(op, (ast.Eq, ast.NotEq)) or not isinstance(right, ast.Constant):
+            continue
+        if right.value is None:
+            found.append(Finding(node.lineno, "E711", "comparison to None should be 'is None' / 'is not None'"))
+        elif right.value is True or right.value is False:
+            found.append(Finding(node.lineno, "E712", f"comparison to {right.value} should be 'if cond:' / 'if not cond:'"))
+    return found
+
+
+def _mutable_default_findings(node: Union[ast.FunctionDef, ast.AsyncFunctionDef]) -> List[Finding]:
+    found = []
+    for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+        if isinstance(default, (ast.List, ast.Dict, ast.Set)) or (
+            isinstance(default, ast.Call) and isinstance(default.func, ast.Name) and default.func.id in ("list", "dict", "set")
+        ):
+            found.append(Finding(default.lineno, "B006", f"mutable default argument in '{node.name}' is shared between calls"))
+    return found
+
+
+def _pattern_checks(tree: ast.Module) -> List[Finding]:
+    found = []
+    # `{x:>7}` keeps its format spec as a JoinedStr without placeholders.
+    format_specs = {id(node.format_spec) for node in ast.walk(tree) if isinstance(node, ast.FormattedValue)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.JoinedStr) and id(node) not in format_specs and not any(
+            isinstance(value, ast.FormattedValue) for value in node.values
+        ):
+            found.append(Finding(node.lineno, "F541", "f-string is missing placeholders"))
+        elif isinstance(node, ast.Compare):
+            found.extend(_comparison_findings(node))
+        elif isinstance(node, ast.ExceptHandler) and node.type is None:
+            found.append(Finding(node.lineno, "E722", "bare 'except:' also catches KeyboardInterrupt and SystemExit"))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            found.extend(_mutable_default_findings(node))
+    return found
+
+
+def lint(tree: ast.Module) -> List[Finding]:
+    """pyflakes-style checks on a parsed module."""
+    return (
+        _unused_imports(tree, _loaded_names(tree) | _string_annotation_names(tree))
+        + _undefined_names(tree)
+        + _unused_locals(tree)
+        + _redefinitions(tree)
+        + _pattern_checks(tree)
+    )
+
+
+# ------------------------------------------------------------------ complexity
+
+
+def _complexity(function: _FunctionNode) -> int:
+    """
+    McCabe cyclomatic complexity of one function (nested functions excluded):
+    one plus a branch per if, loop, except clause and match case. Like mccabe,
+    boolean operators, conditional expressions and comprehensions do not count.
+    """
+    branches = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.ExceptHandler, ast.match_case)
+    return 1 + sum(isinstance(node, branches) for node in _function_body_nodes(function))
+
+
+def complexity(tree: ast.Module, limit: int = COMPLEXITY_LIMIT) -> List[Finding]:
+    """
+    Returns:
+        list[Finding]: One finding per function whose complexity exceeds limit.
+    """
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            score = _complexity(node)
+            if score > limit:
+                found.append(Finding(node.lineno, "C901", f"'{node.name}' is too complex ({score} > {limit}), consider splitting it"))
+    return found
+
+
+def analyze_code(code: str) -> StaticReport:
+    """
+    Runs the syntax, lint and complexity checks on Python source.
+
+    Args:
+        code (str): Python source; it is parsed and compiled, never executed.
+
+    Returns:
+        StaticReport: The syntax error, if any, and the other findings by line.
+    """
+    tree, syntax_error, found = check_syntax(code)
+    if syntax_error:
+        return StaticReport(syntax_error, [])
+    found = found + lint(tree) + complexity(tree)
+    return StaticReport(None, sorted(found, key=lambda finding: (finding.line, finding.code)))
+
+
+# ------------------------------------------------------------------ review loop
+
+
+def _skip_review(message: str) -> types.Content:
+    return types.Content(role="model", parts=[types.Part(text=message)])
+
+
+def static_review_callback(callback_context) -> Optional[types.Content]:
+    """
+    before_agent_callback for the reviewer: runs analyze_code() on the current
+    code and decides whether the reviewer model needs to see it.
+
+    Args:
+        callback_context: ADK CallbackContext.
+
+    Returns:
+        Content: A note that replaces the review (the loop goes on to the refiner),
+            or None to run the reviewer with the findings in its context.
+    """
+    state = callback_context.state
+    code = state.get(GENERATED_CODE_KEY) or ""
+    report = analyze_code(code)
+    state[STATIC_FINDINGS_KEY] = report.render()
+
+    if report.syntax_error:
+        state[REVIEW_COMMENTS_KEY] = f"{report.render()}\nFix this first; the code must compile before it can be reviewed."
+        return _skip_review(f"Static review: {report.syntax_error}. Sent to the refiner without a model review.")
+
+    fingerprint = code_fingerprint(code)
+    if report.clean and fingerprint == state.get(REVIEWED_FINGERPRINT_KEY):
+        return _skip_review("Static review: the code is clean and unchanged since the last review. Review skipped.")
+    state[REVIEWED_FINGERPRINT_KEY] = fingerprint
+    return None
@@ -0,0 +1,242 @@
+"""
+Unified Diff
+------------
+
+Parses and applies unified diffs (``diff -u`` / ``git diff`` format) to an
+in-memory source string, and renders the changed regions of the result for
+review.
+
+LLM-written diffs are rarely byte perfect, so the applier is lenient where
+``patch`` is lenient and strict where correctness depends on it:
+
+    * hunk line counts in the ``@@`` headers are ignored (models miscount them);
+      a hunk ends at the next header or at the end of the diff.
+    * a hunk is searched for around its stated line number, so line numbers
+      that drift are tolerated.
+    * context and removed lines must match the source exactly (trailing
+      whitespace aside); otherwise the whole patch is rejected with PatchError
+      and the source is left untouched.
+"""
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+_HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+_CODE_FENCE = re.compile(r"^\s*```[\w+-]*\s*\n(.*?)\n?\s*```\s*$", re.DOTALL)
+
+
+class PatchError(ValueError):
+    """Raised when a diff cannot be parsed or does not apply to the source."""
+
+
+class Hunk(NamedTuple):
+    """One ``@@`` section of a unified diff."""
+
+    old_start: int
+    # Each line is (tag, text) with tag in " ", "-", "+".
+    lines: List[Tuple[str, str]]
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "+"]
+
+    @property
+    def new_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "-"]
+
+
+class AppliedPatch(NamedTuple):
+    """Result of apply_unified_diff()."""
+
+    code: str
+    # (first, last) 1-based line ranges in the new code touched by the patch.
+    # A pure deletion is reported as the line that now follows the gap.
+    changed_ranges: List[Tuple[int, int]]
+
+
+def strip_code_fences(text: str) -> str:
+    """
+    Removes a surrounding markdown code fence (```diff ... ```), if any.
+
+    Args:
+        text (str): Raw model output.
+
+    Returns:
+        str: The text inside the fence, or the original text.
+    """
+    match = _CODE_FENCE.match(text)
+    return match.group(1) if match else text
+
+
+def parse_unified_diff(diff_text: str) -> List[Hunk]:
+    """
+    Parses the hunks of a single-file unified diff.
+
+    File headers (``---``/``+++``, ``diff --git``, ``index``) are skipped.
+
+    Args:
+        diff_text (str): The diff.
+
+    Returns:
+        list[Hunk]: The hunks, in order. Empty if the diff has no hunks.
+
+    Raises:
+        PatchError: If a hunk contains a line that is not context, removal or addition.
+    """
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    for line_no, line in enumerate(diff_text.rstrip("\n").splitlines(), start=1):
+        header = _HUNK_HEADER.match(line)
+        if header:
+            current = Hunk(old_start=int(header.group(1)), lines=[])
+            hunks.append(current)
+        elif current is None or line.startswith("\\"):
+            # Preamble before the first hunk, or "\ No newline at end of file".
+            continue
+        elif line.startswith(("--- ", "+++ ", "diff ", "index ")) and not current.lines:
+            continue
+        elif line.startswith(("--- ", "diff ")):
+            # Header of a second file; this applier only handles one file.
+            current = None
+        elif line == "":
+            # Editors and models often drop the single space of empty context lines.
+            current.lines.append((" ", ""))
+        elif line[0] in " -+":
+            current.lines.append((line[0], line[1:]))
+        else:
+            raise PatchError(f"Line {line_no} of the diff is not part of a hunk: {line!r}")
+    return [hunk for hunk in hunks if hunk.lines]
+
+
+def _matches_at(source: List[str], position: int, expected: List[str]) -> bool:
+    if position < 0 or position + len(expected) > len(source):
+        return False
+    return all(source[position + i].rstrip() == line.rstrip() for i, line in enumerate(expected))
+
+
+def _find_hunk(source: List[str], hunk: Hunk, start: int, offset: int) -> Optional[int]:
+    """Finds where the hunk's old lines are, searching outward from where the header says."""
+    expected = hunk.old_lines
+    if not expected:
+        # Pure insertion: "@@ -N,0 +M,k @@" inserts after line N.
+        return max(start, min(len(source), hunk.old_start + offset))
+    guess = max(start, hunk.old_start - 1 + offset)
+    for distance in range(max(guess, len(source)) + 1):
+        for position in (guess - distance, guess + distance) if distance else (guess,):
+            if position >= start and _matches_at(source, position, expected):
+                return position
+    return None
+
+
+def apply_unified_diff(source: str, diff_text: str) -> AppliedPatch:
+    """
+    Applies a unified diff to a source string.
+
+    Args:
+        source (str): The current code.
+        diff_text (str): A unified diff against that code.
+
+    Returns:
+        AppliedPatch: The patched code and the line ranges that changed.
+
+    Raises:
+        PatchError: If the diff is malformed, has no hunks, or any hunk does
+            not match the source. No partial result is produced.
+    """
+    hunks = parse_unified_diff(strip_code_fences(diff_text))
+    if not hunks:
+        raise PatchError("The diff contains no hunks.")
+
+    old = source.splitlines()
+    new: List[str] = []
+    changed_ranges: List[Tuple[int, int]] = []
+    cursor = 0  # next unconsumed line of the old source
+    offset = 0  # drift between stated and actual positions so far
+    for index, hunk in enumerate(hunks, start=1):
+        position = _find_hunk(old, hunk, cursor, offset)
+        if position is None:
+            first = next(iter(hunk.old_lines), "")
+            raise PatchError(
+                f"Hunk {index} (@@ -{hunk.old_start} @@) does not match the code; "
+                f"could not find the lines starting with {first!r}."
+            )
+        if hunk.old_lines:
+            offset = position - (hunk.old_start - 1)
+        new.extend(old[cursor:position])
+
+        # Record the changed lines of this hunk in new-file coordinates.
+        first_changed = last_changed = None
+        for tag, text in hunk.lines:
+            if tag == "-":
+                first_changed = first_changed or len(new) + 1
+                last_changed = max(last_changed or 0, len(new) + 1)
+                continue
+            new.append(text)
+            if tag == "+":
+                first_changed = first_changed or len(new)
+                last_changed = len(new)
+        if first_changed is not None:
+            changed_ranges.append((first_changed, last_changed))
+        cursor = position + len(hunk.old_lines)
+    new.extend(old[cursor:])
+    # A deletion at the very end points one past the last line.
+    last_line = max(len(new), 1)
+    changed_ranges = [(min(first, last_line), min(last, last_line)) for first, last in changed_ranges]
+
+    code = "\n".join(new)
+    if new and (source.endswith("\n") or not source):
+        code += "\n"
+    return AppliedPatch(code=code, changed_ranges=changed_ranges)
+
+
+def render_changed_regions(code: str, changed_ranges: List[Tuple[int, int]], context: int = 3) -> str:
+    """
+    Renders only the changed regions of the code, with line numbers and context.
+
+    Overlapping or adjacent regions are merged; gaps are shown as "...".
+    Changed lines are marked with ">".
+
+    Args:
+        code (str): The (patched) code.
+        changed_ranges (list): 1-based (first, last) line ranges, e.g. from AppliedPatch.
+        context (int): Unchanged lines to show around every change.
+
+    Returns:
+        str: The excerpt, or an empty string if nothing changed.
+    """
+    lines = code.splitlines()
+    if not lines or not changed_ranges:
+        return ""
+    changed = {n for first, last in changed_ranges for n in range(first, last + 1)}
+    windows: List[List[int]] = []
+    for first, last in sorted(changed_ranges):
+        start, end = max(1, first - context), min(len(lines), last + context)
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+
+    width = len(str(len(lines)))
+    out: List[str] = []
+    for start, end in windows:
+        if start > 1:
+            out.append("...")
+        for n in range(start, end + 1):
+            out.append(f"{'>' if n in changed else ' '} {n:>{width}} | {lines[n - 1]}")
+    if windows[-1][1] < len(lines):
+        out.append("...")
+    return "\n".join(out)
+
+
+def number_lines(code: str) -> str:
+    """
+    Prefixes every line of the code with its 1-based line number.
+
+    Args:
+        code (str): The code.
+
+    Returns:
+        str: The numbered code, in the same layout as render_changed_regions().
+    """
+    lines = code.splitlines()
+    width = len(str(len(lines)))
+    return "\n".join(f"  {n:>{width}} | {line}" for n, line in enumerate(lines, start=1))
@@ -0,0 +1,47 @@
+"""
+Lazy Imports
+------------
+
+Package-level names that are imported on first access (PEP 562).
+
+The agents, tools and utils packages re-export their factories and helpers
+(`from agents import get_system_info_agent`), but importing a package must not
+import every agent, prompt and tool module behind it: entry scripts would pay
+for agents they never run, and one broken agent module would break them all.
+lazy_exports() returns the module-level __getattr__ and __dir__ that import a
+name's module only when the name is first used, then cache it in the package.
+
+Usage (in a package's __init__.py):
+    from utils.lazy_imports import lazy_exports
+
+    _EXPORTS = {"get_system_info_agent": "agents.system_info_agent.system_info_agent"}
+    __all__ = sorted(_EXPORTS)
+    __getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
+"""
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """
+    Args:
+        package (str): The package's __name__.
+        exports (dict): Exported name -> module that defines it.
+
+    Returns:
+        tuple: (__getattr__, __dir__) for the package's module namespace.
+    """
+    def __getattr__(name: str) -> Any:
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name), name)
+        # Later lookups find the name directly and skip __getattr__.
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[package])) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,7 +1,13 @@
+import asyncio
+from typing import Optional
+
 from google.genai import types
-from colorama import Fore, Back, Style
+
+from utils.llm.deadline import DEADLINE_EXCEEDED_MARKER, Deadline, reset_current_deadline, set_current_deadline
 
 async def process_agent_response_old(event): 
+   from colorama import Back, Fore, Style
+
    print(f"Event ID: {event.id}, Author: {event.author}")
 
    if event.content and event.content.parts:
@@ -35,6 +41,8 @@ async def process_agent_response(event):
     Logs event details and extracts text if the event is final.
     This function should not cause premature returns from the main event loop.
     """
+    from colorama import Back, Fore, Style  # imported on first use, not at startup
+
     print(f"Event ID: {event.id}, Author: {event.author}, Is Final for this event source: {event.is_final_response()}")
 
     extracted_text = None
@@ -67,10 +75,26 @@ async def process_agent_response(event):
     return extracted_text
 
 
-async def call_agent_async(runner, user_id, session_id, message):
+async def call_agent_async(runner, user_id, session_id, message, timeout: Optional[float] = None, budget_weights: Optional[dict] = None):
     """
     Calls the agent asynchronously and waits for the final response of the entire agent execution.
+
+    Args:
+        runner: The ADK Runner to run.
+        user_id (str): The user id of the session.
+        session_id (str): The session id.
+        message (str): The user message.
+        timeout (float, optional): End-to-end deadline for this turn in seconds. The budget is
+            split across sub-agents by the callbacks from utils.llm.deadline.apply_deadline_budgets().
+            When it runs out, whatever is still in flight is cancelled and the partial result is
+            returned instead of raising.
+        budget_weights (dict, optional): Relative budget weight per agent name (see Deadline).
+
+    Returns:
+        str: The final response text, or the partial result if the deadline was reached.
     """
+    from colorama import Back, Fore, Style  # imported on first use, not at startup
+
     print(Back.GREEN + f"Calling agent (User: {user_id}, Session: {session_id}) with message: '{message}'" + Style.RESET_ALL)
 
     # Ensure you are using the correct Content and Part objects expected by your ADK version
@@ -78,33 +102,55 @@ async def call_agent_async(runner, user_id, session_id, message):
     new_message_content = types.Content(role="user", parts=[types.Part(text=message)])
 
     overall_final_response_text = None
+    last_agent_text = None  # latest final text that is not a deadline notice
+    deadline_reached = False
 
     # Run the agent with the message, streaming events as they arrive
-    async for event in runner.run_async(user_id=user_id,
-                                        session_id=session_id,
-                                        new_message=new_message_content): # ADK might use 'request=' or other param name
-
-        print(f"--- Processing Event (ID: {event.id}) ---")
-        # Log event details and potentially get text if this event itself is marked final
-        text_from_this_event = await process_agent_response(event)
-
-        # The key is to only capture the text as the *overall* final response
-        # when the event indicates it's the final one for the whole runner.run_async call.
-        # For a SequentialAgent, this means the last agent in the sequence has completed.
-        if event.is_final_response():
-            if text_from_this_event:
-                overall_final_response_text = text_from_this_event
-                # print(f"{Back.CYAN}{Fore.BLACK}Captured Overall Final Response: {overall_final_response_text}{Style.RESET_ALL}")
-            elif event.content and event.content.parts and hasattr(event.content.parts[0], "text") and event.content.parts[0].text:
-                # Fallback if log_and_extract didn't pick it up but it's plainly there
-                overall_final_response_text = event.content.parts[0].text.strip()
-                print(f"{Back.CYAN}{Fore.BLACK}Captured Overall Final Response (fallback): {overall_final_response_text}{Style.RESET_ALL}")
-            else:
-                # This might happen if the final event is just a marker without text,
-                # or if the text was in a previous event that wasn't THE final one.
-                # Or, if the final output is structured data not in a simple text part.
-                print(f"{Back.RED}Final event (ID: {event.id}) received, but no straightforward text found in its parts for the overall response. The actual final data might have been in an earlier event if the agent produces complex output before signaling completion.{Style.RESET_ALL}")
-
+    events = runner.run_async(user_id=user_id,
+                              session_id=session_id,
+                              new_message=new_message_content) # ADK might use 'request=' or other param name
+    deadline_token = set_current_deadline(Deadline(timeout, budget_weights) if timeout else None)
+    try:
+        # asyncio.timeout(None) never fires, so this is a plain loop when no timeout is given.
+        async with asyncio.timeout(timeout):
+            async for event in events:
+                print(f"--- Processing Event (ID: {event.id}) ---")
+                # Log event details and potentially get text if this event itself is marked final
+                text_from_this_event = await process_agent_response(event)
+
+                # The key is to only capture the text as the *overall* final response
+                # when the event indicates it's the final one for the whole runner.run_async call.
+                # For a SequentialAgent, this means the last agent in the sequence has completed.
+                if event.is_final_response():
+                    if text_from_this_event:
+                        overall_final_response_text = text_from_this_event
+                        # print(f"{Back.CYAN}{Fore.BLACK}Captured Overall Final Response: {overall_final_response_text}{Style.RESET_ALL}")
+                    elif event.content and event.content.parts and hasattr(event.content.parts[0], "text") and event.content.parts[0].text:
+                        # Fallback if log_and_extract didn't pick it up but it's plainly there
+                        overall_final_response_text = event.content.parts[0].text.strip()
+                        print(f"{Back.CYAN}{Fore.BLACK}Captured Overall Final Response (fallback): {overall_final_response_text}{Style.RESET_ALL}")
+                    else:
+                        # This might happen if the final event is just a marker without text,
+                        # or if the text was in a previous event that wasn't THE final one.
+                        # Or, if the final output is structured data not in a simple text part.
+                        print(f"{Back.RED}Final event (ID: {event.id}) received, but no straightforward text found in its parts for the overall response. The actual final data might have been in an earlier event if the agent produces complex output before signaling completion.{Style.RESET_ALL}")
+                    if overall_final_response_text and not overall_final_response_text.startswith(DEADLINE_EXCEEDED_MARKER):
+                        last_agent_text = overall_final_response_text
+    except TimeoutError:
+        # Cancellation has already unwound the agents; keep what they produced so far.
+        deadline_reached = True
+    finally:
+        await events.aclose()
+        reset_current_deadline(deadline_token)
+
+    # Write-behind session services commit at the end of every turn.
+    flush_async = getattr(runner.session_service, "flush_async", None)
+    if flush_async is not None:
+        await flush_async()
+
+    if deadline_reached or (overall_final_response_text or "").startswith(DEADLINE_EXCEEDED_MARKER):
+        print(Back.YELLOW + Fore.BLACK + f"Turn deadline of {timeout}s reached, returning partial result." + Style.RESET_ALL)
+        return f"{last_agent_text or 'No agent finished before the deadline.'}\n\n{DEADLINE_EXCEEDED_MARKER} Partial result: the {timeout:g}s turn deadline was reached before every agent finished."
 
     # The loop has completed, meaning the runner.run_async has finished.
     # overall_final_response_text should now hold the final text from the SequentialAgent.
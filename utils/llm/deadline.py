@@ -0,0 +1,459 @@
+"""
+Deadline Budgets
+----------------
+
+End-to-end deadlines for a single user turn, split across the agent tree.
+
+A caller passes a timeout to call_agent_async(). The resulting Deadline is
+published through a context variable, and the callbacks attached by
+apply_deadline_budgets() divide what is left of it between sub-agents:
+
+    * SequentialAgent children share the remaining time with the siblings that
+      still have to run (optionally weighted).
+    * LoopAgent children additionally share it with the next pass, if
+      max_iterations allows one (LOOP_PASSES_PLANNED). The review loop usually
+      converges after a pass or two, so planning for every allowed pass would
+      starve the passes that do run; the turn deadline still stops the loop.
+    * ParallelAgent and DagAgent children, and the sub-agents of any other
+      agent, each get the parent's full remaining time (a DagAgent node starts
+      when its inputs are ready, not in a fixed order).
+
+Enforcement:
+    * before_agent_callback skips an agent whose budget is already gone (and
+      escalates, so a LoopAgent stops instead of spinning through skips).
+    * before_model_callback skips the model call when the agent is out of time.
+    * DeadlineLlm, the agent's model wrapper, ends a model call that outlives
+      the agent budget (asyncio.timeout, or a transport timeout) with a deadline
+      notice as the response, so the next agent still runs.
+    * DeadlineTool cancels tool calls that outlive the agent budget and returns
+      an error dict the model can read.
+    * call_agent_async() cancels whatever is still in flight when the whole
+      turn runs out and returns the partial result instead of raising.
+"""
+import asyncio
+import contextvars
+import inspect
+import os
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union
+
+import httpx
+from google.adk.agents import BaseAgent, LlmAgent, LoopAgent, SequentialAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.adk.tools import BaseTool, FunctionTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+from utils.callback_chain import chain_callbacks, has_callback
+
+# Texts produced by skipped agents/model calls start with this marker so
+# callers can tell them apart from real agent output.
+DEADLINE_EXCEEDED_MARKER = "[deadline exceeded]"
+
+# Never hand an agent less than this, a model call cannot finish faster anyway.
+MIN_AGENT_BUDGET_S = 0.5
+
+# Passes of a bounded LoopAgent its children's budget is planned for: the
+# current one and the next.
+LOOP_PASSES_PLANNED = 2
+
+# (invocation branch, agent name): one run of an agent. The same agent can run
+# concurrently in several branches (plan executor workers, DAG nodes), each
+# with its own budget.
+RunKey = Tuple[Optional[str], str]
+
+
+def run_key(invocation_context) -> RunKey:
+    """
+    Returns:
+        RunKey: The key of the agent run an InvocationContext belongs to.
+    """
+    return invocation_context.branch, invocation_context.agent.name
+
+
+def get_turn_timeout() -> Optional[float]:
+    """
+    Reads the per-turn deadline from $TURN_TIMEOUT_SECONDS.
+
+    Returns:
+        float: The timeout in seconds, or None (no deadline) when unset or 0.
+    """
+    value = os.environ.get("TURN_TIMEOUT_SECONDS")
+    return float(value) if value and float(value) > 0 else None
+
+
+class Deadline:
+    """
+    An absolute point in time by which a user turn must finish.
+
+    Args:
+        timeout_s (float): Seconds from now until the deadline.
+        weights (dict, optional): Relative budget weight per agent name (default 1.0).
+            E.g. {"web_scrape_single_page_agent": 3} gives the scraper three
+            times the share of its sequential siblings.
+    """
+
+    def __init__(self, timeout_s: float, weights: Optional[Dict[str, float]] = None):
+        self.timeout_s = timeout_s
+        self.expires_at = time.monotonic() + timeout_s
+        self.weights = weights or {}
+        # run key -> absolute expiry (time.monotonic()) of that agent run
+        self.run_expires_at: Dict[RunKey, float] = {}
+        # run key of a LoopAgent -> number of passes started
+        self.loop_passes: Dict[RunKey, int] = {}
+
+    def remaining(self, run: Optional[RunKey] = None) -> float:
+        """
+        Seconds left for the whole turn, or for one agent run.
+
+        Args:
+            run (RunKey, optional): The agent run whose budget to check (see
+                run_key()); an unknown run has the rest of the turn.
+
+        Returns:
+            float: Remaining seconds, never negative.
+        """
+        expires_at = self.run_expires_at.get(run, self.expires_at) if run else self.expires_at
+        return max(0.0, min(expires_at, self.expires_at) - time.monotonic())
+
+    def expired(self, run: Optional[RunKey] = None) -> bool:
+        """Whether the turn (or the given agent run's budget) has run out."""
+        return self.remaining(run) <= 0.0
+
+    def parent_run(self, agent: BaseAgent, branch: Optional[str]) -> Optional[RunKey]:
+        """
+        The run of an agent's parent that a run in `branch` belongs to.
+
+        A child's branch extends its parent's (or equals it), so the parent's
+        run is the one under the longest prefix of the branch.
+
+        Returns:
+            RunKey: The parent's run, (None, parent name) if it was not
+                started under a deadline, or None for the root agent.
+        """
+        parent = agent.parent_agent
+        if parent is None:
+            return None
+        prefix = branch
+        while prefix:
+            if (prefix, parent.name) in self.run_expires_at:
+                return prefix, parent.name
+            prefix = prefix.rpartition(".")[0]
+        return None, parent.name
+
+    def _weight(self, agent: BaseAgent) -> float:
+        return float(self.weights.get(agent.name, 1.0))
+
+    def start_agent(self, agent: BaseAgent, branch: Optional[str] = None) -> float:
+        """
+        Assigns a budget to an agent run that is about to start.
+
+        Args:
+            agent (BaseAgent): The agent starting now.
+            branch (str, optional): The branch of its invocation context.
+
+        Returns:
+            float: The budget in seconds given to the run.
+        """
+        parent = agent.parent_agent
+        parent_run = self.parent_run(agent, branch)
+        available = self.remaining(parent_run)
+        share = available
+        if isinstance(parent, (SequentialAgent, LoopAgent)) and agent in parent.sub_agents:
+            siblings = parent.sub_agents
+            index = siblings.index(agent)
+            pending_weight = sum(self._weight(sibling) for sibling in siblings[index:])
+            if isinstance(parent, LoopAgent):
+                if index == 0:
+                    self.loop_passes[parent_run] = self.loop_passes.get(parent_run, 0) + 1
+                if parent.max_iterations:
+                    passes_left = max(0, parent.max_iterations - self.loop_passes.get(parent_run, 1))
+                    pending_weight += min(passes_left, LOOP_PASSES_PLANNED - 1) * sum(self._weight(sibling) for sibling in siblings)
+            if not isinstance(parent, LoopAgent) or parent.max_iterations:
+                share = available * self._weight(agent) / pending_weight
+            # An unbounded LoopAgent cannot be planned for; each child simply
+            # gets what is left, and the turn deadline stops the loop.
+        if available > 0:
+            share = min(available, max(share, MIN_AGENT_BUDGET_S))
+        self.run_expires_at[(branch, agent.name)] = time.monotonic() + share
+        return share
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar(
+    "adk_turn_deadline", default=None
+)
+# The agent run whose model call is starting; set by deadline_before_model_callback()
+# in the task that then calls the model.
+_model_call_run: contextvars.ContextVar[Optional[RunKey]] = contextvars.ContextVar(
+    "adk_model_call_run", default=None
+)
+
+
+def get_current_deadline() -> Optional[Deadline]:
+    """Returns the Deadline of the turn being run in this context, if any."""
+    return _current_deadline.get()
+
+
+def set_current_deadline(deadline: Optional[Deadline]) -> contextvars.Token:
+    """
+    Publishes a Deadline to everything run from the current context.
+
+    ParallelAgent runs sub-agents in tasks that copy the context, so setting it
+    once before runner.run_async() reaches every branch.
+
+    Args:
+        deadline (Deadline, optional): The deadline, or None to clear it.
+
+    Returns:
+        contextvars.Token: Pass it to reset_current_deadline() when the turn ends.
+    """
+    return _current_deadline.set(deadline)
+
+
+def reset_current_deadline(token: contextvars.Token) -> None:
+    """Restores the deadline that was current before set_current_deadline()."""
+    _current_deadline.reset(token)
+
+
+def current_model_run(agent_name: str) -> RunKey:
+    """
+    The agent run a model call belongs to, for code that only sees the model
+    request (model wrappers such as DeadlineLlm and ModelRouter).
+
+    Args:
+        agent_name (str): The agent, used when no deadline callback ran.
+
+    Returns:
+        RunKey: The run set by deadline_before_model_callback(), or (None, agent_name).
+    """
+    run = _model_call_run.get()
+    return run if run is not None and run[1] == agent_name else (None, agent_name)
+
+
+def _deadline_content(message: str) -> types.Content:
+    return types.Content(role="model", parts=[types.Part(text=f"{DEADLINE_EXCEEDED_MARKER} {message}")])
+
+
+def deadline_before_agent_callback(callback_context) -> Optional[types.Content]:
+    """
+    Gives the starting agent its share of the turn budget, or skips it when
+    nothing is left.
+
+    Args:
+        callback_context: ADK CallbackContext.
+
+    Returns:
+        Content: A deadline notice that replaces the agent run, or None to run normally.
+    """
+    deadline = get_current_deadline()
+    if deadline is None:
+        return None
+    invocation_context = callback_context._invocation_context
+    agent = invocation_context.agent
+    if deadline.expired(deadline.parent_run(agent, invocation_context.branch)):
+        # Escalating makes an enclosing LoopAgent stop instead of skipping
+        # through all of its remaining iterations.
+        callback_context._event_actions.escalate = True
+        return _deadline_content(f"Agent '{agent.name}' was skipped, the turn is out of time.")
+    deadline.start_agent(agent, invocation_context.branch)
+    return None
+
+
+def deadline_before_model_callback(callback_context, llm_request) -> Optional[LlmResponse]:
+    """
+    Skips the model call once the agent is out of time (DeadlineLlm ends a call
+    that runs out of time on the way).
+
+    Args:
+        callback_context: ADK CallbackContext.
+        llm_request: ADK LlmRequest about to be sent.
+
+    Returns:
+        LlmResponse: A deadline notice that replaces the model call, or None.
+    """
+    deadline = get_current_deadline()
+    if deadline is None:
+        return None
+    run = run_key(callback_context._invocation_context)
+    if deadline.expired(run):
+        return LlmResponse(content=_deadline_content(f"Agent '{run[1]}' ran out of time before calling the model."))
+    _model_call_run.set(run)
+    return None
+
+
+class DeadlineLlm(BaseLlm):
+    """
+    The model of an agent under deadline budgets: runs the agent's own model
+    and, while a Deadline is current, ends a call that outlives the agent
+    budget with a deadline notice instead of an exception.
+
+    The budget is enforced with asyncio.timeout around each response, so a
+    hanging call is cancelled at the budget; a transport timeout raised by
+    the model client (httpx.TimeoutException) is answered the same way.
+
+    Attributes:
+        llm: The agent's model: a model name (resolved on every call, as ADK
+            does) or a BaseLlm such as a ModelRouter.
+        agent_name: The agent whose budget applies.
+    """
+
+    llm: Union[str, BaseLlm]
+    agent_name: str
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        # Never resolved by name; apply_deadline_budgets() sets it on agents directly.
+        return []
+
+    def _llm(self) -> BaseLlm:
+        return self.llm if isinstance(self.llm, BaseLlm) else LLMRegistry.new_llm(self.llm)
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        """
+        Yields the model's responses until the agent budget runs out.
+
+        Args:
+            llm_request (LlmRequest): The request.
+            stream (bool): Whether to do a streaming call.
+
+        Yields:
+            LlmResponse: The model's responses, then a deadline notice if the
+                budget ran out before the call finished.
+        """
+        responses = self._llm().generate_content_async(llm_request, stream=stream)
+        deadline = get_current_deadline()
+        if deadline is None:
+            async for llm_response in responses:
+                yield llm_response
+            return
+        expires_at = asyncio.get_running_loop().time() + deadline.remaining(current_model_run(self.agent_name))
+        try:
+            while True:
+                try:
+                    # Only the wait for the model is timed, never the caller's work between responses.
+                    async with asyncio.timeout_at(expires_at):
+                        llm_response = await anext(responses)
+                except StopAsyncIteration:
+                    return
+                except TimeoutError:
+                    yield LlmResponse(content=_deadline_content(
+                        f"The model call of agent '{self.agent_name}' was cut off, the agent ran out of time."
+                    ))
+                    return
+                except httpx.TimeoutException as e:
+                    yield LlmResponse(content=_deadline_content(
+                        f"The model call of agent '{self.agent_name}' timed out ({type(e).__name__})."
+                    ))
+                    return
+                yield llm_response
+        finally:
+            await responses.aclose()
+
+
+def _agent_model(agent: LlmAgent) -> Optional[Union[str, BaseLlm]]:
+    """The model an LlmAgent uses, its own or inherited, without a DeadlineLlm around it; None if it has none."""
+    current = agent
+    while isinstance(current, LlmAgent):
+        if current.model:
+            return current.model.llm if isinstance(current.model, DeadlineLlm) else current.model
+        current = current.parent_agent
+    return None
+
+
+def _run_function_tool_in_thread(tool: FunctionTool, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+    """Runs a synchronous FunctionTool on a worker thread with its own event loop."""
+    return asyncio.run(tool.run_async(args=args, tool_context=tool_context))
+
+
+class DeadlineTool(BaseTool):
+    """
+    Wraps a tool so a call is cancelled once the calling agent's budget is gone.
+
+    Synchronous function tools (requests, subprocess, psutil...) are moved to a
+    worker thread so that the wait can be cancelled without blocking the event
+    loop. A cancelled worker thread still runs to completion in the
+    background; its result is discarded.
+
+    Args:
+        tool (BaseTool): The tool to wrap.
+    """
+
+    def __init__(self, tool: BaseTool):
+        super().__init__(name=tool.name, description=tool.description, is_long_running=tool.is_long_running)
+        self.tool = tool
+
+    def _get_declaration(self):
+        return self.tool._get_declaration()
+
+    async def run_async(self, *, args: Dict[str, Any], tool_context: ToolContext) -> Any:
+        """
+        Runs the wrapped tool within the remaining agent budget.
+
+        Args:
+            args (dict): The tool arguments from the model.
+            tool_context (ToolContext): ADK tool context.
+
+        Returns:
+            The tool result, or {"error": ...} if the budget ran out.
+        """
+        deadline = get_current_deadline()
+        if deadline is None:
+            return await self.tool.run_async(args=args, tool_context=tool_context)
+
+        run = run_key(tool_context._invocation_context)
+        agent_name = run[1]
+        remaining = deadline.remaining(run)
+        if remaining <= 0.0:
+            return {"error": f"{DEADLINE_EXCEEDED_MARKER} Tool '{self.name}' was not run, agent '{agent_name}' is out of time."}
+
+        if isinstance(self.tool, FunctionTool) and not inspect.iscoroutinefunction(self.tool.func):
+            call = asyncio.to_thread(_run_function_tool_in_thread, self.tool, args, tool_context)
+        else:
+            call = self.tool.run_async(args=args, tool_context=tool_context)
+        try:
+            return await asyncio.wait_for(call, timeout=remaining)
+        except asyncio.TimeoutError:
+            return {
+                "error": f"{DEADLINE_EXCEEDED_MARKER} Tool '{self.name}' was cancelled after {remaining:.1f}s,"
+                         f" agent '{agent_name}' ran out of time. Answer with the information you already have."
+            }
+
+
+def apply_deadline_budgets(agent: BaseAgent) -> BaseAgent:
+    """
+    Attaches deadline enforcement to every agent in a tree.
+
+    Existing callbacks are kept; the deadline callbacks run first so an agent
+    that is out of time does no work at all. Agents only enforce anything while
+    a Deadline is current (see call_agent_async(timeout=...)), so an
+    instrumented tree behaves exactly as before when no timeout is passed.
+
+    Args:
+        agent (BaseAgent): The root of the agent tree.
+
+    Returns:
+        BaseAgent: The same agent, for chaining.
+    """
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if has_callback(current.before_agent_callback, deadline_before_agent_callback):
+            continue
+        current.before_agent_callback = chain_callbacks(deadline_before_agent_callback, current.before_agent_callback)
+        if isinstance(current, LlmAgent):
+            current.before_model_callback = chain_callbacks(deadline_before_model_callback, current.before_model_callback)
+            model = _agent_model(current)
+            if model is not None:
+                name = model.model if isinstance(model, BaseLlm) else model
+                current.model = DeadlineLlm(model=name, llm=model, agent_name=current.name)
+            current.tools = [
+                tool if isinstance(tool, DeadlineTool)
+                else DeadlineTool(tool if isinstance(tool, BaseTool) else FunctionTool(tool))
+                for tool in current.tools
+            ]
+    return agent
+
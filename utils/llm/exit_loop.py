@@ -1,9 +1,30 @@
-from adk.tools.tool_context import ToolContext
+"""
+Exit Loop Tool
+--------------
 
+exit_loop() is the tool an agent inside a LoopAgent calls once its work is
+done (python_reviewer_agent calls it when it is satisfied with the code).
 
-def exit_loop(tool_context : ToolContext):
+ADK's LoopAgent stops as soon as a sub-agent yields an event whose actions
+escalate, so setting tool_context.actions.escalate on the tool's response
+event ends the loop there, instead of after max_iterations. Summarization is
+skipped as well: the agent's turn ends with the tool response instead of
+another model call to comment on it.
+"""
+from google.adk.tools.tool_context import ToolContext
+
+
+def exit_loop(tool_context: ToolContext) -> dict:
     """
-    This tool should be called when the agent wants to exit a loop,
-    indicating that all tasks within that loop are completed.
+    Call this tool when you are completely satisfied and no further iterations
+    are needed. It ends the review loop.
+
+    Args:
+        tool_context (ToolContext): ADK tool context.
+
+    Returns:
+        dict: Confirmation that the loop will stop.
     """
     tool_context.actions.escalate = True
+    tool_context.actions.skip_summarization = True
+    return {"status": "loop exited"}
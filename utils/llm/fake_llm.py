@@ -0,0 +1,168 @@
+"""
+Fake LLM
+--------
+
+A local, deterministic stand-in for Gemini, so pipelines, the model router
+(utils/llm/model_router.py) and benchmarks run without an API key or network.
+
+FakeLlm accepts any model name. Each name has a FakeModelProfile: the latency
+of a call and a capability between 0 and 1. Every request gets a difficulty
+between 0 and 1 (FakeLlm.difficulty_of, by default from the prompt length).
+A model whose capability covers the difficulty answers well:
+
+    * it calls the first declared tool that takes no arguments, until the
+      request holds that tool's response,
+    * otherwise it answers with text, or with JSON matching the response
+      schema if the request has one,
+    * the response's avg_logprobs says it is confident (FAKE_CONFIDENT).
+
+A weaker model answers with less confidence, the further it falls short, and
+returns invalid JSON where a schema is expected. Responses carry
+usage_metadata (characters / 4 tokens) in the same place as MeteredGemini's,
+so metrics and cost estimates work as with the real backend.
+
+Usage:
+    from utils.llm.fake_llm import enable_fake_backend
+    enable_fake_backend()          # model names "fake-..." resolve to FakeLlm
+    MODEL_BACKEND=fake             # the model router sends every tier to FakeLlm
+"""
+import asyncio
+import json
+import math
+from typing import Any, AsyncGenerator, Callable, ClassVar, Dict, List, NamedTuple, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import types
+
+from utils.metrics.metered_gemini import AVG_LOGPROBS_KEY, USAGE_METADATA_KEY
+
+# Confidence (exp(avg_logprobs)) of an answer within the model's capability.
+FAKE_CONFIDENT = 0.9
+# Prompt characters at which the default difficulty reaches 1.0.
+DIFFICULTY_CHARS = 20000
+
+
+class FakeModelProfile(NamedTuple):
+    """Latency of one call in seconds, and capability between 0 and 1."""
+
+    latency_s: float
+    capability: float
+
+
+# Roughly the relative speed and strength of the Gemini tiers.
+DEFAULT_PROFILES: Dict[str, FakeModelProfile] = {
+    "gemini-2.0-flash-lite": FakeModelProfile(0.35, 0.5),
+    "gemini-2.0-flash": FakeModelProfile(0.6, 0.75),
+    "gemini-2.5-flash": FakeModelProfile(1.2, 0.9),
+    "gemini-2.5-pro": FakeModelProfile(2.5, 1.0),
+}
+DEFAULT_PROFILE = FakeModelProfile(0.5, 0.7)
+
+
+def _prompt_chars(llm_request: LlmRequest) -> int:
+    texts = [str(llm_request.config.system_instruction or "")]
+    texts.extend(part.text or "" for content in llm_request.contents for part in content.parts or ())
+    return sum(map(len, texts))
+
+
+def prompt_difficulty(llm_request: LlmRequest) -> float:
+    """Default difficulty: the prompt's length relative to DIFFICULTY_CHARS, at most 1.0."""
+    return min(1.0, _prompt_chars(llm_request) / DIFFICULTY_CHARS)
+
+
+def _schema_example(schema: Any) -> Any:
+    """A value of the right JSON shape for a pydantic response schema."""
+    if not (isinstance(schema, type) and hasattr(schema, "model_fields")):
+        return {}
+    values = {}
+    for name, field in schema.model_fields.items():
+        annotation = getattr(field.annotation, "__origin__", field.annotation)
+        values[name] = (
+            0 if annotation is int else 0.0 if annotation is float else False if annotation is bool
+            else [] if annotation in (list, tuple, set) else {} if annotation is dict
+            else _schema_example(annotation) if hasattr(annotation, "model_fields") else "..."
+        )
+    return values
+
+
+class FakeLlm(BaseLlm):
+    """
+    Deterministic local model (see the module docstring).
+
+    Class attributes:
+        profiles: model name -> FakeModelProfile; other names use DEFAULT_PROFILE.
+        difficulty_of: request -> difficulty between 0 and 1.
+    """
+
+    profiles: ClassVar[Dict[str, FakeModelProfile]] = DEFAULT_PROFILES
+    difficulty_of: ClassVar[Callable[[LlmRequest], float]] = prompt_difficulty
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        return [r"fake-.*"]
+
+    def profile(self) -> FakeModelProfile:
+        return self.profiles.get(self.model, DEFAULT_PROFILE)
+
+    def _tool_call(self, llm_request: LlmRequest) -> Optional[types.FunctionCall]:
+        answered = {
+            part.function_response.name
+            for content in llm_request.contents for part in content.parts or () if part.function_response
+        }
+        for name, tool in llm_request.tools_dict.items():
+            declaration = tool._get_declaration()
+            parameters = declaration.parameters if declaration else None
+            if name not in answered and not (parameters and parameters.required):
+                return types.FunctionCall(name=name, args={})
+        return None
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        """
+        Waits the profile's latency and answers (see the module docstring).
+
+        Args:
+            llm_request (LlmRequest): The request.
+            stream (bool): Ignored; the answer is a single response.
+
+        Yields:
+            LlmResponse: The answer, with usage_metadata and avg_logprobs in custom_metadata.
+        """
+        profile = self.profile()
+        await asyncio.sleep(profile.latency_s)
+        difficulty = type(self).difficulty_of(llm_request)
+        capable = profile.capability >= difficulty
+        confidence = FAKE_CONFIDENT if capable else FAKE_CONFIDENT * profile.capability / max(difficulty, 1e-9) / 2
+
+        call = self._tool_call(llm_request) if capable else None
+        schema = llm_request.config.response_schema
+        if call is not None:
+            part = types.Part(function_call=call)
+        elif schema is not None:
+            part = types.Part(text=json.dumps(_schema_example(schema)) if capable else '{"answer": ')
+        else:
+            part = types.Part(text=f"{self.model} answer ({'confident' if capable else 'unsure'}).")
+
+        usage = {
+            "prompt_token_count": _prompt_chars(llm_request) // 4,
+            "candidates_token_count": len(part.text or "") // 4 + 1,
+        }
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            custom_metadata={USAGE_METADATA_KEY: usage, AVG_LOGPROBS_KEY: math.log(confidence)},
+        )
+
+
+def enable_fake_backend(profiles: Optional[Dict[str, FakeModelProfile]] = None) -> None:
+    """
+    Makes model names starting with "fake-" resolve to FakeLlm.
+
+    Args:
+        profiles (dict, optional): Replaces FakeLlm.profiles.
+    """
+    if profiles is not None:
+        FakeLlm.profiles = profiles
+    LLMRegistry.register(FakeLlm)
+    LLMRegistry.resolve.cache_clear()
@@ -0,0 +1,391 @@
+"""
+Model Router
+------------
+
+Picks the model for every model call from a RoutingPolicy instead of the
+model pinned in each agent factory, and escalates to a stronger model when
+the answer is not good enough.
+
+apply_model_routing() replaces the model of every LlmAgent in a tree with a
+ModelRouter that keeps the pinned model as the agent's default. On each call
+the router:
+
+    1. classifies the step: "after_tool" when the request ends with tool
+       responses, else "start",
+    2. takes the route's model: the policy's routes for "agent:step", then
+       "agent", then "*:step", else the agent's pinned model,
+    3. calls it, and checks the response: no error, not empty, only declared
+       tools called, valid JSON for the agent's output_schema, and a
+       confidence (exp(avg_logprobs), when the backend reports it) of at
+       least min_confidence,
+    4. on a failed check, retries once per escalation with the next stronger
+       model of the policy's tiers, up to max_escalations, while the turn
+       deadline (utils/llm/deadline.py) leaves time for it.
+
+Every attempt is recorded in utils.metrics.agent_metrics as
+adk_model_route_calls_total {agent, step, model, result=ok|escalated|failed}
+and adk_model_route_latency_seconds, and its usage is listed on the response
+(custom_metadata["route_attempts"]) so the metrics callbacks bill each model
+separately. route_report() reads the success rate and mean latency per route
+back, and tune_routes() suggests the cheapest tier that meets a success rate
+for each agent and step.
+
+The default policy sends the simple steps (query generation, summaries, the
+system and network reports) to the cheapest tier and keeps every other
+agent on its pinned model. $MODEL_BACKEND=fake serves every model from the
+local FakeLlm (utils/llm/fake_llm.py).
+"""
+import math
+import os
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from pydantic import PrivateAttr, ValidationError
+
+from utils.llm.deadline import current_model_run, get_current_deadline
+from utils.metrics.agent_metrics import AgentMetrics, agent_metrics
+from utils.metrics.metered_gemini import AVG_LOGPROBS_KEY, get_usage
+
+# Cheapest first.
+DEFAULT_TIERS = ("gemini-2.0-flash-lite", "gemini-2.0-flash", "gemini-2.5-flash")
+DEFAULT_ROUTES = {
+    "query_generation_agent": DEFAULT_TIERS[0],
+    "summarize_agent": DEFAULT_TIERS[0],
+    "system_info_agent": DEFAULT_TIERS[0],
+    "network_system_agent": DEFAULT_TIERS[0],
+}
+DEFAULT_MAX_ESCALATIONS = 1
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+STEP_START = "start"
+STEP_AFTER_TOOL = "after_tool"
+
+# custom_metadata key of the response: one entry per model tried.
+ROUTE_ATTEMPTS_KEY = "route_attempts"
+
+
+def parse_routes(text: str) -> Dict[str, str]:
+    """Parses "agent=model,agent:step=model" (as in $MODEL_ROUTES) into a dict."""
+    routes = {}
+    for item in text.split(","):
+        if "=" in item:
+            key, model = item.split("=", 1)
+            routes[key.strip()] = model.strip()
+    return routes
+
+
+def format_routes(routes: Dict[str, str]) -> str:
+    """The inverse of parse_routes(), e.g. to export tune_routes() as $MODEL_ROUTES."""
+    return ",".join(f"{key}={model}" for key, model in sorted(routes.items()))
+
+
+class RoutingPolicy:
+    """
+    Which model serves each agent and step, and when to escalate.
+
+    Args:
+        tiers (sequence): Model names, cheapest first; escalation moves up this list.
+        routes (dict, optional): "agent:step", "agent" or "*:step" -> model.
+            Defaults to DEFAULT_ROUTES.
+        max_escalations (int): Stronger models tried after a failed check.
+        min_confidence (float): Lowest accepted exp(avg_logprobs) of a response.
+        backend (str): "registry" resolves models through ADK's LLMRegistry,
+            "fake" serves them all from FakeLlm.
+        enabled (bool): False leaves the agents' models untouched.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[str] = DEFAULT_TIERS,
+        routes: Optional[Dict[str, str]] = None,
+        max_escalations: int = DEFAULT_MAX_ESCALATIONS,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        backend: str = "registry",
+        enabled: bool = True,
+    ):
+        self.tiers = tuple(tiers)
+        self.routes = dict(DEFAULT_ROUTES if routes is None else routes)
+        self.max_escalations = max_escalations
+        self.min_confidence = min_confidence
+        self.backend = backend
+        self.enabled = enabled
+
+    @classmethod
+    def from_env(cls) -> "RoutingPolicy":
+        """
+        Policy from $MODEL_ROUTING ("off" disables routing), $MODEL_TIERS
+        (comma-separated), $MODEL_ROUTES (merged over DEFAULT_ROUTES, see
+        parse_routes()), $MODEL_MAX_ESCALATIONS, $MODEL_MIN_CONFIDENCE and $MODEL_BACKEND.
+        """
+        tiers = os.environ.get("MODEL_TIERS")
+        return cls(
+            tiers=tuple(model.strip() for model in tiers.split(",") if model.strip()) if tiers else DEFAULT_TIERS,
+            routes={**DEFAULT_ROUTES, **parse_routes(os.environ.get("MODEL_ROUTES", ""))},
+            max_escalations=int(os.environ.get("MODEL_MAX_ESCALATIONS", DEFAULT_MAX_ESCALATIONS)),
+            min_confidence=float(os.environ.get("MODEL_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE)),
+            backend=os.environ.get("MODEL_BACKEND", "registry"),
+            enabled=os.environ.get("MODEL_ROUTING", "on").lower() not in ("off", "0", "false"),
+        )
+
+    def models_for(self, agent: str, step: str, pinned: str) -> List[str]:
+        """
+        The models to try for one call, in order.
+
+        Args:
+            agent (str): Agent name.
+            step (str): STEP_START or STEP_AFTER_TOOL.
+            pinned (str): The agent's own model, used when no route matches.
+
+        Returns:
+            list[str]: The route's model, then up to max_escalations stronger tiers.
+        """
+        first = next(
+            (self.routes[key] for key in (f"{agent}:{step}", agent, f"*:{step}") if key in self.routes), pinned
+        )
+        if first not in self.tiers:
+            return [first]
+        index = self.tiers.index(first)
+        return list(self.tiers[index:index + 1 + max(0, self.max_escalations)])
+
+
+def step_of(llm_request: LlmRequest) -> str:
+    """STEP_AFTER_TOOL when the request ends with tool responses, else STEP_START."""
+    last = llm_request.contents[-1] if llm_request.contents else None
+    if last and any(part.function_response for part in last.parts or ()):
+        return STEP_AFTER_TOOL
+    return STEP_START
+
+
+def response_problem(llm_request: LlmRequest, llm_response: LlmResponse, min_confidence: float) -> Optional[str]:
+    """
+    Checks a model response before it is accepted.
+
+    Args:
+        llm_request (LlmRequest): The request that was sent.
+        llm_response (LlmResponse): The model's answer.
+        min_confidence (float): Lowest accepted exp(avg_logprobs), if reported.
+
+    Returns:
+        str: What is wrong with the response, or None if it passes.
+    """
+    parts = llm_response.content.parts if llm_response.content and llm_response.content.parts else []
+    if llm_response.error_code and not parts:
+        return f"error {llm_response.error_code}: {llm_response.error_message or ''}".strip()
+    calls = [part.function_call for part in parts if part.function_call]
+    text = "".join(part.text or "" for part in parts if not part.thought)
+    if not calls and not text.strip():
+        return "empty response"
+    unknown = [call.name for call in calls if call.name not in llm_request.tools_dict]
+    if unknown:
+        return f"called undeclared tool {', '.join(unknown)}"
+    schema = llm_request.config.response_schema
+    if not calls and isinstance(schema, type) and hasattr(schema, "model_validate_json"):
+        try:
+            schema.model_validate_json(text)
+        except (ValidationError, ValueError) as e:
+            return f"does not match {schema.__name__}: {str(e).splitlines()[0]}"
+    avg_logprobs = (llm_response.custom_metadata or {}).get(AVG_LOGPROBS_KEY)
+    if avg_logprobs is not None and math.exp(avg_logprobs) < min_confidence:
+        return f"low confidence {math.exp(avg_logprobs):.2f}"
+    return None
+
+
+class ModelRouter(BaseLlm):
+    """
+    The model of one routed agent (see the module docstring). `model` is the
+    agent's pinned model, used when no route matches.
+
+    Attributes:
+        agent_name: The agent whose calls this router serves.
+        policy: The routing policy.
+        metrics: Registry that route outcomes are recorded into.
+    """
+
+    agent_name: str
+    policy: RoutingPolicy
+    metrics: AgentMetrics = agent_metrics
+    _llms: Dict[str, BaseLlm] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def supported_models(cls) -> List[str]:
+        # Never resolved by name; apply_model_routing() sets it on agents directly.
+        return []
+
+    def _llm(self, model: str) -> BaseLlm:
+        llm = self._llms.get(model)
+        if llm is None:
+            if self.policy.backend == "fake":
+                from utils.llm.fake_llm import FakeLlm
+
+                llm = FakeLlm(model=model)
+            else:
+                llm = LLMRegistry.new_llm(model)
+            self._llms[model] = llm
+        return llm
+
+    def _has_time_for_another_call(self) -> bool:
+        deadline = get_current_deadline()
+        return deadline is None or deadline.remaining(current_model_run(self.agent_name)) > 0.0
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        """
+        Calls the route's model, escalating to stronger tiers on failed checks.
+
+        Streaming calls go to the route's first model without checks or
+        escalation, since their chunks are already on their way to the caller.
+
+        Args:
+            llm_request (LlmRequest): The request; its `model` is set to each model tried.
+            stream (bool): Whether to do a streaming call.
+
+        Yields:
+            LlmResponse: The accepted response (or the last model's answer),
+                with the attempts in custom_metadata["route_attempts"].
+        """
+        step = step_of(llm_request)
+        models = self.policy.models_for(self.agent_name, step, self.model)
+        if stream:
+            llm_request.model = models[0]
+            async for llm_response in self._llm(models[0]).generate_content_async(llm_request, stream=True):
+                yield llm_response
+            return
+
+        attempts: List[Dict[str, Any]] = []
+        llm_response: Optional[LlmResponse] = None
+        for index, model in enumerate(models):
+            last = index == len(models) - 1
+            llm_request.model = model
+            started = time.perf_counter()
+            try:
+                responses = [response async for response in self._llm(model).generate_content_async(llm_request)]
+                llm_response = responses[-1] if responses else LlmResponse()
+                problem = response_problem(llm_request, llm_response, self.policy.min_confidence)
+            except Exception as e:
+                if last or not self._has_time_for_another_call():
+                    self.metrics.record_model_route(self.agent_name, step, model, "failed", time.perf_counter() - started)
+                    raise
+                llm_response, problem = None, f"{type(e).__name__}: {e}"
+            latency_s = time.perf_counter() - started
+            last = last or not self._has_time_for_another_call()
+            result = "ok" if problem is None else "failed" if last else "escalated"
+            self.metrics.record_model_route(self.agent_name, step, model, result, latency_s)
+            usage = get_usage(llm_response) if llm_response is not None else {}
+            attempts.append({
+                "model": model,
+                "latency_s": latency_s,
+                "prompt_tokens": usage.get("prompt_token_count") or 0,
+                "completion_tokens": usage.get("candidates_token_count") or 0,
+                "cached_tokens": usage.get("cached_content_token_count") or 0,
+                "problem": problem,
+            })
+            if problem is None or last:
+                break
+
+        llm_response.custom_metadata = {**(llm_response.custom_metadata or {}), ROUTE_ATTEMPTS_KEY: attempts}
+        yield llm_response
+
+
+def apply_model_routing(agent: BaseAgent, policy: Optional[RoutingPolicy] = None) -> BaseAgent:
+    """
+    Routes the model calls of every LlmAgent in a tree through a ModelRouter.
+
+    Agents whose model is already a BaseLlm instance (a router or a custom
+    model) are left alone; an agent without a model of its own routes from
+    the model it inherits.
+
+    Args:
+        agent (BaseAgent): The root of the agent tree.
+        policy (RoutingPolicy, optional): Defaults to RoutingPolicy.from_env().
+
+    Returns:
+        BaseAgent: The same agent, for chaining.
+    """
+    policy = policy or RoutingPolicy.from_env()
+    if not policy.enabled:
+        return agent
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        model = _model_name(current)
+        if model:
+            current.model = ModelRouter(model=model, agent_name=current.name, policy=policy)
+    return agent
+
+
+def _model_name(agent: BaseAgent) -> str:
+    """The model name an LlmAgent uses, its own or inherited; "" for other agents and model instances."""
+    while isinstance(agent, LlmAgent):
+        if agent.model:
+            return agent.model if isinstance(agent.model, str) else ""
+        agent = agent.parent_agent
+    return ""
+
+
+def route_report(metrics: AgentMetrics = agent_metrics) -> List[Dict[str, Any]]:
+    """
+    Success rate and latency per route, from the recorded route outcomes.
+
+    Args:
+        metrics (AgentMetrics): Registry the routers recorded into.
+
+    Returns:
+        list[dict]: {"agent", "step", "model", "calls", "ok", "success_rate",
+            "mean_latency_s"} per route, sorted by agent, step and model.
+    """
+    snapshot = metrics.snapshot()
+    routes: Dict[tuple, Dict[str, Any]] = {}
+    for sample in snapshot["counters"].get("adk_model_route_calls_total", []):
+        labels = sample["labels"]
+        route = routes.setdefault(
+            (labels["agent"], labels["step"], labels["model"]),
+            {"agent": labels["agent"], "step": labels["step"], "model": labels["model"], "calls": 0, "ok": 0, "latency_s": 0.0},
+        )
+        route["calls"] += int(sample["value"])
+        if labels["result"] == "ok":
+            route["ok"] += int(sample["value"])
+    for sample in snapshot["histograms"].get("adk_model_route_latency_seconds", []):
+        labels = sample["labels"]
+        route = routes.get((labels["agent"], labels["step"], labels["model"]))
+        if route is not None:
+            route["latency_s"] += sample["sum"]
+    report = []
+    for key in sorted(routes):
+        route = routes[key]
+        latency_s = route.pop("latency_s")
+        route["success_rate"] = route["ok"] / route["calls"] if route["calls"] else 0.0
+        route["mean_latency_s"] = latency_s / route["calls"] if route["calls"] else 0.0
+        report.append(route)
+    return report
+
+
+def tune_routes(
+    policy: RoutingPolicy,
+    metrics: AgentMetrics = agent_metrics,
+    min_success_rate: float = 0.9,
+    min_calls: int = 20,
+) -> Dict[str, str]:
+    """
+    Suggests routes from recorded outcomes: for each agent and step, the
+    cheapest tier with at least min_calls calls and min_success_rate.
+
+    Args:
+        policy (RoutingPolicy): The policy whose tiers are ranked.
+        metrics (AgentMetrics): Registry the routers recorded into.
+        min_success_rate (float): Share of calls that must pass the checks.
+        min_calls (int): Calls needed before a route is trusted.
+
+    Returns:
+        dict: "agent:step" -> model; merge it into the policy's routes
+            (format_routes() renders it for $MODEL_ROUTES).
+    """
+    candidates: Dict[str, List[str]] = {}
+    for route in route_report(metrics):
+        if route["model"] in policy.tiers and route["calls"] >= min_calls and route["success_rate"] >= min_success_rate:
+            candidates.setdefault(f"{route['agent']}:{route['step']}", []).append(route["model"])
+    return {key: min(models, key=policy.tiers.index) for key, models in candidates.items()}
@@ -0,0 +1,316 @@
+"""
+Prompt Compiler
+---------------
+
+Parses the instruction templates in prompts/ once, instead of on every model
+call, and measures what they cost in tokens.
+
+ADK fills an instruction's {key} templates from session state by running a
+regex over the whole text on every model call. compile_prompt() splits a
+template once into static text and state slots ({key}, {key?}, {user:key},
+...), by ADK's own rules: {artifact.name} and braces that do not hold a valid
+state name stay text, for ADK to handle. A CompiledPrompt is an
+InstructionProvider, so it is used as an LlmAgent's instruction; rendering
+only joins the cached static text with the state values.
+
+Token costs (characters / 4, the estimate history_compaction uses):
+
+    * static tokens:    the template's own text, sent on every call,
+    * cacheable prefix: the static text before the first slot. It is the same
+                        on every call, so server-side context caching can
+                        reuse it; static text after a slot cannot be cached.
+                        The prompts put their state slots last for this.
+    * per render:       each injected key's tokens, and the total.
+
+A render over PROMPT_TOKEN_BUDGET tokens (default 8000), or with one key over
+PROMPT_STATE_TOKEN_BUDGET tokens (default 4000), e.g. a long report or
+{user_preferences}, is flagged: counted in adk_instruction_over_budget_total
+and logged once per prompt and key.
+
+ADK 0.4 still runs its regex over an InstructionProvider's result. That only
+touches the {artifact.name} and non-state braces left as text, except when an
+injected value itself contains a {key} template: then the prompt returns the
+raw template and ADK fills it in exactly as without the compiler.
+
+Usage:
+    instruction=compile_prompt(python_reviewer_agent_prompt, name="python_reviewer_agent")
+    compile_instructions(root_agent)    # every string instruction in the tree
+    python -m benchmarks.prompt_budget_benchmark
+"""
+import logging
+import os
+import re
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.readonly_context import ReadonlyContext
+
+from utils.metrics.agent_metrics import agent_metrics
+
+logger = logging.getLogger(__name__)
+
+# Same estimate as utils/sessions/history_compaction.py.
+CHARS_PER_TOKEN = 4
+DEFAULT_PROMPT_TOKEN_BUDGET = 8000
+DEFAULT_STATE_TOKEN_BUDGET = 4000
+
+# Same pattern and state prefixes ADK uses to fill instruction templates.
+_TEMPLATE_PATTERN = re.compile(r"{+[^{}]*}+")
+_STATE_PREFIXES = ("app:", "user:", "temp:")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Returns:
+        int: Approximate token count of text (characters / CHARS_PER_TOKEN).
+    """
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _state_key(template: str) -> Optional[Tuple[str, bool]]:
+    """(key, required) for a template ADK fills from state, else None."""
+    name = template.lstrip("{").rstrip("}").strip()
+    required = not name.endswith("?")
+    name = name.removesuffix("?")
+    for prefix in _STATE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+            break
+    else:
+        prefix = ""
+    return (prefix + name, required) if name.isidentifier() else None
+
+
+def _filled_by_adk(template: str) -> bool:
+    name = template.lstrip("{").rstrip("}").strip().removesuffix("?")
+    return name.startswith("artifact.") or _state_key(template) is not None
+
+
+def template_keys(template: str) -> Dict[str, bool]:
+    """
+    The state keys an instruction template reads.
+
+    Args:
+        template (str): An instruction with ADK {key} templates.
+
+    Returns:
+        dict: key -> True if required ({key}), False if optional ({key?}).
+    """
+    keys: Dict[str, bool] = {}
+    for match in _TEMPLATE_PATTERN.findall(template):
+        key = _state_key(match)
+        if key:
+            keys[key[0]] = keys.get(key[0], False) or key[1]
+    return keys
+
+
+class PromptBudget:
+    """
+    Token budgets for rendered instructions.
+
+    Args:
+        max_tokens (int): Budget for a whole rendered instruction.
+        max_state_tokens (int): Budget for the value of one injected key.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_PROMPT_TOKEN_BUDGET, max_state_tokens: int = DEFAULT_STATE_TOKEN_BUDGET):
+        self.max_tokens = max_tokens
+        self.max_state_tokens = max_state_tokens
+
+    @classmethod
+    def from_env(cls) -> "PromptBudget":
+        """Reads PROMPT_TOKEN_BUDGET and PROMPT_STATE_TOKEN_BUDGET."""
+        return cls(
+            max_tokens=int(os.environ.get("PROMPT_TOKEN_BUDGET", DEFAULT_PROMPT_TOKEN_BUDGET)),
+            max_state_tokens=int(os.environ.get("PROMPT_STATE_TOKEN_BUDGET", DEFAULT_STATE_TOKEN_BUDGET)),
+        )
+
+
+class Slot(NamedTuple):
+    """A state template in a compiled prompt."""
+
+    key: str
+    required: bool
+
+
+class RenderReport(NamedTuple):
+    """
+    Token counts of one render.
+
+    Attributes:
+        tokens: The whole rendered instruction.
+        state_tokens: Injected key -> tokens of its value (0 when missing).
+        over_budget: The keys over the state budget, plus "" when the whole
+            instruction is over the prompt budget.
+    """
+
+    tokens: int
+    state_tokens: Dict[str, int]
+    over_budget: List[str]
+
+
+class CompiledPrompt:
+    """
+    An instruction template parsed once (see the module docstring). Calling it
+    with a ReadonlyContext renders it from the session state.
+
+    Attributes:
+        segments (list): Static text and Slots, in order.
+        keys (dict): key -> True if required, for every slot.
+        prefix (str): The static text before the first slot (cacheable).
+        static_tokens (int): Tokens of all the static text.
+        prefix_tokens (int): Tokens of the prefix.
+
+    Args:
+        template (str): The instruction template.
+        name (str): Name in reports and metrics, usually the agent's.
+        budget (PromptBudget, optional): Token budgets; from the environment by default.
+    """
+
+    def __init__(self, template: str, name: str = "", budget: Optional[PromptBudget] = None):
+        self.template = template
+        self.name = name
+        self.budget = budget or PromptBudget.from_env()
+        self.segments: List[Union[str, Slot]] = []
+        text, position = [], 0
+        for match in _TEMPLATE_PATTERN.finditer(template):
+            text.append(template[position:match.start()])
+            key = _state_key(match.group())
+            if key is None:
+                text.append(match.group())
+            else:
+                self.segments.extend(("".join(text), Slot(*key)))
+                text = []
+            position = match.end()
+        text.append(template[position:])
+        self.segments.append("".join(text))
+        self.segments = [segment for segment in self.segments if segment != ""]
+        self.static = "".join(segment for segment in self.segments if isinstance(segment, str))
+        self.prefix = "" if not self.segments or isinstance(self.segments[0], Slot) else self.segments[0]
+        self.keys: Dict[str, bool] = {}
+        for slot in self.segments:
+            if isinstance(slot, Slot):
+                self.keys[slot.key] = self.keys.get(slot.key, False) or slot.required
+        self.static_tokens = estimate_tokens(self.static)
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self._flagged: Set[str] = set()
+
+    def values(self, state: Mapping[str, Any]) -> Dict[str, str]:
+        """
+        Returns:
+            dict: key -> the text ADK would inject, for the keys in state.
+        """
+        return {key: str(state[key]) for key in self.keys if key in state}
+
+    def render(self, state: Mapping[str, Any], values: Optional[Dict[str, str]] = None) -> str:
+        """
+        Fills the slots from state as ADK would.
+
+        Args:
+            state (Mapping): Session state.
+            values (dict, optional): self.values(state), if already computed.
+
+        Returns:
+            str: The instruction.
+
+        Raises:
+            KeyError: If a required key is not in state.
+        """
+        values = self.values(state) if values is None else values
+        parts = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                parts.append(segment)
+            elif segment.key in values:
+                parts.append(values[segment.key])
+            elif segment.required:
+                raise KeyError(f"Context variable not found: `{segment.key}`.")
+        return "".join(parts)
+
+    def report(self, state: Mapping[str, Any], values: Optional[Dict[str, str]] = None) -> RenderReport:
+        """
+        Token counts of a render, and the budgets it exceeds. Missing keys count
+        as empty, so a state missing required keys can be reported too.
+
+        Args:
+            state (Mapping): Session state.
+            values (dict, optional): self.values(state), if already computed.
+
+        Returns:
+            RenderReport: The counts.
+        """
+        values = self.values(state) if values is None else values
+        state_tokens = {key: estimate_tokens(values.get(key, "")) for key in self.keys}
+        tokens = self.static_tokens + sum(
+            estimate_tokens(values.get(segment.key, "")) for segment in self.segments if isinstance(segment, Slot)
+        )
+        over_budget = [key for key, count in state_tokens.items() if count > self.budget.max_state_tokens]
+        if tokens > self.budget.max_tokens:
+            over_budget.append("")
+        return RenderReport(tokens, state_tokens, over_budget)
+
+    def _flag(self, report: RenderReport) -> None:
+        for key in report.over_budget:
+            agent_metrics.record_instruction_over_budget(self.name, key)
+            if key not in self._flagged:
+                self._flagged.add(key)
+                if key:
+                    logger.warning(
+                        "Prompt '%s': state key '%s' injects %d tokens (budget %d).",
+                        self.name, key, report.state_tokens[key], self.budget.max_state_tokens,
+                    )
+                else:
+                    logger.warning(
+                        "Prompt '%s' renders to %d tokens (budget %d).", self.name, report.tokens, self.budget.max_tokens
+                    )
+
+    def __call__(self, context: ReadonlyContext) -> str:
+        state = context.state
+        values = self.values(state)
+        rendered = self.render(state, values)
+        report = self.report(state, values)
+        agent_metrics.record_instruction(self.name, report.tokens)
+        if report.over_budget:
+            self._flag(report)
+        for value in values.values():
+            if "{" in value and any(_filled_by_adk(match) for match in _TEMPLATE_PATTERN.findall(value)):
+                return self.template
+        return rendered
+
+
+def compile_prompt(template: str, name: str = "", budget: Optional[PromptBudget] = None) -> CompiledPrompt:
+    """
+    Factory function to compile an instruction template.
+
+    Args:
+        template (str): The instruction template.
+        name (str): Name in reports and metrics, usually the agent's.
+        budget (PromptBudget, optional): Token budgets; from the environment by default.
+
+    Returns:
+        CompiledPrompt: The compiled prompt, usable as an LlmAgent instruction.
+    """
+    return CompiledPrompt(template, name=name, budget=budget)
+
+
+def compile_instructions(agent: BaseAgent, budget: Optional[PromptBudget] = None) -> BaseAgent:
+    """
+    Replaces the string instruction of every LlmAgent in the tree with a
+    CompiledPrompt named after the agent. Instructions that are already
+    functions are left alone.
+
+    Args:
+        agent (BaseAgent): Root of the tree.
+        budget (PromptBudget, optional): Token budgets; from the environment by default.
+
+    Returns:
+        BaseAgent: The same agent.
+    """
+    budget = budget or PromptBudget.from_env()
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if isinstance(current, LlmAgent) and isinstance(current.instruction, str) and current.instruction:
+            current.instruction = compile_prompt(current.instruction, name=current.name, budget=budget)
+    return agent
@@ -0,0 +1,97 @@
+"""
+Tool Declarations
+-----------------
+
+Shared function tools whose declarations are built once.
+
+ADK 0.4 wraps every plain-function tool of an LlmAgent in a new FunctionTool
+on every model call (LlmAgent.canonical_tools()), and FunctionTool rebuilds
+the function declaration sent to the model from the function's signature and
+docstring each time (inspect plus pydantic validation). It also re-inspects
+the signature on every tool call.
+
+shared_tool() returns one SharedFunctionTool per function, which builds its
+declaration once per API variant (Gemini API or Vertex AI) and remembers its
+mandatory arguments. share_tool_declarations() swaps them into an agent tree.
+
+Declarations are shared between requests: treat them as read-only.
+
+Usage:
+    from utils.llm.tool_declarations import share_tool_declarations
+    share_tool_declarations(root_agent)  # before apply_deadline_budgets()
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.tools import BaseTool, FunctionTool
+from google.genai import types
+
+# (function, API variant) -> declaration
+_declarations: Dict[Tuple[Callable, str], Optional[types.FunctionDeclaration]] = {}
+_tools: Dict[Callable, "SharedFunctionTool"] = {}
+_lock = threading.Lock()
+
+
+class SharedFunctionTool(FunctionTool):
+    """A FunctionTool that builds its declaration and mandatory arguments once."""
+
+    def __init__(self, func: Callable):
+        super().__init__(func)
+        self._mandatory_args: Optional[List[str]] = None
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        key = (self.func, self._api_variant)
+        if key not in _declarations:
+            # Building twice in a race is harmless; both results are equal.
+            _declarations[key] = super()._get_declaration()
+        return _declarations[key]
+
+    def _get_mandatory_args(self) -> List[str]:
+        if self._mandatory_args is None:
+            self._mandatory_args = super()._get_mandatory_args()
+        return self._mandatory_args
+
+
+def shared_tool(func: Callable) -> SharedFunctionTool:
+    """
+    Args:
+        func (Callable): A tool function.
+
+    Returns:
+        SharedFunctionTool: The one shared tool for func.
+    """
+    tool = _tools.get(func)
+    if tool is None:
+        with _lock:
+            tool = _tools.get(func)
+            if tool is None:
+                tool = _tools[func] = SharedFunctionTool(func)
+    return tool
+
+
+def share_tool_declarations(agent: BaseAgent) -> BaseAgent:
+    """
+    Replaces the plain functions and plain FunctionTools in the tools of every
+    LlmAgent in a tree with shared_tool()s. Other tools are kept as they are,
+    so run it before wrapping tools (e.g. apply_deadline_budgets()).
+
+    Args:
+        agent (BaseAgent): The root of the agent tree.
+
+    Returns:
+        BaseAgent: The same agent, for chaining.
+    """
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if not isinstance(current, LlmAgent):
+            continue
+        current.tools = [
+            shared_tool(tool) if not isinstance(tool, BaseTool)
+            else shared_tool(tool.func) if type(tool) is FunctionTool
+            else tool
+            for tool in current.tools
+        ]
+    return agent
@@ -0,0 +1,199 @@
+"""
+Tool Prefetch
+-------------
+
+Runs the tools an agent always calls before its first model call, so the
+model answers in one round trip instead of spending one just to ask for them.
+
+system_info_agent and network_system_agent (use_parallel_agents.py) each call
+a single tool without arguments on every turn; the model's first call only
+ever decides to call it. With prefetching:
+
+    1. an agent declares its always-needed tools with
+       prefetch_tools_callback(tool, ...) as its before_model_callback,
+    2. a ToolPrefetchAgent placed before the agents in the pipeline runs the
+       declared tools of every agent in its parent's tree concurrently (in
+       worker threads) and stores the results in
+       state["prefetched_tools"] {"invocation_id", "results": {agent: {tool: response}}},
+    3. the agent's before_model_callback adds each result to the request as
+       the function call / function response pair ADK would have produced,
+       and removes that tool's declaration, so the model writes its analysis
+       directly.
+
+Only results of the current invocation are used. A tool that failed, did not
+finish within the turn deadline or was not prefetched at all (no
+ToolPrefetchAgent in the pipeline) keeps its declaration, and the model calls
+it as before.
+
+Only tools without required arguments can be prefetched.
+"""
+import asyncio
+import inspect
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from utils.llm.deadline import get_current_deadline, run_key
+
+PREFETCHED_TOOLS_KEY = "prefetched_tools"
+
+
+def _tool_name(tool: Callable) -> str:
+    return tool.__name__
+
+
+def _response(result: Any) -> Dict[str, Any]:
+    # ADK wraps results that are not dicts the same way for function responses.
+    return result if isinstance(result, dict) else {"result": result}
+
+
+def required_arguments(tool: Callable) -> List[str]:
+    """
+    Returns:
+        list[str]: The arguments of a tool function without a default,
+            other than tool_context.
+    """
+    return [
+        name for name, parameter in inspect.signature(tool).parameters.items()
+        if parameter.default is inspect.Parameter.empty and name != "tool_context"
+        and parameter.kind not in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD)
+    ]
+
+
+def prefetch_tools_callback(*tools: Callable) -> Callable:
+    """
+    Builds a before_model_callback that answers the model's calls to `tools`
+    in advance with the results prefetched by ToolPrefetchAgent.
+
+    The tools stay in the agent's tools list: without a prefetched result the
+    model calls them as usual.
+
+    Args:
+        *tools: Plain tool functions; none may have required arguments other
+            than tool_context.
+
+    Returns:
+        The callback; its __prefetch_tools__ attribute lists the tools.
+
+    Raises:
+        ValueError: If a tool has required arguments.
+    """
+    for tool in tools:
+        required = required_arguments(tool)
+        if required:
+            raise ValueError(f"Tool '{_tool_name(tool)}' cannot be prefetched, it needs arguments: {', '.join(required)}")
+    names = [_tool_name(tool) for tool in tools]
+
+    def prefetched_tools_before_model_callback(callback_context, llm_request) -> None:
+        prefetched = callback_context.state.get(PREFETCHED_TOOLS_KEY) or {}
+        if prefetched.get("invocation_id") != callback_context.invocation_id:
+            return None
+        results = (prefetched.get("results") or {}).get(callback_context.agent_name) or {}
+        answered = [name for name in names if name in results]
+        if not answered:
+            return None
+        llm_request.contents.append(types.Content(role="model", parts=[
+            types.Part(function_call=types.FunctionCall(name=name, args={})) for name in answered
+        ]))
+        llm_request.contents.append(types.Content(role="user", parts=[
+            types.Part(function_response=types.FunctionResponse(name=name, response=results[name])) for name in answered
+        ]))
+        for name in answered:
+            llm_request.tools_dict.pop(name, None)
+        if llm_request.config.tools:
+            remaining = []
+            for tool in llm_request.config.tools:
+                if tool.function_declarations:
+                    declarations = [d for d in tool.function_declarations if d.name not in answered]
+                    if not declarations:
+                        continue
+                    tool = tool.model_copy(update={"function_declarations": declarations})
+                remaining.append(tool)
+            llm_request.config.tools = remaining or None
+        return None
+
+    prefetched_tools_before_model_callback.__prefetch_tools__ = tuple(tools)
+    return prefetched_tools_before_model_callback
+
+
+def declared_prefetch_tools(agent: BaseAgent) -> Tuple[Callable, ...]:
+    """
+    Returns:
+        tuple: The tools an LlmAgent declared with prefetch_tools_callback(),
+            also when the callback is chained with others; () for other agents.
+    """
+    if not isinstance(agent, LlmAgent) or agent.before_model_callback is None:
+        return ()
+    slot = agent.before_model_callback
+    tools = []
+    for callback in getattr(slot, "__chained_callbacks__", (slot,)):
+        tools.extend(getattr(callback, "__prefetch_tools__", ()))
+    return tuple(tools)
+
+
+def _prefetch_plan(root: BaseAgent) -> List[Tuple[str, Callable]]:
+    """(agent name, tool) for every declared tool in the tree under root."""
+    plan = []
+    pending = [root]
+    while pending:
+        current = pending.pop(0)
+        pending.extend(current.sub_agents)
+        plan.extend((current.name, tool) for tool in declared_prefetch_tools(current))
+    return plan
+
+
+class ToolPrefetchAgent(BaseAgent):
+    """
+    Runs the prefetch tools declared by the agents of its parent's tree, all at
+    once, and stores their results for prefetch_tools_callback() (see the
+    module docstring). Spends no model call.
+
+    Place it first in the SequentialAgent whose other sub-agents declare tools.
+    """
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        plan = _prefetch_plan(self.parent_agent or self)
+        calls = [asyncio.ensure_future(asyncio.to_thread(tool)) for _, tool in plan]
+
+        deadline = get_current_deadline()
+        timeout: Optional[float] = max(0.0, deadline.remaining(run_key(ctx))) if deadline else None
+        if calls:
+            _, unfinished = await asyncio.wait(calls, timeout=timeout)
+            for call in unfinished:
+                # The worker thread finishes on its own; the agent will call the tool itself.
+                call.cancel()
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for (agent_name, tool), call in zip(plan, calls):
+            if call.done() and not call.cancelled() and call.exception() is None:
+                results.setdefault(agent_name, {})[_tool_name(tool)] = _response(call.result())
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                PREFETCHED_TOOLS_KEY: {
+                    "invocation_id": ctx.invocation_id,
+                    "results": results,
+                    "seconds": round(time.perf_counter() - started, 3),
+                },
+            }),
+        )
+
+
+def get_tool_prefetch_agent() -> ToolPrefetchAgent:
+    """
+    Factory function to create the tool prefetch stage of a pipeline.
+
+    Returns:
+        ToolPrefetchAgent: The configured agent.
+    """
+    return ToolPrefetchAgent(
+        name="tool_prefetch_agent",
+        description="Runs the tools the pipeline's agents always call, concurrently, before their first model call.",
+    )
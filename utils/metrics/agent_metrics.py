@@ -0,0 +1,382 @@
+"""
+Agent Metrics
+-------------
+
+In-process token, cost and latency accounting for ADK agents.
+
+Every model call and tool call is recorded per (app_name, agent, model) or
+(app_name, agent, tool). The registry keeps Prometheus-style counters and
+histograms and can be read either as a plain snapshot dictionary or as
+Prometheus text exposition (see utils/metrics/prometheus_server.py).
+
+The hot path takes no lock: each thread writes into its own shard, and the
+shards are only merged when a snapshot is requested. Snapshots are therefore
+eventually consistent, which is all a scrape endpoint needs.
+"""
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds. The +Inf bucket is implicit.
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+DEFAULT_TOKEN_BUCKETS: Tuple[float, ...] = (
+    64, 256, 1024, 4096, 16384, 65536, 262144,
+)
+
+# USD per one million tokens as (prompt, completion). Models that are not
+# listed are still counted, they simply accrue no cost.
+MODEL_PRICING_PER_MILLION: Dict[str, Tuple[float, float]] = {
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+
+# name -> (type, help text). Also fixes the order of the exposition output.
+METRIC_DEFINITIONS: Dict[str, Tuple[str, str]] = {
+    "adk_model_calls_total": ("counter", "Number of model calls."),
+    "adk_prompt_tokens_total": ("counter", "Prompt tokens sent to the model."),
+    "adk_completion_tokens_total": ("counter", "Completion tokens returned by the model."),
+    "adk_cached_tokens_total": ("counter", "Prompt tokens served from the context cache."),
+    "adk_model_cost_usd_total": ("counter", "Estimated model cost in USD."),
+    "adk_model_latency_seconds": ("histogram", "Wall-clock latency of a model call."),
+    "adk_model_total_tokens": ("histogram", "Total tokens (prompt + completion) per model call."),
+    "adk_model_route_calls_total": ("counter", "Model calls made by the model router, by route and result (ok, escalated or failed)."),
+    "adk_model_route_latency_seconds": ("histogram", "Wall-clock latency of a routed model call, by route."),
+    "adk_instruction_tokens": ("histogram", "Estimated tokens of a rendered agent instruction (utils/llm/prompt_compiler.py)."),
+    "adk_instruction_over_budget_total": ("counter", "Rendered instructions over a token budget, by state key (empty for the whole instruction)."),
+    "adk_tool_calls_total": ("counter", "Number of tool calls."),
+    "adk_tool_latency_seconds": ("histogram", "Wall-clock latency of a tool call."),
+    "adk_session_cache_lookups_total": ("counter", "Session cache lookups, by result (hit or miss)."),
+    "adk_session_cache_evictions_total": ("counter", "Entries evicted from the session cache to stay within its memory bound."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def estimate_cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimates the USD cost of a model call from MODEL_PRICING_PER_MILLION.
+
+    Versioned model names (e.g. "gemini-2.0-flash-001") fall back to the
+    longest known prefix.
+
+    Args:
+        model (str): The model name.
+        prompt_tokens (int): Prompt token count.
+        completion_tokens (int): Completion token count.
+
+    Returns:
+        float: The estimated cost, or 0.0 for unknown models.
+    """
+    pricing = MODEL_PRICING_PER_MILLION.get(model)
+    if pricing is None:
+        prefixes = [name for name in MODEL_PRICING_PER_MILLION if model.startswith(name)]
+        if not prefixes:
+            return 0.0
+        pricing = MODEL_PRICING_PER_MILLION[max(prefixes, key=len)]
+    prompt_price, completion_price = pricing
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class _Histogram:
+    """Cumulative-on-read histogram with fixed bucket bounds."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class _Shard:
+    """Per-thread metric storage. Only the owning thread writes to it."""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+
+class AgentMetrics:
+    """
+    Registry of per-agent counters and histograms.
+
+    Args:
+        latency_buckets (tuple, optional): Bucket bounds for latency histograms, in seconds.
+        token_buckets (tuple, optional): Bucket bounds for the token histograms.
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+        token_buckets: Tuple[float, ...] = DEFAULT_TOKEN_BUCKETS,
+    ):
+        self._bounds = {
+            "adk_model_latency_seconds": latency_buckets,
+            "adk_model_total_tokens": token_buckets,
+            "adk_model_route_latency_seconds": latency_buckets,
+            "adk_instruction_tokens": token_buckets,
+            "adk_tool_latency_seconds": latency_buckets,
+        }
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _inc(self, shard: _Shard, name: str, labels: Labels, value: float = 1.0) -> None:
+        key = (name, labels)
+        shard.counters[key] = shard.counters.get(key, 0.0) + value
+
+    def _observe(self, shard: _Shard, name: str, labels: Labels, value: float) -> None:
+        key = (name, labels)
+        histogram = shard.histograms.get(key)
+        if histogram is None:
+            histogram = shard.histograms[key] = _Histogram(self._bounds[name])
+        histogram.observe(value)
+
+    def record_model_call(
+        self,
+        app_name: str,
+        agent: str,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        latency_s: Optional[float] = None,
+    ) -> None:
+        """
+        Records one completed model call.
+
+        Args:
+            app_name (str): The runner's app name.
+            agent (str): The agent that made the call.
+            model (str): The model name.
+            prompt_tokens (int): Prompt token count from usage_metadata.
+            completion_tokens (int): Candidate token count from usage_metadata.
+            cached_tokens (int): Cached-content token count from usage_metadata.
+            latency_s (float, optional): Call latency in seconds, if measured.
+        """
+        shard = self._shard()
+        labels = (("app_name", app_name), ("agent", agent), ("model", model))
+        self._inc(shard, "adk_model_calls_total", labels)
+        self._inc(shard, "adk_prompt_tokens_total", labels, prompt_tokens)
+        self._inc(shard, "adk_completion_tokens_total", labels, completion_tokens)
+        if cached_tokens:
+            self._inc(shard, "adk_cached_tokens_total", labels, cached_tokens)
+        self._inc(
+            shard, "adk_model_cost_usd_total", labels,
+            estimate_cost_usd(model, prompt_tokens, completion_tokens),
+        )
+        self._observe(shard, "adk_model_total_tokens", labels, prompt_tokens + completion_tokens)
+        if latency_s is not None:
+            self._observe(shard, "adk_model_latency_seconds", labels, latency_s)
+
+    def record_model_route(self, agent: str, step: str, model: str, result: str, latency_s: float) -> None:
+        """
+        Records one model call made by the model router (see utils/llm/model_router.py).
+
+        Args:
+            agent (str): The routed agent.
+            step (str): The step of the agent's run ("start" or "after_tool").
+            model (str): The model that was called.
+            result (str): "ok", "escalated" (a stronger model is tried next) or "failed".
+            latency_s (float): Call latency in seconds.
+        """
+        shard = self._shard()
+        labels = (("agent", agent), ("step", step), ("model", model))
+        self._inc(shard, "adk_model_route_calls_total", labels + (("result", result),))
+        self._observe(shard, "adk_model_route_latency_seconds", labels, latency_s)
+
+    def record_instruction(self, agent: str, tokens: int) -> None:
+        """
+        Records the size of one rendered instruction (see utils/llm/prompt_compiler.py).
+
+        Args:
+            agent (str): The prompt's agent.
+            tokens (int): Estimated tokens of the rendered instruction.
+        """
+        self._observe(self._shard(), "adk_instruction_tokens", (("agent", agent),), tokens)
+
+    def record_instruction_over_budget(self, agent: str, key: str) -> None:
+        """
+        Records a rendered instruction over a token budget.
+
+        Args:
+            agent (str): The prompt's agent.
+            key (str): The state key over its budget, or "" for the whole instruction.
+        """
+        self._inc(self._shard(), "adk_instruction_over_budget_total", (("agent", agent), ("key", key)))
+
+    def record_tool_call(
+        self,
+        app_name: str,
+        agent: str,
+        tool: str,
+        latency_s: float,
+        error: bool = False,
+    ) -> None:
+        """
+        Records one completed tool call.
+
+        Args:
+            app_name (str): The runner's app name.
+            agent (str): The agent that called the tool.
+            tool (str): The tool name.
+            latency_s (float): Tool latency in seconds.
+            error (bool): Whether the tool reported an error.
+        """
+        shard = self._shard()
+        labels = (("app_name", app_name), ("agent", agent), ("tool", tool))
+        self._inc(shard, "adk_tool_calls_total", labels + (("status", "error" if error else "ok"),))
+        self._observe(shard, "adk_tool_latency_seconds", labels, latency_s)
+
+    def record_session_cache_lookup(self, cache: str, kind: str, hit: bool) -> None:
+        """
+        Records one session cache lookup (see utils/sessions/session_cache.py).
+
+        Args:
+            cache (str): Name of the cache.
+            kind (str): What was looked up ("session" or "list").
+            hit (bool): Whether the entry was cached.
+        """
+        labels = (("cache", cache), ("kind", kind), ("result", "hit" if hit else "miss"))
+        self._inc(self._shard(), "adk_session_cache_lookups_total", labels)
+
+    def record_session_cache_eviction(self, cache: str, count: int = 1) -> None:
+        """
+        Records entries evicted from a session cache.
+
+        Args:
+            cache (str): Name of the cache.
+            count (int): Number of entries evicted.
+        """
+        self._inc(self._shard(), "adk_session_cache_evictions_total", (("cache", cache),), count)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Merges all thread shards into a single point-in-time view.
+
+        Returns:
+            dict: {"counters": {name: [{"labels": {...}, "value": v}]},
+                   "histograms": {name: [{"labels": {...}, "buckets": {le: cumulative},
+                                          "sum": s, "count": c}]}}
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        counters: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        for shard in shards:
+            # dict.copy() is atomic under the GIL, so a concurrent writer
+            # cannot break the iteration below.
+            for key, value in shard.counters.copy().items():
+                counters[key] = counters.get(key, 0.0) + value
+            for key, histogram in shard.histograms.copy().items():
+                merged = histograms.get(key)
+                if merged is None:
+                    merged = histograms[key] = _Histogram(histogram.bounds)
+                for i, bucket_count in enumerate(list(histogram.counts)):
+                    merged.counts[i] += bucket_count
+                merged.total += histogram.total
+                merged.count += histogram.count
+
+        result: Dict[str, Any] = {"counters": {}, "histograms": {}}
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in sorted(histograms.items(), key=lambda item: item[0]):
+            cumulative, buckets = 0, {}
+            for bound, bucket_count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                cumulative += bucket_count
+                buckets["+Inf" if bound == float("inf") else _format_value(bound)] = cumulative
+            result["histograms"].setdefault(name, []).append({
+                "labels": dict(labels),
+                "buckets": buckets,
+                "sum": histogram.total,
+                "count": histogram.count,
+            })
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Renders the current snapshot in the Prometheus text exposition format (0.0.4).
+
+        Returns:
+            str: The exposition text, ending with a newline.
+        """
+        snapshot = self.snapshot()
+        lines: List[str] = []
+        for name, (metric_type, help_text) in METRIC_DEFINITIONS.items():
+            series = snapshot["counters" if metric_type == "counter" else "histograms"].get(name)
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample in series:
+                if metric_type == "counter":
+                    lines.append(f"{name}{_format_labels(sample['labels'])} {_format_value(sample['value'])}")
+                    continue
+                for le, cumulative in sample["buckets"].items():
+                    labels = dict(sample["labels"], le=le)
+                    lines.append(f"{name}_bucket{_format_labels(labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(sample['labels'])} {_format_value(sample['sum'])}")
+                lines.append(f"{name}_count{_format_labels(sample['labels'])} {sample['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drops all recorded values. Mainly useful between benchmark runs."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters = {}
+                shard.histograms = {}
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value without a trailing '.0' for integral numbers."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Formats a label set as {k="v",...}, escaping per the exposition format."""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Process-wide registry used by the callbacks and the HTTP exporter.
+agent_metrics = AgentMetrics()
+
+
+def get_metrics_snapshot() -> Dict[str, Any]:
+    """
+    Returns a snapshot of the process-wide agent metrics.
+
+    Returns:
+        dict: See AgentMetrics.snapshot().
+    """
+    return agent_metrics.snapshot()
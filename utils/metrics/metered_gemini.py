@@ -0,0 +1,123 @@
+"""
+Metered Gemini
+--------------
+
+ADK 0.4's LlmResponse.create() drops the `usage_metadata` of the underlying
+GenerateContentResponse, so after_model_callback cannot see token counts.
+MeteredGemini is a drop-in Gemini subclass that copies the usage numbers into
+`llm_response.custom_metadata["usage_metadata"]`, and the first candidate's
+`avg_logprobs` (a confidence signal, see utils/llm/model_router.py) into
+`llm_response.custom_metadata["avg_logprobs"]`.
+
+The request itself is still made by Gemini.generate_content_async(), so its
+logging and response handling stay ADK's: MeteredGemini's client records
+each raw response in a context variable, and the usage is read from there.
+
+Call enable_usage_capture() once at startup to make every agent whose
+`model` is a plain "gemini-..." string resolve to MeteredGemini.
+"""
+from contextvars import ContextVar
+from functools import cached_property
+from typing import AsyncGenerator, Optional
+
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from google.genai import Client, types
+
+USAGE_METADATA_KEY = "usage_metadata"
+AVG_LOGPROBS_KEY = "avg_logprobs"
+
+# The raw response of the current task's last non-streaming Gemini call.
+_raw_response: ContextVar[Optional[types.GenerateContentResponse]] = ContextVar(
+    "metered_gemini_raw_response", default=None
+)
+
+
+def _attach_usage(llm_response: LlmResponse, usage_metadata, avg_logprobs: Optional[float] = None) -> LlmResponse:
+    """Stores the usage counters (and avg_logprobs) of a raw response on the LlmResponse."""
+    metadata = dict(llm_response.custom_metadata or {})
+    if usage_metadata is not None:
+        metadata[USAGE_METADATA_KEY] = usage_metadata.model_dump(exclude_none=True, mode="json")
+    if avg_logprobs is not None:
+        metadata[AVG_LOGPROBS_KEY] = avg_logprobs
+    if metadata:
+        llm_response.custom_metadata = metadata
+    return llm_response
+
+
+class MeteredGemini(Gemini):
+    """Gemini model that preserves usage_metadata on every final response."""
+
+    @cached_property
+    def api_client(self) -> Client:
+        """Gemini's client, whose async generate_content() records the raw response in _raw_response."""
+        client = super().api_client
+        models = client.aio.models
+        generate_content = models.generate_content
+
+        async def generate_content_recorded(**kwargs) -> types.GenerateContentResponse:
+            response = await generate_content(**kwargs)
+            # Awaited directly, not as a task: the caller's context sees this.
+            _raw_response.set(response)
+            return response
+
+        models.generate_content = generate_content_recorded
+        return client
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """
+        Sends the request to Gemini and attaches usage counters to the response.
+
+        Streaming calls are delegated to Gemini unchanged; the usage numbers of
+        a stream are only known once it is complete and ADK merges the chunks
+        itself.
+
+        Args:
+            llm_request (LlmRequest): The request to send.
+            stream (bool): Whether to do a streaming call.
+
+        Yields:
+            LlmResponse: The model response.
+        """
+        if stream:
+            async for llm_response in super().generate_content_async(llm_request, stream=True):
+                yield llm_response
+            return
+
+        _raw_response.set(None)
+        async for llm_response in super().generate_content_async(llm_request, stream=False):
+            response = _raw_response.get()
+            if response is not None:
+                avg_logprobs = response.candidates[0].avg_logprobs if response.candidates else None
+                _attach_usage(llm_response, response.usage_metadata, avg_logprobs)
+            yield llm_response
+
+
+def enable_usage_capture() -> None:
+    """Registers MeteredGemini for every model name Gemini supports."""
+    LLMRegistry.register(MeteredGemini)
+    # resolve() is lru_cached, drop entries that still point at Gemini.
+    LLMRegistry.resolve.cache_clear()
+
+
+def get_usage(llm_response: LlmResponse) -> dict:
+    """
+    Reads usage counters from an LlmResponse.
+
+    Newer ADK versions expose `usage_metadata` directly on the response; older
+    ones only carry it when the model is MeteredGemini.
+
+    Args:
+        llm_response (LlmResponse): The model response.
+
+    Returns:
+        dict: The usage_metadata fields, or an empty dict when unavailable.
+    """
+    usage = getattr(llm_response, "usage_metadata", None)
+    if usage is not None:
+        return usage.model_dump(exclude_none=True) if hasattr(usage, "model_dump") else dict(usage)
+    return (llm_response.custom_metadata or {}).get(USAGE_METADATA_KEY, {})
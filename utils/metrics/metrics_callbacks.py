@@ -0,0 +1,214 @@
+"""
+Metrics Callbacks
+-----------------
+
+ADK callbacks that feed utils.metrics.agent_metrics from model responses and
+tool calls, plus instrument_agent() to attach them to a whole agent tree.
+
+A model or tool call that raises or is cancelled never reaches its
+after-callback, so the start times of calls still in flight are dropped once
+they are older than the turn timeout ($TURN_TIMEOUT_SECONDS, else
+IN_FLIGHT_MAX_AGE_S): no call can still be running by then.
+
+Usage:
+    from utils.metrics.metrics_callbacks import instrument_agent
+    instrument_agent(sequential_agent)  # before creating the Runner
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+
+from utils.callback_chain import chain_callbacks, has_callback
+from utils.metrics.agent_metrics import AgentMetrics, agent_metrics
+from utils.llm.deadline import get_turn_timeout
+from utils.llm.model_router import ROUTE_ATTEMPTS_KEY
+from utils.metrics.metered_gemini import enable_usage_capture, get_usage
+
+# Age after which an in-flight entry is dropped when no turn timeout is set.
+IN_FLIGHT_MAX_AGE_S = 600.0
+
+# (invocation_id, branch, agent) -> (start time, model name) for in-flight model calls.
+_model_calls_in_flight: Dict[Tuple[str, Optional[str], str], Tuple[float, str]] = {}
+# function_call_id -> start time for in-flight tool calls.
+_tool_calls_in_flight: Dict[str, float] = {}
+_in_flight_lock = threading.Lock()
+
+
+def _track(calls: Dict[Any, Any], key: Hashable, value: Any, started_at: Callable[[Any], float]) -> None:
+    """
+    Stores an in-flight entry and drops the entries older than the turn timeout.
+
+    Entries are kept in start order (re-inserted, not overwritten), so the
+    stale ones are at the front and pruning stops at the first fresh one.
+    """
+    now = time.perf_counter()
+    cutoff = now - (get_turn_timeout() or IN_FLIGHT_MAX_AGE_S)
+    with _in_flight_lock:
+        calls.pop(key, None)
+        calls[key] = value
+        while True:
+            oldest = next(iter(calls))
+            if started_at(calls[oldest]) >= cutoff:
+                break
+            del calls[oldest]
+
+
+def _untrack(calls: Dict[Any, Any], key: Hashable, default: Any = None) -> Any:
+    with _in_flight_lock:
+        return calls.pop(key, default)
+
+
+def _context_labels(context) -> Tuple[str, str]:
+    """Returns (app_name, agent_name) for a CallbackContext or ToolContext."""
+    invocation_context = context._invocation_context
+    return invocation_context.app_name, invocation_context.agent.name
+
+
+def _model_call_key(callback_context) -> Tuple[str, Optional[str], str]:
+    invocation_context = callback_context._invocation_context
+    return (invocation_context.invocation_id, invocation_context.branch, invocation_context.agent.name)
+
+
+def metrics_before_model_callback(callback_context, llm_request):
+    """
+    Remembers when a model call started and for which model.
+
+    Args:
+        callback_context: ADK CallbackContext.
+        llm_request: ADK LlmRequest about to be sent.
+
+    Returns:
+        None (never short-circuits the model call)
+    """
+    _track(
+        _model_calls_in_flight,
+        _model_call_key(callback_context),
+        (time.perf_counter(), llm_request.model or ""),
+        started_at=lambda entry: entry[0],
+    )
+    return None
+
+
+def metrics_after_model_callback(callback_context, llm_response, metrics: AgentMetrics = agent_metrics):
+    """
+    Records tokens, cost and latency of a finished model call.
+
+    Partial (streaming) chunks are ignored; the aggregated response is counted once.
+    A response from the model router (utils/llm/model_router.py) counts once
+    per model it tried, each with its own tokens and latency.
+
+    Args:
+        callback_context: ADK CallbackContext.
+        llm_response: ADK LlmResponse returned by the model.
+        metrics (AgentMetrics): Registry to record into.
+
+    Returns:
+        None (keeps the model response unchanged)
+    """
+    if llm_response.partial:
+        return None
+    started_at, model = _untrack(_model_calls_in_flight, _model_call_key(callback_context), (None, ""))
+    app_name, agent_name = _context_labels(callback_context)
+    attempts = (llm_response.custom_metadata or {}).get(ROUTE_ATTEMPTS_KEY)
+    if attempts:
+        for attempt in attempts:
+            metrics.record_model_call(
+                app_name=app_name,
+                agent=agent_name,
+                model=attempt["model"],
+                prompt_tokens=attempt["prompt_tokens"],
+                completion_tokens=attempt["completion_tokens"],
+                cached_tokens=attempt["cached_tokens"],
+                latency_s=attempt["latency_s"],
+            )
+        return None
+    usage = get_usage(llm_response)
+    metrics.record_model_call(
+        app_name=app_name,
+        agent=agent_name,
+        model=model or "unknown",
+        prompt_tokens=usage.get("prompt_token_count") or 0,
+        completion_tokens=usage.get("candidates_token_count") or 0,
+        cached_tokens=usage.get("cached_content_token_count") or 0,
+        latency_s=None if started_at is None else time.perf_counter() - started_at,
+    )
+    return None
+
+
+def metrics_before_tool_callback(tool, args: dict, tool_context):
+    """
+    Remembers when a tool call started.
+
+    Args:
+        tool: The ADK BaseTool being called.
+        args (dict): The tool arguments.
+        tool_context: ADK ToolContext.
+
+    Returns:
+        None (never replaces the tool call)
+    """
+    _track(_tool_calls_in_flight, tool_context.function_call_id, time.perf_counter(), started_at=lambda entry: entry)
+    return None
+
+
+def metrics_after_tool_callback(tool, args: dict, tool_context, tool_response, metrics: AgentMetrics = agent_metrics):
+    """
+    Records the latency and outcome of a finished tool call.
+
+    A tool response that is a dict with an "error" key counts as an error.
+
+    Args:
+        tool: The ADK BaseTool that was called.
+        args (dict): The tool arguments.
+        tool_context: ADK ToolContext.
+        tool_response: The value returned by the tool.
+        metrics (AgentMetrics): Registry to record into.
+
+    Returns:
+        None (keeps the tool response unchanged)
+    """
+    started_at = _untrack(_tool_calls_in_flight, tool_context.function_call_id)
+    if started_at is None:
+        return None
+    app_name, agent_name = _context_labels(tool_context)
+    metrics.record_tool_call(
+        app_name=app_name,
+        agent=agent_name,
+        tool=tool.name,
+        latency_s=time.perf_counter() - started_at,
+        error=isinstance(tool_response, dict) and "error" in tool_response,
+    )
+    return None
+
+
+def instrument_agent(agent: BaseAgent) -> BaseAgent:
+    """
+    Attaches the metrics callbacks to every LlmAgent in an agent tree.
+
+    Existing callbacks are kept and chained. Calling this twice on the same
+    tree is a no-op for already instrumented agents. Also enables usage
+    capture for Gemini models (see utils/metrics/metered_gemini.py).
+
+    Args:
+        agent (BaseAgent): The root of the agent tree.
+
+    Returns:
+        BaseAgent: The same agent, for chaining.
+    """
+    enable_usage_capture()
+    pending = [agent]
+    while pending:
+        current = pending.pop()
+        pending.extend(current.sub_agents)
+        if not isinstance(current, LlmAgent) or has_callback(current.after_model_callback, metrics_after_model_callback):
+            continue
+        # The agent's own before-callbacks run first, so a call they short-circuit
+        # is never counted. The metrics after-callbacks run first so they see the
+        # real response before the agent's own callbacks may replace it.
+        current.before_model_callback = chain_callbacks(current.before_model_callback, metrics_before_model_callback)
+        current.after_model_callback = chain_callbacks(metrics_after_model_callback, current.after_model_callback)
+        current.before_tool_callback = chain_callbacks(current.before_tool_callback, metrics_before_tool_callback)
+        current.after_tool_callback = chain_callbacks(metrics_after_tool_callback, current.after_tool_callback)
+    return agent
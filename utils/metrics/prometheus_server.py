@@ -0,0 +1,85 @@
+"""
+Prometheus Metrics Server
+-------------------------
+
+Serves the process-wide agent metrics on a local HTTP port:
+
+    GET /metrics   Prometheus text exposition format (0.0.4)
+    GET /snapshot  the same data as JSON (see AgentMetrics.snapshot())
+
+The server runs on a daemon thread so it never blocks the agent event loop.
+"""
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from utils.metrics.agent_metrics import AgentMetrics, agent_metrics
+
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+
+
+def _make_handler(metrics: AgentMetrics) -> type:
+    """Builds a request handler class bound to a metrics registry."""
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] == "/metrics":
+                body = metrics.render_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.split("?", 1)[0] == "/snapshot":
+                body = json.dumps(metrics.snapshot()).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes every few seconds would otherwise flood the console.
+            pass
+
+    return MetricsRequestHandler
+
+
+def start_metrics_server(
+    port: Optional[int] = None,
+    host: str = DEFAULT_METRICS_HOST,
+    metrics: AgentMetrics = agent_metrics,
+) -> ThreadingHTTPServer:
+    """
+    Starts the metrics HTTP server on a background daemon thread.
+
+    Args:
+        port (int, optional): Port to listen on. Defaults to $METRICS_PORT or 9464.
+            Pass 0 to let the OS pick a free port (see server.server_address).
+        host (str): Interface to bind. Defaults to localhost only.
+        metrics (AgentMetrics): Registry to expose.
+
+    Returns:
+        ThreadingHTTPServer: The running server; pass it to stop_metrics_server().
+    """
+    if port is None:
+        port = int(os.environ.get("METRICS_PORT", DEFAULT_METRICS_PORT))
+    server = ThreadingHTTPServer((host, port), _make_handler(metrics))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+def stop_metrics_server(server: ThreadingHTTPServer) -> None:
+    """
+    Stops a server started by start_metrics_server() and releases its port.
+
+    Args:
+        server (ThreadingHTTPServer): The server to stop.
+    """
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,844 @@
+"""
+Async Session Service
+---------------------
+
+A drop-in replacement for ADK's DatabaseSessionService that does its database
+I/O on SQLAlchemy asyncio (aiosqlite for SQLite URLs) instead of blocking the
+event loop the agents run on.
+
+ADK 0.4's Runner calls the session service synchronously from inside
+runner.run_async(). To keep that interface, all database work runs on a
+private event loop in a dedicated I/O thread:
+
+    * append_event() - called for every event of every turn - updates the
+      in-memory session and queues the write; it returns immediately. A single
+      writer drains the queue in order and commits everything queued so far in
+      one transaction.
+    * get_session() answers from memory for sessions this service created,
+      loaded or appended to recently (the Runner calls it once per turn), so
+      a running conversation never waits on the database. The live sessions
+      are kept in a memory-bounded SessionCache (utils/sessions/session_cache.py). Other sessions
+      are loaded from the database, which blocks until the I/O thread answers,
+      as do create_session(), list_sessions() and delete_session().
+    * every method has an awaitable *_async twin for callers that can await;
+      those never block the calling loop.
+
+Like DatabaseSessionService (which raises on stale sessions), this assumes a
+session is written by one process at a time.
+
+Durability: a queued event is written a few milliseconds after append_event()
+returns. flush() (or close(), run at exit for services from
+get_async_session_service()) waits for all queued writes. Write failures are
+logged and re-raised by the next flush().
+
+Write-behind mode (commit_interval_s > 0, e.g. $SESSION_WRITE_BEHIND_MS=50
+for get_async_session_service()) turns this into a group commit: after the
+first queued event the writer waits up to commit_interval_s for more, so the
+events of many turns and sessions share one transaction. A batch is
+committed early when MAX_WRITE_BATCH events are queued, when flush() or
+flush_async() is called (call_agent_async() does so at the end of every
+turn), and before any read that has to go to the database.
+
+    Durability window: an event is in the database at most commit_interval_s
+    (plus the commit itself) after append_event() returns, and always once
+    the turn has ended.
+
+    Crash recovery: with a journal_path, append_event() also appends the
+    event as a JSON line to that file (flushed to the OS, not fsynced). The
+    journal is rotated whenever the writer takes everything journaled so far
+    and the old segment is deleted once that batch is committed. Events the
+    writer failed to commit are first copied to a ".failed" segment, which
+    is kept until the next start. On start, events left in the journal that
+    are not in the database are written first, so a crashed process loses no
+    event whose append_event() returned.
+    A power loss or OS crash can still lose what the OS had not yet written
+    out. Without a journal, a crash loses at most the durability window.
+"""
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Any, Coroutine, Dict, List, Optional, Tuple
+
+from google.adk.events.event import Event
+from google.adk.sessions import _session_util
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListEventsResponse,
+    ListSessionsResponse,
+)
+from google.adk.sessions.database_session_service import (
+    Base,
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+    _extract_state_delta,
+    _merge_state,
+)
+from google.adk.sessions.session import Session
+from sqlalchemy import delete, event as sqlalchemy_event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from utils.sessions.session_cache import SessionCache, changes_shared_state, copy_session
+from utils.sessions.session_compression import compressing_for
+from utils.sessions.session_headers import DEFAULT_PAGE_SIZE, SessionPage, latest_session_header, list_session_headers
+from utils.sessions.session_serializer import attach_serializer
+from utils.sessions.session_service_provider import (
+    POOL_MAX_OVERFLOW,
+    POOL_SIZE,
+    apply_sqlite_pragmas,
+    create_session_indexes,
+)
+from utils.sessions.state_patches import (
+    CHECKPOINT_EVERY_PATCHED_EVENTS,
+    PatchedEventCounter,
+    checkpoint_state_patches,
+    event_patches,
+    restore_patched_state,
+)
+
+logger = logging.getLogger(__name__)
+
+# Sync drivers in DB URLs and their asyncio counterparts.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+# Most events written in one transaction.
+MAX_WRITE_BATCH = 500
+
+# Suffix of a rotated journal segment whose events are being committed.
+JOURNAL_COMMITTING_SUFFIX = ".committing"
+
+# Suffix of the journal segment holding events the writer failed to commit.
+JOURNAL_FAILED_SUFFIX = ".failed"
+
+
+def to_async_db_url(db_url: str) -> str:
+    """
+    Switches a database URL to the asyncio driver of its backend.
+
+    Args:
+        db_url (str): e.g. "sqlite:///db_loop_agent.db".
+
+    Returns:
+        str: e.g. "sqlite+aiosqlite:///db_loop_agent.db". URLs that already
+            name a driver are returned unchanged.
+    """
+    url = make_url(db_url)
+    if url.drivername in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[url.drivername])
+    return url.render_as_string(hide_password=False)
+
+
+def default_journal_path(db_url: str) -> Optional[str]:
+    """
+    Where the write-behind journal of a database goes.
+
+    Args:
+        db_url (str): Database URL.
+
+    Returns:
+        str: $SESSION_WRITE_JOURNAL_PATH if set, else "<db file>.events-journal"
+            for SQLite files, else None (no journal).
+    """
+    if os.environ.get("SESSION_WRITE_JOURNAL_PATH"):
+        return os.environ["SESSION_WRITE_JOURNAL_PATH"]
+    url = make_url(db_url)
+    if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+        return f"{url.database}.events-journal"
+    return None
+
+
+def to_storage_event(session: Session, event: Event) -> StorageEvent:
+    """Builds the events-table row for an event, as DatabaseSessionService.append_event() does."""
+    storage_event = StorageEvent(
+        id=event.id,
+        invocation_id=event.invocation_id,
+        author=event.author,
+        branch=event.branch,
+        actions=event.actions,
+        session_id=session.id,
+        app_name=session.app_name,
+        user_id=session.user_id,
+        timestamp=datetime.fromtimestamp(event.timestamp),
+        long_running_tool_ids=event.long_running_tool_ids,
+        grounding_metadata=event.grounding_metadata,
+        partial=event.partial,
+        turn_complete=event.turn_complete,
+        error_code=event.error_code,
+        error_message=event.error_message,
+        interrupted=event.interrupted,
+    )
+    if event.content:
+        storage_event.content = _session_util.encode_content(event.content)
+    return storage_event
+
+
+def from_storage_event(storage_event: StorageEvent) -> Event:
+    """Builds an Event from its events-table row, as DatabaseSessionService.get_session() does."""
+    return Event(
+        id=storage_event.id,
+        author=storage_event.author,
+        branch=storage_event.branch,
+        invocation_id=storage_event.invocation_id,
+        content=_session_util.decode_content(storage_event.content),
+        actions=storage_event.actions,
+        timestamp=storage_event.timestamp.timestamp(),
+        long_running_tool_ids=storage_event.long_running_tool_ids,
+        grounding_metadata=storage_event.grounding_metadata,
+        partial=storage_event.partial,
+        turn_complete=storage_event.turn_complete,
+        error_code=storage_event.error_code,
+        error_message=storage_event.error_message,
+        interrupted=storage_event.interrupted,
+    )
+
+
+class AsyncDatabaseSessionService(BaseSessionService):
+    """
+    Session service on SQLAlchemy asyncio, run from a dedicated I/O thread.
+
+    Uses the same tables as DatabaseSessionService, so both can open the same
+    database. Supports the incremental state operations in
+    utils/sessions/state_patches.py.
+
+    Args:
+        db_url (str): Database URL; sync URLs like "sqlite:///file.db" are
+            switched to their asyncio driver (see to_async_db_url()).
+        commit_interval_s (float): Group-commit window of write-behind mode;
+            0 commits as soon as the writer is free.
+        journal_path (str, optional): Crash-recovery journal (see module docstring).
+        cache (SessionCache, optional): Holds the live sessions; defaults to a new SessionCache().
+    """
+
+    supports_state_patches = True
+
+    def __init__(
+        self,
+        db_url: str,
+        commit_interval_s: float = 0.0,
+        journal_path: Optional[str] = None,
+        cache: Optional[SessionCache] = None,
+    ):
+        self.db_url = db_url
+        self.commit_interval_s = commit_interval_s
+        self.journal_path = journal_path
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="session-io", daemon=True)
+        self._thread.start()
+
+        url = make_url(to_async_db_url(db_url))
+        if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+            self.db_engine = create_async_engine(url, poolclass=StaticPool)
+        else:
+            self.db_engine = create_async_engine(url, pool_size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW)
+        if url.get_backend_name() == "sqlite":
+            sqlalchemy_event.listen(self.db_engine.sync_engine, "connect", apply_sqlite_pragmas)
+        attach_serializer(self.db_engine)
+        self.DatabaseSessionFactory = async_sessionmaker(self.db_engine, expire_on_commit=False)
+
+        self.cache = cache if cache is not None else SessionCache()
+
+        # Write-behind queue. _queued/_written count events so flush() knows
+        # when everything appended before it has been committed.
+        self._write_queue: asyncio.Queue = None
+        self._write_progress = threading.Condition()
+        self._queued = 0
+        self._written = 0
+        self._write_errors: List[BaseException] = []
+        self._closed = False
+        # Events taken off the queue by the writer (I/O thread only).
+        self._drained = 0
+        # (target _written count, future) of flush_async() callers (I/O thread only).
+        self._write_waiters: List[Tuple[int, asyncio.Future]] = []
+        # Highest _written count a flush is waiting for, and the signal that
+        # ends a group-commit window early (I/O thread only).
+        self._flush_target = 0
+        self._flush_requested: asyncio.Event = None
+        self._journal = None
+        # Events with state patches per session since its last checkpoint (I/O thread only).
+        self._patched_events = PatchedEventCounter()
+
+        self._run(self._start())
+
+    # ---------------------------------------------------------------- plumbing
+
+    def _submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _run(self, coro: Coroutine) -> Any:
+        """Runs a coroutine on the I/O thread and blocks until it is done."""
+        return self._submit(coro).result()
+
+    async def _await(self, coro: Coroutine) -> Any:
+        """Runs a coroutine on the I/O thread without blocking the calling loop."""
+        return await asyncio.wrap_future(self._submit(coro))
+
+    async def _start(self) -> None:
+        async with self.db_engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.run_sync(create_session_indexes)
+        self._write_queue = asyncio.Queue()
+        self._flush_requested = asyncio.Event()
+        if self.journal_path:
+            await self._recover_journal()
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._writer = asyncio.create_task(self._write_events_forever())
+
+    @staticmethod
+    async def _load_states(db: AsyncSession, app_name: str, user_id: str):
+        storage_app_state = await db.get(StorageAppState, (app_name))
+        storage_user_state = await db.get(StorageUserState, (app_name, user_id))
+        return storage_app_state, storage_user_state
+
+    def _remember(self, session: Session) -> Session:
+        """Makes a session live and returns a copy for the caller."""
+        self.cache.put(session)
+        return copy_session(session)
+
+    async def _wait_for_writes(self) -> None:
+        """Waits until every event queued so far is committed (runs on the I/O thread)."""
+        target = self._queued
+        if self._written >= target:
+            return
+        self._set_flush_target(target)
+        future = self._loop.create_future()
+        self._write_waiters.append((target, future))
+        await future
+
+    def _set_flush_target(self, target: int) -> None:
+        """Commits without waiting for the group-commit window until `target` events are written."""
+        self._flush_target = max(self._flush_target, target)
+        self._flush_requested.set()
+
+    def _request_flush(self, target: int) -> None:
+        """_set_flush_target() from any thread."""
+        self._loop.call_soon_threadsafe(self._set_flush_target, target)
+
+    def _wait_written(self, target: int, timeout: Optional[float]) -> bool:
+        with self._write_progress:
+            return self._write_progress.wait_for(lambda: self._written >= target, timeout=timeout)
+
+    # ------------------------------------------------------- database access
+
+    async def _create_session(
+        self, app_name: str, user_id: str, state: Optional[dict], session_id: Optional[str]
+    ) -> Session:
+        async with self.DatabaseSessionFactory() as db:
+            storage_app_state, storage_user_state = await self._load_states(db, app_name, user_id)
+            app_state = storage_app_state.state if storage_app_state else {}
+            user_state = storage_user_state.state if storage_user_state else {}
+            if not storage_app_state:
+                storage_app_state = StorageAppState(app_name=app_name, state={})
+                db.add(storage_app_state)
+            if not storage_user_state:
+                storage_user_state = StorageUserState(app_name=app_name, user_id=user_id, state={})
+                db.add(storage_user_state)
+
+            app_state_delta, user_state_delta, session_state = _extract_state_delta(state)
+            app_state.update(app_state_delta)
+            user_state.update(user_state_delta)
+            if app_state_delta:
+                storage_app_state.state = app_state
+            if user_state_delta:
+                storage_user_state.state = user_state
+
+            storage_session = StorageSession(app_name=app_name, user_id=user_id, id=session_id, state=session_state)
+            db.add(storage_session)
+            with compressing_for(app_name):
+                await db.commit()
+            await db.refresh(storage_session)
+
+            return Session(
+                app_name=str(storage_session.app_name),
+                user_id=str(storage_session.user_id),
+                id=str(storage_session.id),
+                state=_merge_state(app_state, user_state, session_state),
+                last_update_time=storage_session.update_time.timestamp(),
+            )
+
+    async def _get_session(
+        self, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig]
+    ) -> Optional[Session]:
+        await self._wait_for_writes()
+        async with self.DatabaseSessionFactory() as db:
+            storage_session = await db.get(StorageSession, (app_name, user_id, session_id))
+            if storage_session is None:
+                return None
+
+            query = select(StorageEvent).where(StorageEvent.session_id == storage_session.id)
+            if config and config.after_timestamp:
+                query = query.where(StorageEvent.timestamp < datetime.fromtimestamp(config.after_timestamp))
+            query = query.order_by(StorageEvent.timestamp.asc())
+            if config and config.num_recent_events:
+                query = query.limit(config.num_recent_events)
+            storage_events = (await db.execute(query)).scalars().all()
+
+            storage_app_state, storage_user_state = await self._load_states(db, app_name, user_id)
+            session = Session(
+                app_name=app_name,
+                user_id=user_id,
+                id=session_id,
+                state=_merge_state(
+                    storage_app_state.state if storage_app_state else {},
+                    storage_user_state.state if storage_user_state else {},
+                    storage_session.state,
+                ),
+                last_update_time=storage_session.update_time.timestamp(),
+            )
+            session.events = [from_storage_event(e) for e in storage_events]
+            restore_patched_state(session)
+            return session
+
+    async def _list_sessions(self, app_name: str, user_id: str) -> ListSessionsResponse:
+        async with self.DatabaseSessionFactory() as db:
+            results = await db.execute(
+                select(StorageSession).where(StorageSession.app_name == app_name, StorageSession.user_id == user_id)
+            )
+            return ListSessionsResponse(sessions=[
+                Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=storage_session.id,
+                    state={},
+                    last_update_time=storage_session.update_time.timestamp(),
+                )
+                for storage_session in results.scalars()
+            ])
+
+    async def _delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        await self._wait_for_writes()
+        async with self.DatabaseSessionFactory() as db:
+            await db.execute(delete(StorageSession).where(
+                StorageSession.app_name == app_name,
+                StorageSession.user_id == user_id,
+                StorageSession.id == session_id,
+            ))
+            await db.commit()
+        self._patched_events.forget((app_name, user_id, session_id))
+
+    async def _write_batch(self, batch: List[Tuple[Session, Event]]) -> List[Tuple[Session, Event]]:
+        """
+        Commits a batch of events, retrying them one by one if the batch fails.
+
+        Returns:
+            list: The events that were not committed; their errors are in _write_errors.
+        """
+        try:
+            async with self.DatabaseSessionFactory() as db:
+                # Load every row the batch touches once, before anything is
+                # added, so the ORM neither autoflushes nor re-selects per event.
+                storage_sessions, app_states, user_states = {}, {}, {}
+                for session, _ in batch:
+                    key = (session.app_name, session.user_id, session.id)
+                    if key not in storage_sessions:
+                        storage_sessions[key] = await db.get(StorageSession, key)
+                        if storage_sessions[key] is None:
+                            raise ValueError(f"Session {session.id} does not exist.")
+                    if session.app_name not in app_states:
+                        app_states[session.app_name] = await db.get(StorageAppState, (session.app_name))
+                    if key[:2] not in user_states:
+                        user_states[key[:2]] = await db.get(StorageUserState, key[:2])
+
+                app_state_deltas, user_state_deltas, session_state_deltas = {}, {}, {}
+                for session, event in batch:
+                    key = (session.app_name, session.user_id, session.id)
+                    if event.actions and event.actions.state_delta:
+                        app_delta, user_delta, session_delta = _extract_state_delta(event.actions.state_delta)
+                        app_state_deltas.setdefault(session.app_name, {}).update(app_delta)
+                        user_state_deltas.setdefault(key[:2], {}).update(user_delta)
+                        session_state_deltas.setdefault(key, {}).update(session_delta)
+                    db.add(to_storage_event(session, event))
+
+                # Assign new dicts: JSON columns only notice reassignment.
+                for rows, deltas in ((app_states, app_state_deltas), (user_states, user_state_deltas),
+                                     (storage_sessions, session_state_deltas)):
+                    for key, delta in deltas.items():
+                        if delta and rows[key] is not None:
+                            rows[key].state = {**rows[key].state, **delta}
+                # Every append counts as an update, as in DatabaseSessionService
+                # (session lists are ordered by update_time).
+                for storage_session in storage_sessions.values():
+                    storage_session.update_time = func.now()
+                # A batch mixing apps is compressed without dictionaries.
+                apps = {session.app_name for session, _ in batch}
+                with compressing_for(apps.pop() if len(apps) == 1 else None):
+                    await db.commit()
+        except Exception:
+            if len(batch) == 1:
+                session, event = batch[0]
+                logger.exception("Failed to persist event %s of session %s", event.id, session.id)
+                raise
+            # Retry one by one so a single bad event does not drop the whole batch.
+            failed = []
+            for item in batch:
+                try:
+                    await self._write_batch([item])
+                except Exception as e:
+                    self._write_errors.append(e)
+                    failed.append(item)
+            return failed
+        await self._checkpoint_patches(batch)
+        return []
+
+    async def _checkpoint_patches(self, batch: List[Tuple[Session, Event]]) -> None:
+        """Folds state patches into the sessions table every CHECKPOINT_EVERY_PATCHED_EVENTS events."""
+        due = []
+        for session, event in batch:
+            if event_patches(event.actions):
+                key = (session.app_name, session.user_id, session.id)
+                if self._patched_events.count(key, CHECKPOINT_EVERY_PATCHED_EVENTS):
+                    due.append(key)
+        for key in due:
+            async with self.DatabaseSessionFactory() as db:
+                with compressing_for(key[0]):
+                    await db.run_sync(checkpoint_state_patches, *key)
+
+    async def _write_events_forever(self) -> None:
+        while True:
+            batch = [await self._write_queue.get()]
+            if self.commit_interval_s and self._flush_target <= self._written:
+                # Group commit: let more events join this transaction.
+                try:
+                    await asyncio.wait_for(self._flush_requested.wait(), self.commit_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+            self._flush_requested.clear()
+            while len(batch) < MAX_WRITE_BATCH and not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            self._drained += len(batch)
+            committing_segment = self._rotate_journal()
+            try:
+                failed = await self._write_batch(batch)
+            except Exception as e:
+                self._write_errors.append(e)
+                failed = batch
+            if failed and self._journal is not None:
+                # Keep them for the next start before their segment goes.
+                self._journal_failed(failed)
+            if committing_segment:
+                os.remove(committing_segment)
+            with self._write_progress:
+                self._written += len(batch)
+                self._write_progress.notify_all()
+            waiting = []
+            for target, future in self._write_waiters:
+                if target > self._written:
+                    waiting.append((target, future))
+                elif not future.done():
+                    future.set_result(None)
+            self._write_waiters = waiting
+
+    # --------------------------------------------------------------- journal
+
+    def _rotate_journal(self) -> Optional[str]:
+        """
+        Starts a new journal segment if every journaled event has been taken
+        off the queue, so the old segment can go once they are committed.
+
+        Returns:
+            str: Path of the old segment, or None if the journal was not rotated.
+        """
+        if self._journal is None:
+            return None
+        with self._write_progress:
+            if self._drained != self._queued or self._journal.tell() == 0:
+                return None
+            self._journal.close()
+            committing_segment = self.journal_path + JOURNAL_COMMITTING_SUFFIX
+            os.replace(self.journal_path, committing_segment)
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        return committing_segment
+
+    @staticmethod
+    def _journal_record(session: Session, event: Event) -> str:
+        record = {
+            "app_name": session.app_name,
+            "user_id": session.user_id,
+            "session_id": session.id,
+            "event": event.model_dump(mode="json", exclude_none=True),
+        }
+        return json.dumps(record) + "\n"
+
+    def _journal_event(self, session: Session, event: Event) -> None:
+        """Appends an event to the journal. Called with _write_progress held."""
+        self._journal.write(self._journal_record(session, event))
+        self._journal.flush()
+
+    def _journal_failed(self, items: List[Tuple[Session, Event]]) -> None:
+        """Appends events the writer could not commit to the failed segment, which only recovery clears."""
+        with open(self.journal_path + JOURNAL_FAILED_SUFFIX, "a", encoding="utf-8") as f:
+            f.writelines(self._journal_record(session, event) for session, event in items)
+
+    async def _recover_journal(self) -> None:
+        """Writes journaled events that never reached the database, then clears the journal."""
+        segments = [
+            self.journal_path + JOURNAL_FAILED_SUFFIX,
+            self.journal_path + JOURNAL_COMMITTING_SUFFIX,
+            self.journal_path,
+        ]
+        # A failed event can also still be in a later segment; keep its first copy.
+        journaled: Dict[Tuple[str, str, str, str], Tuple[Session, Event]] = {}
+        for segment in segments:
+            if not os.path.exists(segment):
+                continue
+            with open(segment, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line of a crashed process can be cut short.
+                        logger.warning("Ignoring a torn record at the end of %s", segment)
+                        break
+                    session = Session(app_name=record["app_name"], user_id=record["user_id"], id=record["session_id"])
+                    event = Event.model_validate(record["event"])
+                    journaled.setdefault((session.app_name, session.user_id, session.id, event.id), (session, event))
+
+        items = list(journaled.values())
+        for start in range(0, len(items), MAX_WRITE_BATCH):
+            chunk = items[start:start + MAX_WRITE_BATCH]
+            async with self.DatabaseSessionFactory() as db:
+                written = set((await db.execute(
+                    select(StorageEvent.app_name, StorageEvent.user_id, StorageEvent.session_id, StorageEvent.id)
+                    .where(StorageEvent.id.in_([event.id for _, event in chunk]))
+                )).all())
+            pending = [
+                (session, event) for session, event in chunk
+                if (session.app_name, session.user_id, session.id, event.id) not in written
+            ]
+            if pending:
+                logger.warning("Recovering %d session events from %s", len(pending), self.journal_path)
+                try:
+                    await self._write_batch(pending)
+                except Exception:
+                    pass  # already logged; the event's session is gone
+        for segment in segments:
+            if os.path.exists(segment):
+                os.remove(segment)
+
+    # ----------------------------------------------------- BaseSessionService
+
+    def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session = self._run(self._create_session(app_name, user_id, state, session_id))
+        if changes_shared_state(state):
+            self.cache.clear()
+        self.cache.invalidate_list((app_name, user_id))
+        return self._remember(session)
+
+    def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if config is None:
+            session = self.cache.get((app_name, user_id, session_id))
+            if session is not None:
+                return session
+        session = self._run(self._get_session(app_name, user_id, session_id, config))
+        if session is not None and config is None:
+            return self._remember(session)
+        return session
+
+    def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        response = self.cache.get_list((app_name, user_id))
+        if response is None:
+            response = self._run(self._list_sessions(app_name, user_id))
+            self.cache.put_list((app_name, user_id), response)
+        return response
+
+    def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        self.cache.invalidate((app_name, user_id, session_id))
+        self._run(self._delete_session(app_name, user_id, session_id))
+
+    def list_events(self, *, app_name: str, user_id: str, session_id: str) -> ListEventsResponse:
+        raise NotImplementedError()
+
+    def list_session_headers(
+        self, *, app_name: str, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ) -> SessionPage:
+        """A page of the user's session headers, newest first (see session_headers.list_session_headers())."""
+        return self.run_sync(lambda db: list_session_headers(db, app_name, user_id, limit=limit, cursor=cursor))
+
+    def latest_session(self, *, app_name: str, user_id: str) -> Optional[Session]:
+        """
+        Returns:
+            Session: The user's most recently updated session, or None if there is none.
+        """
+        header = self.run_sync(latest_session_header, app_name, user_id)
+        if header is None:
+            return None
+        return self.get_session(app_name=app_name, user_id=user_id, session_id=header.id)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        """
+        Applies the event to the in-memory session and queues its write.
+
+        Args:
+            session (Session): The session the event belongs to.
+            event (Event): The event to append.
+
+        Returns:
+            Event: The same event. The database write happens in the background.
+        """
+        if event.partial:
+            return event
+        if self._closed:
+            raise RuntimeError("AsyncDatabaseSessionService is closed.")
+        super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        if changes_shared_state(event.actions.state_delta):
+            self.cache.clear()
+        self.cache.put(session, appended=event)
+        self.cache.invalidate_list((session.app_name, session.user_id))
+        with self._write_progress:
+            if self._journal is not None:
+                self._journal_event(session, event)
+            self._queued += 1
+            backlog = self._queued - self._written
+        self._loop.call_soon_threadsafe(self._write_queue.put_nowait, (session, event))
+        if self.commit_interval_s and backlog >= MAX_WRITE_BATCH:
+            self._request_flush(self._queued)
+        return event
+
+    def evict(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """
+        Drops the in-memory copy of a session so the next get_session() reads
+        the database again. Call it after changing a session's rows directly.
+        """
+        self.cache.invalidate((app_name, user_id, session_id))
+
+    def run_sync(self, fn, *args: Any) -> Any:
+        """
+        Runs fn(orm_session, *args) with a synchronous-style ORM session on the
+        I/O thread, after all queued writes, and returns its result. The
+        function must commit itself.
+
+        This lets code written for DatabaseSessionService's sync
+        DatabaseSessionFactory work against this service too.
+        """
+        async def run() -> Any:
+            await self._wait_for_writes()
+            async with self.DatabaseSessionFactory() as db:
+                return await db.run_sync(fn, *args)
+
+        return self._run(run())
+
+    # ------------------------------------------------------ awaitable variants
+
+    async def create_session_async(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        """Awaitable create_session()."""
+        session = await self._await(self._create_session(app_name, user_id, state, session_id))
+        self.cache.invalidate_list((app_name, user_id))
+        return self._remember(session)
+
+    async def get_session_async(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        """
+        Awaitable get_session(). Also warms the live session, so a following
+        runner.run_async() for the same session does not block on the database.
+        """
+        if config is None:
+            session = self.cache.get((app_name, user_id, session_id))
+            if session is not None:
+                return session
+        session = await self._await(self._get_session(app_name, user_id, session_id, config))
+        if session is not None and config is None:
+            return self._remember(session)
+        return session
+
+    async def list_sessions_async(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        """Awaitable list_sessions()."""
+        response = self.cache.get_list((app_name, user_id))
+        if response is None:
+            response = await self._await(self._list_sessions(app_name, user_id))
+            self.cache.put_list((app_name, user_id), response)
+        return response
+
+    async def delete_session_async(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """Awaitable delete_session()."""
+        self.cache.invalidate((app_name, user_id, session_id))
+        await self._await(self._delete_session(app_name, user_id, session_id))
+
+    async def flush_async(self) -> None:
+        """Awaitable flush(); ends a write-behind window early."""
+        await self._await(self._wait_for_writes())
+        self._raise_write_error()
+
+    # ------------------------------------------------------------- lifecycle
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits until every event appended so far is written, ending a
+        write-behind window early.
+
+        Args:
+            timeout (float, optional): Seconds to wait at most.
+
+        Raises:
+            TimeoutError: If the writes did not finish within the timeout.
+            Exception: The first write failure since the last flush().
+        """
+        target = self._queued
+        if self._written < target:
+            self._request_flush(target)
+        if not self._wait_written(target, timeout):
+            raise TimeoutError(f"Session events still queued after {timeout}s.")
+        self._raise_write_error()
+
+    def _raise_write_error(self) -> None:
+        """Raises the first write failure since the last flush, if any."""
+        if self._write_errors:
+            error, self._write_errors = self._write_errors[0], []
+            raise error
+
+    def close(self) -> None:
+        """Writes what is queued, disposes the engine and stops the I/O thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        finally:
+            self._loop.call_soon_threadsafe(self._writer.cancel)
+            self._run(self.db_engine.dispose())
+            if self._journal is not None:
+                self._journal.close()
+                # Everything is committed; an empty journal has nothing to recover.
+                if not self._write_errors and os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) == 0:
+                    os.remove(self.journal_path)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
@@ -0,0 +1,361 @@
+"""
+History Compaction
+------------------
+
+Keeps long-lived sessions small. Once a session holds more than
+CompactionPolicy.max_events events or about max_tokens tokens of content,
+everything but the most recent turns is folded into a single summary event,
+and the raw events are moved from the hot `events` table to
+`archived_events`.
+
+The summary event is authored by "history_summary", so ADK passes it to the
+model as "[history_summary] said: ..." context. Session state is stored
+separately from events and is not affected.
+
+Usage:
+    from utils.sessions.history_compaction import compact_session_if_needed
+    compact_session_if_needed(session_service, APP_NAME, USER_ID, SESSION_ID)  # between turns
+"""
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.database_session_service import StorageEvent
+from google.adk.sessions.session import Session
+from google.genai import types
+from sqlalchemy import DateTime, String, Text, delete
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from utils.sessions.session_compression import compressing_for
+from utils.sessions.state_patches import checkpoint_state_patches
+
+SUMMARY_AUTHOR = "history_summary"
+
+# Rough size of a token in characters, good enough to decide when to compact.
+CHARS_PER_TOKEN = 4
+
+# Summarizer signature: (previous summary or "", events being folded) -> new summary.
+Summarizer = Callable[[str, List[Event]], str]
+
+
+class ArchiveBase(DeclarativeBase):
+    pass
+
+
+class StorageArchivedEvent(ArchiveBase):
+    """An event moved out of the events table by compaction, kept as JSON."""
+
+    __tablename__ = "archived_events"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    app_name: Mapped[str] = mapped_column(String, primary_key=True)
+    user_id: Mapped[str] = mapped_column(String, primary_key=True)
+    session_id: Mapped[str] = mapped_column(String, primary_key=True, index=True)
+    timestamp: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now)
+    event_json: Mapped[str] = mapped_column(Text)
+
+
+class CompactionPolicy:
+    """
+    When to compact a session and how much of it to keep.
+
+    Args:
+        max_events (int): Compact once the session has more events than this.
+        max_tokens (int): ...or once its event content is estimated above this.
+        keep_recent_events (int): Roughly how many of the newest events stay raw.
+            The cut is moved back to the start of a user turn so a turn is never split.
+        summary_max_chars (int): Upper bound for the summary text.
+    """
+
+    def __init__(
+        self,
+        max_events: int = 120,
+        max_tokens: int = 30000,
+        keep_recent_events: int = 30,
+        summary_max_chars: int = 6000,
+    ):
+        self.max_events = max_events
+        self.max_tokens = max_tokens
+        self.keep_recent_events = keep_recent_events
+        self.summary_max_chars = summary_max_chars
+
+    @classmethod
+    def from_env(cls) -> "CompactionPolicy":
+        """Policy from $HISTORY_MAX_EVENTS, $HISTORY_MAX_TOKENS and $HISTORY_KEEP_RECENT_EVENTS."""
+        defaults = cls()
+        return cls(
+            max_events=int(os.environ.get("HISTORY_MAX_EVENTS", defaults.max_events)),
+            max_tokens=int(os.environ.get("HISTORY_MAX_TOKENS", defaults.max_tokens)),
+            keep_recent_events=int(os.environ.get("HISTORY_KEEP_RECENT_EVENTS", defaults.keep_recent_events)),
+        )
+
+
+def event_text(event: Event) -> str:
+    """Text, function calls and function responses of an event as one string."""
+    if not event.content or not event.content.parts:
+        return ""
+    chunks = []
+    for part in event.content.parts:
+        if part.text:
+            chunks.append(part.text)
+        elif part.function_call:
+            chunks.append(f"called {part.function_call.name}({part.function_call.args or {}})")
+        elif part.function_response:
+            chunks.append(f"{part.function_response.name} returned {part.function_response.response}")
+    return "\n".join(chunks)
+
+
+def estimate_tokens(events: List[Event]) -> int:
+    """
+    Estimates the prompt tokens the events add to a model request.
+
+    Args:
+        events (list[Event]): Session events.
+
+    Returns:
+        int: Approximate token count (characters / CHARS_PER_TOKEN).
+    """
+    return sum(len(event_text(event)) for event in events) // CHARS_PER_TOKEN
+
+
+def summarize_events_locally(previous_summary: str, events: List[Event], max_chars: int = 6000) -> str:
+    """
+    Default summarizer: an extractive digest that needs no model call.
+
+    Keeps the previous summary and one line per folded event (author and the
+    start of its text), trimming the oldest lines first when over max_chars.
+
+    Args:
+        previous_summary (str): Summary text from an earlier compaction, or "".
+        events (list[Event]): Events being folded into the summary.
+        max_chars (int): Upper bound for the result.
+
+    Returns:
+        str: The new summary.
+    """
+    lines = [line for line in previous_summary.splitlines() if line.strip()]
+    for event in events:
+        if event.author == SUMMARY_AUTHOR:
+            continue
+        text = " ".join(event_text(event).split())
+        if text:
+            lines.append(f"- {event.author}: {text[:280]}{'...' if len(text) > 280 else ''}")
+    while lines and sum(len(line) + 1 for line in lines) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def make_llm_summarizer(model: str = "gemini-2.0-flash") -> Summarizer:
+    """
+    Builds a summarizer that asks a Gemini model for an abstractive summary.
+
+    Args:
+        model (str): Gemini model name.
+
+    Returns:
+        Summarizer: A callable usable as compact_session(..., summarizer=...).
+    """
+    from google import genai
+
+    client = genai.Client()
+
+    def summarize(previous_summary: str, events: List[Event]) -> str:
+        transcript = "\n".join(
+            f"[{event.author}] {event_text(event)}" for event in events if event.author != SUMMARY_AUTHOR
+        )
+        response = client.models.generate_content(
+            model=model,
+            contents=(
+                "Update the running summary of a conversation between a user and a team of agents. "
+                "Keep decisions, facts, code that was agreed on and open questions; drop chit-chat. "
+                f"Answer with the updated summary only.\n\nCurrent summary:\n{previous_summary or '(none)'}"
+                f"\n\nNew messages:\n{transcript}"
+            ),
+        )
+        return response.text or previous_summary
+
+    return summarize
+
+
+def needs_compaction(session: Session, policy: CompactionPolicy) -> bool:
+    """Whether the session is over the policy's event or token limit."""
+    return len(session.events) > policy.max_events or estimate_tokens(session.events) > policy.max_tokens
+
+
+def _cut_index(events: List[Event], keep_recent_events: int) -> int:
+    """
+    Index of the first event to keep raw: moved back to the start of a user
+    turn, or - when one turn is itself too long - forward past any function
+    responses so a call is never separated from its response.
+    """
+    target = max(0, len(events) - keep_recent_events)
+    cut = target
+    while cut > 0 and events[cut].author != "user":
+        cut -= 1
+    if cut > 0:
+        return cut
+    cut = target
+    while cut < len(events) and events[cut].get_function_responses():
+        cut += 1
+    return cut
+
+
+def _replace_events(db, session: Session, folded: List[Event], summary_event: Event) -> None:
+    """Archives the folded events and stores the summary event."""
+    # State patches recorded in the folded events must reach the stored state first.
+    checkpoint_state_patches(db, session.app_name, session.user_id, session.id)
+    ArchiveBase.metadata.create_all(db.connection())
+    for event in folded:
+        db.add(StorageArchivedEvent(
+            id=event.id,
+            app_name=session.app_name,
+            user_id=session.user_id,
+            session_id=session.id,
+            timestamp=datetime.fromtimestamp(event.timestamp),
+            event_json=event.model_dump_json(exclude_none=True),
+        ))
+    db.execute(delete(StorageEvent).where(
+        StorageEvent.app_name == session.app_name,
+        StorageEvent.user_id == session.user_id,
+        StorageEvent.session_id == session.id,
+        StorageEvent.id.in_([event.id for event in folded]),
+    ))
+    from utils.sessions.async_session_service import to_storage_event
+
+    db.add(to_storage_event(session, summary_event))
+    with compressing_for(session.app_name):
+        db.commit()
+
+
+def _is_async_service(session_service) -> bool:
+    """
+    isinstance(session_service, AsyncDatabaseSessionService), without importing
+    the async service (and sqlalchemy.ext.asyncio) at startup: if its module
+    was never loaded, no such service exists.
+    """
+    module = sys.modules.get("utils.sessions.async_session_service")
+    return module is not None and isinstance(session_service, module.AsyncDatabaseSessionService)
+
+
+def _database_service(session_service, app_name: str, user_id: str):
+    """The service owning the user's rows: the user's shard for a ShardedSessionService."""
+    if hasattr(session_service, "shard_for"):
+        return session_service.shard_for(app_name, user_id)
+    return session_service
+
+
+def compact_session(
+    session_service,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    policy: Optional[CompactionPolicy] = None,
+    summarizer: Optional[Summarizer] = None,
+    force: bool = False,
+) -> Optional[Event]:
+    """
+    Folds the older events of a session into a summary event and archives them.
+
+    Must run between turns (not while the Runner is appending events).
+
+    Args:
+        session_service: DatabaseSessionService, PooledDatabaseSessionService,
+            AsyncDatabaseSessionService or ShardedSessionService.
+        app_name (str): App name.
+        user_id (str): User id.
+        session_id (str): Session id.
+        policy (CompactionPolicy, optional): Limits; defaults to CompactionPolicy.from_env().
+        summarizer (Summarizer, optional): Defaults to summarize_events_locally().
+        force (bool): Compact even if the session is under the limits.
+
+    Returns:
+        Event: The new summary event, or None if nothing was compacted.
+    """
+    policy = policy or CompactionPolicy.from_env()
+    session_service = _database_service(session_service, app_name, user_id)
+    session = session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+    if session is None or not (force or needs_compaction(session, policy)):
+        return None
+    cut = _cut_index(session.events, policy.keep_recent_events)
+    folded = session.events[:cut]
+    if not folded or (len(folded) == 1 and folded[0].author == SUMMARY_AUTHOR):
+        return None
+
+    previous_summary = "\n".join(event_text(e) for e in folded if e.author == SUMMARY_AUTHOR)
+    if summarizer is None:
+        summary = summarize_events_locally(previous_summary, folded, policy.summary_max_chars)
+    else:
+        summary = summarizer(previous_summary, folded)[:policy.summary_max_chars]
+    summary_event = Event(
+        author=SUMMARY_AUTHOR,
+        invocation_id=folded[-1].invocation_id,
+        content=types.Content(role="model", parts=[types.Part(text=summary)]),
+        # Sort right before the first raw event that is kept.
+        timestamp=(session.events[cut].timestamp if cut < len(session.events) else time.time()) - 1e-6,
+    )
+
+    if _is_async_service(session_service):
+        session_service.run_sync(_replace_events, session, folded, summary_event)
+        session_service.evict(app_name=app_name, user_id=user_id, session_id=session_id)
+    elif isinstance(session_service, DatabaseSessionService):
+        with session_service.DatabaseSessionFactory() as db:
+            _replace_events(db, session, folded, summary_event)
+        if hasattr(session_service, "evict"):
+            session_service.evict(app_name=app_name, user_id=user_id, session_id=session_id)
+    else:
+        raise TypeError(f"History compaction needs a database session service, got {type(session_service).__name__}.")
+    return summary_event
+
+
+def compact_session_if_needed(
+    session_service,
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    policy: Optional[CompactionPolicy] = None,
+    summarizer: Optional[Summarizer] = None,
+) -> Optional[Event]:
+    """
+    compact_session() for the common case: a no-op for small sessions and for
+    session services without a database (e.g. InMemorySessionService).
+
+    Returns:
+        Event: The new summary event, or None if nothing was compacted.
+    """
+    database_service = _database_service(session_service, app_name, user_id)
+    if not (isinstance(database_service, DatabaseSessionService) or _is_async_service(database_service)):
+        return None
+    return compact_session(session_service, app_name, user_id, session_id, policy=policy, summarizer=summarizer)
+
+
+def load_archived_events(session_service, app_name: str, user_id: str, session_id: str) -> List[Event]:
+    """
+    Reads back the raw events compaction moved out of a session, oldest first.
+
+    Returns:
+        list[Event]: The archived events.
+    """
+    def read(db) -> List[Event]:
+        ArchiveBase.metadata.create_all(db.connection())
+        rows = (
+            db.query(StorageArchivedEvent)
+            .filter(
+                StorageArchivedEvent.app_name == app_name,
+                StorageArchivedEvent.user_id == user_id,
+                StorageArchivedEvent.session_id == session_id,
+            )
+            .order_by(StorageArchivedEvent.timestamp.asc())
+            .all()
+        )
+        return [Event.model_validate_json(row.event_json) for row in rows]
+
+    session_service = _database_service(session_service, app_name, user_id)
+    if _is_async_service(session_service):
+        return session_service.run_sync(read)
+    with session_service.DatabaseSessionFactory() as db:
+        return read(db)
@@ -1,9 +1,25 @@
-from google.adk.sessions import DatabaseSessionService
+from typing import Optional
 
-def load_user_session(app_name: str, user_id: str, session_id: str, intial_state: dict = ""):
+from utils.sessions.history_compaction import compact_session_if_needed
+from utils.sessions.session_service_provider import (
+    SESSION_DB_SHARDS,
+    WRITE_BEHIND_INTERVAL_S,
+    get_async_session_service,
+    get_session_service,
+    get_sharded_session_service,
+)
+
+def load_user_session(app_name: str, user_id: str, session_id: str, intial_state: dict = "", db_url: Optional[str] = None):
     # ********** DATABASE SETUP **********
-    db_url = "sqlite:///db_loop_agent.db"
-    session_service = DatabaseSessionService(db_url)
+    # Shared, pooled service per URL; db_url defaults to $SESSION_DB_URL or sqlite:///db_loop_agent.db
+    # $SESSION_DB_SHARDS spreads users over that many SQLite files;
+    # $SESSION_WRITE_BEHIND_MS switches to the group-committing async service.
+    if SESSION_DB_SHARDS > 1:
+       session_service = get_sharded_session_service(db_url)
+    elif WRITE_BEHIND_INTERVAL_S:
+       session_service = get_async_session_service(db_url)
+    else:
+       session_service = get_session_service(db_url)
     # ********** END OF DATABASE SETUP **********
 
     # ********** SESSION SETUP **********
@@ -19,6 +35,9 @@ def load_user_session(app_name: str, user_id: str, session_id: str, intial_state
     else:
        exists_session_id = session.id
        print("Loaded existing session, state updated:", session.id)
+       # Resumed sessions can be arbitrarily old; fold old history into a summary first.
+       if compact_session_if_needed(session_service, app_name, user_id, session.id):
+          print("Compacted session history:", session.id)
     # ********** END OF SESSION SETUP **********
 
     return {
@@ -0,0 +1,236 @@
+"""
+Session Cache
+-------------
+
+A read-through LRU cache of deserialized sessions for the database session
+services, so a hot session is not re-read and re-decoded from the database
+on every get_session().
+
+    * get_session() results are cached per (app_name, user_id, session_id)
+      and handed out as copies, so callers can append to them freely.
+    * list_sessions() results are cached per (app_name, user_id).
+    * append_event() keeps a cached session current when the caller appended
+      to an up-to-date copy, and drops it otherwise; it always drops the
+      user's cached list_sessions() result. create/delete drop both.
+    * The cache is bounded by an estimate of the memory its sessions take
+      ($SESSION_CACHE_MAX_MB, default 256); the least recently used entries go first.
+    * Lookups and evictions are counted in utils.metrics.agent_metrics
+      (adk_session_cache_lookups_total, adk_session_cache_evictions_total),
+      and stats() returns the same numbers plus the current size.
+
+app: and user: state is merged into every session of the app or user, so
+writing it clears the whole cache. Code that changes session rows behind a
+service's back (history compaction, maintenance) must call the service's evict().
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions.base_session_service import ListSessionsResponse
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+
+from utils.metrics.agent_metrics import AgentMetrics, agent_metrics
+
+SESSION_CACHE_MAX_BYTES = int(float(os.environ.get("SESSION_CACHE_MAX_MB", 256)) * 1024 * 1024)
+
+# Rough fixed cost of the Python objects behind one event, on top of its payload.
+EVENT_OVERHEAD_BYTES = 1024
+SESSION_OVERHEAD_BYTES = 2048
+
+_SessionKey = Tuple[str, str, str]
+_UserKey = Tuple[str, str]
+
+
+def _approx_size(value: Any) -> int:
+    """Approximate payload size of a JSON-like value, without serializing it."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + _approx_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_approx_size(item) for item in value)
+    return 16
+
+
+def estimate_event_bytes(event: Event) -> int:
+    """Approximate memory taken by an event."""
+    size = EVENT_OVERHEAD_BYTES
+    if event.content and event.content.parts:
+        for part in event.content.parts:
+            size += len(part.text or "")
+            if part.function_call:
+                size += _approx_size(part.function_call.args)
+            if part.function_response:
+                size += _approx_size(part.function_response.response)
+            if part.executable_code:
+                size += len(part.executable_code.code or "")
+            if part.code_execution_result:
+                size += len(part.code_execution_result.output or "")
+    if event.actions and event.actions.state_delta:
+        size += _approx_size(event.actions.state_delta)
+    return size
+
+
+def estimate_session_bytes(session: Session) -> int:
+    """Approximate memory taken by a session with its events and state."""
+    return SESSION_OVERHEAD_BYTES + _approx_size(session.state) + sum(estimate_event_bytes(e) for e in session.events)
+
+
+def changes_shared_state(state: Optional[Dict[str, Any]]) -> bool:
+    """Whether a state (delta) writes app: or user: keys, which other sessions carry too."""
+    return any(key.startswith((State.APP_PREFIX, State.USER_PREFIX)) for key in state or {})
+
+
+def copy_session(session: Session) -> Session:
+    """
+    A copy of a session that can be appended to without affecting the original.
+
+    Events are shared (they are not changed after being appended). State
+    values are copied deeply: state_patches changes lists and dicts in place.
+    """
+    return session.model_copy(update={"events": list(session.events), "state": copy.deepcopy(session.state)})
+
+
+class SessionCache:
+    """
+    Memory-bounded LRU of sessions and list_sessions() results. Thread-safe.
+
+    Args:
+        max_bytes (int): Upper bound for the estimated size of all entries.
+        name (str): Value of the "cache" metrics label.
+        metrics (AgentMetrics): Registry the lookups and evictions are counted in.
+    """
+
+    def __init__(self, max_bytes: int = SESSION_CACHE_MAX_BYTES, name: str = "session", metrics: AgentMetrics = agent_metrics):
+        self.max_bytes = max_bytes
+        self.name = name
+        self.metrics = metrics
+        # key -> (value, estimated bytes); session keys and ("list", app, user) keys share one LRU.
+        self._entries: "OrderedDict[tuple, Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------ internals
+
+    def _lookup(self, key: tuple, kind: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        self.metrics.record_session_cache_lookup(self.name, kind, hit=entry is not None)
+        return entry[0] if entry is not None else None
+
+    def _store(self, key: tuple, value: Any, size: int) -> None:
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, dropped_size) = self._entries.popitem(last=False)
+                self._bytes -= dropped_size
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            self.metrics.record_session_cache_eviction(self.name, evicted)
+
+    def _drop(self, key: tuple) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    # ------------------------------------------------------------- sessions
+
+    def get(self, key: _SessionKey) -> Optional[Session]:
+        """
+        Looks up a session.
+
+        Returns:
+            Session: A copy of the cached session (see copy_session()), or None on a miss.
+        """
+        session = self._lookup(key, "session")
+        return copy_session(session) if session is not None else None
+
+    def peek(self, key: _SessionKey) -> Optional[Session]:
+        """The cached session object itself (no copy, no LRU or metrics update), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, session: Session, appended: Optional[Event] = None) -> None:
+        """
+        Caches a session object as is; get() hands out copies of it.
+
+        Args:
+            session (Session): The session to cache.
+            appended (Event, optional): The event just appended to this very
+                object, if it is already cached; only the event is then sized.
+        """
+        key = (session.app_name, session.user_id, session.id)
+        size = None
+        if appended is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and entry[0] is session:
+                size = entry[1] + estimate_event_bytes(appended)
+        self._store(key, session, size if size is not None else estimate_session_bytes(session))
+
+    def invalidate(self, key: _SessionKey) -> None:
+        """Drops a session and its user's list_sessions() result."""
+        self._drop(key)
+        self._drop(("list",) + key[:2])
+
+    # --------------------------------------------------------- session lists
+
+    def get_list(self, key: _UserKey) -> Optional[ListSessionsResponse]:
+        """Looks up a list_sessions() result; returns a copy, or None on a miss."""
+        response = self._lookup(("list",) + key, "list")
+        return response.model_copy(deep=True) if response is not None else None
+
+    def put_list(self, key: _UserKey, response: ListSessionsResponse) -> None:
+        """Caches a copy of a list_sessions() result."""
+        self._store(("list",) + key, response.model_copy(deep=True), SESSION_OVERHEAD_BYTES * (len(response.sessions) + 1))
+
+    def invalidate_list(self, key: _UserKey) -> None:
+        """Drops a user's list_sessions() result."""
+        self._drop(("list",) + key)
+
+    # ------------------------------------------------------------ reporting
+
+    def clear(self) -> None:
+        """Drops everything."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: hits, misses, hit_rate, evictions, entries, bytes and max_bytes.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
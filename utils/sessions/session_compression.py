@@ -0,0 +1,276 @@
+"""
+Session Compression
+-------------------
+
+zstd dictionaries for the "+zstd" session formats of
+utils/sessions/session_serializer.py.
+
+Tool results (a full get_network_info dump, scraped JSON) make up most of a
+session database, and a session's events are re-read on every turn. With
+$SESSION_COMPRESS_MIN_BYTES set, event content and state values whose JSON
+text is at least that long are stored zstd-compressed; smaller values stay
+plain JSON text.
+
+Values of one app look alike (same tools, same keys, same output layout), so
+zstd compresses them far better with a dictionary trained on that app's own
+values. Dictionaries live in the `compression_dictionaries` table of the
+session database. Every compressed value records the id of its dictionary,
+so retraining never breaks old rows. The app a write belongs to is taken from
+compressing_for(), which the session services set around their writes; values
+written outside of it are compressed without a dictionary.
+
+Training is a maintenance step:
+
+    python -m utils.sessions.session_maintenance train-dictionaries
+    python -m utils.sessions.session_maintenance migrate-format   # recompress existing rows
+
+Values are decompressed when their row is read, so rows a query does not load
+(session headers, list_sessions(), archived history, events outside a
+GetSessionConfig window) are never decompressed.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from sqlalchemy import DateTime, Integer, LargeBinary, String, create_engine, func, inspect, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.pool import NullPool
+
+# Dictionary size; zstd's default. Values longer than this gain less from it.
+DICTIONARY_BYTES = 112 * 1024
+# Most recent values of an app a dictionary is trained on.
+TRAINING_SAMPLES = 2000
+# Fewer values than this are not worth a dictionary.
+MIN_TRAINING_SAMPLES = 50
+
+# How often a registry looks for dictionaries trained by another process.
+REFRESH_INTERVAL_S = 300.0
+
+_compression_app: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("compression_app", default=None)
+
+
+class CompressionBase(DeclarativeBase):
+    pass
+
+
+class StorageCompressionDictionary(CompressionBase):
+    """A zstd dictionary trained on the stored values of one app."""
+
+    __tablename__ = "compression_dictionaries"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    app_name: Mapped[str] = mapped_column(String, index=True)
+    create_time: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    samples: Mapped[int] = mapped_column(Integer)
+    data: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+def zstandard_module():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ValueError("Compressed session formats need `pip install zstandard`.") from e
+    return zstandard
+
+
+@contextlib.contextmanager
+def compressing_for(app_name: Optional[str]) -> Iterator[None]:
+    """Values written inside this block are compressed with app_name's dictionary."""
+    token = _compression_app.set(app_name)
+    try:
+        yield
+    finally:
+        _compression_app.reset(token)
+
+
+def current_compression_app() -> Optional[str]:
+    return _compression_app.get()
+
+
+class DictionaryRegistry:
+    """
+    The compression dictionaries of one session database, loaded on first use.
+
+    Lookups happen while SQLAlchemy encodes and decodes column values, so the
+    registry reads the table over its own connection (SQLite files only). An
+    in-memory database only sees dictionaries trained in this process.
+
+    Args:
+        engine: Engine or AsyncEngine of the session database.
+        level (int): zstd compression level.
+    """
+
+    def __init__(self, engine, level: int = 1):
+        self.level = level
+        url = engine.url
+        if url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:"):
+            self._loader = create_engine(url.set(drivername="sqlite"), poolclass=NullPool)
+        else:
+            self._loader = None
+        self._lock = threading.Lock()
+        self._dictionaries: Dict[int, object] = {}
+        # app name -> id of its newest dictionary
+        self._current: Dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        # zstd (de)compressor objects must not be shared between threads.
+        self._local = threading.local()
+
+    def add(self, dictionary_id: int, app_name: str, data: bytes) -> None:
+        zstandard = zstandard_module()
+        with self._lock:
+            self._dictionaries[dictionary_id] = zstandard.ZstdCompressionDict(data)
+            if dictionary_id > self._current.get(app_name, 0):
+                self._current[app_name] = dictionary_id
+
+    def load(self) -> None:
+        """(Re)reads the dictionaries table."""
+        self._loaded_at = time.monotonic()
+        if self._loader is None:
+            return
+        with self._loader.connect() as connection:
+            # Created by the first training; creating it here could wait on
+            # the write lock held by the transaction being encoded.
+            if not inspect(connection).has_table(StorageCompressionDictionary.__tablename__):
+                return
+            known = set(self._dictionaries)
+            rows = connection.execute(
+                select(StorageCompressionDictionary.id, StorageCompressionDictionary.app_name,
+                       StorageCompressionDictionary.data)
+                .where(StorageCompressionDictionary.id.notin_(known))
+            ).all()
+        for dictionary_id, app_name, data in rows:
+            self.add(dictionary_id, app_name, data)
+
+    def _refresh_if_due(self) -> None:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > REFRESH_INTERVAL_S:
+            self.load()
+
+    def current_id(self, app_name: Optional[str]) -> int:
+        """Id of the dictionary new values of the app are compressed with; 0 for none."""
+        if app_name is None:
+            return 0
+        self._refresh_if_due()
+        return self._current.get(app_name, 0)
+
+    def compressor(self, app_name: Optional[str]) -> Tuple[int, object]:
+        """
+        Returns:
+            tuple: (dictionary id or 0, zstd compressor using that dictionary).
+        """
+        dictionary_id = self.current_id(app_name)
+        compressors = self._local.__dict__.setdefault("compressors", {})
+        if dictionary_id not in compressors:
+            zstandard = zstandard_module()
+            if dictionary_id:
+                compressors[dictionary_id] = zstandard.ZstdCompressor(
+                    level=self.level, dict_data=self._dictionaries[dictionary_id]
+                )
+            else:
+                compressors[dictionary_id] = zstandard.ZstdCompressor(level=self.level)
+        return dictionary_id, compressors[dictionary_id]
+
+    def decompressor(self, dictionary_id: int):
+        """
+        Raises:
+            ValueError: If the dictionary is not in the database.
+        """
+        decompressors = self._local.__dict__.setdefault("decompressors", {})
+        if dictionary_id not in decompressors:
+            zstandard = zstandard_module()
+            if not dictionary_id:
+                decompressors[dictionary_id] = zstandard.ZstdDecompressor()
+            else:
+                if dictionary_id not in self._dictionaries:
+                    self.load()
+                if dictionary_id not in self._dictionaries:
+                    raise ValueError(f"Compression dictionary {dictionary_id} is missing from the session database.")
+                decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=self._dictionaries[dictionary_id])
+        return decompressors[dictionary_id]
+
+
+def _training_samples(connection, app_name: str, encode, max_samples: int) -> List[bytes]:
+    """The app's most recent event contents and session states as stored JSON text."""
+    samples = []
+    for table, column, order in (
+        (StorageEvent, StorageEvent.content, StorageEvent.timestamp),
+        (StorageSession, StorageSession.state, StorageSession.update_time),
+    ):
+        rows = connection.execute(
+            select(column).where(table.app_name == app_name, column.isnot(None))
+            .order_by(order.desc()).limit(max_samples)
+        ).scalars()
+        for value in rows:
+            if value:
+                text = encode(value)
+                samples.append(text.encode("utf-8") if isinstance(text, str) else text)
+    return samples[:max_samples]
+
+
+def train_app_dictionary(
+    engine,
+    app_name: str,
+    dictionary_bytes: int = DICTIONARY_BYTES,
+    max_samples: int = TRAINING_SAMPLES,
+) -> Optional[int]:
+    """
+    Trains a dictionary on an app's stored values and makes it the app's
+    current one. Rows already stored keep their dictionary until rewritten
+    (see session_serializer.migrate_serialized_rows()).
+
+    Args:
+        engine: Engine with a serializer attached (see session_serializer.attach_serializer()).
+        app_name (str): App name.
+        dictionary_bytes (int): Dictionary size.
+        max_samples (int): Most recent values trained on.
+
+    Returns:
+        int: Id of the new dictionary, or None if the app has too few values.
+    """
+    zstandard = zstandard_module()
+    serializer = engine.dialect.session_serializer
+    # Train on the exact text the serializer compresses.
+    encode = getattr(serializer, "inner", serializer).dumps
+    with engine.connect() as connection:
+        samples = _training_samples(connection, app_name, encode, max_samples)
+    if len(samples) < MIN_TRAINING_SAMPLES:
+        return None
+    # zstd wants far more sample text than dictionary.
+    dictionary_bytes = min(dictionary_bytes, sum(len(sample) for sample in samples) // 10)
+    try:
+        dictionary = zstandard.train_dictionary(dictionary_bytes, samples)
+    except zstandard.ZstdError:
+        return None
+    data = dictionary.as_bytes()
+    with engine.begin() as connection:
+        CompressionBase.metadata.create_all(connection)
+        dictionary_id = connection.execute(
+            StorageCompressionDictionary.__table__.insert().values(app_name=app_name, samples=len(samples), data=data)
+        ).inserted_primary_key[0]
+    engine.dialect.session_dictionaries.add(dictionary_id, app_name, data)
+    return dictionary_id
+
+
+def train_dictionaries(engine, retrain: bool = False) -> Dict[str, Optional[int]]:
+    """
+    Trains a dictionary for every app in the session database.
+
+    Args:
+        engine: Engine with a serializer attached.
+        retrain (bool): Also train apps that already have a dictionary.
+
+    Returns:
+        dict: App name -> new dictionary id (None: too few values), for the apps trained.
+    """
+    registry = engine.dialect.session_dictionaries
+    registry.load()
+    with engine.connect() as connection:
+        apps = connection.execute(select(StorageSession.app_name).distinct()).scalars().all()
+    return {
+        app_name: train_app_dictionary(engine, app_name)
+        for app_name in apps
+        if retrain or not registry.current_id(app_name)
+    }
@@ -0,0 +1,134 @@
+"""
+Session Headers
+---------------
+
+Lightweight listing of a user's sessions for the database session services.
+
+ADK's list_sessions() returns every session of a user in no defined order,
+so finding the session to resume meant loading all of them. These queries
+return headers only (id, update time, event count), newest first, and walk
+the (app_name, user_id, update_time, id) index: one page, or the latest
+session, costs an index seek no matter how many sessions the user has.
+
+Pages are keyset-paginated: pass SessionPage.next_cursor back to get the
+next page. Cursors stay valid while sessions are added or updated (a
+session updated meanwhile moves to the front and is not repeated).
+
+Usage:
+    page = session_service.list_session_headers(app_name=APP_NAME, user_id=USER_ID, limit=20)
+    session = session_service.latest_session(app_name=APP_NAME, user_id=USER_ID)
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from sqlalchemy import String, and_, func, or_, select, type_coerce
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+
+# update_time as the database stores it. SQLite keeps DATETIME as text, and
+# rows written by now() and by Python differ in precision ("...:05" vs
+# "...:05.000000"), so cursors compare against the stored value itself.
+_STORED_UPDATE_TIME = type_coerce(StorageSession.update_time, String)
+
+
+class SessionHeader(NamedTuple):
+    """A session without its events and state."""
+
+    id: str
+    last_update_time: float
+    event_count: int
+
+
+class SessionPage(NamedTuple):
+    """One page of list_session_headers()."""
+
+    headers: List[SessionHeader]
+    # Pass to the next call to continue; None on the last page.
+    next_cursor: Optional[str]
+
+
+def _encode_cursor(stored_update_time, session_id: str) -> str:
+    if isinstance(stored_update_time, datetime):
+        position = {"t": stored_update_time.isoformat(), "datetime": True, "id": session_id}
+    else:
+        position = {"t": stored_update_time, "id": session_id}
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        stored_update_time = datetime.fromisoformat(position["t"]) if position.get("datetime") else position["t"]
+        return stored_update_time, position["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid session list cursor '{cursor}'.") from e
+
+
+def _header_query(app_name: str, user_id: str):
+    event_count = (
+        select(func.count())
+        .where(
+            StorageEvent.session_id == StorageSession.id,
+            StorageEvent.app_name == StorageSession.app_name,
+            StorageEvent.user_id == StorageSession.user_id,
+        )
+        .scalar_subquery()
+    )
+    return (
+        select(StorageSession.id, StorageSession.update_time, _STORED_UPDATE_TIME.label("stored_update_time"), event_count)
+        .where(StorageSession.app_name == app_name, StorageSession.user_id == user_id)
+        .order_by(StorageSession.update_time.desc(), StorageSession.id.desc())
+    )
+
+
+def _header(row) -> SessionHeader:
+    return SessionHeader(id=row[0], last_update_time=row[1].timestamp(), event_count=row[3])
+
+
+def list_session_headers(
+    db,
+    app_name: str,
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+) -> SessionPage:
+    """
+    Lists a user's sessions, newest first, one page at a time.
+
+    Args:
+        db: SQLAlchemy ORM session on the session database.
+        app_name (str): App name.
+        user_id (str): User id.
+        limit (int): Page size, at most MAX_PAGE_SIZE.
+        cursor (str, optional): next_cursor of the previous page.
+
+    Returns:
+        SessionPage: The headers and the cursor of the next page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = _header_query(app_name, user_id)
+    if cursor:
+        stored_update_time, session_id = _decode_cursor(cursor)
+        query = query.where(or_(
+            _STORED_UPDATE_TIME < stored_update_time,
+            and_(_STORED_UPDATE_TIME == stored_update_time, StorageSession.id < session_id),
+        ))
+    rows = db.execute(query.limit(limit + 1)).all()
+    next_cursor = _encode_cursor(rows[limit - 1][2], rows[limit - 1][0]) if len(rows) > limit else None
+    return SessionPage(headers=[_header(row) for row in rows[:limit]], next_cursor=next_cursor)
+
+
+def latest_session_header(db, app_name: str, user_id: str) -> Optional[SessionHeader]:
+    """
+    Returns:
+        SessionHeader: The user's most recently updated session, or None if there is none.
+    """
+    row = db.execute(_header_query(app_name, user_id).limit(1)).first()
+    return _header(row) if row is not None else None
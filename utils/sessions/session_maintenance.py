@@ -0,0 +1,613 @@
+"""
+Session Maintenance
+-------------------
+
+Keeps the session database from growing forever. Every run of the use_*.py
+scripts starts a new session that is never deleted, so without this the
+store (and its indexes) only ever grow.
+
+    * Expiry: sessions not updated for longer than their app's TTL are
+      written to a gzip-compressed JSON archive file and deleted from the
+      database, together with their events and compacted history.
+    * Orphans: events whose session no longer exists (left behind by
+      delete_session() on SQLite before foreign keys were enabled) are purged.
+    * Vacuum: on SQLite, free pages are handed back to the file system with
+      incremental vacuum, the WAL is truncated and the query planner
+      statistics are refreshed.
+    * Stats: file size, page usage and session/event counts per app.
+    * Format migration: rewrites stored state and event content in the
+      format of $SESSION_SERIALIZER (see utils/sessions/session_serializer.py).
+    * Compression dictionaries: trains a zstd dictionary per app for the
+      "+zstd" formats (see utils/sessions/session_compression.py); run
+      migrate-format afterwards to recompress stored values with them.
+
+TTLs come from $SESSION_TTL_DAYS (default 30, 0 keeps sessions forever) and
+per-app overrides in $SESSION_TTL_DAYS_BY_APP ("loop_agent_app=7,other_app=0").
+Archives go to $SESSION_ARCHIVE_DIR (default "session_archive").
+
+Usage:
+    python -m utils.sessions.session_maintenance stats
+    python -m utils.sessions.session_maintenance run      # expire + vacuum, e.g. nightly from cron
+    python -m utils.sessions.session_maintenance expire --ttl-days 7 --dry-run
+    python -m utils.sessions.session_maintenance migrate-format --format msgpack-zstd
+    python -m utils.sessions.session_maintenance train-dictionaries --retrain
+
+    from utils.sessions.session_maintenance import run_maintenance
+    run_maintenance()
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from google.adk.sessions.session import Session
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.engine import make_url
+
+from utils.sessions.async_session_service import from_storage_event
+from utils.sessions.history_compaction import StorageArchivedEvent
+from utils.sessions.session_compression import train_dictionaries
+from utils.sessions.session_serializer import (
+    CompressingSerializer,
+    attach_serializer,
+    get_serializer,
+    migrate_serialized_rows,
+)
+from utils.sessions.session_service_provider import create_session_engine, get_session_db_url, get_session_service
+from utils.sessions.state_patches import CHECKPOINT_STATE_KEY, replay_patches, restore_patched_state
+
+DEFAULT_TTL_DAYS = 30.0
+DEFAULT_ARCHIVE_DIR = "session_archive"
+
+# Version of the archive file layout written by archive_session(). From 2 on,
+# "state" has the state patches folded in; format 1 stored the raw checkpoint.
+ARCHIVE_FORMAT = 2
+
+# Sessions archived and deleted per transaction.
+EXPIRE_BATCH_SIZE = 200
+
+_AUTO_VACUUM_MODES = {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}
+
+
+class RetentionPolicy:
+    """
+    How long sessions are kept after their last update, per app.
+
+    Args:
+        default_ttl_days (float, optional): TTL for apps without an override.
+            None or 0 keeps sessions forever.
+        app_ttl_days (dict, optional): app_name -> TTL in days (None or 0 = forever).
+    """
+
+    def __init__(
+        self,
+        default_ttl_days: Optional[float] = DEFAULT_TTL_DAYS,
+        app_ttl_days: Optional[Dict[str, Optional[float]]] = None,
+    ):
+        self.default_ttl_days = default_ttl_days
+        self.app_ttl_days = app_ttl_days or {}
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        """Reads $SESSION_TTL_DAYS and $SESSION_TTL_DAYS_BY_APP ("app=days,app=days")."""
+        app_ttl_days = {}
+        for item in os.environ.get("SESSION_TTL_DAYS_BY_APP", "").split(","):
+            if "=" in item:
+                app_name, days = item.rsplit("=", 1)
+                app_ttl_days[app_name.strip()] = float(days)
+        return cls(float(os.environ.get("SESSION_TTL_DAYS", DEFAULT_TTL_DAYS)), app_ttl_days)
+
+    def ttl(self, app_name: str) -> Optional[timedelta]:
+        """
+        The TTL of an app's sessions.
+
+        Returns:
+            timedelta: The TTL, or None if the app's sessions never expire.
+        """
+        days = self.app_ttl_days.get(app_name, self.default_ttl_days)
+        return timedelta(days=days) if days else None
+
+
+def get_archive_dir(archive_dir: Optional[str] = None) -> str:
+    """Returns archive_dir, else $SESSION_ARCHIVE_DIR, else DEFAULT_ARCHIVE_DIR."""
+    return archive_dir or os.environ.get("SESSION_ARCHIVE_DIR") or DEFAULT_ARCHIVE_DIR
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name) or "_"
+
+
+def _has_archive_table(db) -> bool:
+    return inspect(db.connection()).has_table(StorageArchivedEvent.__tablename__)
+
+
+def find_expired_sessions(
+    db,
+    policy: RetentionPolicy,
+    now: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[Tuple[str, str, str]]:
+    """
+    Lists sessions whose last update is older than their app's TTL, oldest first.
+
+    Args:
+        db: SQLAlchemy ORM session on the session database.
+        policy (RetentionPolicy): The TTLs.
+        now (datetime, optional): Reference time in the database clock. Defaults
+            to the database's own now(), the clock update_time is written with.
+        limit (int, optional): Return at most this many sessions.
+
+    Returns:
+        list[tuple]: (app_name, user_id, session_id) of the expired sessions.
+    """
+    now = now or db.scalar(select(func.now()))
+    expired = []
+    for app_name in db.scalars(select(StorageSession.app_name).distinct()).all():
+        ttl = policy.ttl(app_name)
+        if ttl is None:
+            continue
+        query = (
+            select(StorageSession.app_name, StorageSession.user_id, StorageSession.id)
+            .where(StorageSession.app_name == app_name, StorageSession.update_time < now - ttl)
+            .order_by(StorageSession.update_time.asc())
+        )
+        if limit is not None:
+            query = query.limit(limit - len(expired))
+        expired.extend(tuple(row) for row in db.execute(query))
+        if limit is not None and len(expired) >= limit:
+            break
+    return expired
+
+
+def archive_session(db, app_name: str, user_id: str, session_id: str, archive_dir: str) -> Optional[str]:
+    """
+    Writes one session, its events and its compacted history to a gzip JSON file.
+
+    The archived state is the session's current state: state patch operations
+    newer than the stored checkpoint are folded in (without writing to the
+    database), and the checkpoint bookkeeping is left out.
+
+    The file is written to a temporary name and renamed into place, so an
+    archive that exists is always complete. Nothing is deleted here.
+
+    Args:
+        db: SQLAlchemy ORM session on the session database.
+        app_name (str): App name.
+        user_id (str): User id.
+        session_id (str): Session id.
+        archive_dir (str): Root directory of the archive.
+
+    Returns:
+        str: Path of the archive file, or None if the session does not exist.
+    """
+    storage_session = db.get(StorageSession, (app_name, user_id, session_id))
+    if storage_session is None:
+        return None
+    storage_events = db.scalars(
+        select(StorageEvent)
+        .where(
+            StorageEvent.app_name == app_name,
+            StorageEvent.user_id == user_id,
+            StorageEvent.session_id == session_id,
+        )
+        .order_by(StorageEvent.timestamp.asc())
+    ).all()
+    archived_events = []
+    if _has_archive_table(db):
+        archived_events = db.scalars(
+            select(StorageArchivedEvent.event_json)
+            .where(
+                StorageArchivedEvent.app_name == app_name,
+                StorageArchivedEvent.user_id == user_id,
+                StorageArchivedEvent.session_id == session_id,
+            )
+            .order_by(StorageArchivedEvent.timestamp.asc())
+        ).all()
+
+    state = dict(storage_session.state or {})
+    checkpoints = dict(state.pop(CHECKPOINT_STATE_KEY, None) or {})
+    replay_patches(
+        state, checkpoints,
+        ((storage_event.timestamp.timestamp(), storage_event.actions) for storage_event in storage_events),
+    )
+
+    document = {
+        "format": ARCHIVE_FORMAT,
+        "app_name": app_name,
+        "user_id": user_id,
+        "id": session_id,
+        "state": state,
+        "create_time": storage_session.create_time.isoformat(),
+        "update_time": storage_session.update_time.isoformat(),
+        "events": [
+            from_storage_event(storage_event).model_dump(mode="json", exclude_none=True)
+            for storage_event in storage_events
+        ],
+        "compacted_events": [json.loads(event_json) for event_json in archived_events],
+    }
+    directory = os.path.join(
+        archive_dir,
+        _safe_name(app_name),
+        storage_session.update_time.strftime("%Y-%m"),
+        _safe_name(user_id),
+    )
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{_safe_name(session_id)}.json.gz")
+    with gzip.open(f"{path}.tmp", "wt", encoding="utf-8") as f:
+        json.dump(document, f, default=str)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def read_session_archive(path: str) -> Session:
+    """
+    Loads an archive file written by archive_session() back into an ADK Session.
+
+    Events that had been compacted are put back in front of the stored events,
+    so the returned session has the full raw history. Archives of format 1
+    get their state patches replayed here.
+
+    Args:
+        path (str): The .json.gz archive file.
+
+    Returns:
+        Session: The archived session, with state and events.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        document = json.load(f)
+    session = Session(
+        app_name=document["app_name"],
+        user_id=document["user_id"],
+        id=document["id"],
+        state=document["state"],
+        last_update_time=datetime.fromisoformat(document["update_time"]).timestamp(),
+    )
+    session.events = [
+        Event.model_validate(event)
+        for event in document["compacted_events"] + document["events"]
+    ]
+    if document.get("format", 1) < 2:
+        # Format 1 stored the raw checkpointed state.
+        restore_patched_state(session)
+    return session
+
+
+def _delete_sessions(db, keys: List[Tuple[str, str, str]]) -> None:
+    """Deletes sessions with their events and compacted history (no commit)."""
+    has_archive_table = _has_archive_table(db)
+    for app_name, user_id, session_id in keys:
+        db.execute(delete(StorageEvent).where(
+            StorageEvent.app_name == app_name,
+            StorageEvent.user_id == user_id,
+            StorageEvent.session_id == session_id,
+        ))
+        if has_archive_table:
+            db.execute(delete(StorageArchivedEvent).where(
+                StorageArchivedEvent.app_name == app_name,
+                StorageArchivedEvent.user_id == user_id,
+                StorageArchivedEvent.session_id == session_id,
+            ))
+        db.execute(delete(StorageSession).where(
+            StorageSession.app_name == app_name,
+            StorageSession.user_id == user_id,
+            StorageSession.id == session_id,
+        ))
+
+
+def _event_has_no_session():
+    """WHERE clause matching events whose session row is gone."""
+    return ~(
+        select(StorageSession.id)
+        .where(
+            StorageSession.app_name == StorageEvent.app_name,
+            StorageSession.user_id == StorageEvent.user_id,
+            StorageSession.id == StorageEvent.session_id,
+        )
+        .exists()
+    )
+
+
+def _count_orphan_events(db) -> int:
+    return db.scalar(select(func.count()).select_from(StorageEvent).where(_event_has_no_session())) or 0
+
+
+def purge_orphan_events(db) -> int:
+    """
+    Deletes events whose session no longer exists and commits.
+
+    Returns:
+        int: Number of events deleted.
+    """
+    deleted = db.execute(delete(StorageEvent).where(_event_has_no_session())).rowcount
+    db.commit()
+    return deleted or 0
+
+
+def expire_sessions(
+    db_url: Optional[str] = None,
+    policy: Optional[RetentionPolicy] = None,
+    archive_dir: Optional[str] = None,
+    archive: bool = True,
+    dry_run: bool = False,
+    batch_size: int = EXPIRE_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Archives and deletes every session older than its app's TTL, and purges
+    orphaned events.
+
+    Sessions are handled in batches of batch_size: the archive files of a
+    batch are written first and the batch is deleted in one transaction
+    afterwards, so a crash can leave an archived session still in the
+    database (it is archived again next time) but never loses one.
+
+    Args:
+        db_url (str, optional): Session database URL (see get_session_db_url()).
+        policy (RetentionPolicy, optional): TTLs; defaults to RetentionPolicy.from_env().
+        archive_dir (str, optional): Where archives go (see get_archive_dir()).
+        archive (bool): Write archive files before deleting. False just deletes.
+        dry_run (bool): Only count what would be expired.
+        batch_size (int): Sessions per transaction.
+
+    Returns:
+        dict: {"expired_sessions", "archive_files", "orphan_events"} counts
+            (for a dry run, what would be expired).
+    """
+    policy = policy or RetentionPolicy.from_env()
+    archive_dir = get_archive_dir(archive_dir)
+    service = get_session_service(db_url)
+    result = {"expired_sessions": 0, "archive_files": 0, "orphan_events": 0}
+
+    with service.DatabaseSessionFactory() as db:
+        if dry_run:
+            result["expired_sessions"] = len(find_expired_sessions(db, policy))
+            result["orphan_events"] = _count_orphan_events(db)
+            return result
+
+        # Fix the reference time so a long run does not chase sessions that
+        # expire while it is working.
+        now = db.scalar(select(func.now()))
+        while True:
+            keys = find_expired_sessions(db, policy, now=now, limit=batch_size)
+            if not keys:
+                break
+            if archive:
+                for key in keys:
+                    if archive_session(db, *key, archive_dir):
+                        result["archive_files"] += 1
+            _delete_sessions(db, keys)
+            db.commit()
+            for app_name, user_id, session_id in keys:
+                service.evict(app_name=app_name, user_id=user_id, session_id=session_id)
+            result["expired_sessions"] += len(keys)
+        result["orphan_events"] = purge_orphan_events(db)
+    return result
+
+
+def _is_file_sqlite(db_url: str) -> bool:
+    url = make_url(db_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def vacuum_session_store(db_url: Optional[str] = None, max_pages: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Returns free pages of an SQLite session database to the file system.
+
+    The first run on a database created without auto_vacuum=INCREMENTAL does a
+    one-time full VACUUM to switch it over; it rewrites the whole file and
+    blocks writers while it runs. Later runs only release free pages, which is
+    cheap. Also truncates the WAL and refreshes the query planner statistics
+    (PRAGMA optimize). A no-op for other databases.
+
+    Args:
+        db_url (str, optional): Session database URL (see get_session_db_url()).
+        max_pages (int, optional): Release at most this many pages (default: all).
+
+    Returns:
+        dict: {"full_vacuum", "freed_pages", "file_bytes_before", "file_bytes_after"},
+            or {} when the database is not an SQLite file.
+    """
+    db_url = get_session_db_url(db_url)
+    if not _is_file_sqlite(db_url):
+        return {}
+    service = get_session_service(db_url)
+    bytes_before = _file_bytes(db_url)
+    with service.db_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        free_before = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        full_vacuum = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2
+        if full_vacuum:
+            connection.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+        else:
+            # sqlite3's execute() steps this pragma once, which frees a single
+            # page; executescript() runs it to completion.
+            connection.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({max_pages or 0});")
+        free_after = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        connection.exec_driver_sql("PRAGMA optimize")
+    return {
+        "full_vacuum": full_vacuum,
+        "freed_pages": free_before - free_after,
+        "file_bytes_before": bytes_before,
+        "file_bytes_after": _file_bytes(db_url),
+    }
+
+
+def _file_bytes(db_url: str) -> Optional[int]:
+    """Size of an SQLite database file including its WAL, or None."""
+    if not _is_file_sqlite(db_url):
+        return None
+    path = make_url(db_url).database
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+def session_store_stats(db_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Size and content of the session database.
+
+    Args:
+        db_url (str, optional): Session database URL (see get_session_db_url()).
+
+    Returns:
+        dict: db_url, file_bytes, SQLite page usage (page_size, page_count,
+            free_pages, auto_vacuum), sessions, events, compacted_events,
+            orphan_events, and per-app {sessions, events, oldest_update, newest_update}.
+    """
+    db_url = get_session_db_url(db_url)
+    service = get_session_service(db_url)
+    stats: Dict[str, Any] = {"db_url": db_url, "file_bytes": _file_bytes(db_url)}
+    with service.DatabaseSessionFactory() as db:
+        if service.db_engine.dialect.name == "sqlite":
+            pragma = lambda name: db.connection().exec_driver_sql(f"PRAGMA {name}").scalar()
+            stats["page_size"] = pragma("page_size")
+            stats["page_count"] = pragma("page_count")
+            stats["free_pages"] = pragma("freelist_count")
+            stats["auto_vacuum"] = _AUTO_VACUUM_MODES.get(pragma("auto_vacuum"), "?")
+        stats["sessions"] = db.scalar(select(func.count()).select_from(StorageSession))
+        stats["events"] = db.scalar(select(func.count()).select_from(StorageEvent))
+        stats["compacted_events"] = (
+            db.scalar(select(func.count()).select_from(StorageArchivedEvent)) if _has_archive_table(db) else 0
+        )
+        stats["orphan_events"] = _count_orphan_events(db)
+
+        apps: Dict[str, Dict[str, Any]] = {}
+        for app_name, sessions, oldest, newest in db.execute(
+            select(
+                StorageSession.app_name,
+                func.count(),
+                func.min(StorageSession.update_time),
+                func.max(StorageSession.update_time),
+            ).group_by(StorageSession.app_name)
+        ):
+            apps[app_name] = {"sessions": sessions, "events": 0, "oldest_update": oldest, "newest_update": newest}
+        for app_name, events in db.execute(
+            select(StorageEvent.app_name, func.count()).group_by(StorageEvent.app_name)
+        ):
+            apps.setdefault(app_name, {"sessions": 0, "oldest_update": None, "newest_update": None})["events"] = events
+        stats["apps"] = apps
+    return stats
+
+
+def format_session_store_stats(stats: Dict[str, Any]) -> str:
+    """Renders session_store_stats() as a small text report."""
+    lines = [f"Session store: {stats['db_url']}"]
+    if stats.get("file_bytes") is not None:
+        lines.append(f"  file size:        {stats['file_bytes'] / 1024 / 1024:.2f} MB")
+    if "page_count" in stats:
+        free_share = stats["free_pages"] / stats["page_count"] if stats["page_count"] else 0.0
+        lines.append(
+            f"  pages:            {stats['page_count']} x {stats['page_size']} B,"
+            f" {stats['free_pages']} free ({free_share:.0%}), auto_vacuum={stats['auto_vacuum']}"
+        )
+    lines.append(f"  sessions:         {stats['sessions']}")
+    lines.append(f"  events:           {stats['events']}")
+    lines.append(f"  compacted events: {stats['compacted_events']}")
+    lines.append(f"  orphan events:    {stats['orphan_events']}")
+    for app_name, app in sorted(stats["apps"].items()):
+        lines.append(
+            f"  [{app_name}] sessions={app['sessions']} events={app['events']}"
+            f" oldest={app['oldest_update']} newest={app['newest_update']}"
+        )
+    return "\n".join(lines)
+
+
+def run_maintenance(
+    db_url: Optional[str] = None,
+    policy: Optional[RetentionPolicy] = None,
+    archive_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Expires old sessions, then vacuums. With a "+zstd" session format, also
+    trains dictionaries for apps that have none yet. Meant to run
+    periodically (e.g. nightly).
+
+    Returns:
+        dict: The results of expire_sessions() and vacuum_session_store(),
+            plus dictionaries_trained.
+    """
+    expired = expire_sessions(db_url, policy=policy, archive_dir=archive_dir)
+    result = {**expired, **vacuum_session_store(db_url)}
+    if isinstance(get_serializer(), CompressingSerializer):
+        result["dictionaries_trained"] = train_session_dictionaries(db_url)
+    return result
+
+
+def migrate_session_format(db_url: Optional[str] = None, serializer_name: Optional[str] = None) -> Dict[str, int]:
+    """
+    Rewrites every stored value not yet in the given format. Safe to run
+    while the store is in use; values are readable in either format.
+
+    Args:
+        db_url (str, optional): Session database URL (see get_session_db_url()).
+        serializer_name (str, optional): Target format; defaults to $SESSION_SERIALIZER.
+
+    Returns:
+        dict: Rows rewritten per table.
+    """
+    engine = create_session_engine(get_session_db_url(db_url))
+    try:
+        attach_serializer(engine, get_serializer(serializer_name))
+        return migrate_serialized_rows(engine)
+    finally:
+        engine.dispose()
+
+
+def train_session_dictionaries(db_url: Optional[str] = None, retrain: bool = False) -> Dict[str, Optional[int]]:
+    """
+    Trains zstd compression dictionaries for the apps of the session database.
+
+    Args:
+        db_url (str, optional): Session database URL (see get_session_db_url()).
+        retrain (bool): Also train apps that already have a dictionary.
+
+    Returns:
+        dict: App name -> new dictionary id (None: too few stored values to train on).
+    """
+    engine = create_session_engine(get_session_db_url(db_url))
+    try:
+        return train_dictionaries(engine, retrain=retrain)
+    finally:
+        engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "expire", "vacuum", "run", "migrate-format", "train-dictionaries"])
+    parser.add_argument("--db-url", default=None, help="session database URL (default: $SESSION_DB_URL or the local file)")
+    parser.add_argument(
+        "--ttl-days", type=float, default=None,
+        help="TTL for apps without an override, replaces $SESSION_TTL_DAYS ($SESSION_TTL_DAYS_BY_APP still applies)",
+    )
+    parser.add_argument("--archive-dir", default=None, help="where expired sessions are archived")
+    parser.add_argument("--no-archive", action="store_true", help="delete expired sessions without archiving them")
+    parser.add_argument("--dry-run", action="store_true", help="only report what expire would delete")
+    parser.add_argument(
+        "--format", default=None, help="migrate-format target: json, orjson, msgpack-zstd, json+zstd or orjson+zstd"
+    )
+    parser.add_argument("--retrain", action="store_true", help="train-dictionaries: also apps that have one")
+    args = parser.parse_args()
+
+    policy = RetentionPolicy.from_env()
+    if args.ttl_days is not None:
+        policy.default_ttl_days = args.ttl_days
+
+    if args.command in ("expire", "run"):
+        print(expire_sessions(
+            args.db_url, policy=policy, archive_dir=args.archive_dir,
+            archive=not args.no_archive, dry_run=args.dry_run,
+        ))
+    if args.command in ("vacuum", "run") and not args.dry_run:
+        print(vacuum_session_store(args.db_url))
+    if args.command == "migrate-format":
+        print(migrate_session_format(args.db_url, args.format))
+    if args.command == "train-dictionaries":
+        print(train_session_dictionaries(args.db_url, retrain=args.retrain))
+    print(format_session_store_stats(session_store_stats(args.db_url)))
+
+
+if __name__ == "__main__":
+    main()
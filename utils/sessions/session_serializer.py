@@ -0,0 +1,436 @@
+"""
+Session Serializer
+------------------
+
+Pluggable encoding of the JSON columns of the session tables (session, app
+and user state, event content and grounding metadata).
+
+ADK stores these columns as TEXT written with the stdlib json module, which
+shows up in profiles once state holds scraped pages, generated code or
+network reports. attach_serializer() gives an engine one of:
+
+    * "json": the stdlib json module, as ADK does.
+    * "orjson": the same JSON text, encoded and decoded several times faster.
+      The default when orjson is installed.
+    * "msgpack-zstd" (SQLite only): msgpack packed, zstd compressed blobs,
+      tagged with BINARY_MAGIC and a format version. Needs `pip install
+      msgpack zstandard`.
+    * "json+zstd", "orjson+zstd" (SQLite only): JSON text, except that values
+      of at least $SESSION_COMPRESS_MIN_BYTES bytes are stored as tagged zstd
+      blobs, compressed with a dictionary trained per app (see
+      utils/sessions/session_compression.py). Setting
+      $SESSION_COMPRESS_MIN_BYTES adds "+zstd" to the configured format.
+
+Reading is format-agnostic: every serializer decodes legacy JSON text and
+every tagged binary format, so existing databases keep working after a
+switch. Rows are rewritten in the configured format as they are updated, or
+all at once with migrate_serialized_rows() (`python -m
+utils.sessions.session_maintenance migrate-format`).
+
+The format is picked with $SESSION_SERIALIZER. PostgreSQL stores these
+columns as JSONB and is left alone.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from google.adk.sessions.database_session_service import (
+    DynamicJSON,
+    StorageAppState,
+    StorageEvent,
+    StorageSession,
+    StorageUserState,
+)
+from sqlalchemy import Text, bindparam, select, tuple_, type_coerce, update
+
+from utils.sessions.session_compression import (
+    DictionaryRegistry,
+    compressing_for,
+    current_compression_app,
+    zstandard_module,
+)
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib json module
+    orjson = None
+
+# Binary values start with a NUL byte, which JSON text never does.
+BINARY_MAGIC = b"\x00ADK"
+FORMAT_MSGPACK_ZSTD = 1
+# BINARY_MAGIC, FORMAT_ZSTD_JSON, 4-byte dictionary id (0: none), zstd(JSON text).
+FORMAT_ZSTD_JSON = 2
+_DICTIONARY_ID_BYTES = 4
+
+# Threshold of the "+zstd" formats when $SESSION_COMPRESS_MIN_BYTES is not set.
+DEFAULT_COMPRESS_MIN_BYTES = 1024
+
+# zstd level 1 is the fastest standard level; higher levels shrink rows a little more.
+ZSTD_LEVEL = 1
+
+# Columns encoded by the serializer, per table. Every table has app_name in its primary key.
+SERIALIZED_COLUMNS = {
+    StorageSession.__table__: ["state"],
+    StorageAppState.__table__: ["state"],
+    StorageUserState.__table__: ["state"],
+    StorageEvent.__table__: ["content", "grounding_metadata"],
+}
+
+MIGRATE_BATCH_SIZE = 500
+
+
+def _json_loads(text) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN written by the stdlib json module
+    return json.loads(text)
+
+
+def _json_dumps(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        except TypeError:
+            pass  # e.g. ints above 64 bits
+    return json.dumps(value)
+
+
+class SessionSerializer:
+    """
+    Stdlib json encoding; the base class of the other serializers.
+
+    dumps() returns what is stored in the column (str or bytes); loads()
+    accepts anything any serializer has stored. dictionaries is the
+    DictionaryRegistry of the database the value is stored in.
+    """
+
+    name = "json"
+    binary = False
+
+    def dumps(self, value: Any, dictionaries: Optional[DictionaryRegistry] = None):
+        return json.dumps(value)
+
+    def loads(self, stored, dictionaries: Optional[DictionaryRegistry] = None) -> Any:
+        return decode_stored_value(stored, dictionaries)
+
+    def needs_rewrite(self, stored, app_name: str, dictionaries: Optional[DictionaryRegistry] = None) -> bool:
+        """Whether a stored value of the app is not in the format dumps() would write."""
+        return isinstance(stored, (bytes, bytearray))
+
+
+class OrjsonSerializer(SessionSerializer):
+    """JSON text encoded with orjson. Values orjson cannot encode (e.g. ints above 64 bits) fall back to json."""
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ValueError("The orjson session serializer needs `pip install orjson`.")
+
+    def dumps(self, value: Any, dictionaries: Optional[DictionaryRegistry] = None):
+        return _json_dumps(value)
+
+
+class MsgpackZstdSerializer(SessionSerializer):
+    """
+    msgpack + zstd blobs: BINARY_MAGIC, FORMAT_MSGPACK_ZSTD, compressed msgpack.
+
+    Values msgpack cannot encode are stored as JSON text instead.
+
+    Args:
+        level (int): zstd compression level.
+    """
+
+    name = "msgpack-zstd"
+    binary = True
+
+    def __init__(self, level: int = ZSTD_LEVEL):
+        _binary_modules()
+        self.level = level
+        # zstd compressor objects must not be shared between threads.
+        self._local = threading.local()
+
+    def dumps(self, value: Any, dictionaries: Optional[DictionaryRegistry] = None):
+        msgpack, zstandard = _binary_modules()
+        try:
+            packed = msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError):
+            return _json_dumps(value)
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+        return BINARY_MAGIC + bytes([FORMAT_MSGPACK_ZSTD]) + compressor.compress(packed)
+
+    def needs_rewrite(self, stored, app_name: str, dictionaries: Optional[DictionaryRegistry] = None) -> bool:
+        return _stored_format(stored) != FORMAT_MSGPACK_ZSTD
+
+
+class CompressingSerializer(SessionSerializer):
+    """
+    Another serializer's JSON text, zstd-compressed when it is at least
+    min_bytes long: BINARY_MAGIC, FORMAT_ZSTD_JSON, the dictionary id, the
+    compressed text. The dictionary is the current one of the app set by
+    session_compression.compressing_for(); values compress without one
+    outside of it.
+
+    Args:
+        inner (SessionSerializer): Serializer producing the JSON text.
+        min_bytes (int): Smallest value compressed, in bytes of JSON text.
+    """
+
+    binary = True
+
+    def __init__(self, inner: SessionSerializer, min_bytes: int = DEFAULT_COMPRESS_MIN_BYTES):
+        zstandard_module()
+        if inner.binary:
+            raise ValueError(f"The {inner.name} session format cannot be combined with +zstd.")
+        self.inner = inner
+        self.min_bytes = min_bytes
+        self.name = f"{inner.name}+zstd"
+
+    def dumps(self, value: Any, dictionaries: Optional[DictionaryRegistry] = None):
+        text = self.inner.dumps(value)
+        data = text.encode("utf-8")
+        if len(data) < self.min_bytes or dictionaries is None:
+            return text
+        dictionary_id, compressor = dictionaries.compressor(current_compression_app())
+        compressed = compressor.compress(data)
+        if len(compressed) >= len(data):
+            return text
+        return (
+            BINARY_MAGIC + bytes([FORMAT_ZSTD_JSON]) + dictionary_id.to_bytes(_DICTIONARY_ID_BYTES, "big") + compressed
+        )
+
+    def needs_rewrite(self, stored, app_name: str, dictionaries: Optional[DictionaryRegistry] = None) -> bool:
+        stored_format = _stored_format(stored)
+        if stored_format is None:
+            # Text that would compress now, give or take multi-byte characters.
+            return len(stored) >= self.min_bytes
+        if stored_format != FORMAT_ZSTD_JSON:
+            return True
+        # Compressed before the app's current dictionary was trained.
+        dictionary_id = int.from_bytes(stored[len(BINARY_MAGIC) + 1:len(BINARY_MAGIC) + 1 + _DICTIONARY_ID_BYTES], "big")
+        return dictionaries is not None and dictionary_id != dictionaries.current_id(app_name)
+
+
+SERIALIZERS = {
+    SessionSerializer.name: SessionSerializer,
+    OrjsonSerializer.name: OrjsonSerializer,
+    MsgpackZstdSerializer.name: MsgpackZstdSerializer,
+}
+
+_binary_local = threading.local()
+
+
+def _binary_modules():
+    try:
+        import msgpack
+        import zstandard
+    except ImportError as e:
+        raise ValueError("The msgpack-zstd session format needs `pip install msgpack zstandard`.") from e
+    return msgpack, zstandard
+
+
+def _stored_format(stored) -> Optional[int]:
+    """Format version of a stored binary value; None for JSON text."""
+    if isinstance(stored, (bytes, bytearray, memoryview)) and bytes(stored[:len(BINARY_MAGIC)]) == BINARY_MAGIC:
+        return stored[len(BINARY_MAGIC)]
+    return None
+
+
+def _plain_decompressor(zstandard):
+    decompressor = getattr(_binary_local, "decompressor", None)
+    if decompressor is None:
+        decompressor = _binary_local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor
+
+
+def decode_stored_value(stored, dictionaries: Optional[DictionaryRegistry] = None) -> Any:
+    """
+    Decodes a column value written by any serializer (or by ADK itself).
+
+    Args:
+        stored (str | bytes): The raw column value.
+        dictionaries (DictionaryRegistry, optional): Compression dictionaries
+            of the database; needed for values compressed with one.
+
+    Returns:
+        The decoded value.
+
+    Raises:
+        ValueError: For an unknown binary format version or a missing dictionary.
+    """
+    if isinstance(stored, (bytes, bytearray, memoryview)):
+        stored = bytes(stored)
+        if stored.startswith(BINARY_MAGIC):
+            version = stored[len(BINARY_MAGIC)]
+            if version == FORMAT_ZSTD_JSON:
+                start = len(BINARY_MAGIC) + 1
+                dictionary_id = int.from_bytes(stored[start:start + _DICTIONARY_ID_BYTES], "big")
+                if dictionary_id and dictionaries is None:
+                    raise ValueError("This session value needs the compression dictionaries of its database.")
+                if dictionaries is not None:
+                    decompressor = dictionaries.decompressor(dictionary_id)
+                else:
+                    decompressor = _plain_decompressor(zstandard_module())
+                return _json_loads(decompressor.decompress(stored[start + _DICTIONARY_ID_BYTES:]))
+            if version != FORMAT_MSGPACK_ZSTD:
+                raise ValueError(f"Unknown session value format {version}.")
+            msgpack, zstandard = _binary_modules()
+            return msgpack.unpackb(
+                _plain_decompressor(zstandard).decompress(stored[len(BINARY_MAGIC) + 1:]), raw=False, strict_map_key=False
+            )
+    return _json_loads(stored)
+
+
+def get_serializer(name: Optional[str] = None) -> SessionSerializer:
+    """
+    Args:
+        name (str, optional): "json", "orjson" or "msgpack-zstd", optionally
+            with "+zstd" after "json" or "orjson"; defaults to
+            $SESSION_SERIALIZER, else "orjson" when installed, else "json".
+            Without a name, "+zstd" is added when $SESSION_COMPRESS_MIN_BYTES is set.
+
+    Returns:
+        SessionSerializer: A new serializer.
+
+    Raises:
+        ValueError: For an unknown name or a missing optional package.
+    """
+    min_bytes = int(os.environ.get("SESSION_COMPRESS_MIN_BYTES") or 0)
+    configured = name is None
+    name = name or os.environ.get("SESSION_SERIALIZER") or ("orjson" if orjson is not None else "json")
+    explicit = name.endswith("+zstd")
+    name = name[:-len("+zstd")] if explicit else name
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown session serializer '{name}', expected one of {sorted(SERIALIZERS)}.")
+    serializer = SERIALIZERS[name]()
+    # $SESSION_COMPRESS_MIN_BYTES leaves msgpack-zstd alone: it compresses everything already.
+    if explicit or (configured and min_bytes > 0 and not serializer.binary):
+        return CompressingSerializer(serializer, min_bytes or DEFAULT_COMPRESS_MIN_BYTES)
+    return serializer
+
+
+# ADK's DynamicJSON methods, used for dialects without a serializer.
+_stock_bind_param = DynamicJSON.process_bind_param
+_stock_result_value = DynamicJSON.process_result_value
+
+
+def _process_bind_param(self, value, dialect):
+    serializer = getattr(dialect, "session_serializer", None)
+    if serializer is None or value is None or dialect.name == "postgresql":
+        return _stock_bind_param(self, value, dialect)
+    return serializer.dumps(value, dialect.session_dictionaries)
+
+
+def _process_result_value(self, value, dialect):
+    serializer = getattr(dialect, "session_serializer", None)
+    if serializer is None or value is None or dialect.name == "postgresql":
+        return _stock_result_value(self, value, dialect)
+    return serializer.loads(value, dialect.session_dictionaries)
+
+
+def attach_serializer(engine, serializer: Optional[SessionSerializer] = None) -> SessionSerializer:
+    """
+    Makes an engine encode the session JSON columns with a serializer, and
+    gives it the DictionaryRegistry of its database.
+
+    Other engines, including stock DatabaseSessionService ones, are unaffected.
+
+    Args:
+        engine: SQLAlchemy Engine or AsyncEngine.
+        serializer (SessionSerializer, optional): Defaults to get_serializer().
+
+    Returns:
+        SessionSerializer: The attached serializer.
+
+    Raises:
+        ValueError: If a binary serializer is used on a database other than SQLite.
+    """
+    serializer = serializer or get_serializer()
+    dialect = engine.dialect
+    if serializer.binary and dialect.name != "sqlite":
+        raise ValueError(f"The {serializer.name} session format is only supported on SQLite, not {dialect.name}.")
+    # Set before the engine runs any statement: SQLAlchemy caches processors per dialect.
+    DynamicJSON.process_bind_param = _process_bind_param
+    DynamicJSON.process_result_value = _process_result_value
+    # DynamicJSON has no per-instance state; without this SQLAlchemy never
+    # caches the compiled SQL of statements that touch these columns.
+    DynamicJSON.cache_ok = True
+    dialect.session_serializer = serializer
+    if getattr(dialect, "session_dictionaries", None) is None:
+        dialect.session_dictionaries = DictionaryRegistry(engine)
+    return serializer
+
+
+def migrate_serialized_rows(engine, batch_size: int = MIGRATE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Rewrites stored values that are not in the format of the engine's
+    serializer (JSON text vs. binary, compressed with an older dictionary),
+    a batch of rows per transaction. update_time values are kept.
+
+    Args:
+        engine: Engine with a serializer attached (see attach_serializer()).
+        batch_size (int): Rows read and rewritten per transaction.
+
+    Returns:
+        dict: Rows rewritten per table.
+
+    Raises:
+        ValueError: If the engine has no serializer attached.
+    """
+    serializer = getattr(engine.dialect, "session_serializer", None)
+    if serializer is None:
+        raise ValueError("migrate_serialized_rows() needs an engine with a serializer attached.")
+    dictionaries = engine.dialect.session_dictionaries
+    rewritten: Dict[str, int] = {}
+    for table, columns in SERIALIZED_COLUMNS.items():
+        keys = list(table.primary_key.columns)
+        kept = [table.c.update_time] if "update_time" in table.c else []
+        # Raw stored values, to tell the formats apart.
+        raw = [type_coerce(table.c[column], Text).label(column) for column in columns]
+        query = select(*keys, *kept, *raw).order_by(*keys).limit(batch_size)
+        statement = (
+            update(table)
+            .where(*(key == bindparam(f"key_{key.name}") for key in keys))
+            .values({column.name: bindparam(f"value_{column.name}") for column in kept})
+            .values({column: bindparam(f"value_{column}") for column in columns})
+        )
+        rewritten[table.name] = 0
+        last = None
+        while True:
+            with engine.begin() as connection:
+                page = query if last is None else query.where(tuple_(*keys) > tuple_(*last))
+                rows = connection.execute(page).mappings().all()
+                if not rows:
+                    break
+                last = [rows[-1][key.name] for key in keys]
+                stale: Dict[str, list] = {}
+                for row in rows:
+                    if any(
+                        row[column] is not None and serializer.needs_rewrite(row[column], row["app_name"], dictionaries)
+                        for column in columns
+                    ):
+                        stale.setdefault(row["app_name"], []).append(row)
+                # Per app, so each app's values get its own dictionary.
+                for app_name, app_rows in stale.items():
+                    with compressing_for(app_name):
+                        connection.execute(statement, [
+                            {
+                                **{f"key_{key.name}": row[key.name] for key in keys},
+                                **{f"value_{column.name}": row[column.name] for column in kept},
+                                **{
+                                    f"value_{column}": (
+                                        decode_stored_value(row[column], dictionaries)
+                                        if row[column] is not None else None
+                                    )
+                                    for column in columns
+                                },
+                            }
+                            for row in app_rows
+                        ])
+                    rewritten[table.name] += len(app_rows)
+    return rewritten
@@ -0,0 +1,443 @@
+"""
+Session Service Provider
+------------------------
+
+One DatabaseSessionService (and so one SQLAlchemy engine and connection pool)
+per database URL for the whole process, instead of a new engine per call.
+
+The URL comes from the caller, else $SESSION_DB_URL, else the local SQLite
+file the examples have always used. SQLite databases are switched to WAL
+journaling so readers no longer block on a writer, and each pooled connection
+gets pragmas that cut per-commit fsync cost and wait on locks instead of
+failing with "database is locked".
+
+The ADK tables only index their primary keys, and the events key starts with
+the event id, so loading a session scanned the whole events table. The
+indexes in SESSION_INDEXES are added to new and existing databases so lookups
+stay fast as the store grows (see also utils/sessions/session_maintenance.py).
+
+Usage:
+    from utils.sessions.session_service_provider import get_session_service
+    session_service = get_session_service()
+"""
+import atexit
+import copy
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional
+
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.database_session_service import Base, StorageEvent, StorageSession
+from google.adk.sessions.state import State
+from sqlalchemy import Index, MetaData, create_engine, event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import ArgumentError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from utils.sessions.session_cache import SessionCache, changes_shared_state, copy_session
+from utils.sessions.session_compression import compressing_for
+from utils.sessions.session_headers import DEFAULT_PAGE_SIZE, SessionPage, latest_session_header, list_session_headers
+from utils.sessions.session_serializer import attach_serializer
+from utils.sessions.state_patches import (
+    CHECKPOINT_EVERY_PATCHED_EVENTS,
+    PatchedEventCounter,
+    apply_ops,
+    checkpoint_state_patches,
+    event_patches,
+    restore_patched_state,
+)
+
+if TYPE_CHECKING:
+    from utils.sessions.async_session_service import AsyncDatabaseSessionService
+    from utils.sessions.sharded_session_service import ShardedSessionService
+
+DEFAULT_SESSION_DB_URL = "sqlite:///db_loop_agent.db"
+
+# Applied to every new SQLite connection. WAL lets readers run while a writer
+# commits; synchronous=NORMAL is durable against app crashes in WAL mode and
+# only skips the fsync per commit; busy_timeout makes writers wait for the
+# lock instead of raising. auto_vacuum only takes effect for new database
+# files (existing ones are converted by session_maintenance.vacuum_session_store()),
+# and foreign_keys makes deleting a session cascade to its events.
+SQLITE_PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -64000,  # KiB, i.e. 64 MB page cache per connection
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+# Secondary indexes on the ADK session tables, created if missing.
+SESSION_INDEXES = [
+    # get_session(): events of one session in timestamp order.
+    Index("ix_events_session_timestamp", StorageEvent.session_id, StorageEvent.timestamp),
+    # TTL expiry: stale sessions per app.
+    Index("ix_sessions_app_update_time", StorageSession.app_name, StorageSession.update_time),
+    # list_session_headers() / latest_session(): a user's sessions, newest first.
+    Index(
+        "ix_sessions_app_user_update_time",
+        StorageSession.app_name,
+        StorageSession.user_id,
+        StorageSession.update_time,
+        StorageSession.id,
+    ),
+]
+
+# Connection pool sizing for file and server databases.
+POOL_SIZE = int(os.environ.get("SESSION_DB_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.environ.get("SESSION_DB_POOL_MAX_OVERFLOW", 10))
+POOL_RECYCLE_S = 1800
+
+# Group-commit window of the services from get_async_session_service().
+# 0 (the default) writes events as soon as the writer is free.
+WRITE_BEHIND_INTERVAL_S = float(os.environ.get("SESSION_WRITE_BEHIND_MS", 0)) / 1000
+
+# Number of SQLite shards of get_sharded_session_service(); 0 or 1 means no sharding.
+SESSION_DB_SHARDS = int(os.environ.get("SESSION_DB_SHARDS", 0))
+
+_services: Dict[str, DatabaseSessionService] = {}
+_async_services: Dict[str, "AsyncDatabaseSessionService"] = {}
+_sharded_services: Dict[tuple, "ShardedSessionService"] = {}
+_services_lock = threading.Lock()
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """SQLAlchemy "connect" event handler that applies SQLITE_PRAGMAS to a new connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_session_indexes(connection) -> None:
+    """
+    Creates the SESSION_INDEXES that do not exist yet.
+
+    Args:
+        connection: SQLAlchemy Connection (or Engine) to a database with the ADK session tables.
+    """
+    for index in SESSION_INDEXES:
+        index.create(connection, checkfirst=True)
+
+
+def create_session_engine(db_url: str):
+    """
+    Creates an SQLAlchemy engine tuned for the session tables, encoding
+    their JSON columns with utils/sessions/session_serializer.py.
+
+    Args:
+        db_url (str): SQLAlchemy database URL.
+
+    Returns:
+        Engine: The engine.
+
+    Raises:
+        ValueError: If the URL is invalid or its driver is not installed.
+    """
+    try:
+        url = make_url(db_url)
+        if url.get_backend_name() != "sqlite":
+            engine = create_engine(
+                url,
+                pool_size=POOL_SIZE,
+                max_overflow=POOL_MAX_OVERFLOW,
+                pool_pre_ping=True,
+                pool_recycle=POOL_RECYCLE_S,
+            )
+            attach_serializer(engine)
+            return engine
+        if url.database in (None, "", ":memory:"):
+            # Every connection to an in-memory database is a new, empty
+            # database, so all sessions must share a single connection.
+            engine = create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+        else:
+            engine = create_engine(
+                url,
+                pool_size=POOL_SIZE,
+                max_overflow=POOL_MAX_OVERFLOW,
+                connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+            )
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+        attach_serializer(engine)
+        return engine
+    except ArgumentError as e:
+        raise ValueError(f"Invalid database URL format or argument '{db_url}'.") from e
+    except ImportError as e:
+        raise ValueError(f"Database related module not found for URL '{db_url}'.") from e
+
+
+def _follow_append(cached, session, event) -> None:
+    """
+    Brings the cached copy of a session up to date with an event just
+    appended to the caller's copy, as ADK and the state patches did there.
+
+    The state dict is replaced rather than changed, and only the values the
+    event changes are copied, so a concurrent get() copying the cached session
+    never sees it half-updated.
+    """
+    delta = event.actions.state_delta if event.actions else None
+    if delta:
+        state = dict(cached.state)
+        for key, value in delta.items():
+            if not key.startswith(State.TEMP_PREFIX):
+                state[key] = copy.deepcopy(value)
+        for key, ops in event_patches(event.actions).items():
+            # A full write of the key in the same event already holds the operations.
+            if key not in delta:
+                state[key] = apply_ops(copy.deepcopy(state.get(key)), ops)
+        cached.state = state
+    cached.events.append(event)
+    cached.last_update_time = session.last_update_time
+
+
+class PooledDatabaseSessionService(DatabaseSessionService):
+    """
+    DatabaseSessionService on an engine from create_session_engine().
+
+    Behaves like DatabaseSessionService, plus support for the incremental
+    state operations in utils/sessions/state_patches.py, a read-through
+    cache of sessions (utils/sessions/session_cache.py) and paginated session
+    headers (utils/sessions/session_headers.py).
+    Prefer get_session_service(), which shares one instance per URL.
+
+    Args:
+        db_url (str): SQLAlchemy database URL.
+        cache (SessionCache, optional): Session cache; defaults to a new
+            SessionCache(). Pass SessionCache(max_bytes=0) to disable caching.
+    """
+
+    supports_state_patches = True
+
+    def __init__(self, db_url: str, cache: Optional[SessionCache] = None):
+        # Same setup as DatabaseSessionService.__init__, without creating a
+        # second, untuned engine first.
+        self.db_url = db_url
+        self.db_engine = create_session_engine(db_url)
+        self.metadata = MetaData()
+        self.inspector = inspect(self.db_engine)
+        self.DatabaseSessionFactory = sessionmaker(bind=self.db_engine)
+        Base.metadata.create_all(self.db_engine)
+        with self.db_engine.begin() as connection:
+            create_session_indexes(connection)
+
+        self._patched_events = PatchedEventCounter()
+        self.cache = cache if cache is not None else SessionCache()
+
+    def create_session(self, *, app_name, user_id, state=None, session_id=None):
+        with compressing_for(app_name):
+            session = super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        if changes_shared_state(state):
+            self.cache.clear()
+        self.cache.invalidate_list((app_name, user_id))
+        self.cache.put(copy_session(session))
+        return session
+
+    def get_session(self, *, app_name, user_id, session_id, config=None):
+        if config is None:
+            session = self.cache.get((app_name, user_id, session_id))
+            if session is not None:
+                return session
+        session = super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if session is not None:
+            restore_patched_state(session)
+            if config is None:
+                self.cache.put(copy_session(session))
+        return session
+
+    def list_sessions(self, *, app_name, user_id):
+        response = self.cache.get_list((app_name, user_id))
+        if response is None:
+            response = super().list_sessions(app_name=app_name, user_id=user_id)
+            self.cache.put_list((app_name, user_id), response)
+        return response
+
+    def delete_session(self, *, app_name, user_id, session_id):
+        self.cache.invalidate((app_name, user_id, session_id))
+        self._patched_events.forget((app_name, user_id, session_id))
+        super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def list_session_headers(
+        self, *, app_name: str, user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+    ) -> SessionPage:
+        """A page of the user's session headers, newest first (see session_headers.list_session_headers())."""
+        with self.DatabaseSessionFactory() as db:
+            return list_session_headers(db, app_name, user_id, limit=limit, cursor=cursor)
+
+    def latest_session(self, *, app_name: str, user_id: str):
+        """
+        Returns:
+            Session: The user's most recently updated session, or None if there is none.
+        """
+        with self.DatabaseSessionFactory() as db:
+            header = latest_session_header(db, app_name, user_id)
+        if header is None:
+            return None
+        return self.get_session(app_name=app_name, user_id=user_id, session_id=header.id)
+
+    def evict(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """
+        Drops the cached copy of a session so the next get_session() reads
+        the database again. Call it after changing a session's rows directly.
+        """
+        self.cache.invalidate((app_name, user_id, session_id))
+
+    def append_event(self, session, event):
+        key = (session.app_name, session.user_id, session.id)
+        cached = self.cache.peek(key)
+        # The cached copy can follow this append only if the caller appended
+        # to a session that was exactly as current as the cached one.
+        in_sync = (
+            cached is not None
+            and cached.last_update_time == session.last_update_time
+            and len(cached.events) == len(session.events)
+        )
+        if event.partial:
+            return super().append_event(session=session, event=event)
+        self.cache.invalidate_list(key[:2])
+        try:
+            with compressing_for(session.app_name):
+                event = super().append_event(session=session, event=event)
+                if event_patches(event.actions):
+                    self._checkpoint_patches(session, key)
+        except BaseException:
+            self.cache.invalidate(key)
+            raise
+        if changes_shared_state(event.actions.state_delta):
+            self.cache.clear()
+        if in_sync:
+            _follow_append(cached, session, event)
+            self.cache.put(cached, appended=event)
+        else:
+            self.cache.invalidate(key)
+        return event
+
+    def _checkpoint_patches(self, session, key) -> None:
+        """Folds state patches into the sessions table every CHECKPOINT_EVERY_PATCHED_EVENTS events."""
+        if self._patched_events.count(key, CHECKPOINT_EVERY_PATCHED_EVENTS):
+            with self.DatabaseSessionFactory() as db:
+                update_time = checkpoint_state_patches(db, *key)
+            if update_time is not None:
+                # Keep ADK's stale-session check happy after our own update.
+                session.last_update_time = update_time
+
+    def close(self) -> None:
+        """Closes all pooled connections (checkpointing the SQLite WAL)."""
+        self.db_engine.dispose()
+
+
+def get_session_db_url(db_url: Optional[str] = None) -> str:
+    """
+    Resolves the session database URL.
+
+    Args:
+        db_url (str, optional): Explicit URL; wins over the environment.
+
+    Returns:
+        str: db_url, else $SESSION_DB_URL, else DEFAULT_SESSION_DB_URL.
+    """
+    return db_url or os.environ.get("SESSION_DB_URL") or DEFAULT_SESSION_DB_URL
+
+
+def get_session_service(db_url: Optional[str] = None) -> PooledDatabaseSessionService:
+    """
+    Returns the process-wide session service for a database URL.
+
+    The first call for a URL creates the engine and tables; later calls (from
+    any thread) return the same instance.
+
+    Args:
+        db_url (str, optional): SQLAlchemy database URL (see get_session_db_url()).
+
+    Returns:
+        PooledDatabaseSessionService: The shared session service.
+    """
+    db_url = get_session_db_url(db_url)
+    service = _services.get(db_url)
+    if service is not None:
+        return service
+    with _services_lock:
+        if db_url not in _services:
+            if not _services and not _async_services:
+                atexit.register(close_session_services)
+            _services[db_url] = PooledDatabaseSessionService(db_url)
+        return _services[db_url]
+
+
+def get_async_session_service(db_url: Optional[str] = None) -> "AsyncDatabaseSessionService":
+    """
+    Returns the process-wide non-blocking session service for a database URL.
+
+    Same URL resolution and sharing as get_session_service(); see
+    utils/sessions/async_session_service.py for how it avoids blocking the
+    event loop. With $SESSION_WRITE_BEHIND_MS set, the service runs in
+    write-behind mode with a crash-recovery journal next to the database.
+
+    Args:
+        db_url (str, optional): Database URL (see get_session_db_url()).
+
+    Returns:
+        AsyncDatabaseSessionService: The shared session service.
+    """
+    from utils.sessions.async_session_service import AsyncDatabaseSessionService, default_journal_path
+
+    db_url = get_session_db_url(db_url)
+    service = _async_services.get(db_url)
+    if service is not None:
+        return service
+    with _services_lock:
+        if db_url not in _async_services:
+            if not _services and not _async_services:
+                atexit.register(close_session_services)
+            _async_services[db_url] = AsyncDatabaseSessionService(
+                db_url,
+                commit_interval_s=WRITE_BEHIND_INTERVAL_S,
+                journal_path=default_journal_path(db_url) if WRITE_BEHIND_INTERVAL_S else None,
+            )
+        return _async_services[db_url]
+
+
+def get_sharded_session_service(db_url: Optional[str] = None, shards: Optional[int] = None) -> "ShardedSessionService":
+    """
+    Returns the process-wide sharded session service for a SQLite file URL.
+
+    The shards are the files next to the database named by the URL
+    (sessions.db -> sessions.shard0.db, ...); see
+    utils/sessions/sharded_session_service.py.
+
+    Args:
+        db_url (str, optional): SQLite file URL (see get_session_db_url()).
+        shards (int, optional): Number of shards; defaults to $SESSION_DB_SHARDS.
+
+    Returns:
+        ShardedSessionService: The shared session service.
+    """
+    from utils.sessions.sharded_session_service import ShardedSessionService, shard_db_urls
+
+    key = (get_session_db_url(db_url), shards or SESSION_DB_SHARDS or 1)
+    service = _sharded_services.get(key)
+    if service is not None:
+        return service
+    shard_urls = shard_db_urls(*key)
+    # Shards come from get_session_service(), which takes the lock itself.
+    service = ShardedSessionService(shard_urls)
+    with _services_lock:
+        return _sharded_services.setdefault(key, service)
+
+
+def close_session_services() -> None:
+    """
+    Closes every shared session service, writing out queued events first.
+    Registered with atexit; safe to call twice.
+    """
+    with _services_lock:
+        services = list(_services.values()) + list(_async_services.values())
+        _services.clear()
+        _async_services.clear()
+        _sharded_services.clear()
+    for service in services:
+        service.close()
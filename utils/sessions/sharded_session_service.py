@@ -0,0 +1,394 @@
+"""
+Sharded Session Service
+-----------------------
+
+Spreads sessions over several SQLite databases so that appends for different
+users no longer queue behind a single database's write lock.
+
+Every (app_name, user_id) is routed to one shard by consistent hashing
+(HashRing), so all sessions, events and user: state of a user live in one
+database and every single-user call touches exactly one shard. Each shard is
+the shared PooledDatabaseSessionService for its URL, with its own engine,
+connection pool and session cache.
+
+    * list_sessions(app_name=..., user_id=None) lists the sessions of all
+      users of an app, querying the shards in parallel.
+    * app: state is kept in every shard; writes to it are copied to the
+      other shards (and clear their session caches), so keep it small and
+      rarely written.
+    * reshard() moves to a new set of shard URLs while the service keeps
+      serving. Only the users whose shard changes are moved, one at a time;
+      calls for a user wait while that user is being moved. If a reshard is
+      interrupted, run the same reshard() again before serving traffic - it
+      picks up users found on the wrong shard.
+
+Sharding helps as long as writers run in parallel: several worker processes
+(or threads spending their time in SQLite, which releases the GIL).
+Run session maintenance (utils/sessions/session_maintenance.py) per shard URL.
+
+Usage:
+    from utils.sessions.session_service_provider import get_sharded_session_service
+    session_service = get_sharded_session_service(shards=4)  # or $SESSION_DB_SHARDS
+"""
+import bisect
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions.base_session_service import ListSessionsResponse
+from google.adk.sessions.database_session_service import StorageAppState, StorageEvent, StorageSession, StorageUserState
+from google.adk.sessions.session import Session
+from google.adk.sessions.state import State
+from sqlalchemy import delete, inspect, insert, select
+from sqlalchemy.engine import make_url
+
+from utils.sessions.history_compaction import StorageArchivedEvent
+from utils.sessions.session_compression import compressing_for
+from utils.sessions.session_headers import DEFAULT_PAGE_SIZE, SessionPage
+from utils.sessions.session_service_provider import PooledDatabaseSessionService, get_session_service
+
+# Points per shard on the hash ring; more points spread users more evenly.
+VIRTUAL_NODES_PER_SHARD = 64
+
+# Calls for users hashing to the same stripe serialize against a reshard
+# moving one of them; the stripes keep unrelated users from waiting.
+LOCK_STRIPES = 64
+
+# Tables holding per-user rows, in the order they are copied (parents first).
+USER_TABLES = [StorageSession.__table__, StorageEvent.__table__, StorageUserState.__table__, StorageArchivedEvent.__table__]
+
+_UserKey = Tuple[str, str]
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping user keys to shard URLs.
+
+    Adding a shard to N shards moves only about 1/(N+1) of the users.
+
+    Args:
+        shard_urls (list[str]): The shards.
+        virtual_nodes (int): Ring points per shard.
+    """
+
+    def __init__(self, shard_urls: Sequence[str], virtual_nodes: int = VIRTUAL_NODES_PER_SHARD):
+        if not shard_urls:
+            raise ValueError("A hash ring needs at least one shard.")
+        self.shard_urls = list(dict.fromkeys(shard_urls))
+        points = sorted((_hash(f"{url}#{n}"), url) for url in self.shard_urls for n in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._urls = [url for _, url in points]
+
+    def owner(self, app_name: str, user_id: str) -> str:
+        """
+        Returns:
+            str: URL of the shard that owns the user.
+        """
+        index = bisect.bisect(self._hashes, _hash(f"{app_name}/{user_id}")) % len(self._hashes)
+        return self._urls[index]
+
+
+def shard_db_urls(db_url: str, count: int) -> List[str]:
+    """
+    Derives shard URLs from a SQLite file URL: sessions.db -> sessions.shard0.db, ...
+
+    Args:
+        db_url (str): SQLite database URL of a file.
+        count (int): Number of shards.
+
+    Returns:
+        list[str]: One URL per shard.
+
+    Raises:
+        ValueError: If db_url is not a SQLite file URL or count is below 1.
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        raise ValueError(f"Shard URLs can only be derived from a SQLite file URL, got '{db_url}'.")
+    if count < 1:
+        raise ValueError(f"Shard count must be at least 1, got {count}.")
+    root, extension = os.path.splitext(url.database)
+    return [url.set(database=f"{root}.shard{n}{extension or '.db'}").render_as_string(hide_password=False) for n in range(count)]
+
+
+class ShardedSessionService(BaseSessionService):
+    """
+    Session service routing each user to one of several databases.
+
+    Args:
+        shard_urls (list[str]): One SQLAlchemy URL per shard (see shard_db_urls()).
+    """
+
+    supports_state_patches = True
+
+    def __init__(self, shard_urls: Sequence[str]):
+        self._ring = HashRing(shard_urls)
+        self._shards: Dict[str, PooledDatabaseSessionService] = {url: get_session_service(url) for url in self._ring.shard_urls}
+        # Users still on their old shard while a reshard is running -> that shard's URL.
+        self._moving: Dict[_UserKey, str] = {}
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # Users created while a reshard scans the shards, None when no scan runs.
+        self._created: Optional[Set[_UserKey]] = None
+
+    @property
+    def shard_urls(self) -> List[str]:
+        return list(self._ring.shard_urls)
+
+    # -------------------------------------------------------------- routing
+
+    def _shard_url(self, app_name: str, user_id: str) -> str:
+        return self._moving.get((app_name, user_id)) or self._ring.owner(app_name, user_id)
+
+    def shard_for(self, app_name: str, user_id: str) -> PooledDatabaseSessionService:
+        """
+        The shard holding a user's sessions, for code that works on the
+        database directly (e.g. history compaction).
+        """
+        return self._shards[self._shard_url(app_name, user_id)]
+
+    @contextmanager
+    def _routed(self, app_name: str, user_id: str) -> Iterator[PooledDatabaseSessionService]:
+        """Yields the user's shard, holding the user's lock stripe so a reshard cannot move the user meanwhile."""
+        with self._locks[_hash(f"{app_name}/{user_id}") % LOCK_STRIPES]:
+            yield self.shard_for(app_name, user_id)
+
+    @contextmanager
+    def _all_users_locked(self) -> Iterator[None]:
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    # ------------------------------------------------------ session service
+
+    def create_session(self, *, app_name, user_id, state=None, session_id=None) -> Session:
+        with self._routed(app_name, user_id) as shard:
+            session = shard.create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+            # Checked after the insert: a scan that started earlier may have missed it.
+            created = self._created
+            if created is not None:
+                created.add((app_name, user_id))
+        self._replicate_app_state(app_name, state, origin=shard)
+        return session
+
+    def get_session(self, *, app_name, user_id, session_id, config=None) -> Optional[Session]:
+        with self._routed(app_name, user_id) as shard:
+            return shard.get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    def list_sessions(self, *, app_name, user_id=None) -> ListSessionsResponse:
+        """
+        Lists a user's sessions, or - with user_id=None - the sessions of all
+        users of the app across every shard.
+        """
+        if user_id is not None:
+            with self._routed(app_name, user_id) as shard:
+                return shard.list_sessions(app_name=app_name, user_id=user_id)
+        shards = list(self._shards.values())
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            results = list(pool.map(lambda shard: _list_app_sessions(shard, app_name), shards))
+        # A user interrupted mid-move can be on two shards; the moving source wins.
+        sessions: Dict[Tuple[str, str], Session] = {}
+        for shard, shard_sessions in zip(shards, results):
+            for session in shard_sessions:
+                key = (session.user_id, session.id)
+                if key not in sessions or self._shard_url(app_name, session.user_id) == shard.db_url:
+                    sessions[key] = session
+        return ListSessionsResponse(sessions=list(sessions.values()))
+
+    def list_session_headers(self, *, app_name, user_id, limit=DEFAULT_PAGE_SIZE, cursor=None) -> SessionPage:
+        """A page of the user's session headers, newest first (see session_headers.list_session_headers())."""
+        with self._routed(app_name, user_id) as shard:
+            return shard.list_session_headers(app_name=app_name, user_id=user_id, limit=limit, cursor=cursor)
+
+    def latest_session(self, *, app_name, user_id) -> Optional[Session]:
+        """The user's most recently updated session, or None."""
+        with self._routed(app_name, user_id) as shard:
+            return shard.latest_session(app_name=app_name, user_id=user_id)
+
+    def delete_session(self, *, app_name, user_id, session_id) -> None:
+        with self._routed(app_name, user_id) as shard:
+            shard.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def list_events(self, *, app_name, user_id, session_id):
+        with self._routed(app_name, user_id) as shard:
+            return shard.list_events(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def append_event(self, session: Session, event: Event) -> Event:
+        with self._routed(session.app_name, session.user_id) as shard:
+            event = shard.append_event(session, event)
+        if not event.partial and event.actions:
+            self._replicate_app_state(session.app_name, event.actions.state_delta, origin=shard)
+        return event
+
+    def evict(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        """Drops the cached copy of a session (see PooledDatabaseSessionService.evict())."""
+        self.shard_for(app_name, user_id).evict(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    def close(self) -> None:
+        """Nothing to do: the shards are the shared services of get_session_service(), closed at exit."""
+
+    # ------------------------------------------------------------ app state
+
+    def _replicate_app_state(self, app_name: str, state: Optional[dict], origin: PooledDatabaseSessionService) -> None:
+        """Copies app: keys of a state (delta) to the shards other than the one that just stored them."""
+        delta = {
+            key.removeprefix(State.APP_PREFIX): value
+            for key, value in (state or {}).items()
+            if key.startswith(State.APP_PREFIX)
+        }
+        if not delta:
+            return
+        for shard in self._shards.values():
+            if shard is origin:
+                continue
+            with shard.DatabaseSessionFactory() as db, compressing_for(app_name):
+                row = db.get(StorageAppState, app_name)
+                if row is None:
+                    db.add(StorageAppState(app_name=app_name, state=delta))
+                else:
+                    row.state.update(delta)
+                db.commit()
+            # Cached sessions of this app carry the old app: values.
+            shard.cache.clear()
+
+    def _copy_app_states(self, source: PooledDatabaseSessionService, target: PooledDatabaseSessionService) -> None:
+        """Gives a new shard the app: state rows it does not have yet."""
+        table = StorageAppState.__table__
+        with source.db_engine.connect() as connection:
+            rows = [dict(row) for row in connection.execute(select(table)).mappings()]
+        with target.db_engine.begin() as connection:
+            existing = set(connection.execute(select(table.c.app_name)).scalars())
+            missing = [row for row in rows if row["app_name"] not in existing]
+            if missing:
+                connection.execute(insert(table), missing)
+
+    # ------------------------------------------------------------ resharding
+
+    def reshard(self, shard_urls: Sequence[str]) -> Dict[str, int]:
+        """
+        Moves to a new set of shards while the service stays in use.
+
+        Users whose owner changes under the new ring are copied to their new
+        shard and then deleted from the old one, one user at a time, in a
+        transaction per shard. Until a user has been moved, calls for that user
+        still go to the old shard; calls for other users are not held up.
+        Shards left out of shard_urls are emptied and no longer used.
+
+        Args:
+            shard_urls (list[str]): The new shard URLs; may overlap the current ones.
+
+        Returns:
+            dict: users_moved, users_checked and shards.
+        """
+        new_ring = HashRing(shard_urls)
+        previous_shards = self._shards
+        added = {url: get_session_service(url) for url in new_ring.shard_urls if url not in previous_shards}
+        for shard in added.values():
+            self._copy_app_states(next(iter(previous_shards.values())), shard)
+        # Replaced, not changed in place: other threads may be iterating the shards.
+        self._shards = {**previous_shards, **added}
+
+        # Find the users outside the locks; create_session() records the users
+        # created meanwhile, so the pause for everyone only switches the ring.
+        self._created = set()
+        try:
+            users = {url: _stored_users(shard) for url, shard in self._shards.items()}
+        except BaseException:
+            self._created = None
+            raise
+        with self._all_users_locked():
+            for key in self._created:
+                users[self._shard_url(*key)].add(key)
+            self._created = None
+            moving: Dict[_UserKey, str] = {}
+            for url, keys in users.items():
+                for key in keys:
+                    # A user found on both its old and its new shard (an
+                    # interrupted earlier move) is copied again from the old one.
+                    if new_ring.owner(*key) != url and key not in moving:
+                        moving[key] = url
+            self._moving = moving
+            self._ring = new_ring
+        users_moved = len(moving)
+
+        for key, source_url in list(moving.items()):
+            with self._locks[_hash("/".join(key)) % LOCK_STRIPES]:
+                self._move_user(key, self._shards[source_url], self._shards[new_ring.owner(*key)])
+                del self._moving[key]
+
+        self._shards = {url: shard for url, shard in self._shards.items() if url in new_ring.shard_urls}
+        return {
+            "users_moved": users_moved,
+            "users_checked": len(set().union(*users.values())) if users else 0,
+            "shards": len(new_ring.shard_urls),
+        }
+
+    def _move_user(self, key: _UserKey, source: PooledDatabaseSessionService, target: PooledDatabaseSessionService) -> None:
+        """Copies all rows of a user from source to target, then deletes them from source."""
+        app_name, user_id = key
+        # Values are decoded from source and re-encoded with target's own dictionaries.
+        with (
+            source.db_engine.connect() as source_connection,
+            target.db_engine.begin() as target_connection,
+            compressing_for(app_name),
+        ):
+            has_archive = inspect(source_connection).has_table(StorageArchivedEvent.__tablename__)
+            copied: Dict[str, list] = {}
+            for table in USER_TABLES:
+                if table is StorageArchivedEvent.__table__:
+                    if not has_archive:
+                        continue
+                    table.create(target_connection, checkfirst=True)
+                copied[table.name] = [
+                    dict(row) for row in source_connection.execute(
+                        select(table).where(table.c.app_name == app_name, table.c.user_id == user_id)
+                    ).mappings()
+                ]
+            # Leftovers of an interrupted earlier move are replaced.
+            for table in reversed(USER_TABLES):
+                if table.name in copied:
+                    target_connection.execute(delete(table).where(table.c.app_name == app_name, table.c.user_id == user_id))
+            for table in USER_TABLES:
+                if copied.get(table.name):
+                    target_connection.execute(insert(table), copied[table.name])
+
+        with source.db_engine.begin() as source_connection:
+            for table in reversed(USER_TABLES):
+                if table.name in copied:
+                    source_connection.execute(delete(table).where(table.c.app_name == app_name, table.c.user_id == user_id))
+
+        for row in copied[StorageSession.__tablename__]:
+            source.evict(app_name=app_name, user_id=user_id, session_id=row["id"])
+            target.evict(app_name=app_name, user_id=user_id, session_id=row["id"])
+        source.cache.invalidate_list(key)
+        target.cache.invalidate_list(key)
+
+
+def _stored_users(shard: PooledDatabaseSessionService) -> Set[_UserKey]:
+    """(app_name, user_id) of every user with sessions or user: state in a shard."""
+    with shard.db_engine.connect() as connection:
+        users = {tuple(row) for row in connection.execute(select(StorageSession.app_name, StorageSession.user_id).distinct())}
+        users.update(tuple(row) for row in connection.execute(select(StorageUserState.app_name, StorageUserState.user_id).distinct()))
+    return users
+
+
+def _list_app_sessions(shard: PooledDatabaseSessionService, app_name: str) -> List[Session]:
+    """Sessions (without events or state) of all users of an app in one shard."""
+    with shard.DatabaseSessionFactory() as db:
+        rows = db.query(StorageSession).filter(StorageSession.app_name == app_name).all()
+        return [
+            Session(app_name=app_name, user_id=row.user_id, id=row.id, state={}, last_update_time=row.update_time.timestamp())
+            for row in rows
+        ]
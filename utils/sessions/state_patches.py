@@ -0,0 +1,381 @@
+"""
+State Patches
+-------------
+
+Incremental updates for list- and dict-valued session state.
+
+The usual pattern
+
+    reminders = tool_context.state.get("reminders", [])
+    reminders.append(reminder)
+    tool_context.state["reminders"] = reminders
+
+puts the whole list into the event's state_delta, and the session service
+writes the whole list to the database again. The helpers here change the
+value in place and record only the operation, e.g. ["append", "buy milk"],
+under the reserved delta key "temp:state_patch:reminders":
+
+    from utils.sessions.state_patches import state_append
+    state_append(tool_context, "reminders", reminder)
+
+Patch-aware session services (PooledDatabaseSessionService,
+AsyncDatabaseSessionService) store the operation with the event, leave the
+checkpointed value in the sessions table alone, replay operations newer than
+the checkpoint when a session is loaded, and fold them into a new checkpoint
+every CHECKPOINT_EVERY_PATCHED_EVENTS events. With any other session service
+the helpers fall back to a normal full-value write, so tools keep working.
+
+Operations: append, extend, set (list index), remove (list index), merge
+(dict keys), delete (dict key).
+"""
+import copy
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from google.adk.sessions.state import State
+
+# Delta key prefix for recorded operations. "temp:" keeps ADK from copying
+# the operations into session.state or into the sessions table.
+PATCH_DELTA_PREFIX = State.TEMP_PREFIX + "state_patch:"
+
+# Session-state key holding {state key: timestamp of the last event folded
+# into the stored value}. Stripped from sessions when they are loaded.
+CHECKPOINT_STATE_KEY = "_state_patch_checkpoints"
+
+# Fold operations into the stored value after this many events with patches.
+CHECKPOINT_EVERY_PATCHED_EVENTS = 50
+
+# Sessions whose patched events a service counts; the least recently patched
+# are forgotten first (their next checkpoint is merely postponed).
+MAX_COUNTED_SESSIONS = 10000
+
+
+def _session_service_supports_patches(context) -> bool:
+    invocation_context = getattr(context, "_invocation_context", None)
+    service = getattr(invocation_context, "session_service", None)
+    return bool(getattr(service, "supports_state_patches", False))
+
+
+def _record(context, key: str, value: Any, op: List[Any]) -> None:
+    """Records one operation for a value that was already changed in place."""
+    state = context.state
+    # State._value is the live session.state dict; keep it pointing at the
+    # changed object so reads in the same invocation see the change.
+    state._value[key] = value
+    if key in state._delta or not _session_service_supports_patches(context):
+        # A full value is pending for this event anyway (or the service
+        # cannot replay operations): write the whole value.
+        state[key] = value
+        state._delta.pop(PATCH_DELTA_PREFIX + key, None)
+        return
+    state._delta.setdefault(PATCH_DELTA_PREFIX + key, []).append(op)
+
+
+def _current(context, key: str, kind: type):
+    value = context.state.get(key)
+    if isinstance(value, kind):
+        return value
+    # Missing or of another type: start over with a full write.
+    value = kind()
+    context.state[key] = value
+    return value
+
+
+def state_append(context, key: str, value: Any) -> List[Any]:
+    """
+    Appends an item to a list in session state.
+
+    Args:
+        context: ADK ToolContext or CallbackContext.
+        key (str): State key of the list (created if missing).
+        value: JSON-serializable item to append.
+
+    Returns:
+        list: The updated list.
+    """
+    items = _current(context, key, list)
+    items.append(value)
+    _record(context, key, items, ["append", value])
+    return items
+
+
+def state_extend(context, key: str, values: Iterable[Any]) -> List[Any]:
+    """
+    Appends several items to a list in session state.
+
+    Args:
+        context: ADK ToolContext or CallbackContext.
+        key (str): State key of the list (created if missing).
+        values: JSON-serializable items to append.
+
+    Returns:
+        list: The updated list.
+    """
+    values = list(values)
+    items = _current(context, key, list)
+    items.extend(values)
+    _record(context, key, items, ["extend", values])
+    return items
+
+
+def state_set_index(context, key: str, index: int, value: Any) -> Any:
+    """
+    Replaces the item at an index of a list in session state.
+
+    Args:
+        context: ADK ToolContext or CallbackContext.
+        key (str): State key of the list.
+        index (int): 0-based index (negative indexes count from the end).
+        value: The new JSON-serializable item.
+
+    Returns:
+        The replaced item.
+
+    Raises:
+        IndexError: If the index is out of range.
+    """
+    items = _current(context, key, list)
+    index = range(len(items))[index]  # normalizes negative indexes, raises IndexError
+    old = items[index]
+    items[index] = value
+    _record(context, key, items, ["set", index, value])
+    return old
+
+
+def state_remove_index(context, key: str, index: int) -> Any:
+    """
+    Removes the item at an index of a list in session state.
+
+    Args:
+        context: ADK ToolContext or CallbackContext.
+        key (str): State key of the list.
+        index (int): 0-based index (negative indexes count from the end).
+
+    Returns:
+        The removed item.
+
+    Raises:
+        IndexError: If the index is out of range.
+    """
+    items = _current(context, key, list)
+    index = range(len(items))[index]
+    old = items.pop(index)
+    _record(context, key, items, ["remove", index])
+    return old
+
+
+def state_merge(context, key: str, mapping: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Sets some keys of a dict in session state, leaving the others untouched.
+
+    Args:
+        context: ADK ToolContext or CallbackContext.
+        key (str): State key of the dict (created if missing).
+        mapping (dict): JSON-serializable keys and values to set.
+
+    Returns:
+        dict: The updated dict.
+    """
+    mapping = dict(mapping)
+    value = _current(context, key, dict)
+    value.update(mapping)
+    _record(context, key, value, ["merge", mapping])
+    return value
+
+
+def state_delete_key(context, key: str, item_key: str) -> Any:
+    """
+    Removes one key from a dict in session state.
+
+    Args:
+        context: ADK ToolContext or CallbackContext.
+        key (str): State key of the dict.
+        item_key (str): The dict key to remove.
+
+    Returns:
+        The removed value, or None if the key was not present.
+    """
+    value = _current(context, key, dict)
+    if item_key not in value:
+        return None
+    old = value.pop(item_key)
+    _record(context, key, value, ["delete", item_key])
+    return old
+
+
+# --------------------------------------------------------------------------
+# Used by the session services
+# --------------------------------------------------------------------------
+
+
+def apply_ops(value: Any, ops: List[List[Any]]) -> Any:
+    """
+    Applies recorded operations to a value.
+
+    Args:
+        value: The value before the operations (a list or dict, or None).
+        ops (list): Operations as recorded by the state_* helpers.
+
+    Returns:
+        The updated value (changed in place where possible).
+    """
+    for op in ops:
+        name = op[0]
+        if name in ("append", "extend", "set", "remove"):
+            value = value if isinstance(value, list) else []
+            if name == "append":
+                value.append(copy.deepcopy(op[1]))
+            elif name == "extend":
+                value.extend(copy.deepcopy(op[1]))
+            elif name == "set" and op[1] < len(value):
+                value[op[1]] = copy.deepcopy(op[2])
+            elif name == "remove" and op[1] < len(value):
+                value.pop(op[1])
+        elif name in ("merge", "delete"):
+            value = value if isinstance(value, dict) else {}
+            if name == "merge":
+                value.update(copy.deepcopy(op[1]))
+            else:
+                value.pop(op[1], None)
+    return value
+
+
+class PatchedEventCounter:
+    """
+    Events with state patches per session since its last checkpoint, for the
+    max_sessions most recently patched sessions, so sessions that are never
+    deleted do not keep an entry for the life of the process.
+    """
+
+    def __init__(self, max_sessions: int = MAX_COUNTED_SESSIONS):
+        self.max_sessions = max_sessions
+        self._counts: "OrderedDict[tuple, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def count(self, key: tuple, every: int = CHECKPOINT_EVERY_PATCHED_EVENTS) -> bool:
+        """
+        Counts one patched event of a session.
+
+        Args:
+            key (tuple): (app_name, user_id, session_id).
+            every (int): Patched events between checkpoints.
+
+        Returns:
+            bool: Whether the session is due for a checkpoint (its count restarts).
+        """
+        count = self._counts.pop(key, 0) + 1
+        self._counts[key] = 0 if count >= every else count
+        if len(self._counts) > self.max_sessions:
+            self._counts.popitem(last=False)
+        return count >= every
+
+    def forget(self, key: tuple) -> None:
+        """Drops the count of a deleted session."""
+        self._counts.pop(key, None)
+
+
+def event_patches(actions) -> Dict[str, List[List[Any]]]:
+    """
+    The operations recorded in an event's actions.
+
+    Args:
+        actions: EventActions of an event (or None).
+
+    Returns:
+        dict: {state key: [operations]}; empty if the event has none.
+    """
+    if not actions or not actions.state_delta:
+        return {}
+    return {
+        key[len(PATCH_DELTA_PREFIX):]: ops
+        for key, ops in actions.state_delta.items()
+        if key.startswith(PATCH_DELTA_PREFIX)
+    }
+
+
+def replay_patches(state: Dict[str, Any], checkpoints: Dict[str, float], events: Iterable[Tuple[float, Any]]) -> bool:
+    """
+    Applies operations newer than each key's checkpoint, in event order.
+
+    A full write of a key (a plain state[key] = value) is stored in the
+    sessions table and already contains every earlier operation, so it acts
+    as a checkpoint too.
+
+    Args:
+        state (dict): Session state holding the checkpointed values; updated in place.
+        checkpoints (dict): {state key: timestamp already folded in}; updated in place.
+        events: (timestamp, actions) pairs in timestamp order.
+
+    Returns:
+        bool: Whether any operation was applied.
+    """
+    events = list(events)
+    for timestamp, actions in events:
+        for key in (actions.state_delta if actions and actions.state_delta else {}):
+            if not key.startswith(State.TEMP_PREFIX) and timestamp > checkpoints.get(key, float("-inf")):
+                checkpoints[key] = timestamp
+
+    applied = False
+    for timestamp, actions in events:
+        for key, ops in event_patches(actions).items():
+            if timestamp <= checkpoints.get(key, float("-inf")):
+                continue
+            state[key] = apply_ops(state.get(key), ops)
+            checkpoints[key] = timestamp
+            applied = True
+    return applied
+
+
+def restore_patched_state(session) -> None:
+    """
+    Completes a session loaded from the database: replays the operations
+    newer than the stored checkpoints and hides the checkpoint bookkeeping.
+
+    Args:
+        session (Session): A session built from the sessions and events tables.
+    """
+    checkpoints = dict(session.state.pop(CHECKPOINT_STATE_KEY, None) or {})
+    replay_patches(session.state, checkpoints, ((event.timestamp, event.actions) for event in session.events))
+
+
+def checkpoint_state_patches(db, app_name: str, user_id: str, session_id: str) -> Optional[float]:
+    """
+    Folds every stored operation into the values in the sessions table.
+
+    Runs on a synchronous ORM session (DatabaseSessionFactory(), or
+    AsyncSession.run_sync()) and commits.
+
+    Args:
+        db: SQLAlchemy ORM session.
+        app_name (str): App name.
+        user_id (str): User id.
+        session_id (str): Session id.
+
+    Returns:
+        float: The session's new update_time, or None if there was nothing to fold.
+    """
+    storage_session = db.get(StorageSession, (app_name, user_id, session_id))
+    if storage_session is None:
+        return None
+    state = dict(storage_session.state)
+    checkpoints = dict(state.get(CHECKPOINT_STATE_KEY) or {})
+    rows = (
+        db.query(StorageEvent.timestamp, StorageEvent.actions)
+        .filter(
+            StorageEvent.app_name == app_name,
+            StorageEvent.user_id == user_id,
+            StorageEvent.session_id == session_id,
+        )
+        .order_by(StorageEvent.timestamp.asc())
+        .all()
+    )
+    if not replay_patches(state, checkpoints, ((row.timestamp.timestamp(), row.actions) for row in rows)):
+        return None
+    state[CHECKPOINT_STATE_KEY] = checkpoints
+    storage_session.state = state
+    db.commit()
+    db.refresh(storage_session)
+    return storage_session.update_time.timestamp()